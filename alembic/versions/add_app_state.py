@@ -0,0 +1,29 @@
+"""add_app_state
+
+Revision ID: add_app_state
+Revises: d6f3b8e90044
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a4c9fa0047'
+down_revision = 'd6f3b8e90044'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'app_state',
+        sa.Column('key', sa.String(length=100), primary_key=True),
+        sa.Column('value', sa.String(length=255), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('app_state')
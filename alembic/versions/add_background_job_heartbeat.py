@@ -0,0 +1,24 @@
+"""add_background_job_heartbeat
+
+Revision ID: add_background_job_heartbeat
+Revises: e7a4c9fa0047
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8b5dab10040'
+down_revision = 'e7a4c9fa0047'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('background_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('background_jobs', 'heartbeat_at')
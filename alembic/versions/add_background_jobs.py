@@ -0,0 +1,41 @@
+"""add_background_jobs
+
+Revision ID: add_background_jobs
+Revises: b4d1f6c70035
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e2a7d80040'
+down_revision = 'b4d1f6c70035'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'background_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('group', sa.String(length=50), nullable=False),
+        sa.Column('func', sa.String(length=255), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('worker_id', sa.String(length=100), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_background_jobs_id', 'background_jobs', ['id'])
+    op.create_index('ix_background_jobs_status_group', 'background_jobs', ['status', 'group', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_background_jobs_status_group', table_name='background_jobs')
+    op.drop_index('ix_background_jobs_id', table_name='background_jobs')
+    op.drop_table('background_jobs')
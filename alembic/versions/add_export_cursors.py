@@ -0,0 +1,30 @@
+"""add_export_cursors
+
+Revision ID: add_export_cursors
+Revises: c5e2a7d80040
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6f3b8e90044'
+down_revision = 'c5e2a7d80040'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'export_cursors',
+        sa.Column('name', sa.String(length=100), primary_key=True),
+        sa.Column('last_created_at', sa.DateTime(), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('export_cursors')
@@ -0,0 +1,32 @@
+"""add_fsm_storage
+
+Revision ID: add_fsm_storage
+Revises: f2b8d4a50029
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9e5b60032'
+down_revision = 'f2b8d4a50029'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'fsm_storage',
+        sa.Column('key', sa.String(length=255), primary_key=True),
+        sa.Column('state', sa.String(length=255), nullable=True),
+        sa.Column('data', sa.JSON(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_fsm_storage_updated_at', 'fsm_storage', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_fsm_storage_updated_at', table_name='fsm_storage')
+    op.drop_table('fsm_storage')
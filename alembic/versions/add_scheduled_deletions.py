@@ -0,0 +1,32 @@
+"""add_scheduled_deletions
+
+Revision ID: add_scheduled_deletions
+Revises: a3c9e5b60032
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d1f6c70035'
+down_revision = 'a3c9e5b60032'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'scheduled_deletions',
+        sa.Column('bot_id', sa.Integer(), primary_key=True),
+        sa.Column('chat_id', sa.Integer(), primary_key=True),
+        sa.Column('message_id', sa.Integer(), primary_key=True),
+        sa.Column('delete_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_scheduled_deletions_delete_at', 'scheduled_deletions', ['delete_at'])
+
+
+def downgrade():
+    op.drop_index('ix_scheduled_deletions_delete_at', table_name='scheduled_deletions')
+    op.drop_table('scheduled_deletions')
@@ -0,0 +1,27 @@
+"""add_webapp_category_version
+
+Revision ID: add_webapp_category_version
+Revises: e1a7c3f40026
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d4a50029'
+down_revision = 'e1a7c3f40026'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'webapp_categories',
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0')
+    )
+
+
+def downgrade():
+    op.drop_column('webapp_categories', 'version')
@@ -0,0 +1,24 @@
+"""add_webapp_file_variants
+
+Revision ID: add_webapp_file_variants
+Revises: d5c6f0b12345
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1a7c3f40026'
+down_revision = 'd5c6f0b12345'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('webapp_files', sa.Column('variants', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('webapp_files', 'variants')
@@ -1,20 +1,31 @@
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from config import settings
 from bot_registry import BotRegistry
+from bots.api_session import acquire_api_session, release_api_session
+from bots.fsm_storage import create_fsm_storage
+from bots.handler_timing import install_handler_timing
+from bots.throttling import create_throttling_middleware
+from bots.webhook import WebhookUpdateConsumer
 
 
 class AdminBot:
     """Admin Bot instance"""
     
     def __init__(self):
-        self.bot = Bot(token=settings.admin_bot_token)
-        self.storage = MemoryStorage()
+        self.bot = Bot(token=settings.admin_bot_token, session=acquire_api_session())
+        self.storage = create_fsm_storage()
         self.dp = Dispatcher(storage=self.storage)
+        self.dp.update.outer_middleware(create_throttling_middleware("admin"))
+        install_handler_timing(self.dp, "admin")
+        self.webhook = WebhookUpdateConsumer("admin", self.bot, self.dp)
+        self.use_webhook = False
+        self._handlers_registered = False
         BotRegistry.set_admin_bot(self.bot)
     
-    async def start(self):
-        """Start the admin bot"""
+    def register_handlers(self):
+        """Register routers once (webhook routes may receive updates before start)"""
+        if self._handlers_registered:
+            return
         from bots.handlers import admin_handlers
         from bots.handlers import admin_category_handlers
         from bots.handlers import admin_alert_handlers
@@ -29,10 +40,25 @@ class AdminBot:
         self.dp.include_router(admin_export_handlers.router)
         self.dp.include_router(admin_menu_handlers.router)
         self.dp.include_router(admin_dynamic_menu_handlers.router)
+        self._handlers_registered = True
+    
+    async def start(self, use_webhook: bool = False, register_webhook: bool = True):
+        """Start the admin bot with webhook or polling"""
+        self.register_handlers()
+        self.use_webhook = use_webhook
+        
+        if use_webhook:
+            await self.webhook.start(register=register_webhook)
+            return
         
+        # getUpdates is rejected while a webhook is registered
+        await self.bot.delete_webhook()
         await self.dp.start_polling(self.bot)
     
     async def stop(self):
         """Stop the admin bot"""
-        await self.bot.session.close()
+        if self.use_webhook:
+            await self.webhook.stop()
+        await self.storage.close()
+        await release_api_session()
         BotRegistry.set_admin_bot(None)
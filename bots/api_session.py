@@ -0,0 +1,256 @@
+"""
+Shared outbound Telegram API session for both bots
+One tuned aiohttp connection pool plus request middlewares that skip no-op
+message edits and record per-method latency
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram import Bot, __version__ as aiogram_version
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import (
+    DeleteMessage,
+    DeleteMessages,
+    EditMessageCaption,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    SendMessage,
+    TelegramMethod,
+)
+from aiogram.methods.base import TelegramType
+from aiogram.types import Message
+
+from config import settings
+from utils.logger import logger
+from utils.metrics import metrics
+
+TELEGRAM_API_DURATION = metrics.histogram(
+    "telegram_api_request_seconds",
+    "Outbound Bot API call latency by method and outcome",
+    ("method", "outcome")
+)
+
+NOT_MODIFIED_ERROR = "message is not modified"
+
+# (bot_id, chat_id, message_id) or (bot_id, inline_message_id)
+MessageKey = Tuple[Any, ...]
+
+
+def _message_key(bot: Bot, method: TelegramMethod) -> Optional[MessageKey]:
+    inline_message_id = getattr(method, "inline_message_id", None)
+    if inline_message_id:
+        return bot.id, inline_message_id
+    message_id = getattr(method, "message_id", None)
+    if message_id is None:
+        return None
+    return bot.id, method.chat_id, message_id
+
+
+def _fingerprint(*parts: Any) -> str:
+    payload = json.dumps(
+        [part.model_dump(mode="json", exclude_none=True) if hasattr(part, "model_dump") else repr(part) for part in parts],
+        sort_keys=True,
+        default=repr
+    )
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class NoOpEditMiddleware(BaseRequestMiddleware):
+    """
+    Skips edits that would not change a message.
+
+    The content of messages the bot sent or edited is remembered as
+    fingerprints of (text, parse mode, entities) and of the inline keyboard.
+    An edit matching what the message already shows returns ``True``
+    without a request, identical edits of the same message running at the
+    same time share one request, and a "message is not modified" answer
+    from Telegram is treated as success.
+
+    The memory is per process: when several processes edit the same
+    messages, disable it with BOT_API_SKIP_NOOP_EDITS=false.
+    """
+
+    def __init__(self, max_messages: int = 10000):
+        self.max_messages = max_messages
+        self._content: "OrderedDict[MessageKey, Dict[str, str]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[MessageKey, str], asyncio.Future] = {}
+        self.skipped = 0
+
+    def _remember(self, key: MessageKey, **fingerprints: str) -> None:
+        content = self._content.get(key)
+        if content is None:
+            content = self._content[key] = {}
+            if len(self._content) > self.max_messages:
+                self._content.popitem(last=False)
+        else:
+            self._content.move_to_end(key)
+        content.update(fingerprints)
+
+    def _edit_fingerprints(self, method: TelegramMethod) -> Dict[str, str]:
+        markup = _fingerprint(method.reply_markup)
+        if isinstance(method, EditMessageText):
+            return {"text": _fingerprint(method.text, method.parse_mode, method.entities), "markup": markup}
+        if isinstance(method, EditMessageCaption):
+            return {"caption": _fingerprint(method.caption, method.parse_mode, method.caption_entities), "markup": markup}
+        return {"markup": markup}
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Any:
+        if isinstance(method, SendMessage):
+            result = await make_request(bot, method)
+            if isinstance(result, Message):
+                self._remember(
+                    (bot.id, result.chat.id, result.message_id),
+                    text=_fingerprint(method.text, method.parse_mode, method.entities),
+                    markup=_fingerprint(method.reply_markup)
+                )
+            return result
+
+        if isinstance(method, (DeleteMessage, DeleteMessages)):
+            message_ids = method.message_ids if isinstance(method, DeleteMessages) else [method.message_id]
+            for message_id in message_ids:
+                self._content.pop((bot.id, method.chat_id, message_id), None)
+            return await make_request(bot, method)
+
+        if not isinstance(method, (EditMessageText, EditMessageCaption, EditMessageReplyMarkup)):
+            return await make_request(bot, method)
+
+        key = _message_key(bot, method)
+        if key is None:
+            return await make_request(bot, method)
+
+        fingerprints = self._edit_fingerprints(method)
+        current = self._content.get(key, {})
+        if all(current.get(name) == value for name, value in fingerprints.items()):
+            self.skipped += 1
+            return True
+
+        flight_key = (key, "|".join(f"{name}={value}" for name, value in sorted(fingerprints.items())))
+        pending = self._in_flight.get(flight_key)
+        if pending is not None:
+            self.skipped += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[flight_key] = future
+        try:
+            try:
+                result = await make_request(bot, method)
+            except TelegramBadRequest as e:
+                if NOT_MODIFIED_ERROR not in e.message.lower():
+                    raise
+                result = True
+            self._remember(key, **fingerprints)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            self._content.pop(key, None)
+            future.cancel()
+            raise
+        except Exception as e:
+            # Unknown state after a failure: the next edit goes to Telegram
+            self._content.pop(key, None)
+            future.set_exception(e)
+            # Nobody else may be waiting; do not warn about a lost exception
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[flight_key]
+
+
+class LatencyMiddleware(BaseRequestMiddleware):
+    """Records Bot API call latency per method"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Any:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await make_request(bot, method)
+            outcome = "ok"
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            TELEGRAM_API_DURATION.observe((method.__api_method__, outcome), time.perf_counter() - started)
+
+
+# aiogram releases whose AiohttpSession builds its connector from the
+# private _connector_init dict (checked by tests/test_api_session.py)
+CONNECTOR_INIT_AIOGRAM_VERSIONS = ("3.4.",)
+
+_shared_session: Optional[AiohttpSession] = None
+_session_users = 0
+
+
+def tune_connector(session: AiohttpSession) -> bool:
+    """
+    Apply the BOT_API_* pool options to the connector the session opens
+    lazily. aiogram has no public hook for them, so on an untested aiogram
+    release the defaults are kept and a warning is logged.
+    """
+    connector_init = getattr(session, "_connector_init", None)
+    if not aiogram_version.startswith(CONNECTOR_INIT_AIOGRAM_VERSIONS) or not isinstance(connector_init, dict):
+        logger.warning(
+            f"⚠️ aiogram {aiogram_version}: настройки пула соединений Bot API не применены, "
+            "проверьте bots/api_session.py"
+        )
+        return False
+    connector_init.update(
+        limit=settings.bot_api_pool_size,
+        limit_per_host=settings.bot_api_pool_size,
+        ttl_dns_cache=settings.bot_api_dns_cache_ttl,
+        keepalive_timeout=settings.bot_api_keepalive_timeout,
+    )
+    return True
+
+
+def create_api_session() -> AiohttpSession:
+    """Build a tuned AiohttpSession with the request middlewares installed"""
+    session = AiohttpSession(timeout=settings.bot_api_timeout)
+    tune_connector(session)
+    # The first middleware is the outermost: skipped edits never reach the latency histogram
+    if settings.bot_api_skip_noop_edits:
+        no_op_edits = NoOpEditMiddleware()
+        session.middleware(no_op_edits)
+        metrics.gauge("telegram_api_edits_skipped", "No-op message edits not sent to Telegram", lambda: no_op_edits.skipped)
+    session.middleware(LatencyMiddleware())
+    return session
+
+
+def acquire_api_session() -> AiohttpSession:
+    """Return the session shared by the bots of this process"""
+    global _shared_session, _session_users
+    if _shared_session is None:
+        _shared_session = create_api_session()
+    _session_users += 1
+    return _shared_session
+
+
+async def release_api_session() -> None:
+    """Close the shared session once the last bot using it has stopped"""
+    global _shared_session, _session_users
+    _session_users = max(0, _session_users - 1)
+    if _session_users or _shared_session is None:
+        return
+    session, _shared_session = _shared_session, None
+    try:
+        await session.close()
+    except Exception as e:
+        logger.error(f"❌ Ошибка закрытия сессии Bot API: {str(e)}", exc_info=True)
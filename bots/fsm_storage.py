@@ -0,0 +1,236 @@
+"""
+Persistent FSM storage for the bots
+Keeps aiogram FSM state and data in the database through AsyncSessionLocal
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete, insert
+
+from config import settings
+from database import AsyncSessionLocal
+from models import FSMRecord
+from utils.logger import logger
+
+
+class _CachedRecord:
+    """In-memory copy of one FSM record"""
+
+    __slots__ = ("state", "data", "updated_at", "loaded_at", "dirty")
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], updated_at: datetime):
+        self.state = state
+        self.data = data
+        self.updated_at = updated_at
+        self.loaded_at = time.monotonic()
+        self.dirty = False
+
+    @property
+    def is_empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+class SQLStorage(BaseStorage):
+    """
+    FSM storage backed by the ``fsm_storage`` table.
+
+    Writes are coalesced: a wizard step usually changes state and data in
+    quick succession, so changed records are written together after
+    ``flush_delay`` seconds in a single transaction. Reads are served from
+    a cache for ``cache_ttl`` seconds; set it to 0 when several processes
+    handle updates of the same chats. Records untouched for ``state_ttl``
+    seconds are abandoned wizards and are evicted.
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        *,
+        state_ttl: int = 86400,
+        flush_delay: float = 0.5,
+        cache_ttl: float = 60.0,
+        sweep_interval: float = 600.0
+    ):
+        self.session_factory = session_factory
+        self.state_ttl = state_ttl
+        self.flush_delay = flush_delay
+        self.cache_ttl = cache_ttl
+        self.sweep_interval = sweep_interval
+        self._cache: Dict[str, _CachedRecord] = {}
+        self._dirty: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._sweep_task: Optional[asyncio.Task] = None
+        self._last_sweep = time.monotonic()
+
+    @staticmethod
+    def _build_key(key: StorageKey) -> str:
+        thread_id = key.thread_id if key.thread_id is not None else ""
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{thread_id}:{key.destiny}"
+
+    def _is_expired(self, updated_at: datetime) -> bool:
+        return bool(self.state_ttl) and datetime.utcnow() - updated_at > timedelta(seconds=self.state_ttl)
+
+    async def _load(self, storage_key: str) -> _CachedRecord:
+        async with self.session_factory() as session:
+            row = await session.get(FSMRecord, storage_key)
+
+        if row is None:
+            return _CachedRecord(None, {}, datetime.utcnow())
+
+        record = _CachedRecord(row.state, dict(row.data or {}), row.updated_at)
+        if self._is_expired(row.updated_at):
+            # Abandoned wizard: start over and delete the row on next flush
+            record = _CachedRecord(None, {}, datetime.utcnow())
+            self._mark_dirty(storage_key, record)
+        return record
+
+    async def _get_record(self, key: StorageKey) -> _CachedRecord:
+        self._maybe_schedule_sweep()
+        storage_key = self._build_key(key)
+        record = self._cache.get(storage_key)
+
+        if record is not None and (record.dirty or time.monotonic() - record.loaded_at < self.cache_ttl):
+            return record
+
+        record = await self._load(storage_key)
+        # A write may have happened while loading; it wins over the loaded copy
+        current = self._cache.get(storage_key)
+        if current is not None and current.dirty:
+            return current
+        self._cache[storage_key] = record
+        return record
+
+    def _mark_dirty(self, storage_key: str, record: _CachedRecord) -> None:
+        record.dirty = True
+        record.updated_at = datetime.utcnow()
+        self._dirty.add(storage_key)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later(), name="fsm-storage-flush")
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get_record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(self._build_key(key), record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await self._get_record(key)
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._get_record(key)
+        record.data = data.copy()
+        self._mark_dirty(self._build_key(key), record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await self._get_record(key)
+        return record.data.copy()
+
+    async def flush(self) -> None:
+        """Write all changed records in one transaction; records with non-JSON data are skipped"""
+        keys = list(self._dirty)
+        self._dirty.clear()
+        if not keys:
+            return
+
+        rows = []
+        for storage_key in list(keys):
+            record = self._cache.get(storage_key)
+            if record is None:
+                continue
+            record.dirty = False
+            if record.is_empty:
+                continue
+            try:
+                json.dumps(record.data)
+            except (TypeError, ValueError) as e:
+                # Only cached: a value the JSON column cannot hold must
+                # not fail the transaction for the other records
+                logger.error(f"❌ FSM данные {storage_key} не сохранены, значение не JSON: {str(e)}")
+                keys.remove(storage_key)
+                continue
+            rows.append({
+                "key": storage_key,
+                "state": record.state,
+                "data": record.data,
+                "updated_at": record.updated_at
+            })
+
+        if not keys:
+            return
+        try:
+            async with self.session_factory() as session:
+                await session.execute(delete(FSMRecord).where(FSMRecord.key.in_(keys)))
+                if rows:
+                    await session.execute(insert(FSMRecord), rows)
+                await session.commit()
+            logger.debug(f"FSM: сохранено записей {len(rows)}, удалено {len(keys) - len(rows)}")
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения FSM состояния: {str(e)}", exc_info=True)
+            for storage_key in keys:
+                record = self._cache.get(storage_key)
+                if record is not None and not record.dirty:
+                    # Retry later without touching updated_at
+                    record.dirty = True
+                    self._dirty.add(storage_key)
+
+    def _maybe_schedule_sweep(self) -> None:
+        if time.monotonic() - self._last_sweep < self.sweep_interval:
+            return
+        if self._sweep_task is None or self._sweep_task.done():
+            self._last_sweep = time.monotonic()
+            self._sweep_task = asyncio.create_task(self.evict_expired(), name="fsm-storage-sweep")
+
+    async def evict_expired(self) -> int:
+        """Delete abandoned records and drop stale cache entries"""
+        now = time.monotonic()
+        for storage_key, record in list(self._cache.items()):
+            if record.dirty:
+                continue
+            if now - record.loaded_at >= self.cache_ttl or self._is_expired(record.updated_at):
+                del self._cache[storage_key]
+
+        if not self.state_ttl:
+            return 0
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.state_ttl)
+        try:
+            async with self.session_factory() as session:
+                result = await session.execute(delete(FSMRecord).where(FSMRecord.updated_at < cutoff))
+                await session.commit()
+            if result.rowcount:
+                logger.info(f"FSM: удалено заброшенных состояний: {result.rowcount}")
+            return result.rowcount or 0
+        except Exception as e:
+            logger.error(f"❌ Ошибка очистки FSM состояний: {str(e)}", exc_info=True)
+            return 0
+
+    async def close(self) -> None:
+        if self._sweep_task is not None and not self._sweep_task.done():
+            self._sweep_task.cancel()
+        # Let a scheduled flush finish instead of cancelling it mid-write
+        if self._flush_task is not None and not self._flush_task.done():
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+
+
+def create_fsm_storage() -> BaseStorage:
+    """Create the FSM storage configured by FSM_STORAGE (sql or memory)"""
+    if settings.fsm_storage.lower() == "memory":
+        return MemoryStorage()
+
+    return SQLStorage(
+        state_ttl=settings.fsm_state_ttl,
+        flush_delay=settings.fsm_flush_delay,
+        cache_ttl=settings.fsm_cache_ttl
+    )
@@ -0,0 +1,88 @@
+"""
+Handler timing for the bots
+Inner middleware recording how long every matched handler runs, by router
+and handler name
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.event.bases import SkipHandler
+from aiogram.types import TelegramObject
+
+from utils.metrics import metrics
+
+BOT_HANDLER_DURATION = metrics.histogram(
+    "bot_handler_duration_seconds",
+    "Bot update handler run time by bot, router, handler and outcome",
+    ("bot", "router", "handler", "outcome")
+)
+
+# Observers whose "handlers" are the dispatcher itself or error hooks
+SKIPPED_OBSERVERS = ("update", "error")
+
+
+def _router_name(router: Any, callback: Callable[..., Any]) -> str:
+    name = getattr(router, "name", None)
+    # Routers created without a name are called after their id
+    if not name or name.startswith("0x"):
+        return callback.__module__.rsplit(".", 1)[-1]
+    return name
+
+
+class HandlerTimingMiddleware(BaseMiddleware):
+    """
+    Times the handler chosen for an event.
+
+    As an inner middleware it runs only after the filters matched, so the
+    time spent in filters and in the outer middlewares (throttling) is not
+    included; updates no handler matched are not recorded.
+    """
+
+    def __init__(self, bot_name: str):
+        self.bot_name = bot_name
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        if handler_object is None:
+            return await handler(event, data)
+
+        callback = handler_object.callback
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await handler(event, data)
+            outcome = "ok"
+            return result
+        except SkipHandler:
+            outcome = "skipped"
+            raise
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            BOT_HANDLER_DURATION.observe(
+                (
+                    self.bot_name,
+                    _router_name(data.get("event_router"), callback),
+                    getattr(callback, "__qualname__", repr(callback)),
+                    outcome
+                ),
+                time.perf_counter() - started
+            )
+
+
+def install_handler_timing(dp: Dispatcher, bot_name: str) -> HandlerTimingMiddleware:
+    """Attach the middleware to every event observer of a dispatcher (routers included later inherit it)"""
+    middleware = HandlerTimingMiddleware(bot_name)
+    for event_name, observer in dp.observers.items():
+        if event_name not in SKIPPED_OBSERVERS:
+            observer.middleware(middleware)
+    return middleware
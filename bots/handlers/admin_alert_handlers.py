@@ -15,9 +15,10 @@ from states import AdminStates
 from models import AlertType, Alert
 from utils.logger import logger
 from utils.message_helpers import delete_message_later
+from utils.job_queue import background_job
+from utils.task_supervisor import supervisor
 from bot_registry import get_admin_bot, get_user_bot
 from datetime import datetime
-import asyncio
 
 router = Router()
 
@@ -280,13 +281,13 @@ async def approve_alert(callback: CallbackQuery, state: FSMContext):
         admin_bot = get_admin_bot()
         if admin_bot:
             from utils.message_helpers import delete_message_immediately
-            asyncio.create_task(
-                delete_message_immediately(admin_bot, callback.message.chat.id, callback.message.message_id)
+            supervisor.spawn(
+                "cleanup", delete_message_immediately, admin_bot, callback.message.chat.id, callback.message.message_id
             )
         
         # AUTOMATICALLY TRIGGER BROADCAST (FIX #5 - broadcast must work!)
         # Start broadcast in background immediately after approval
-        asyncio.create_task(_broadcast_alert_task(alert_id, callback.message.chat.id))
+        supervisor.spawn("broadcasts", _broadcast_alert_task, alert_id, callback.message.chat.id)
         
         logger.info(f"[admin_alert_approve] ✅ Админ {admin_id} одобрил алерт #{alert_id} - начата рассылка")
         
@@ -295,6 +296,7 @@ async def approve_alert(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка одобрения алерта", show_alert=True)
 
 
+@background_job
 async def _broadcast_alert_task(alert_id: int, admin_chat_id: int):
     """Background task to broadcast alert to users"""
     try:
@@ -612,7 +614,7 @@ async def broadcast_alert(callback: CallbackQuery, state: FSMContext):
         )
         
         # Launch broadcast task (same as automatic flow)
-        asyncio.create_task(_broadcast_alert_task(alert_id, callback.message.chat.id))
+        supervisor.spawn("broadcasts", _broadcast_alert_task, alert_id, callback.message.chat.id)
         
         await callback.answer("📢 Рассылка запускается", show_alert=True)
         
@@ -8,13 +8,23 @@ from aiogram.filters import Command, StateFilter
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
 from aiogram.fsm.context import FSMContext
 from database import AsyncSessionLocal
-from utils.exporter import ExportService
+from utils.export_jobs import EXPORT_GROUP, EXPORTS, new_export_job_id, run_backup_job, run_export_job
+from utils.task_supervisor import supervisor
 from states import AdminStates
 from models import AlertType
 from utils.logger import logger
 from config import settings
+import asyncio
 import os
 
+ANALYTICS_MENU = (
+    ("alerts", "📋 Алерты"),
+    ("users", "👥 Пользователи"),
+    ("deliveries", "🚚 Доставки"),
+    ("user_activities", "📊 Активность"),
+    ("button_clicks", "🔘 Нажатия кнопок"),
+)
+
 router = Router()
 
 
@@ -28,6 +38,7 @@ async def show_export_menu(callback: CallbackQuery, state: FSMContext):
             [InlineKeyboardButton(text="📋 Экспорт алертов", callback_data="admin_export_alerts")],
             [InlineKeyboardButton(text="👥 Экспорт пользователей", callback_data="admin_export_users")],
             [InlineKeyboardButton(text="🚚 Экспорт доставок", callback_data="admin_export_deliveries")],
+            [InlineKeyboardButton(text="📈 Аналитика (Parquet)", callback_data="admin_export_analytics")],
             [InlineKeyboardButton(text="💾 Дамп базы данных (SQLite)", callback_data="admin_export_database")],
             [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_back_main")]
         ])
@@ -38,6 +49,7 @@ async def show_export_menu(callback: CallbackQuery, state: FSMContext):
             "Выберите что экспортировать:\n\n"
             "• CSV - табличный формат для Excel\n"
             "• JSON - структурированные данные\n"
+            "• Parquet - типизированные таблицы для аналитики\n"
             "• SQLite - полный дамп базы данных"
         )
         
@@ -51,6 +63,35 @@ async def show_export_menu(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка загрузки меню", show_alert=True)
 
 
+async def _submit_export(callback: CallbackQuery, export_type: str):
+    """Queue an export job; the worker edits the status message with its progress"""
+    try:
+        job_id = new_export_job_id()
+        await callback.message.edit_text(
+            f"⏳ {EXPORTS[export_type].title}...\n\n"
+            f"Задача #{job_id} поставлена в очередь"
+        )
+        
+        task = supervisor.spawn(
+            EXPORT_GROUP, run_export_job,
+            job_id, export_type, {}, callback.message.chat.id, callback.message.message_id
+        )
+        if task is None:
+            raise RuntimeError("background tasks are shutting down")
+        await callback.answer(f"Задача экспорта #{job_id}")
+        
+        logger.info(f"[export_{export_type}] ✅ Админ {callback.from_user.id} запустил задачу экспорта #{job_id}")
+        
+    except Exception as e:
+        logger.error(f"[export_{export_type}] ❌ Ошибка: {str(e)}", exc_info=True)
+        await callback.message.edit_text(
+            "❌ Ошибка экспорта",
+            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_export_menu")]
+            ])
+        )
+
+
 @router.callback_query(F.data == "admin_export_alerts")
 async def export_alerts_menu(callback: CallbackQuery, state: FSMContext):
     """Choose format for alerts export"""
@@ -82,129 +123,19 @@ async def export_alerts_menu(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data == "admin_export_do_alerts_csv")
 async def do_export_alerts_csv(callback: CallbackQuery, state: FSMContext):
     """Export alerts to CSV"""
-    try:
-        await callback.message.edit_text(
-            "⏳ Экспорт алертов в CSV...\n\n"
-            "Пожалуйста, подождите..."
-        )
-        
-        async with AsyncSessionLocal() as session:
-            # Export to CSV
-            filepath = await ExportService.export_alerts_csv(session)
-        
-        # Send file
-        file = FSInputFile(filepath)
-        await callback.message.answer_document(
-            document=file,
-            caption="✅ Экспорт алертов завершен!\n\n📊 CSV файл готов."
-        )
-        
-        # Clean up
-        ExportService.cleanup_export_file(filepath)
-        
-        # Return to menu
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 К меню экспорта", callback_data="admin_export_menu")]
-        ])
-        await callback.message.edit_text(
-            "✅ Файл отправлен!",
-            reply_markup=keyboard
-        )
-        
-        logger.info(f"[export_alerts_csv] ✅ Админ {callback.from_user.id} экспортировал алерты в CSV")
-        
-    except Exception as e:
-        logger.error(f"[export_alerts_csv] ❌ Ошибка: {str(e)}", exc_info=True)
-        await callback.message.edit_text(
-            "❌ Ошибка экспорта",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_export_menu")]
-            ])
-        )
+    await _submit_export(callback, "alerts_csv")
 
 
 @router.callback_query(F.data == "admin_export_do_alerts_json")
 async def do_export_alerts_json(callback: CallbackQuery, state: FSMContext):
     """Export alerts to JSON"""
-    try:
-        await callback.message.edit_text(
-            "⏳ Экспорт алертов в JSON...\n\n"
-            "Пожалуйста, подождите..."
-        )
-        
-        async with AsyncSessionLocal() as session:
-            # Export to JSON
-            filepath = await ExportService.export_alerts_json(session)
-        
-        # Send file
-        file = FSInputFile(filepath)
-        await callback.message.answer_document(
-            document=file,
-            caption="✅ Экспорт алертов завершен!\n\n📄 JSON файл готов."
-        )
-        
-        # Clean up
-        ExportService.cleanup_export_file(filepath)
-        
-        # Return to menu
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 К меню экспорта", callback_data="admin_export_menu")]
-        ])
-        await callback.message.edit_text(
-            "✅ Файл отправлен!",
-            reply_markup=keyboard
-        )
-        
-        logger.info(f"[export_alerts_json] ✅ Админ {callback.from_user.id} экспортировал алерты в JSON")
-        
-    except Exception as e:
-        logger.error(f"[export_alerts_json] ❌ Ошибка: {str(e)}", exc_info=True)
-        await callback.message.edit_text(
-            "❌ Ошибка экспорта",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_export_menu")]
-            ])
-        )
+    await _submit_export(callback, "alerts_json")
 
 
 @router.callback_query(F.data == "admin_export_do_alerts_txt")
 async def do_export_alerts_txt(callback: CallbackQuery, state: FSMContext):
     """Export alerts to TXT"""
-    try:
-        await callback.message.edit_text(
-            "⏳ Экспорт алертов в TXT...\n\n"
-            "Пожалуйста, подождите..."
-        )
-        
-        async with AsyncSessionLocal() as session:
-            filepath = await ExportService.export_alerts_txt(session)
-        
-        file = FSInputFile(filepath)
-        await callback.message.answer_document(
-            document=file,
-            caption="✅ Экспорт алертов завершен!\n\n📝 TXT файл готов."
-        )
-        
-        ExportService.cleanup_export_file(filepath)
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 К меню экспорта", callback_data="admin_export_menu")]
-        ])
-        await callback.message.edit_text(
-            "✅ Файл отправлен!",
-            reply_markup=keyboard
-        )
-        
-        logger.info(f"[export_alerts_txt] ✅ Админ {callback.from_user.id} экспортировал алерты в TXT")
-        
-    except Exception as e:
-        logger.error(f"[export_alerts_txt] ❌ Ошибка: {str(e)}", exc_info=True)
-        await callback.message.edit_text(
-            "❌ Ошибка экспорта",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_export_menu")]
-            ])
-        )
+    await _submit_export(callback, "alerts_txt")
 
 
 @router.callback_query(F.data == "admin_export_users")
@@ -236,85 +167,13 @@ async def export_users_menu(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data == "admin_export_do_users_csv")
 async def do_export_users_csv(callback: CallbackQuery, state: FSMContext):
     """Export users to CSV"""
-    try:
-        await callback.message.edit_text(
-            "⏳ Экспорт пользователей в CSV...\n\n"
-            "Пожалуйста, подождите..."
-        )
-        
-        async with AsyncSessionLocal() as session:
-            # Export to CSV
-            filepath = await ExportService.export_users_csv(session)
-        
-        # Send file
-        file = FSInputFile(filepath)
-        await callback.message.answer_document(
-            document=file,
-            caption="✅ Экспорт пользователей завершен!\n\n📊 CSV файл готов."
-        )
-        
-        # Clean up
-        ExportService.cleanup_export_file(filepath)
-        
-        # Return to menu
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 К меню экспорта", callback_data="admin_export_menu")]
-        ])
-        await callback.message.edit_text(
-            "✅ Файл отправлен!",
-            reply_markup=keyboard
-        )
-        
-        logger.info(f"[export_users_csv] ✅ Админ {callback.from_user.id} экспортировал пользователей в CSV")
-        
-    except Exception as e:
-        logger.error(f"[export_users_csv] ❌ Ошибка: {str(e)}", exc_info=True)
-        await callback.message.edit_text(
-            "❌ Ошибка экспорта",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_export_menu")]
-            ])
-        )
+    await _submit_export(callback, "users_csv")
 
 
 @router.callback_query(F.data == "admin_export_do_users_txt")
 async def do_export_users_txt(callback: CallbackQuery, state: FSMContext):
     """Export users to TXT"""
-    try:
-        await callback.message.edit_text(
-            "⏳ Экспорт пользователей в TXT...\n\n"
-            "Пожалуйста, подождите..."
-        )
-        
-        async with AsyncSessionLocal() as session:
-            filepath = await ExportService.export_users_txt(session)
-        
-        file = FSInputFile(filepath)
-        await callback.message.answer_document(
-            document=file,
-            caption="✅ Экспорт пользователей завершен!\n\n📝 TXT файл готов."
-        )
-        
-        ExportService.cleanup_export_file(filepath)
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 К меню экспорта", callback_data="admin_export_menu")]
-        ])
-        await callback.message.edit_text(
-            "✅ Файл отправлен!",
-            reply_markup=keyboard
-        )
-        
-        logger.info(f"[export_users_txt] ✅ Админ {callback.from_user.id} экспортировал пользователей в TXT")
-        
-    except Exception as e:
-        logger.error(f"[export_users_txt] ❌ Ошибка: {str(e)}", exc_info=True)
-        await callback.message.edit_text(
-            "❌ Ошибка экспорта",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_export_menu")]
-            ])
-        )
+    await _submit_export(callback, "users_txt")
 
 
 @router.callback_query(F.data == "admin_export_deliveries")
@@ -346,125 +205,78 @@ async def export_deliveries_menu(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data == "admin_export_do_deliveries_csv")
 async def do_export_deliveries_csv(callback: CallbackQuery, state: FSMContext):
     """Export deliveries to CSV"""
-    try:
-        await callback.message.edit_text(
-            "⏳ Экспорт доставок в CSV...\n\n"
-            "Пожалуйста, подождите..."
-        )
-        
-        async with AsyncSessionLocal() as session:
-            # Export to CSV
-            filepath = await ExportService.export_deliveries_csv(session)
-        
-        # Send file
-        file = FSInputFile(filepath)
-        await callback.message.answer_document(
-            document=file,
-            caption="✅ Экспорт доставок завершен!\n\n📊 CSV файл готов."
-        )
-        
-        # Clean up
-        ExportService.cleanup_export_file(filepath)
-        
-        # Return to menu
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 К меню экспорта", callback_data="admin_export_menu")]
-        ])
-        await callback.message.edit_text(
-            "✅ Файл отправлен!",
-            reply_markup=keyboard
-        )
-        
-        logger.info(f"[export_deliveries_csv] ✅ Админ {callback.from_user.id} экспортировал доставки в CSV")
-        
-    except Exception as e:
-        logger.error(f"[export_deliveries_csv] ❌ Ошибка: {str(e)}", exc_info=True)
-        await callback.message.edit_text(
-            "❌ Ошибка экспорта",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_export_menu")]
-            ])
-        )
+    await _submit_export(callback, "deliveries_csv")
 
 
 @router.callback_query(F.data == "admin_export_do_deliveries_txt")
 async def do_export_deliveries_txt(callback: CallbackQuery, state: FSMContext):
     """Export deliveries to TXT"""
+    await _submit_export(callback, "deliveries_txt")
+
+
+@router.callback_query(F.data == "admin_export_analytics")
+async def export_analytics_menu(callback: CallbackQuery, state: FSMContext):
+    """Choose table for columnar analytics export"""
     try:
-        await callback.message.edit_text(
-            "⏳ Экспорт доставок в TXT...\n\n"
-            "Пожалуйста, подождите..."
-        )
-        
-        async with AsyncSessionLocal() as session:
-            filepath = await ExportService.export_deliveries_txt(session)
-        
-        file = FSInputFile(filepath)
-        await callback.message.answer_document(
-            document=file,
-            caption="✅ Экспорт доставок завершен!\n\n📝 TXT файл готов."
-        )
-        
-        ExportService.cleanup_export_file(filepath)
+        await state.update_data(export_type="analytics")
         
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 К меню экспорта", callback_data="admin_export_menu")]
-        ])
-        await callback.message.edit_text(
-            "✅ Файл отправлен!",
-            reply_markup=keyboard
+            [
+                InlineKeyboardButton(text=f"{title} — все", callback_data=f"admin_export_do_analytics_{table}"),
+                InlineKeyboardButton(text="🆕 новые", callback_data=f"admin_export_do_analytics_{table}_new")
+            ]
+            for table, title in ANALYTICS_MENU
+        ] + [[InlineKeyboardButton(text="🔙 Назад", callback_data="admin_export_menu")]])
+        
+        text = (
+            "📈 АНАЛИТИЧЕСКИЙ ЭКСПОРТ\n"
+            "═══════════════════════════════════════\n\n"
+            "Полные строки с типами (Parquet, без pyarrow — JSON Lines).\n"
+            "«Новые» — только записи после прошлого экспорта таблицы."
         )
         
-        logger.info(f"[export_deliveries_txt] ✅ Админ {callback.from_user.id} экспортировал доставки в TXT")
+        await callback.message.edit_text(text, reply_markup=keyboard)
+        await callback.answer()
         
     except Exception as e:
-        logger.error(f"[export_deliveries_txt] ❌ Ошибка: {str(e)}", exc_info=True)
-        await callback.message.edit_text(
-            "❌ Ошибка экспорта",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_export_menu")]
-            ])
-        )
+        logger.error(f"[export_analytics_menu] ❌ Ошибка: {str(e)}", exc_info=True)
+        await callback.answer("❌ Ошибка", show_alert=True)
+
+
+@router.callback_query(F.data.startswith("admin_export_do_analytics_"))
+async def do_export_analytics(callback: CallbackQuery, state: FSMContext):
+    """Export one table in columnar format (all rows or new since the last export)"""
+    export_type = callback.data.removeprefix("admin_export_do_")
+    if export_type not in EXPORTS:
+        await callback.answer("❌ Неизвестная таблица", show_alert=True)
+        return
+    await _submit_export(callback, export_type)
 
 
 @router.callback_query(F.data == "admin_export_database")
 async def do_export_database(callback: CallbackQuery, state: FSMContext):
-    """Export entire database to SQLite dump"""
+    """Queue a consistent online backup of the database"""
     try:
+        job_id = new_export_job_id()
         await callback.message.edit_text(
-            "⏳ Создание дампа базы данных...\n\n"
-            "Пожалуйста, подождите..."
-        )
-        
-        # Export database
-        filepath = await ExportService.export_database_sqlite(settings.database_url)
-        
-        # Send file
-        file = FSInputFile(filepath)
-        await callback.message.answer_document(
-            document=file,
-            caption="✅ Дамп базы данных готов!\n\n💾 SQLite файл содержит все таблицы и данные."
+            "⏳ Резервная копия базы данных...\n\n"
+            f"Задача #{job_id} поставлена в очередь"
         )
         
-        # Clean up
-        ExportService.cleanup_export_file(filepath)
-        
-        # Return to menu
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 К меню экспорта", callback_data="admin_export_menu")]
-        ])
-        await callback.message.edit_text(
-            "✅ Файл отправлен!",
-            reply_markup=keyboard
+        task = supervisor.spawn(
+            EXPORT_GROUP, run_backup_job,
+            job_id, callback.message.chat.id, callback.message.message_id
         )
+        if task is None:
+            raise RuntimeError("background tasks are shutting down")
+        await callback.answer(f"Задача экспорта #{job_id}")
         
-        logger.info(f"[export_database] ✅ Админ {callback.from_user.id} экспортировал дамп базы данных")
+        logger.info(f"[export_database] ✅ Админ {callback.from_user.id} запустил резервную копию #{job_id}")
         
     except Exception as e:
         logger.error(f"[export_database] ❌ Ошибка: {str(e)}", exc_info=True)
         await callback.message.edit_text(
-            "❌ Ошибка экспорта\n\n"
-            "Экспорт базы данных возможен только для SQLite.",
+            "❌ Ошибка экспорта",
             reply_markup=InlineKeyboardMarkup(inline_keyboard=[
                 [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_export_menu")]
             ])
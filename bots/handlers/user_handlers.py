@@ -10,7 +10,6 @@ from aiogram.types import (
     InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
 )
 from aiogram.fsm.context import FSMContext
-import asyncio
 import re
 
 from database import AsyncSessionLocal
@@ -25,7 +24,10 @@ from services.statistics_service import StatisticsService
 from services.geolocation_service import GeolocationService
 from models import AlertType, User
 from utils.logger import logger
+from utils.keyboard_cache import keyboard_cache
 from utils.message_helpers import send_menu_auto_delete, delete_message_later
+from utils.job_queue import background_job
+from utils.task_supervisor import supervisor
 from config import settings
 from bot_registry import get_admin_bot, get_user_bot
 
@@ -35,114 +37,120 @@ router = Router()
 # HELPER FUNCTIONS
 # ==============================================================================
 
-async def send_alert_to_admins_for_moderation(alert):
+@background_job
+async def send_alert_to_admins_for_moderation(alert_id: int, session):
     """
     Отправить алерт всем администраторам для модерации через ADMIN BOT
     Send alert to all admins for moderation via ADMIN BOT
     
     ИСПРАВЛЕНИЕ: Теперь отправляется через Admin Bot, а НЕ через User Bot!
     FIX: Now sends via Admin Bot, NOT User Bot!
+    
+    Runs as a supervised background task with its own session.
     """
     admin_bot = get_admin_bot()
     if not admin_bot:
         logger.error(f"[send_alert_to_admins] ❌ Admin Bot не доступен!")
         return
     
-    logger.info(f"[send_alert_to_admins] Начало | alert_id={alert.id} type={alert.alert_type.value}")
     try:
-        async with AsyncSessionLocal() as session:
-            admins = await UserService.get_all_admins(session)
-            
-            for admin in admins:
-                try:
-                    # Alert type emoji mapping
-                    type_emojis = {
-                        AlertType.SHURTA: "🚨",
-                        AlertType.MISSING_PERSON: "👤",
-                        AlertType.LOST_ITEM: "📦",
-                        AlertType.SCAM_WARNING: "⚠️",
-                        AlertType.MEDICAL_EMERGENCY: "🏥",
-                        AlertType.ACCOMMODATION_NEEDED: "🏠",
-                        AlertType.RIDE_SHARING: "🚗",
-                        AlertType.JOB_POSTING: "💼",
-                        AlertType.LOST_DOCUMENT: "📄",
-                        AlertType.EVENT_ANNOUNCEMENT: "🎉",
-                        AlertType.COURIER_NEEDED: "📦"
-                    }
-                    
-                    emoji = type_emojis.get(alert.alert_type, "📝")
-                    
-                    text = f"{emoji} НОВЫЙ АЛЕРТ НА МОДЕРАЦИЮ\n"
-                    text += f"═══════════════════════════════════════\n\n"
-                    text += f"Тип: {alert.alert_type.value}\n"
-                    
-                    if alert.title:
-                        text += f"Заголовок: {alert.title}\n"
-                    text += f"Описание: {alert.description}\n"
-                    
-                    if alert.phone:
-                        text += f"Телефон: {alert.phone}\n"
-                    
-                    if alert.address_text:
-                        text += f"Адрес: {alert.address_text}\n"
-                    elif alert.latitude and alert.longitude:
-                        text += f"Координаты: {alert.latitude}, {alert.longitude}\n"
-                    elif alert.maps_url:
-                        text += f"Карта: {alert.maps_url}\n"
-                    
-                    text += f"\nОт пользователя: {alert.creator_id}\n"
-                    text += f"ID алерта: {alert.id}\n"
-                    
-                    # 2-ROW BUTTON LAYOUT (COMPACT)
-                    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                        [
-                            InlineKeyboardButton(text="✅ Одобрить", callback_data=f"admin_alert_approve_{alert.id}"),
-                            InlineKeyboardButton(text="❌ Отклонить", callback_data=f"admin_alert_reject_{alert.id}")
-                        ]
-                    ])
-                    
-                    # Send location if available
-                    if alert.latitude and alert.longitude:
-                        await admin_bot.send_location(
-                            chat_id=admin.telegram_id,
-                            latitude=alert.latitude,
-                            longitude=alert.longitude
-                        )
-                    
-                    # Send photo or text via ADMIN BOT
-                    if alert.photo_file_id:
-                        msg = await admin_bot.send_photo(
-                            chat_id=admin.telegram_id,
-                            photo=alert.photo_file_id,
-                            caption=text,
-                            reply_markup=keyboard
-                        )
-                    else:
-                        msg = await admin_bot.send_message(
-                            chat_id=admin.telegram_id,
-                            text=text,
-                            reply_markup=keyboard
-                        )
-                    
-                    # Store message_id for later deletion after moderation
-                    async with AsyncSessionLocal() as mod_session:
-                        from models import ModerationQueue
-                        from sqlalchemy import select, update
-                        
-                        # Update moderation queue with message_id
-                        stmt = (
-                            update(ModerationQueue)
-                            .where(ModerationQueue.entity_type == "ALERT")
-                            .where(ModerationQueue.entity_id == alert.id)
-                            .values(admin_message_id=msg.message_id)
-                        )
-                        await mod_session.execute(stmt)
-                        await mod_session.commit()
-                    
-                    logger.info(f"[send_alert_to_admins] ✅ Отправлено администратору {admin.telegram_id} через Admin Bot")
-                except Exception as e:
-                    logger.error(f"[send_alert_to_admins] ❌ Ошибка отправки администратору {admin.telegram_id}: {str(e)}")
+        alert = await AlertService.get_alert(session, alert_id)
+        if not alert:
+            logger.error(f"[send_alert_to_admins] ❌ Алерт #{alert_id} не найден")
+            return
+        
+        logger.info(f"[send_alert_to_admins] Начало | alert_id={alert.id} type={alert.alert_type.value}")
+        admins = await UserService.get_all_admins(session)
         
+        for admin in admins:
+            try:
+                # Alert type emoji mapping
+                type_emojis = {
+                    AlertType.SHURTA: "🚨",
+                    AlertType.MISSING_PERSON: "👤",
+                    AlertType.LOST_ITEM: "📦",
+                    AlertType.SCAM_WARNING: "⚠️",
+                    AlertType.MEDICAL_EMERGENCY: "🏥",
+                    AlertType.ACCOMMODATION_NEEDED: "🏠",
+                    AlertType.RIDE_SHARING: "🚗",
+                    AlertType.JOB_POSTING: "💼",
+                    AlertType.LOST_DOCUMENT: "📄",
+                    AlertType.EVENT_ANNOUNCEMENT: "🎉",
+                    AlertType.COURIER_NEEDED: "📦"
+                }
+                
+                emoji = type_emojis.get(alert.alert_type, "📝")
+                
+                text = f"{emoji} НОВЫЙ АЛЕРТ НА МОДЕРАЦИЮ\n"
+                text += f"═══════════════════════════════════════\n\n"
+                text += f"Тип: {alert.alert_type.value}\n"
+                
+                if alert.title:
+                    text += f"Заголовок: {alert.title}\n"
+                text += f"Описание: {alert.description}\n"
+                
+                if alert.phone:
+                    text += f"Телефон: {alert.phone}\n"
+                
+                if alert.address_text:
+                    text += f"Адрес: {alert.address_text}\n"
+                elif alert.latitude and alert.longitude:
+                    text += f"Координаты: {alert.latitude}, {alert.longitude}\n"
+                elif alert.maps_url:
+                    text += f"Карта: {alert.maps_url}\n"
+                
+                text += f"\nОт пользователя: {alert.creator_id}\n"
+                text += f"ID алерта: {alert.id}\n"
+                
+                # 2-ROW BUTTON LAYOUT (COMPACT)
+                keyboard = InlineKeyboardMarkup(inline_keyboard=[
+                    [
+                        InlineKeyboardButton(text="✅ Одобрить", callback_data=f"admin_alert_approve_{alert.id}"),
+                        InlineKeyboardButton(text="❌ Отклонить", callback_data=f"admin_alert_reject_{alert.id}")
+                    ]
+                ])
+                
+                # Send location if available
+                if alert.latitude and alert.longitude:
+                    await admin_bot.send_location(
+                        chat_id=admin.telegram_id,
+                        latitude=alert.latitude,
+                        longitude=alert.longitude
+                    )
+                
+                # Send photo or text via ADMIN BOT
+                if alert.photo_file_id:
+                    msg = await admin_bot.send_photo(
+                        chat_id=admin.telegram_id,
+                        photo=alert.photo_file_id,
+                        caption=text,
+                        reply_markup=keyboard
+                    )
+                else:
+                    msg = await admin_bot.send_message(
+                        chat_id=admin.telegram_id,
+                        text=text,
+                        reply_markup=keyboard
+                    )
+                
+                # Store message_id for later deletion after moderation
+                from models import ModerationQueue
+                from sqlalchemy import update
+                
+                # Update moderation queue with message_id
+                stmt = (
+                    update(ModerationQueue)
+                    .where(ModerationQueue.entity_type == "ALERT")
+                    .where(ModerationQueue.entity_id == alert.id)
+                    .values(admin_message_id=msg.message_id)
+                )
+                await session.execute(stmt)
+                await session.commit()
+                
+                logger.info(f"[send_alert_to_admins] ✅ Отправлено администратору {admin.telegram_id} через Admin Bot")
+            except Exception as e:
+                logger.error(f"[send_alert_to_admins] ❌ Ошибка отправки администратору {admin.telegram_id}: {str(e)}")
+    
         logger.info(f"[send_alert_to_admins] ✅ Успешно")
     except Exception as e:
         logger.error(f"[send_alert_to_admins] ❌ Ошибка: {str(e)}", exc_info=True)
@@ -160,7 +168,11 @@ def get_language_keyboard():
 
 
 async def get_main_menu_inline_keyboard(lang: str) -> InlineKeyboardMarkup:
-    """Get main menu INLINE keyboard from database (ALWAYS FRESH DATA)"""
+    """Get main menu INLINE keyboard from database (cached per language until the buttons change)"""
+    return await keyboard_cache.get_or_build("main_menu_inline", lang, lambda: _build_main_menu_inline_keyboard(lang))
+
+
+async def _build_main_menu_inline_keyboard(lang: str) -> InlineKeyboardMarkup:
     from services.main_menu_service import MainMenuService
     
     async with AsyncSessionLocal() as session:
@@ -769,8 +781,8 @@ async def select_alert_type(callback: CallbackQuery, state: FSMContext):
             await callback.answer("❌ Этот тип алертов временно отключен", show_alert=True)
             return
         
-        # Store alert type in state
-        await state.update_data(alert_type=alert_type)
+        # Store alert type in state (FSM data is saved as JSON)
+        await state.update_data(alert_type=alert_type.value)
         
         # Determine if title is needed (for some types)
         needs_title = alert_type in [
@@ -846,7 +858,7 @@ async def process_alert_description(message: Message, state: FSMContext):
         
         # Determine if phone is needed
         data = await state.get_data()
-        alert_type = data.get("alert_type")
+        alert_type = AlertType(data["alert_type"])
         
         needs_phone = alert_type in [
             AlertType.MISSING_PERSON,
@@ -1125,7 +1137,7 @@ async def create_alert_from_state(message: Message, state: FSMContext, user, ses
         # Create alert
         alert = await AlertService.create_alert(
             session,
-            alert_type=data.get("alert_type"),
+            alert_type=AlertType(data["alert_type"]),
             creator_id=user.id,
             title=data.get("title"),
             description=data.get("description"),
@@ -1141,7 +1153,7 @@ async def create_alert_from_state(message: Message, state: FSMContext, user, ses
         )
         
         # Send to admins for moderation via ADMIN BOT
-        asyncio.create_task(send_alert_to_admins_for_moderation(alert))
+        supervisor.spawn("moderation", send_alert_to_admins_for_moderation, alert.id, with_session=True)
         
         # Confirm to user with auto-delete after 30 sec
         msg = await message.answer(
@@ -1149,7 +1161,7 @@ async def create_alert_from_state(message: Message, state: FSMContext, user, ses
             reply_markup=get_main_menu_keyboard(user.language)
         )
         # Auto-delete confirmation after 30 seconds
-        asyncio.create_task(delete_message_later(message.bot, message.chat.id, msg.message_id, 30))
+        await delete_message_later(message.bot, message.chat.id, msg.message_id, 30)
         
         await StatisticsService.track_activity(
             session,
@@ -1170,10 +1182,13 @@ async def create_alert_from_state(message: Message, state: FSMContext, user, ses
     await state.clear()
 
 
-async def notify_couriers_about_delivery(delivery, session):
+@background_job
+async def notify_couriers_about_delivery(delivery_id: int, session):
     """
     Notify all active couriers about new delivery order
     Sends notification via User Bot with order details and action buttons
+    
+    Runs as a supervised background task with its own session.
     """
     user_bot = get_user_bot()
     if not user_bot:
@@ -1181,6 +1196,11 @@ async def notify_couriers_about_delivery(delivery, session):
         return
     
     try:
+        delivery = await DeliveryService.get_delivery(session, delivery_id)
+        if not delivery:
+            logger.error(f"[notify_couriers] ❌ Доставка #{delivery_id} не найдена")
+            return
+        
         # Get all active couriers
         from sqlalchemy import select
         from models import User
@@ -1849,7 +1869,7 @@ async def process_delivery_phone(message: Message, state: FSMContext):
             logger.info(f"[delivery_created] ✅ Пользователь {user.id} создал доставку {delivery.id}")
             
             # NOTIFY ALL ACTIVE COURIERS ABOUT NEW DELIVERY
-            asyncio.create_task(notify_couriers_about_delivery(delivery, session))
+            supervisor.spawn("couriers", notify_couriers_about_delivery, delivery.id, with_session=True)
             
         except Exception as e:
             logger.error(f"[delivery_phone] ❌ Ошибка создания доставки: {str(e)}", exc_info=True)
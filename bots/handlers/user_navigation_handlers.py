@@ -6,19 +6,25 @@ User Bot Navigation - ONE MESSAGE SYSTEM
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.exceptions import TelegramBadRequest
+from bots.navigation_state import create_navigation_state_store
 from database import AsyncSessionLocal
 from services.dynamic_menu_service import DynamicMenuService, MenuFilterService
 from services.category_service import CategoryService
+from utils.keyboard_cache import keyboard_cache
 from utils.logger import logger
 
 router = Router()
 
-# State storage для навигации
-user_nav_state = {}  # {user_id: {message_id: int, menu_id: int, filter_option_id: int, category_id: int}}
+# State storage для навигации (LRU + TTL, см. NAV_STATE_* в настройках)
+nav_state = create_navigation_state_store()
 
 
 async def build_main_menu_keyboard(user_id: int, lang: str) -> ReplyKeyboardMarkup:
-    """Построить главное меню (KEYBOARD)"""
+    """Построить главное меню (KEYBOARD), кэшируется по языку до изменения меню"""
+    return await keyboard_cache.get_or_build("nav_main_menu", lang, lambda: _build_main_menu_keyboard(lang))
+
+
+async def _build_main_menu_keyboard(lang: str) -> ReplyKeyboardMarkup:
     async with AsyncSessionLocal() as session:
         menus = await DynamicMenuService.get_all_menus(session, active_only=True)
     
@@ -184,10 +190,7 @@ async def handle_talim_menu(message: Message):
         sent = await message.answer(text, reply_markup=markup)
         
         # Сохраняем state
-        user_nav_state[user_id] = {
-            'message_id': sent.message_id,
-            'menu_id': talim_menu.id
-        }
+        await nav_state.set(user_id, message_id=sent.message_id, menu_id=talim_menu.id)
 
 
 @router.message(F.text.contains("DOSTAVKA") | F.text.contains("Yetkazib"))
@@ -207,10 +210,7 @@ async def handle_dostavka_menu(message: Message):
         text, markup = await build_menu_view(dostavka_menu.id, lang=lang)
         sent = await message.answer(text, reply_markup=markup)
         
-        user_nav_state[user_id] = {
-            'message_id': sent.message_id,
-            'menu_id': dostavka_menu.id
-        }
+        await nav_state.set(user_id, message_id=sent.message_id, menu_id=dostavka_menu.id)
 
 
 @router.callback_query(F.data.startswith("nav_filter_"))
@@ -233,8 +233,7 @@ async def handle_filter_selection(callback: CallbackQuery):
             raise
     
     # Обновляем state
-    if user_id in user_nav_state:
-        user_nav_state[user_id]['filter_option_id'] = filter_option_id
+    await nav_state.update(user_id, filter_option_id=filter_option_id)
     
     await callback.answer()
 
@@ -257,8 +256,7 @@ async def handle_category_selection(callback: CallbackQuery):
             raise
     
     # Обновляем state
-    if user_id in user_nav_state:
-        user_nav_state[user_id]['category_id'] = category_id
+    await nav_state.update(user_id, category_id=category_id)
     
     await callback.answer()
 
@@ -294,7 +292,6 @@ async def handle_back_to_main(callback: CallbackQuery):
         pass
     
     # Очищаем state
-    if user_id in user_nav_state:
-        del user_nav_state[user_id]
+    await nav_state.delete(user_id)
     
     await callback.answer("✅ Вернулись в главное меню")
@@ -0,0 +1,200 @@
+"""
+Navigation state store for the one-message navigation system
+Bounded LRU with TTL eviction and an optional persistent backend
+"""
+
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from config import settings
+from database import AsyncSessionLocal
+from models import FSMRecord
+from utils.logger import logger
+from utils.metrics import metrics
+
+NAV_FIELDS = ("message_id", "menu_id", "filter_option_id", "category_id")
+
+
+class NavState:
+    """Navigation position of one user"""
+
+    __slots__ = NAV_FIELDS + ("expires_at",)
+
+    def __init__(
+        self,
+        message_id: Optional[int] = None,
+        menu_id: Optional[int] = None,
+        filter_option_id: Optional[int] = None,
+        category_id: Optional[int] = None
+    ):
+        self.message_id = message_id
+        self.menu_id = menu_id
+        self.filter_option_id = filter_option_id
+        self.category_id = category_id
+        self.expires_at = 0.0
+
+    def as_dict(self) -> Dict[str, Optional[int]]:
+        return {name: getattr(self, name) for name in NAV_FIELDS}
+
+
+class SQLNavigationBackend:
+    """Keeps navigation records in the fsm_storage table under nav:<user_id> keys"""
+
+    def __init__(self, ttl: int, session_factory=AsyncSessionLocal):
+        self.ttl = ttl
+        self.session_factory = session_factory
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"nav:{user_id}"
+
+    async def load(self, user_id: int) -> Optional[Dict[str, Optional[int]]]:
+        async with self.session_factory() as session:
+            row = await session.get(FSMRecord, self._key(user_id))
+        if row is None or datetime.utcnow() - row.updated_at > timedelta(seconds=self.ttl):
+            return None
+        return {name: (row.data or {}).get(name) for name in NAV_FIELDS}
+
+    async def save(self, user_id: int, values: Dict[str, Optional[int]]) -> None:
+        async with self.session_factory() as session:
+            await session.merge(FSMRecord(
+                key=self._key(user_id),
+                state=None,
+                data=values,
+                updated_at=datetime.utcnow()
+            ))
+            await session.commit()
+
+    async def delete(self, user_id: int) -> None:
+        async with self.session_factory() as session:
+            row = await session.get(FSMRecord, self._key(user_id))
+            if row is not None:
+                await session.delete(row)
+                await session.commit()
+
+
+class NavigationStateStore:
+    """
+    Per-user navigation state with LRU + TTL eviction.
+
+    At most ``max_entries`` users are kept in memory; entries untouched for
+    ``ttl`` seconds are dropped. With a backend, writes go through to it and
+    memory misses are read back from it, so state survives restarts and is
+    shared between workers.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: int = 3600, backend: Optional[SQLNavigationBackend] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self._entries: "OrderedDict[int, NavState]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _put(self, user_id: int, state: NavState) -> NavState:
+        now = time.monotonic()
+        state.expires_at = now + self.ttl
+        self._entries[user_id] = state
+        self._entries.move_to_end(user_id)
+
+        # LRU order is also expiry order, so expired entries sit at the front
+        while self._entries:
+            oldest_id, oldest = next(iter(self._entries.items()))
+            if oldest.expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[oldest_id]
+            self.evictions += 1
+        return state
+
+    async def _save(self, user_id: int, state: NavState) -> None:
+        if self.backend is None:
+            return
+        try:
+            await self.backend.save(user_id, state.as_dict())
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения навигации пользователя {user_id}: {str(e)}", exc_info=True)
+
+    async def get(self, user_id: int) -> Optional[NavState]:
+        state = self._entries.get(user_id)
+        if state is not None:
+            if state.expires_at > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return state
+            del self._entries[user_id]
+            self.evictions += 1
+
+        if self.backend is not None:
+            try:
+                values = await self.backend.load(user_id)
+            except Exception as e:
+                logger.error(f"❌ Ошибка загрузки навигации пользователя {user_id}: {str(e)}", exc_info=True)
+                values = None
+            if values is not None:
+                self.hits += 1
+                return self._put(user_id, NavState(**values))
+
+        self.misses += 1
+        return None
+
+    async def set(self, user_id: int, **values: Optional[int]) -> NavState:
+        """Start a new navigation session, replacing any previous one"""
+        state = self._put(user_id, NavState(**values))
+        await self._save(user_id, state)
+        return state
+
+    async def update(self, user_id: int, **values: Optional[int]) -> bool:
+        """Update fields of an existing session; returns False if there is none"""
+        state = await self.get(user_id)
+        if state is None:
+            return False
+        for name, value in values.items():
+            setattr(state, name, value)
+        self._put(user_id, state)
+        await self._save(user_id, state)
+        return True
+
+    async def delete(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+        if self.backend is not None:
+            try:
+                await self.backend.delete(user_id)
+            except Exception as e:
+                logger.error(f"❌ Ошибка удаления навигации пользователя {user_id}: {str(e)}", exc_info=True)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+        }
+
+
+def create_navigation_state_store() -> NavigationStateStore:
+    """Create the store configured by NAV_STATE_* settings and register its metrics"""
+    backend = None
+    if settings.nav_state_backend.lower() == "sql":
+        backend = SQLNavigationBackend(ttl=settings.nav_state_ttl)
+
+    store = NavigationStateStore(
+        max_entries=settings.nav_state_max_entries,
+        ttl=settings.nav_state_ttl,
+        backend=backend
+    )
+    metrics.gauge("bot_nav_state_entries", "Users with navigation state in memory", lambda: len(store))
+    metrics.gauge("bot_nav_state_hit_rate", "Navigation state lookup hit rate", lambda: store.hit_rate)
+    metrics.gauge("bot_nav_state_evictions", "Navigation state entries evicted", lambda: store.evictions)
+    return store
@@ -0,0 +1,240 @@
+"""
+Update throttling for the bots
+Per-user token buckets, a global concurrency ceiling and collapsing of
+duplicate in-flight callbacks
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Set, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject, Update, User
+
+from config import settings
+from locales import t
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+class TokenBucket:
+    """Refilling allowance of updates for one user"""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+    def take(self, rate: float, capacity: float, now: float) -> bool:
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Outer update middleware protecting handlers from floods.
+
+    Checks run cheapest first and never touch the database:
+
+    * a callback whose data starts with one of ``dedup_prefixes`` and is
+      already being handled for the same user is answered and dropped
+      (double taps on "accept delivery" and similar buttons);
+    * each user spends one token per update from a bucket of ``burst``
+      tokens refilled at ``rate`` per second, and may have at most
+      ``per_user_concurrency`` updates in flight;
+    * at most ``max_concurrency`` updates run handlers at once; an update
+      that waits longer than ``queue_timeout`` for a slot is shed.
+
+    Dropped callbacks are answered so the client stops its spinner. A
+    ``rate``, ``per_user_concurrency`` or ``max_concurrency`` of 0 disables
+    that check.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float = 2.0,
+        burst: int = 8,
+        per_user_concurrency: int = 2,
+        max_concurrency: int = 64,
+        queue_timeout: float = 5.0,
+        dedup_prefixes: Sequence[str] = (),
+        max_users: int = 10000
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.per_user_concurrency = per_user_concurrency
+        self.queue_timeout = queue_timeout
+        self.dedup_prefixes = tuple(dedup_prefixes)
+        self.max_users = max_users
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self._buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._user_in_flight: Dict[int, int] = {}
+        self._callbacks_in_flight: Set[Tuple[int, str]] = set()
+        self.in_flight = 0
+        self.throttled = 0
+        self.collapsed = 0
+        self.shed = 0
+
+    def _take_token(self, user_id: int) -> bool:
+        if self.rate <= 0:
+            return True
+
+        now = time.monotonic()
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.burst, now)
+            if len(self._buckets) > self.max_users:
+                # A forgotten user simply starts again with a full bucket
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+        return bucket.take(self.rate, self.burst, now)
+
+    def _user_busy(self, user_id: int) -> bool:
+        return 0 < self.per_user_concurrency <= self._user_in_flight.get(user_id, 0)
+
+    def _dedup_key(self, user: User, callback: Optional[CallbackQuery]) -> Optional[Tuple[int, str]]:
+        if callback is None or not callback.data or not self.dedup_prefixes:
+            return None
+        if callback.data.startswith(self.dedup_prefixes):
+            return user.id, callback.data
+        return None
+
+    @staticmethod
+    async def _answer(callback: Optional[CallbackQuery], user: User, with_text: bool = True) -> None:
+        if callback is None:
+            return
+        lang = "UZ" if (user.language_code or "").startswith("uz") else "RU"
+        try:
+            await callback.answer(t("too_many_requests", lang) if with_text else None)
+        except Exception as e:
+            logger.debug(f"⚠️ Не удалось ответить на отброшенный callback: {str(e)}")
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        user: Optional[User] = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        callback = event.callback_query
+        dedup_key = self._dedup_key(user, callback)
+        if dedup_key is not None and dedup_key in self._callbacks_in_flight:
+            self.collapsed += 1
+            await self._answer(callback, user, with_text=False)
+            return None
+
+        if not self._take_token(user.id) or self._user_busy(user.id):
+            self.throttled += 1
+            logger.debug(f"Пользователь {user.id} ограничен: слишком частые обновления")
+            await self._answer(callback, user)
+            return None
+
+        if dedup_key is not None:
+            self._callbacks_in_flight.add(dedup_key)
+        self._user_in_flight[user.id] = self._user_in_flight.get(user.id, 0) + 1
+        try:
+            if self._semaphore is None:
+                return await self._handle(handler, event, data)
+
+            if not await self._acquire_slot():
+                self.shed += 1
+                logger.warning(f"Обновление пользователя {user.id} отброшено: все обработчики заняты")
+                await self._answer(callback, user)
+                return None
+            try:
+                return await self._handle(handler, event, data)
+            finally:
+                self._semaphore.release()
+        finally:
+            if dedup_key is not None:
+                self._callbacks_in_flight.discard(dedup_key)
+            remaining = self._user_in_flight[user.id] - 1
+            if remaining:
+                self._user_in_flight[user.id] = remaining
+            else:
+                del self._user_in_flight[user.id]
+
+    async def _acquire_slot(self) -> bool:
+        """Take a handler slot waiting at most queue_timeout; False when timed out"""
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return True
+
+        # Not asyncio.wait_for: on 3.11 it can swallow a cancellation that
+        # races with a successful acquire and leak the slot
+        waiter = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            await asyncio.wait((waiter,), timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._semaphore.release()
+            else:
+                waiter.cancel()
+            raise
+        if waiter.done():
+            return True
+        waiter.cancel()
+        return False
+
+    async def _handle(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        self.in_flight += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "throttled": self.throttled,
+            "collapsed": self.collapsed,
+            "shed": self.shed,
+            "tracked_users": len(self._buckets),
+        }
+
+
+def create_throttling_middleware(bot_name: str) -> ThrottlingMiddleware:
+    """
+    Create the middleware for a bot and register its metrics.
+
+    The user bot gets the full protection; the admin bot is used by a few
+    trusted people, so it only collapses duplicate callbacks.
+    """
+    if bot_name == "user":
+        middleware = ThrottlingMiddleware(
+            rate=settings.throttle_rate,
+            burst=settings.throttle_burst,
+            per_user_concurrency=settings.throttle_per_user_concurrency,
+            max_concurrency=settings.throttle_max_concurrency,
+            queue_timeout=settings.throttle_queue_timeout,
+            dedup_prefixes=settings.throttle_dedup_prefixes_list
+        )
+    else:
+        middleware = ThrottlingMiddleware(
+            rate=0,
+            per_user_concurrency=0,
+            max_concurrency=0,
+            dedup_prefixes=settings.throttle_dedup_prefixes_list
+        )
+
+    metrics.gauge(f"bot_{bot_name}_updates_in_flight", "Updates being handled", lambda: middleware.in_flight)
+    metrics.gauge(f"bot_{bot_name}_updates_throttled", "Updates dropped by per-user limits", lambda: middleware.throttled)
+    metrics.gauge(f"bot_{bot_name}_callbacks_collapsed", "Duplicate in-flight callbacks dropped", lambda: middleware.collapsed)
+    metrics.gauge(f"bot_{bot_name}_updates_shed", "Updates dropped at the concurrency ceiling", lambda: middleware.shed)
+    return middleware
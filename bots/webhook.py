@@ -0,0 +1,155 @@
+"""
+Webhook transport for the aiogram dispatchers
+Telegram updates are acknowledged immediately and processed in the background
+"""
+
+import asyncio
+import hashlib
+import hmac
+from typing import Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from fastapi import Request, Response
+
+from config import settings
+from utils.logger import logger
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def webhook_mode_enabled() -> bool:
+    """
+    Check whether the bots should receive updates through webhooks.
+
+    Telegram only delivers webhooks over HTTPS, so a plain HTTP base URL
+    (typical for local development) falls back to polling.
+    """
+    if settings.bot_update_mode.lower() != "webhook":
+        return False
+
+    if not settings.bot_webhook_base_url_resolved.startswith("https://"):
+        logger.warning(
+            f"BOT_UPDATE_MODE=webhook требует HTTPS адрес, получен "
+            f"{settings.bot_webhook_base_url_resolved!r}; используем polling"
+        )
+        return False
+
+    return True
+
+
+def build_secret_token(bot_token: str) -> str:
+    """
+    Derive the per-bot secret sent by Telegram with every update.
+
+    Derived rather than random so every worker process computes the same
+    value; only [A-Za-z0-9_-] characters are allowed by Telegram.
+    """
+    base = settings.bot_webhook_secret or bot_token
+    return hashlib.sha256(f"{base}:{bot_token}".encode("utf-8")).hexdigest()
+
+
+class WebhookUpdateConsumer:
+    """Receives webhook updates of one bot and feeds them to its dispatcher"""
+
+    def __init__(self, name: str, bot: Bot, dispatcher: Dispatcher):
+        self.name = name
+        self.bot = bot
+        self.dispatcher = dispatcher
+        self.secret_token = build_secret_token(bot.token)
+        self._semaphore = asyncio.Semaphore(settings.bot_webhook_max_concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._ready = False
+
+    @property
+    def path(self) -> str:
+        return f"/{settings.bot_webhook_path.strip('/')}/{self.name}"
+
+    @property
+    def url(self) -> str:
+        return f"{settings.bot_webhook_base_url_resolved}{self.path}"
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    async def start(self, register: bool = True) -> None:
+        """
+        Run dispatcher startup hooks and register the webhook with Telegram.
+
+        Web worker processes of a cluster pass ``register=False``: the
+        webhook is registered once by the supervisor process.
+        """
+        await self.dispatcher.emit_startup(
+            bot=self.bot,
+            dispatcher=self.dispatcher,
+            bots=(self.bot,),
+            **self.dispatcher.workflow_data
+        )
+        self._ready = True
+
+        if register:
+            await self.register()
+
+    async def register(self) -> None:
+        """Point the bot's webhook at this consumer"""
+        await self.bot.set_webhook(
+            url=self.url,
+            secret_token=self.secret_token,
+            allowed_updates=self.dispatcher.resolve_used_update_types(),
+            max_connections=settings.bot_webhook_max_concurrency
+        )
+        logger.info(f"Webhook бота {self.name} зарегистрирован: {self.url}")
+
+    async def handle(self, request: Request) -> Response:
+        """Validate the secret, schedule processing and acknowledge at once"""
+        token = request.headers.get(SECRET_TOKEN_HEADER, "")
+        if not hmac.compare_digest(token, self.secret_token):
+            client = request.client.host if request.client else "?"
+            logger.warning(f"Webhook бота {self.name}: неверный secret token от {client}")
+            return Response(status_code=401)
+
+        # Not ready yet or overloaded: Telegram redelivers non-2xx updates later
+        if not self._ready or len(self._tasks) >= settings.bot_webhook_max_pending:
+            return Response(status_code=503)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except Exception as e:
+            logger.warning(f"Webhook бота {self.name}: некорректное обновление: {str(e)}")
+            return Response(status_code=400)
+
+        task = asyncio.create_task(self._process(update), name=f"{self.name}-update-{update.update_id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return Response(status_code=200)
+
+    async def _process(self, update: Update) -> None:
+        async with self._semaphore:
+            try:
+                await self.dispatcher.feed_update(self.bot, update)
+            except Exception as e:
+                logger.error(f"❌ Ошибка обработки обновления {update.update_id} бота {self.name}: {str(e)}", exc_info=True)
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Stop accepting updates and wait for in-flight ones to finish"""
+        self._ready = False
+        if not self._tasks:
+            return
+
+        logger.info(f"Ожидаем завершения {len(self._tasks)} обновлений бота {self.name}...")
+        done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Прервано {len(pending)} незавершённых обновлений бота {self.name}")
+
+    async def stop(self) -> None:
+        """Drain updates and run dispatcher shutdown hooks"""
+        await self.drain()
+        await self.dispatcher.emit_shutdown(
+            bot=self.bot,
+            dispatcher=self.dispatcher,
+            bots=(self.bot,),
+            **self.dispatcher.workflow_data
+        )
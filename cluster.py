@@ -0,0 +1,297 @@
+"""
+Multi-process entry point
+Runs the webapp (and the bots' webhook consumers) in N uvicorn workers and
+background jobs in separate worker processes; the processes coordinate
+only through the database.
+
+    python cluster.py
+
+Processes:
+    web       uvicorn with CLUSTER_WEB_WORKERS workers (0 → one per core);
+              in webhook mode every worker feeds updates to both bots
+    bots      polling mode only: one process polling both bots
+    jobs-N    CLUSTER_JOB_WORKERS processes running queued background jobs;
+              jobs-0 also deletes expired bot messages and makes the
+              scheduled database backups
+"""
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Work that must be shared between processes goes through the database
+SHARED_ENV = {
+    "BACKGROUND_JOBS_MODE": "queue",
+    "AUTO_DELETE_ROLE": "producer",
+    "FSM_CACHE_TTL": "0",
+    "FSM_FLUSH_DELAY": "0",
+    "NAV_STATE_BACKEND": "sql",
+    "BOT_API_SKIP_NOOP_EDITS": "false",
+}
+DEFAULT_MENU_CACHE_TTL = "5"
+
+RESTART_BACKOFF_MIN = 1.0
+RESTART_BACKOFF_MAX = 30.0
+# A child that ran this long before exiting is restarted without delay
+STABLE_UPTIME = 60.0
+
+
+async def _stop_bots(bots, use_webhook: bool) -> None:
+    """Shutdown order of main.py: updates, background tasks, deletions, bots"""
+    from config import settings
+    from services.telegraph_service import telegraph_service
+    from utils.deletion_scheduler import deletion_scheduler
+    from utils.task_supervisor import supervisor
+
+    if use_webhook:
+        await asyncio.gather(*(bot.webhook.drain() for bot in bots))
+    await supervisor.drain(settings.background_task_drain_timeout)
+    await deletion_scheduler.stop()
+    await telegraph_service.close()
+    for bot in bots:
+        await bot.stop()
+
+
+def create_worker_app():
+    """uvicorn factory of a web worker: the webapp plus webhook consumers"""
+    from bots.admin_bot import AdminBot
+    from bots.user_bot import UserBot
+    from bots.webhook import webhook_mode_enabled
+    from utils.deletion_scheduler import deletion_scheduler
+    from utils.logger import logger
+    from webapp.server import create_app
+
+    use_webhook = webhook_mode_enabled()
+    bots = [UserBot(), AdminBot()] if use_webhook else []
+    for bot in bots:
+        bot.register_handlers()
+    app = create_app(bot_webhooks=[bot.webhook for bot in bots])
+
+    app_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(application):
+        async with app_lifespan(application):
+            # Webhooks were registered by the cluster supervisor
+            for bot in bots:
+                await bot.start(use_webhook=True, register_webhook=False)
+            deletion_scheduler.start()
+            logger.info(f"Веб-процесс {os.getpid()} запущен")
+            try:
+                yield
+            finally:
+                await _stop_bots(bots, use_webhook)
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+def run_web(workers: int) -> None:
+    import uvicorn
+    from config import settings
+
+    uvicorn.run(
+        "cluster:create_worker_app",
+        factory=True,
+        host=settings.webapp_host,
+        port=settings.webapp_port,
+        workers=workers,
+        log_config=None,
+        loop="asyncio"
+    )
+
+
+async def _run_bots() -> None:
+    from bots.admin_bot import AdminBot
+    from bots.user_bot import UserBot
+
+    bots = [UserBot(), AdminBot()]
+    try:
+        await asyncio.gather(*(bot.start() for bot in bots))
+    finally:
+        await _stop_bots(bots, use_webhook=False)
+
+
+def run_bots() -> None:
+    try:
+        asyncio.run(_run_bots())
+    except KeyboardInterrupt:
+        pass
+
+
+async def _run_jobs(index: int) -> None:
+    from bots.admin_bot import AdminBot
+    from bots.user_bot import UserBot
+    from utils.backup_scheduler import backup_scheduler
+    from utils.deletion_scheduler import deletion_scheduler
+    from utils.job_queue import create_job_worker, default_worker_id
+
+    # Bots are only used to send messages here: no handlers, no updates
+    bots = [UserBot(), AdminBot()]
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    # Singleton duties of the cluster run in the first job worker
+    if deletion_scheduler.role == "consumer":
+        deletion_scheduler.start()
+        backup_scheduler.start()
+    try:
+        await create_job_worker(f"jobs-{index}@{default_worker_id()}").run(stop)
+    finally:
+        await backup_scheduler.stop()
+        await _stop_bots(bots, use_webhook=False)
+
+
+def run_jobs(index: int) -> None:
+    asyncio.run(_run_jobs(index))
+
+
+async def prepare(use_webhook: bool) -> None:
+    """One-time startup work done before any child process starts"""
+    from bots.admin_bot import AdminBot
+    from bots.user_bot import UserBot
+    from config import settings
+    from main import SEED_VERSION, seed_initial_data
+    from utils.fast_boot import prepare_database
+
+    await prepare_database(seed_initial_data, SEED_VERSION, fast=settings.fast_boot)
+
+    if use_webhook:
+        bots = [UserBot(), AdminBot()]
+        try:
+            for bot in bots:
+                bot.register_handlers()
+                await bot.webhook.register()
+        finally:
+            for bot in bots:
+                await bot.stop()
+
+
+def _child(target: Callable[..., None], env: Dict[str, str], *args) -> None:
+    os.environ.update(env)
+    # Lets processes forked by this one (uvicorn workers) pick their own log file
+    os.environ["LOG_PROCESS_PID"] = str(os.getpid())
+    target(*args)
+
+
+class Supervisor:
+    """Starts the child processes and restarts the ones that die"""
+
+    def __init__(self, specs: List[Tuple[str, Callable[..., None], Dict[str, str], tuple]]):
+        self.specs = {name: (target, env, args) for name, target, env, args in specs}
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: Dict[str, multiprocessing.Process] = {}
+        self.started_at: Dict[str, float] = {}
+        self.backoff: Dict[str, float] = {}
+        self.next_start: Dict[str, float] = {}
+        self.stopping = False
+
+    def _start(self, name: str) -> None:
+        from utils.logger import logger
+
+        target, env, args = self.specs[name]
+        # Every process writes and rotates its own log file
+        env = dict(env, LOG_PROCESS_NAME=name)
+        process = self.context.Process(target=_child, args=(target, env, *args), name=name)
+        process.start()
+        self.processes[name] = process
+        self.started_at[name] = time.monotonic()
+        logger.info(f"Процесс {name} запущен (pid {process.pid})")
+
+    def _check(self) -> None:
+        from utils.logger import logger
+
+        now = time.monotonic()
+        for name in self.specs:
+            process = self.processes.get(name)
+            if process is not None and process.is_alive():
+                continue
+
+            if process is not None:
+                self.processes.pop(name)
+                uptime = now - self.started_at[name]
+                if uptime >= STABLE_UPTIME:
+                    self.backoff[name] = 0.0
+                else:
+                    self.backoff[name] = min(
+                        RESTART_BACKOFF_MAX,
+                        max(RESTART_BACKOFF_MIN, self.backoff.get(name, 0.0) * 2)
+                    )
+                self.next_start[name] = now + self.backoff[name]
+                logger.warning(
+                    f"Процесс {name} завершился с кодом {process.exitcode}, "
+                    f"перезапуск через {self.backoff[name]:.0f} с"
+                )
+
+            if now >= self.next_start.get(name, 0.0):
+                self._start(name)
+
+    def stop(self, *_) -> None:
+        self.stopping = True
+
+    def run(self) -> None:
+        from utils.logger import logger
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while not self.stopping:
+            self._check()
+            time.sleep(0.5)
+
+        logger.info("Останавливаем процессы кластера...")
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes.values():
+            process.join(timeout=60)
+            if process.is_alive():
+                process.kill()
+
+
+def build_specs(use_webhook: bool, web_workers: int, job_workers: int, menu_cache_ttl: Optional[float]):
+    env = dict(SHARED_ENV)
+    if not menu_cache_ttl:
+        env["MENU_CACHE_TTL"] = DEFAULT_MENU_CACHE_TTL
+
+    specs = [("web", run_web, env, (web_workers,))]
+    if not use_webhook:
+        specs.append(("bots", run_bots, env, ()))
+    for index in range(max(1, job_workers)):
+        job_env = dict(env, BACKGROUND_JOBS_MODE="local")
+        if index == 0:
+            job_env["AUTO_DELETE_ROLE"] = "consumer"
+        specs.append((f"jobs-{index}", run_jobs, job_env, (index,)))
+    return specs
+
+
+def main() -> None:
+    from bots.webhook import webhook_mode_enabled
+    from config import settings
+    from utils.logger import logger
+
+    use_webhook = webhook_mode_enabled()
+    web_workers = settings.cluster_web_workers or os.cpu_count() or 1
+    logger.info(
+        f"Запуск кластера: {web_workers} веб-процессов, {max(1, settings.cluster_job_workers)} обработчиков задач, "
+        f"обновления ботов через {'webhook' if use_webhook else 'polling'}"
+    )
+
+    asyncio.run(prepare(use_webhook))
+    specs = build_specs(use_webhook, web_workers, settings.cluster_job_workers, settings.menu_cache_ttl)
+    Supervisor(specs).run()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        from utils.logger import logger
+        logger.error(f"Fatal error: {e}")
+        sys.exit(1)
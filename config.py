@@ -19,8 +19,24 @@ class Settings(BaseSettings):
     )
     admin_ids: str = Field(default="", alias="ADMIN_IDS")
     telegraph_token: str = Field(default="", alias="TELEGRAPH_TOKEN")
+    telegraph_token_file: str = Field(default="./data/.telegraph_token", alias="TELEGRAPH_TOKEN_FILE")  # auto-created token
+    telegraph_concurrency: int = Field(default=1, alias="TELEGRAPH_CONCURRENCY")  # publishes in flight
+    telegraph_max_retries: int = Field(default=3, alias="TELEGRAPH_MAX_RETRIES")
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
     log_file: str = Field(default="bot.log", alias="LOG_FILE")
+    log_format: str = Field(default="text", alias="LOG_FORMAT")  # text or json
+    log_rotation: str = Field(default="none", alias="LOG_ROTATION")  # none, size or time
+    log_max_bytes: int = Field(default=10 * 1024 * 1024, alias="LOG_MAX_BYTES")  # 10MB per file
+    log_backup_count: int = Field(default=5, alias="LOG_BACKUP_COUNT")
+    log_rotate_when: str = Field(default="midnight", alias="LOG_ROTATE_WHEN")  # TimedRotatingFileHandler interval
+    log_process_name: str = Field(default="", alias="LOG_PROCESS_NAME")  # set by cluster.py: the process writes LOG_FILE.<name>
+    log_sample_rates: str = Field(
+        default="main_menu_service._load_active_buttons:0.01,main_menu_service.get_button_by_callback:0.01,"
+                "statistics_service.track_button_click:0.01,statistics_service.track_activity:0.01,"
+                "auth.get_current_user:0.01,auth.require_admin_user:0.01",
+        alias="LOG_SAMPLE_RATES",
+        description="Доля INFO/DEBUG записей по модулю или модуль.функция; предупреждения и ошибки пишутся всегда"
+    )
     webapp_host: str = Field(default="0.0.0.0", alias="WEBAPP_HOST")
     webapp_port: int = Field(default=8000, alias="WEBAPP_PORT")
     webapp_public_url: str = Field(default="http://localhost:8000", alias="WEBAPP_PUBLIC_URL")
@@ -39,6 +55,75 @@ class Settings(BaseSettings):
     webapp_upload_dir: str = Field(default="webapp/uploads", alias="WEBAPP_UPLOAD_DIR")
     webapp_max_upload_size: int = Field(default=10 * 1024 * 1024, alias="WEBAPP_MAX_UPLOAD_SIZE")  # 10MB default
     webapp_version: str = Field(default="1.0.0", alias="WEBAPP_VERSION")
+    webapp_access_log_sample_rate: float = Field(default=0.01, alias="WEBAPP_ACCESS_LOG_SAMPLE_RATE")
+    webapp_slow_request_ms: int = Field(default=1000, alias="WEBAPP_SLOW_REQUEST_MS")
+    webapp_server_timing: bool = Field(default=True, alias="WEBAPP_SERVER_TIMING")
+    webapp_static_fingerprint: bool = Field(default=True, alias="WEBAPP_STATIC_FINGERPRINT")
+    webapp_image_variant_widths: str = Field(default="320,640,1280", alias="WEBAPP_IMAGE_VARIANT_WIDTHS")
+    webapp_image_workers: int = Field(default=2, alias="WEBAPP_IMAGE_WORKERS")
+    bot_update_mode: str = Field(
+        default="polling",
+        alias="BOT_UPDATE_MODE",
+        description="polling или webhook; webhook требует HTTPS адрес"
+    )
+    bot_webhook_base_url: str = Field(default="", alias="BOT_WEBHOOK_BASE_URL")  # empty → WEBAPP_PUBLIC_URL
+    bot_webhook_path: str = Field(default="/telegram/webhook", alias="BOT_WEBHOOK_PATH")
+    bot_webhook_secret: str = Field(default="", alias="BOT_WEBHOOK_SECRET")
+    bot_webhook_max_concurrency: int = Field(default=40, alias="BOT_WEBHOOK_MAX_CONCURRENCY")
+    bot_webhook_max_pending: int = Field(default=1000, alias="BOT_WEBHOOK_MAX_PENDING")
+    fsm_storage: str = Field(default="sql", alias="FSM_STORAGE")  # sql or memory
+    fsm_state_ttl: int = Field(default=86400, alias="FSM_STATE_TTL")  # seconds, 0 disables eviction
+    fsm_flush_delay: float = Field(default=0.5, alias="FSM_FLUSH_DELAY")
+    fsm_cache_ttl: float = Field(default=60.0, alias="FSM_CACHE_TTL")  # 0 when running several workers
+    nav_state_backend: str = Field(default="memory", alias="NAV_STATE_BACKEND")  # memory or sql
+    nav_state_max_entries: int = Field(default=10000, alias="NAV_STATE_MAX_ENTRIES")
+    nav_state_ttl: int = Field(default=3600, alias="NAV_STATE_TTL")  # seconds
+    background_task_default_limit: int = Field(default=8, alias="BACKGROUND_TASK_DEFAULT_LIMIT")
+    background_task_drain_timeout: float = Field(default=30.0, alias="BACKGROUND_TASK_DRAIN_TIMEOUT")
+    background_jobs_mode: str = Field(default="local", alias="BACKGROUND_JOBS_MODE")  # local or queue
+    background_job_groups: str = Field(default="broadcasts,moderation,couriers,exports", alias="BACKGROUND_JOB_GROUPS")
+    background_job_poll_interval: float = Field(default=1.0, alias="BACKGROUND_JOB_POLL_INTERVAL")  # seconds
+    background_job_stale_timeout: float = Field(default=600.0, alias="BACKGROUND_JOB_STALE_TIMEOUT")  # seconds without a worker heartbeat
+    background_job_max_attempts: int = Field(default=3, alias="BACKGROUND_JOB_MAX_ATTEMPTS")
+    db_auto_migrate: bool = Field(default=True, alias="DB_AUTO_MIGRATE")  # upgrade an outdated schema on start
+    db_migration_lock_timeout: float = Field(default=5.0, alias="DB_MIGRATION_LOCK_TIMEOUT")  # seconds a migration waits for a lock
+    db_migration_batch_size: int = Field(default=1000, alias="DB_MIGRATION_BATCH_SIZE")  # rows per backfill transaction
+    fast_boot: bool = Field(default=False, alias="FAST_BOOT")  # skip create_all and seeding while nothing changed
+    cluster_web_workers: int = Field(default=0, alias="CLUSTER_WEB_WORKERS")  # 0 → one per CPU core
+    cluster_job_workers: int = Field(default=1, alias="CLUSTER_JOB_WORKERS")
+    menu_cache_ttl: float = Field(default=0, alias="MENU_CACHE_TTL")  # seconds, 0 → until invalidated
+    auto_delete_role: str = Field(default="local", alias="AUTO_DELETE_ROLE")  # local, producer or consumer
+    export_batch_size: int = Field(default=1000, alias="EXPORT_BATCH_SIZE")  # rows fetched per batch
+    export_gzip_threshold: int = Field(default=50 * 1024 * 1024, alias="EXPORT_GZIP_THRESHOLD")  # bytes (Bot API document limit), 0 disables
+    export_cache_size: int = Field(default=16, alias="EXPORT_CACHE_SIZE")  # finished export files kept, 0 disables
+    export_cache_ttl: float = Field(default=3600.0, alias="EXPORT_CACHE_TTL")  # seconds
+    analytics_export_compression: str = Field(default="zstd", alias="ANALYTICS_EXPORT_COMPRESSION")  # Parquet codec
+    parser_workers: int = Field(default=0, alias="PARSER_WORKERS")  # channel export parser processes, 0 → one per CPU core
+    parser_chunk_size: int = Field(default=5000, alias="PARSER_CHUNK_SIZE")  # messages per parser task
+    backup_compress: bool = Field(default=True, alias="BACKUP_COMPRESS")  # gzip database backups
+    backup_pages_per_step: int = Field(default=1024, alias="BACKUP_PAGES_PER_STEP")  # SQLite pages copied per step
+    backup_interval_hours: float = Field(default=0, alias="BACKUP_INTERVAL_HOURS")  # 0 disables scheduled backups
+    backup_dir: str = Field(default="./backups", alias="BACKUP_DIR")
+    backup_keep: int = Field(default=7, alias="BACKUP_KEEP")  # newest backups kept, 0 keeps all
+    auto_delete_tick: float = Field(default=1.0, alias="AUTO_DELETE_TICK")  # seconds
+    auto_delete_max_rate: float = Field(default=10.0, alias="AUTO_DELETE_MAX_RATE")  # delete calls per second
+    auto_delete_persist: bool = Field(default=True, alias="AUTO_DELETE_PERSIST")
+    bot_api_timeout: float = Field(default=60.0, alias="BOT_API_TIMEOUT")  # seconds
+    bot_api_pool_size: int = Field(default=100, alias="BOT_API_POOL_SIZE")  # connections shared by both bots
+    bot_api_dns_cache_ttl: int = Field(default=300, alias="BOT_API_DNS_CACHE_TTL")  # seconds
+    bot_api_keepalive_timeout: float = Field(default=30.0, alias="BOT_API_KEEPALIVE_TIMEOUT")  # seconds
+    bot_api_skip_noop_edits: bool = Field(default=True, alias="BOT_API_SKIP_NOOP_EDITS")
+    throttle_rate: float = Field(default=2.0, alias="THROTTLE_RATE")  # updates per second per user, 0 disables
+    throttle_burst: int = Field(default=8, alias="THROTTLE_BURST")
+    throttle_per_user_concurrency: int = Field(default=2, alias="THROTTLE_PER_USER_CONCURRENCY")
+    throttle_max_concurrency: int = Field(default=64, alias="THROTTLE_MAX_CONCURRENCY")  # user bot, 0 disables
+    throttle_queue_timeout: float = Field(default=5.0, alias="THROTTLE_QUEUE_TIMEOUT")  # seconds
+    throttle_dedup_prefixes: str = Field(
+        default="accept_delivery_,admin_approve_notif_",
+        alias="THROTTLE_DEDUP_PREFIXES"
+    )
+    metrics_token: str = Field(default="", alias="METRICS_TOKEN")  # bearer token for /webapp/metrics, empty → endpoint disabled
+    metrics_db_queries: bool = Field(default=True, alias="METRICS_DB_QUERIES")  # time every SQL statement
 
     @property
     def admin_ids_list(self) -> List[int]:
@@ -52,5 +137,26 @@ class Settings(BaseSettings):
             return []
         return [origin.strip() for origin in self.webapp_cors_origins.split(",") if origin.strip()]
 
+    @property
+    def webapp_image_variant_widths_list(self) -> List[int]:
+        if not self.webapp_image_variant_widths:
+            return []
+        return [int(width.strip()) for width in self.webapp_image_variant_widths.split(",") if width.strip()]
+
+
+    @property
+    def background_job_groups_list(self) -> List[str]:
+        """Supervisor groups handed over to job worker processes in queue mode"""
+        return [group.strip() for group in self.background_job_groups.split(",") if group.strip()]
+
+    @property
+    def throttle_dedup_prefixes_list(self) -> List[str]:
+        """Callback data prefixes whose duplicate in-flight callbacks are dropped"""
+        return [prefix.strip() for prefix in self.throttle_dedup_prefixes.split(",") if prefix.strip()]
+
+    @property
+    def bot_webhook_base_url_resolved(self) -> str:
+        return (self.bot_webhook_base_url or self.webapp_public_url).rstrip("/")
+
 
 settings = Settings()
@@ -20,6 +20,11 @@ else:
         future=True
     )
 
+if settings.metrics_db_queries:
+    from utils.db_metrics import install_query_metrics
+
+    install_query_metrics(engine.sync_engine)
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -30,13 +35,10 @@ AsyncSessionLocal = async_sessionmaker(
 
 
 async def init_db():
-    """Initialize database tables - ensure all models are imported first"""
-    async with engine.begin() as conn:
-        # Create all tables defined in models that inherit from Base
-        await conn.run_sync(Base.metadata.create_all)
-        
-        # Log all tables that were created
-        await conn.run_sync(lambda sync_conn: print(f"Created tables: {list(Base.metadata.tables.keys())}"))
+    """Create the schema on a new database or check and upgrade its migration revision"""
+    from utils.migrations import migrate_database
+
+    await migrate_database(auto_upgrade=settings.db_auto_migrate)
 
 
 async def get_session() -> AsyncSession:
@@ -155,6 +155,7 @@ LOCALES = {
         "invalid_input": "❌ Неверный ввод. Попробуйте снова.",
         "banned": "❌ Ваш аккаунт заблокирован.",
         "send": "✅ Отправить",
+        "too_many_requests": "⏳ Слишком много запросов, подождите немного.",
     },
     
     "UZ": {
@@ -313,10 +314,37 @@ LOCALES = {
         "invalid_input": "❌ Noto'g'ri kiritish. Qayta urinib ko'ring.",
         "banned": "❌ Sizning akkauntingiz bloklangan.",
         "send": "✅ Yuborish",
+        "too_many_requests": "⏳ So'rovlar juda ko'p, biroz kuting.",
     }
 }
 
 
+
+class _Template:
+    """Locale string prepared once at import"""
+
+    __slots__ = ("text", "format")
+
+    def __init__(self, text: str):
+        self.text = text
+        # Only strings with placeholders or escaped braces go through str.format
+        self.format = text.format if "{" in text or "}" in text else None
+
+
+# Precompiled catalog: language -> key -> template
+CATALOG = {
+    lang: {key: _Template(text) for key, text in strings.items()}
+    for lang, strings in LOCALES.items()
+}
+_DEFAULT_CATALOG = CATALOG["RU"]
+
+# Common spellings of the language code resolve with a single lookup
+_CATALOG_BY_LANG = {}
+for _lang, _catalog in CATALOG.items():
+    for _spelling in (_lang, _lang.lower(), _lang.capitalize()):
+        _CATALOG_BY_LANG[_spelling] = _catalog
+
+
 def t(key: str, lang: str = "RU", **kwargs) -> str:
     """
     Get translated string by key and language.
@@ -329,16 +357,18 @@ def t(key: str, lang: str = "RU", **kwargs) -> str:
     Returns:
         Translated and formatted string
     """
-    lang = lang.upper() if lang else "RU"
-    if lang not in LOCALES:
-        lang = "RU"
+    catalog = _CATALOG_BY_LANG.get(lang)
+    if catalog is None:
+        catalog = CATALOG.get(lang.upper(), _DEFAULT_CATALOG) if lang else _DEFAULT_CATALOG
     
-    text = LOCALES[lang].get(key, key)
+    template = catalog.get(key)
+    if template is None:
+        return key
     
-    if kwargs:
+    if kwargs and template.format is not None:
         try:
-            return text.format(**kwargs)
+            return template.format(**kwargs)
         except (KeyError, ValueError):
-            return text
+            return template.text
     
-    return text
+    return template.text
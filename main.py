@@ -1,10 +1,20 @@
 import asyncio
 import sys
+from utils.startup_profile import BootTimer
+
+# Started before the heavy imports below
+boot_timer = BootTimer()
+
 import uvicorn
-from database import init_db
 from bots.user_bot import UserBot
 from bots.admin_bot import AdminBot
+from bots.webhook import webhook_mode_enabled
+from services.telegraph_service import telegraph_service
+from utils.backup_scheduler import backup_scheduler
+from utils.deletion_scheduler import deletion_scheduler
+from utils.fast_boot import prepare_database
 from utils.logger import logger
+from utils.task_supervisor import supervisor
 from config import settings
 from webapp.server import create_app
 
@@ -13,9 +23,13 @@ from models import (
     User, Document, DocumentButton, Delivery, Notification,
     ShurtaAlert, UserMessage, Broadcast, TelegraphArticle,
     Courier, SystemSetting, AdminLog, WebAppCategory,
-    WebAppCategoryItem, WebAppCategoryItemType, WebAppFile
+    WebAppCategoryItem, WebAppCategoryItemType, WebAppFile, FSMRecord,
+    BackgroundJob, ExportCursor, AppState
 )
 
+# Bump whenever seed_initial_data changes, so fast boots seed again once
+SEED_VERSION = 1
+
 
 async def seed_initial_data():
     """Seed initial documents and system settings"""
@@ -187,20 +201,19 @@ async def seed_initial_data():
 async def main():
     """Main entry point"""
     logger.info("Starting bot system...")
-    
-    logger.info("Initializing database...")
-    await init_db()
-    logger.info("Database tables created successfully")
-    
-    logger.info("Seeding initial data...")
-    await seed_initial_data()
-    logger.info("Initial data seeding completed")
-    
+    boot_timer.mark("импорт")
+
+    await prepare_database(seed_initial_data, SEED_VERSION, fast=settings.fast_boot)
+    boot_timer.mark("база данных")
+
     logger.info("Starting both bots...")
 
     user_bot = UserBot()
     admin_bot = AdminBot()
-    webapp_app = create_app()
+    use_webhook = webhook_mode_enabled()
+    bot_webhooks = (user_bot.webhook, admin_bot.webhook) if use_webhook else ()
+    webapp_app = create_app(bot_webhooks=bot_webhooks)
+    logger.info(f"Режим получения обновлений ботами: {'webhook' if use_webhook else 'polling'}")
 
     uvicorn_config = uvicorn.Config(
         app=webapp_app,
@@ -211,6 +224,10 @@ async def main():
     )
     webapp_server = uvicorn.Server(uvicorn_config)
 
+    # Resume message deletions scheduled before the last restart
+    deletion_scheduler.start()
+    backup_scheduler.start()
+
     async def start_webapp_server():
         logger.info(
             "Запускаем веб-сервер: "
@@ -221,9 +238,12 @@ async def main():
         finally:
             logger.info("Веб-сервер остановлен")
 
+    boot_timer.mark("боты и веб-приложение")
+    logger.info(f"Запуск занял {boot_timer.summary()}")
+
     tasks = [
-        asyncio.create_task(user_bot.start(), name="user-bot"),
-        asyncio.create_task(admin_bot.start(), name="admin-bot"),
+        asyncio.create_task(user_bot.start(use_webhook=use_webhook), name="user-bot"),
+        asyncio.create_task(admin_bot.start(use_webhook=use_webhook), name="admin-bot"),
         asyncio.create_task(start_webapp_server(), name="webapp-server")
     ]
 
@@ -240,6 +260,14 @@ async def main():
             if not task.done():
                 task.cancel()
         await asyncio.gather(*tasks, return_exceptions=True)
+        # Finish in-flight updates first: they may still spawn background tasks
+        if use_webhook:
+            await asyncio.gather(user_bot.webhook.drain(), admin_bot.webhook.drain())
+        # Let broadcasts and notifications finish while the bots can still send
+        await supervisor.drain(settings.background_task_drain_timeout)
+        await deletion_scheduler.stop()
+        await backup_scheduler.stop()
+        await telegraph_service.close()
         logger.info("Останавливаем ботов...")
         await user_bot.stop()
         await admin_bot.stop()
@@ -1,6 +1,6 @@
 import enum
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Float, JSON, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Float, JSON, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta
 from database import Base
@@ -524,6 +524,7 @@ class WebAppFile(Base):
     tag = Column(String(255), nullable=True)  # Optional tag label
     width = Column(Integer, nullable=True)  # Image width (for images only)
     height = Column(Integer, nullable=True)  # Image height (for images only)
+    variants = Column(JSON, nullable=True)  # Responsive image variants: [{"width", "height", "format", "storage_path", ...}]
     uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -553,6 +554,7 @@ class WebAppCategory(Base):
     order_index = Column(Integer, default=0, index=True)
     is_active = Column(Boolean, default=True, index=True)
     cover_file_id = Column(Integer, ForeignKey("webapp_files.id"), nullable=True)
+    version = Column(Integer, default=0, nullable=False, server_default="0")  # Bumped on item set/order changes (optimistic locking)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -691,3 +693,62 @@ class MenuButton(Base):
 
     # Relationships
     menu_item = relationship("MenuItem", back_populates="buttons")
+
+
+class FSMRecord(Base):
+    """Persisted aiogram FSM state and data of one chat/user"""
+    __tablename__ = "fsm_storage"
+
+    key = Column(String(255), primary_key=True)  # bot_id:chat_id:user_id:thread_id:destiny
+    state = Column(String(255), nullable=True)
+    data = Column(JSON, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class ScheduledDeletion(Base):
+    """Bot message waiting for automatic deletion"""
+    __tablename__ = "scheduled_deletions"
+
+    bot_id = Column(Integer, primary_key=True)
+    chat_id = Column(Integer, primary_key=True)
+    message_id = Column(Integer, primary_key=True)
+    delete_at = Column(DateTime, nullable=False, index=True)
+
+
+class BackgroundJob(Base):
+    """Background task handed over to a job worker process"""
+    __tablename__ = "background_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    group = Column(String(50), nullable=False)  # TaskSupervisor group: broadcasts, moderation, ...
+    func = Column(String(255), nullable=False)  # module:qualname of a @background_job function
+    payload = Column(JSON, nullable=False)  # {"args": [...], "kwargs": {...}, "with_session": bool}
+    status = Column(String(20), default="queued", nullable=False)  # queued, claimed, running, done, failed
+    attempts = Column(Integer, default=0, nullable=False)  # times the job was started
+    worker_id = Column(String(100), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # refreshed by the worker holding the job
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_background_jobs_status_group", "status", "group", "id"),)
+
+
+class ExportCursor(Base):
+    """Position of the last incremental analytics export of a table"""
+    __tablename__ = "export_cursors"
+
+    name = Column(String(100), primary_key=True)  # table name
+    last_created_at = Column(DateTime, nullable=False)
+    last_id = Column(Integer, nullable=False)  # tie-breaker for rows with the same created_at
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class AppState(Base):
+    """Small key/value records the application keeps about itself"""
+    __tablename__ = "app_state"
+
+    key = Column(String(100), primary_key=True)  # boot_marker, ...
+    value = Column(String(255), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -1,22 +1,39 @@
 """Dynamic Menu Service"""
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import raiseload, selectinload
 from typing import List, Optional
 from datetime import datetime
 from models import MainMenu, MenuFilter, MenuFilterOption, Category
 from utils.logger import logger
+from utils.menu_cache import menu_cache
 
 
 class DynamicMenuService:
     @staticmethod
     async def get_all_menus(session: AsyncSession, active_only: bool = True) -> List[MainMenu]:
+        """
+        Active menus come from the menu cache with filters and options loaded;
+        their categories are not loaded (use CategoryService.get_categories_by_menu).
+        active_only=False is the admin view and always reads the database.
+        """
+        if active_only:
+            return await menu_cache.get_or_load(
+                "main_menus", lambda: DynamicMenuService._load_active_menus(session)
+            )
         stmt = select(MainMenu).options(
             selectinload(MainMenu.filters).selectinload(MenuFilter.options),
             selectinload(MainMenu.categories)
         ).order_by(MainMenu.order_index)
-        if active_only:
-            stmt = stmt.where(MainMenu.is_active == True)
+        result = await session.execute(stmt)
+        return list(result.scalars().unique().all())
+    
+    @staticmethod
+    async def _load_active_menus(session: AsyncSession) -> List[MainMenu]:
+        stmt = select(MainMenu).options(
+            selectinload(MainMenu.filters).selectinload(MenuFilter.options),
+            raiseload(MainMenu.categories)
+        ).where(MainMenu.is_active == True).order_by(MainMenu.order_index)
         result = await session.execute(stmt)
         return list(result.scalars().unique().all())
     
@@ -37,6 +54,7 @@ class DynamicMenuService:
         menu = MainMenu(name_ru=name_ru, name_uz=name_uz, icon=icon, order_index=max_order + 1)
         session.add(menu)
         await session.commit()
+        menu_cache.invalidate("DynamicMenuService.create_menu")
         await session.refresh(menu)
         logger.info(f"[DynamicMenuService] ✅ Создано меню: {name_ru}")
         return menu
@@ -49,6 +67,7 @@ class DynamicMenuService:
         menu.is_active = not menu.is_active
         menu.updated_at = datetime.utcnow()
         await session.commit()
+        menu_cache.invalidate("DynamicMenuService.toggle_menu")
         return menu.is_active
     
     @staticmethod
@@ -58,6 +77,7 @@ class DynamicMenuService:
             return False
         await session.delete(menu)
         await session.commit()
+        menu_cache.invalidate("DynamicMenuService.delete_menu")
         return True
 
 
@@ -70,6 +90,7 @@ class MenuFilterService:
         filter_obj = MenuFilter(main_menu_id=main_menu_id, name_ru=name_ru, name_uz=name_uz, order_index=max_order + 1)
         session.add(filter_obj)
         await session.commit()
+        menu_cache.invalidate("MenuFilterService.create_filter")
         await session.refresh(filter_obj)
         logger.info(f"[MenuFilterService] ✅ Создан фильтр: {name_ru}")
         return filter_obj
@@ -87,6 +108,7 @@ class MenuFilterService:
             return False
         await session.delete(filter_obj)
         await session.commit()
+        menu_cache.invalidate("MenuFilterService.delete_filter")
         return True
 
 
@@ -99,6 +121,7 @@ class MenuFilterOptionService:
         option = MenuFilterOption(filter_id=filter_id, name_ru=name_ru, name_uz=name_uz, icon=icon, order_index=max_order + 1)
         session.add(option)
         await session.commit()
+        menu_cache.invalidate("MenuFilterOptionService.create_option")
         await session.refresh(option)
         logger.info(f"[MenuFilterOptionService] ✅ Создана опция: {name_ru}")
         return option
@@ -116,6 +139,7 @@ class MenuFilterOptionService:
             return False
         await session.delete(option)
         await session.commit()
+        menu_cache.invalidate("MenuFilterOptionService.delete_option")
         return True
 
 
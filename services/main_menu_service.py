@@ -5,6 +5,7 @@ from datetime import datetime
 
 from models import MainMenuButton
 from utils.logger import logger
+from utils.menu_cache import menu_cache
 
 
 class MainMenuService:
@@ -15,7 +16,13 @@ class MainMenuService:
     # ════════════════════════════════════════════════════════════════════════
     @staticmethod
     async def get_active_buttons(session: AsyncSession) -> List[MainMenuButton]:
-        """Return all active buttons ordered by order_index"""
+        """Return all active buttons ordered by order_index (served from the menu cache)"""
+        return await menu_cache.get_or_load(
+            "main_menu_buttons", lambda: MainMenuService._load_active_buttons(session)
+        )
+
+    @staticmethod
+    async def _load_active_buttons(session: AsyncSession) -> List[MainMenuButton]:
         stmt = (
             select(MainMenuButton)
             .where(MainMenuButton.is_active == True)
@@ -89,6 +96,7 @@ class MainMenuService:
         )
         session.add(button)
         await session.commit()
+        menu_cache.invalidate("MainMenuService.create_button")
         await session.refresh(button)
         logger.info(
             "[MainMenuService] ✅ Создана кнопка главного меню %s (ID=%s)",
@@ -117,6 +125,7 @@ class MainMenuService:
         button.updated_at = datetime.utcnow()
 
         await session.commit()
+        menu_cache.invalidate("MainMenuService.update_button")
         await session.refresh(button)
         logger.info(
             "[MainMenuService] ✅ Обновлена кнопка главного меню ID=%s",
@@ -135,6 +144,7 @@ class MainMenuService:
         button.is_active = not button.is_active
         button.updated_at = datetime.utcnow()
         await session.commit()
+        menu_cache.invalidate("MainMenuService.toggle_button")
         logger.info(
             "[MainMenuService] ✅ Переключен статус кнопки ID=%s → %s",
             button_id,
@@ -150,6 +160,7 @@ class MainMenuService:
 
         await session.delete(button)
         await session.commit()
+        menu_cache.invalidate("MainMenuService.delete_button")
         logger.info(
             "[MainMenuService] ✅ Удалена кнопка главного меню ID=%s",
             button_id,
@@ -194,6 +205,7 @@ class MainMenuService:
         button.updated_at = datetime.utcnow()
         swap_button.updated_at = datetime.utcnow()
         await session.commit()
+        menu_cache.invalidate("MainMenuService.reorder_button")
         logger.info(
             "[MainMenuService] ✅ Перемещена кнопка ID=%s направление=%s",
             button_id,
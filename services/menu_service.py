@@ -5,6 +5,7 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 from models import MenuItem, MenuContent, MenuButton
 from utils.logger import logger
+from utils.menu_cache import menu_cache
 
 
 class MenuService:
@@ -21,8 +22,17 @@ class MenuService:
     ) -> List[MenuItem]:
         """
         Get all menu items ordered by order_index
-        ALWAYS FRESH DATA - NO CACHING
+        Active items come from the menu cache (dropped by every mutation below);
+        include_inactive=True is the admin view and always reads the database
         """
+        if not include_inactive:
+            return await menu_cache.get_or_load(
+                "menu_items", lambda: MenuService._load_menu_items(session, include_inactive)
+            )
+        return await MenuService._load_menu_items(session, include_inactive)
+
+    @staticmethod
+    async def _load_menu_items(session: AsyncSession, include_inactive: bool) -> List[MenuItem]:
         stmt = select(MenuItem).options(
             selectinload(MenuItem.content),
             selectinload(MenuItem.buttons)
@@ -85,6 +95,7 @@ class MenuService:
         
         session.add(menu_item)
         await session.commit()
+        menu_cache.invalidate("MenuService.create_menu_item")
         await session.refresh(menu_item)
         
         logger.info(f"[MenuService] ✅ Создан новый пункт меню: {name_ru} (ID={menu_item.id})")
@@ -107,6 +118,7 @@ class MenuService:
         
         menu_item.updated_at = datetime.utcnow()
         await session.commit()
+        menu_cache.invalidate("MenuService.update_menu_item")
         await session.refresh(menu_item)
         
         logger.info(f"[MenuService] ✅ Обновлен пункт меню: {menu_item.name_ru} (ID={menu_item_id})")
@@ -124,6 +136,7 @@ class MenuService:
         
         menu_item.is_active = not menu_item.is_active
         await session.commit()
+        menu_cache.invalidate("MenuService.toggle_menu_item")
         
         status = "ON" if menu_item.is_active else "OFF"
         logger.info(f"[MenuService] ✅ Переключен статус пункта меню: {menu_item.name_ru} → {status}")
@@ -141,6 +154,7 @@ class MenuService:
         
         await session.delete(menu_item)
         await session.commit()
+        menu_cache.invalidate("MenuService.delete_menu_item")
         
         logger.info(f"[MenuService] ✅ Удален пункт меню: {menu_item.name_ru} (ID={menu_item_id})")
         return True
@@ -178,6 +192,7 @@ class MenuService:
         # Swap order indices
         menu_item.order_index, swap_item.order_index = swap_item.order_index, menu_item.order_index
         await session.commit()
+        menu_cache.invalidate("MenuService.reorder_menu_item")
         
         logger.info(f"[MenuService] ✅ Перемещен пункт меню: {menu_item.name_ru} ({direction})")
         return True
@@ -211,6 +226,7 @@ class MenuService:
         
         session.add(content)
         await session.commit()
+        menu_cache.invalidate("MenuService.add_text_content")
         await session.refresh(content)
         
         logger.info(f"[MenuService] ✅ Добавлен TEXT контент для пункта меню ID={menu_item_id}")
@@ -242,6 +258,7 @@ class MenuService:
         
         session.add(content)
         await session.commit()
+        menu_cache.invalidate("MenuService.add_photo_content")
         await session.refresh(content)
         
         logger.info(f"[MenuService] ✅ Добавлен PHOTO контент для пункта меню ID={menu_item_id}")
@@ -273,6 +290,7 @@ class MenuService:
         
         session.add(content)
         await session.commit()
+        menu_cache.invalidate("MenuService.add_pdf_content")
         await session.refresh(content)
         
         logger.info(f"[MenuService] ✅ Добавлен PDF контент для пункта меню ID={menu_item_id}")
@@ -304,6 +322,7 @@ class MenuService:
         
         session.add(content)
         await session.commit()
+        menu_cache.invalidate("MenuService.add_audio_content")
         await session.refresh(content)
         
         logger.info(f"[MenuService] ✅ Добавлен AUDIO контент для пункта меню ID={menu_item_id}")
@@ -341,6 +360,7 @@ class MenuService:
         
         session.add(content)
         await session.commit()
+        menu_cache.invalidate("MenuService.add_location_content")
         await session.refresh(content)
         
         logger.info(f"[MenuService] ✅ Добавлен LOCATION контент для пункта меню ID={menu_item_id}")
@@ -361,6 +381,7 @@ class MenuService:
         
         await session.delete(content)
         await session.commit()
+        menu_cache.invalidate("MenuService.delete_content")
         
         logger.info(f"[MenuService] ✅ Удален контент ID={content_id}")
         return True
@@ -398,6 +419,7 @@ class MenuService:
         
         session.add(button)
         await session.commit()
+        menu_cache.invalidate("MenuService.add_button")
         await session.refresh(button)
         
         logger.info(f"[MenuService] ✅ Добавлена кнопка для пункта меню ID={menu_item_id}, type={button_type}, action={action_type}")
@@ -418,6 +440,7 @@ class MenuService:
         
         await session.delete(button)
         await session.commit()
+        menu_cache.invalidate("MenuService.delete_button")
         
         logger.info(f"[MenuService] ✅ Удалена кнопка ID={button_id}")
         return True
@@ -1,28 +1,126 @@
-from telegraph import Telegraph
+import asyncio
+import os
+import time
 from config import settings
 from utils.logger import logger
-from typing import Optional
+from typing import Any, Awaitable, Callable, Optional
+
+# Backoff between retries of failed requests, in seconds. Telegraph API
+# errors such as an invalid token or malformed HTML are never retried
+RETRY_DELAY = 1.0
+RETRY_DELAY_MAX = 30.0
 
 
 class TelegraphService:
-    """Service for Telegraph integration"""
-    
-    def __init__(self):
-        self.telegraph = Telegraph()
-        self.token = settings.telegraph_token
-        
-        if not self.token:
-            try:
-                self.telegraph.create_account(
+    """
+    Service for Telegraph integration
+
+    The client is created on first use. Without TELEGRAPH_TOKEN an account
+    is created once and its token is kept in TELEGRAPH_TOKEN_FILE, so
+    restarts and other processes reuse it. Publishes run one at a time
+    (TELEGRAPH_CONCURRENCY) and are retried on network errors and flood
+    waits; a flood wait pauses every queued publish.
+    """
+
+    def __init__(
+        self,
+        token: str = "",
+        token_file: str = "",
+        concurrency: int = 1,
+        max_retries: int = 3
+    ):
+        self.token = token or None
+        self.token_file = token_file
+        self.max_retries = max_retries
+        self._telegraph = None
+        self._lock = asyncio.Lock()
+        self._publishing = asyncio.Semaphore(max(1, concurrency))
+        self._paused_until = 0.0
+
+    def _read_token(self) -> Optional[str]:
+        if not self.token_file:
+            return None
+        try:
+            with open(self.token_file, 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _write_token(self, token: str) -> None:
+        if not self.token_file:
+            return
+        directory = os.path.dirname(self.token_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.token_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(token)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.token_file)
+
+    async def get_client(self):
+        """Telegraph client with an access token, created on first call"""
+        if self._telegraph is not None:
+            return self._telegraph
+
+        async with self._lock:
+            if self._telegraph is not None:
+                return self._telegraph
+
+            from telegraph.aio import Telegraph
+
+            token = self.token or await asyncio.to_thread(self._read_token)
+            telegraph = Telegraph(access_token=token)
+            if not token:
+                await self._call(lambda: telegraph.create_account(
                     short_name="AlAzharDirassa",
                     author_name="Al-Azhar & Dirassa Bot"
-                )
-                self.token = self.telegraph.get_access_token()
+                ), idempotent=False)
+                token = telegraph.get_access_token()
+                await asyncio.to_thread(self._write_token, token)
                 logger.info("Telegraph token auto-generated")
-            except Exception as e:
-                logger.error(f"Failed to create Telegraph account: {e}")
-    
-    def create_article(
+            self.token = token
+            self._telegraph = telegraph
+            return telegraph
+
+    async def _call(self, request: Callable[[], Awaitable[Any]], idempotent: bool = True) -> Any:
+        """
+        Run a Telegraph request, retrying network errors and flood waits.
+
+        A request that may have reached the server is only repeated when
+        it is idempotent, so a lost response never publishes a page twice.
+        """
+        import httpx
+        from telegraph.exceptions import RetryAfterError
+
+        retryable = (httpx.TransportError, ValueError) if idempotent else (httpx.ConnectError, httpx.ConnectTimeout)
+
+        delay = RETRY_DELAY
+        for attempt in range(self.max_retries + 1):
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            try:
+                return await request()
+            except RetryAfterError as e:
+                if attempt >= self.max_retries:
+                    raise
+                self._paused_until = time.monotonic() + e.retry_after
+                logger.warning(f"Telegraph flood wait: {e.retry_after}s")
+            except retryable as e:
+                # ValueError: a non-JSON answer from an overloaded server
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(f"Telegraph request failed ({e!r}), retrying in {delay:g}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RETRY_DELAY_MAX)
+
+    async def _publish(self, method: str, idempotent: bool, **kwargs) -> dict:
+        telegraph = await self.get_client()
+        async with self._publishing:
+            return await self._call(lambda: getattr(telegraph, method)(**kwargs), idempotent)
+
+    async def create_article(
         self,
         title: str,
         content: str,
@@ -30,7 +128,9 @@ class TelegraphService:
     ) -> Optional[str]:
         """Create Telegraph article and return URL"""
         try:
-            response = self.telegraph.create_page(
+            response = await self._publish(
+                "create_page",
+                idempotent=False,
                 title=title,
                 html_content=content,
                 author_name=author_name
@@ -41,8 +141,8 @@ class TelegraphService:
         except Exception as e:
             logger.error(f"Failed to create Telegraph article: {e}")
             return None
-    
-    def update_article(
+
+    async def update_article(
         self,
         path: str,
         title: str,
@@ -50,7 +150,9 @@ class TelegraphService:
     ) -> Optional[str]:
         """Update existing Telegraph article"""
         try:
-            response = self.telegraph.edit_page(
+            response = await self._publish(
+                "edit_page",
+                idempotent=True,
                 path=path,
                 title=title,
                 html_content=content
@@ -61,18 +163,29 @@ class TelegraphService:
         except Exception as e:
             logger.error(f"Failed to update Telegraph article: {e}")
             return None
-    
+
+    async def close(self) -> None:
+        """Close the HTTP client if one was created"""
+        if self._telegraph is not None:
+            await self._telegraph._telegraph.session.aclose()
+            self._telegraph = None
+
     @staticmethod
     def format_content(text: str) -> str:
         """Format text for Telegraph"""
         text = text.replace('\n', '<br>')
-        
+
         return f"<p>{text}</p>"
-    
+
     @staticmethod
     def is_long_content(text: str, threshold: int = 1000) -> bool:
         """Check if content should be moved to Telegraph"""
         return len(text) > threshold
 
 
-telegraph_service = TelegraphService()
+telegraph_service = TelegraphService(
+    token=settings.telegraph_token,
+    token_file=settings.telegraph_token_file,
+    concurrency=settings.telegraph_concurrency,
+    max_retries=settings.telegraph_max_retries
+)
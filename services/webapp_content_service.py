@@ -4,14 +4,30 @@
 
 import asyncio
 
-from sqlalchemy import select
+from sqlalchemy import and_, case, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from typing import List, Optional, Dict, Any, Union
+from sqlalchemy.orm import load_only, noload, selectinload
+from typing import Iterable, List, Optional, Dict, Any, Tuple, Union
 from models import WebAppCategory, WebAppCategoryItem, WebAppFile, WebAppCategoryItemType
 from utils.logger import logger
 
 
+class WebAppVersionConflictError(Exception):
+    """Raised when a category was modified since the client last read it"""
+    pass
+
+
+# Position of a row in (order_index, id) order, used as a keyset cursor
+KeysetPosition = Tuple[int, int]
+
+# File relationships that are never needed when serializing a page
+_FILE_PAGE_OPTIONS = (
+    noload(WebAppFile.uploader),
+    noload(WebAppFile.category_items),
+    noload(WebAppFile.categories_as_cover),
+)
+
+
 class WebAppContentService:
     """Service for Web App content management"""
     
@@ -41,7 +57,7 @@ class WebAppContentService:
             query = select(WebAppCategory).options(
                 selectinload(WebAppCategory.items),
                 selectinload(WebAppCategory.cover_file)
-            )
+            ).execution_options(populate_existing=True)
             
             if not include_inactive:
                 query = query.where(WebAppCategory.is_active == True)
@@ -57,6 +73,182 @@ class WebAppContentService:
             logger.error(f"Ошибка получения категорий Web App: {str(e)}", exc_info=True)
             raise
     
+    @staticmethod
+    def _after_position(model, after: Optional[KeysetPosition]):
+        """Keyset condition selecting rows strictly after (order_index, id)"""
+        order_index, row_id = after
+        return or_(
+            model.order_index > order_index,
+            and_(model.order_index == order_index, model.id > row_id)
+        )
+    
+    @staticmethod
+    def _split_page(rows: List[Any], limit: Optional[int]) -> Tuple[List[Any], Optional[KeysetPosition]]:
+        """Trim the look-ahead row and return the position to continue from"""
+        if limit is None or len(rows) <= limit:
+            return rows, None
+        page = rows[:limit]
+        return page, (page[-1].order_index, page[-1].id)
+    
+    @staticmethod
+    async def list_categories_page(
+        session: AsyncSession,
+        include_inactive: bool = False,
+        limit: Optional[int] = None,
+        after: Optional[KeysetPosition] = None
+    ) -> Tuple[List[WebAppCategory], Optional[KeysetPosition]]:
+        """
+        Получить страницу категорий без загрузки элементов
+        Get a keyset page of categories ordered by (order_index, id)
+        
+        Items are not loaded; use count_items_by_category for counters.
+        Returns the page and the position of its last row when more rows follow.
+        """
+        try:
+            query = select(WebAppCategory).options(
+                noload(WebAppCategory.items),
+                noload(WebAppCategory.targeted_items),
+                selectinload(WebAppCategory.cover_file).options(*_FILE_PAGE_OPTIONS)
+            )
+            
+            if not include_inactive:
+                query = query.where(WebAppCategory.is_active == True)
+            
+            if after is not None:
+                query = query.where(WebAppContentService._after_position(WebAppCategory, after))
+            
+            query = query.order_by(WebAppCategory.order_index, WebAppCategory.id)
+            
+            if limit is not None:
+                query = query.limit(limit + 1)
+            
+            result = await session.execute(query)
+            categories, next_position = WebAppContentService._split_page(list(result.scalars().all()), limit)
+            
+            logger.info(f"Найдено категорий Web App на странице: {len(categories)}")
+            return categories, next_position
+        except Exception as e:
+            logger.error(f"Ошибка получения страницы категорий Web App: {str(e)}", exc_info=True)
+            raise
+    
+    @staticmethod
+    async def count_items_by_category(
+        session: AsyncSession,
+        category_ids: Iterable[int],
+        include_inactive: bool = False
+    ) -> Dict[int, int]:
+        """
+        Подсчитать элементы категорий одним запросом
+        Count items per category with a single grouped query
+        """
+        category_ids = list(category_ids)
+        if not category_ids:
+            return {}
+        
+        try:
+            query = select(
+                WebAppCategoryItem.category_id,
+                func.count(WebAppCategoryItem.id)
+            ).where(
+                WebAppCategoryItem.category_id.in_(category_ids)
+            ).group_by(WebAppCategoryItem.category_id)
+            
+            if not include_inactive:
+                query = query.where(WebAppCategoryItem.is_active == True)
+            
+            result = await session.execute(query)
+            return {category_id: count for category_id, count in result.all()}
+        except Exception as e:
+            logger.error(f"Ошибка подсчета элементов категорий Web App: {str(e)}", exc_info=True)
+            raise
+    
+    @staticmethod
+    async def list_category_items_page(
+        session: AsyncSession,
+        category_id: int,
+        include_inactive: bool = False,
+        limit: Optional[int] = None,
+        after: Optional[KeysetPosition] = None,
+        columns: Optional[Iterable[str]] = None
+    ) -> Tuple[List[WebAppCategoryItem], Optional[KeysetPosition]]:
+        """
+        Получить страницу элементов категории
+        Get a keyset page of category items ordered by (order_index, id)
+        
+        ``columns`` restricts loaded item columns (id and order_index are
+        always loaded); the file relationship is loaded only when ``file_id``
+        is among them. Returns the page and the position to continue from.
+        """
+        try:
+            query = select(WebAppCategoryItem).where(
+                WebAppCategoryItem.category_id == category_id
+            ).options(
+                noload(WebAppCategoryItem.category),
+                noload(WebAppCategoryItem.target_category)
+            )
+            
+            if columns is None:
+                with_file = True
+            else:
+                column_names = set(columns) | {"id", "order_index"}
+                with_file = "file_id" in column_names
+                query = query.options(load_only(
+                    *(getattr(WebAppCategoryItem, name) for name in sorted(column_names))
+                ))
+            
+            if with_file:
+                query = query.options(
+                    selectinload(WebAppCategoryItem.file).options(*_FILE_PAGE_OPTIONS)
+                )
+            else:
+                query = query.options(noload(WebAppCategoryItem.file))
+            
+            if not include_inactive:
+                query = query.where(WebAppCategoryItem.is_active == True)
+            
+            if after is not None:
+                query = query.where(WebAppContentService._after_position(WebAppCategoryItem, after))
+            
+            query = query.order_by(WebAppCategoryItem.order_index, WebAppCategoryItem.id)
+            
+            if limit is not None:
+                query = query.limit(limit + 1)
+            
+            result = await session.execute(query)
+            items, next_position = WebAppContentService._split_page(list(result.scalars().all()), limit)
+            
+            logger.info(f"Найдено элементов категории {category_id} на странице: {len(items)}")
+            return items, next_position
+        except Exception as e:
+            logger.error(f"Ошибка получения страницы элементов категории Web App: {str(e)}", exc_info=True)
+            raise
+    
+    @staticmethod
+    async def get_category_summary(
+        session: AsyncSession,
+        category_id: int,
+        include_inactive: bool = False
+    ) -> Optional[WebAppCategory]:
+        """
+        Получить категорию без элементов
+        Get category by ID with its cover but without loading items
+        """
+        try:
+            query = select(WebAppCategory).options(
+                noload(WebAppCategory.items),
+                noload(WebAppCategory.targeted_items),
+                selectinload(WebAppCategory.cover_file).options(*_FILE_PAGE_OPTIONS)
+            ).where(WebAppCategory.id == category_id)
+            
+            if not include_inactive:
+                query = query.where(WebAppCategory.is_active == True)
+            
+            result = await session.execute(query)
+            return result.scalar_one_or_none()
+        except Exception as e:
+            logger.error(f"Ошибка получения категории Web App: {str(e)}", exc_info=True)
+            raise
+    
     @staticmethod
     async def get_category(
         session: AsyncSession,
@@ -71,7 +263,7 @@ class WebAppContentService:
             query = select(WebAppCategory).options(
                 selectinload(WebAppCategory.items),
                 selectinload(WebAppCategory.cover_file)
-            ).where(WebAppCategory.id == category_id)
+            ).execution_options(populate_existing=True).where(WebAppCategory.id == category_id)
             
             if not include_inactive:
                 query = query.where(WebAppCategory.is_active == True)
@@ -103,7 +295,7 @@ class WebAppContentService:
             query = select(WebAppCategory).options(
                 selectinload(WebAppCategory.items),
                 selectinload(WebAppCategory.cover_file)
-            ).where(WebAppCategory.slug == slug)
+            ).execution_options(populate_existing=True).where(WebAppCategory.slug == slug)
             
             if not include_inactive:
                 query = query.where(WebAppCategory.is_active == True)
@@ -268,6 +460,7 @@ class WebAppContentService:
             )
             
             session.add(item)
+            await WebAppContentService._bump_category_version(session, category_id)
             await session.commit()
             await session.refresh(item)
             
@@ -321,6 +514,7 @@ class WebAppContentService:
             if is_active is not None:
                 item.is_active = is_active
             
+            await WebAppContentService._bump_category_version(session, item.category_id)
             await session.commit()
             await session.refresh(item)
             
@@ -350,6 +544,7 @@ class WebAppContentService:
                 return False
             
             await session.delete(item)
+            await WebAppContentService._bump_category_version(session, item.category_id)
             await session.commit()
             
             logger.info(f"✅ Элемент Web App {item_id} удалён")
@@ -359,10 +554,67 @@ class WebAppContentService:
             await session.rollback()
             raise
     
+    @staticmethod
+    async def _bump_category_version(
+        session: AsyncSession,
+        category_id: int,
+        expected_version: Optional[int] = None
+    ) -> None:
+        """
+        Увеличить версию категории (оптимистичная блокировка)
+        Increment category version, optionally checking the expected one
+        """
+        statement = (
+            update(WebAppCategory)
+            .where(WebAppCategory.id == category_id)
+            .values(version=WebAppCategory.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if expected_version is not None:
+            statement = statement.where(WebAppCategory.version == expected_version)
+        
+        result = await session.execute(statement)
+        if result.rowcount == 0 and expected_version is not None:
+            raise WebAppVersionConflictError(
+                f"Категория Web App {category_id} была изменена (ожидалась версия {expected_version})"
+            )
+    
+    @staticmethod
+    async def _bulk_set_order(
+        session: AsyncSession,
+        model,
+        order: List[Dict[str, int]],
+        *criteria
+    ) -> int:
+        """
+        Обновить order_index одним UPDATE ... CASE
+        Set order_index for many rows with a single set-based UPDATE
+        
+        The statement bypasses the identity map; category reads use
+        populate_existing so subsequent loads see the new order.
+        """
+        mapping = {
+            entry['id']: entry['order_index']
+            for entry in order
+            if entry.get('id') is not None and entry.get('order_index') is not None
+        }
+        if not mapping:
+            return 0
+        
+        result = await session.execute(
+            update(model)
+            .where(model.id.in_(mapping.keys()), *criteria)
+            .values(order_index=case(mapping, value=model.id))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+    
     @staticmethod
     async def reorder_items(
         session: AsyncSession,
-        item_order: List[Dict[str, int]]
+        item_order: List[Dict[str, int]],
+        category_id: Optional[int] = None,
+        expected_version: Optional[int] = None
     ) -> bool:
         """
         Переупорядочить элементы категории
@@ -370,27 +622,53 @@ class WebAppContentService:
         
         Args:
             item_order: List of dicts with 'id' and 'order_index' keys
+            category_id: Category whose version is bumped (and items restricted to)
+            expected_version: Reject with WebAppVersionConflictError if the
+                category version differs (optimistic concurrency)
         """
         try:
             logger.info(f"Переупорядочивание {len(item_order)} элементов Web App")
             
-            for item_data in item_order:
-                item_id = item_data.get('id')
-                new_order = item_data.get('order_index')
-                
-                if item_id is not None and new_order is not None:
-                    result = await session.execute(
-                        select(WebAppCategoryItem).where(WebAppCategoryItem.id == item_id)
-                    )
-                    item = result.scalar_one_or_none()
-                    if item:
-                        item.order_index = new_order
+            criteria = []
+            if category_id is not None:
+                await WebAppContentService._bump_category_version(session, category_id, expected_version)
+                criteria.append(WebAppCategoryItem.category_id == category_id)
             
+            await WebAppContentService._bulk_set_order(session, WebAppCategoryItem, item_order, *criteria)
             await session.commit()
+            
             logger.info(f"✅ Элементы Web App переупорядочены")
             return True
         except Exception as e:
-            logger.error(f"❌ Ошибка переупорядочивания элементов Web App: {str(e)}", exc_info=True)
+            if isinstance(e, WebAppVersionConflictError):
+                logger.warning(f"⚠️ {str(e)}")
+            else:
+                logger.error(f"❌ Ошибка переупорядочивания элементов Web App: {str(e)}", exc_info=True)
+            await session.rollback()
+            raise
+    
+    @staticmethod
+    async def reorder_categories(
+        session: AsyncSession,
+        category_order: List[Dict[str, int]]
+    ) -> bool:
+        """
+        Переупорядочить категории
+        Reorder categories
+        
+        Args:
+            category_order: List of dicts with 'id' and 'order_index' keys
+        """
+        try:
+            logger.info(f"Переупорядочивание {len(category_order)} категорий Web App")
+            
+            await WebAppContentService._bulk_set_order(session, WebAppCategory, category_order)
+            await session.commit()
+            
+            logger.info(f"✅ Категории Web App переупорядочены")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Ошибка переупорядочивания категорий Web App: {str(e)}", exc_info=True)
             await session.rollback()
             raise
     
@@ -466,6 +744,33 @@ class WebAppContentService:
             logger.error(f"Ошибка получения файла Web App: {str(e)}", exc_info=True)
             raise
     
+    @staticmethod
+    async def set_file_variants(
+        session: AsyncSession,
+        file_id: int,
+        variants: List[Dict[str, Any]]
+    ) -> Optional[WebAppFile]:
+        """
+        Сохранить варианты изображения для файла
+        Store responsive image variants on a file record
+        """
+        try:
+            file_record = await WebAppContentService.get_file(session, file_id)
+            if not file_record:
+                logger.warning(f"Файл Web App {file_id} не найден для сохранения вариантов")
+                return None
+            
+            file_record.variants = variants or None
+            await session.commit()
+            await session.refresh(file_record)
+            
+            logger.info(f"✅ Сохранено вариантов изображения для файла {file_id}: {len(variants)}")
+            return file_record
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения вариантов файла Web App: {str(e)}", exc_info=True)
+            await session.rollback()
+            raise
+    
     @staticmethod
     async def resolve_file_url(file: Optional[WebAppFile]) -> Optional[str]:
         """
@@ -509,6 +814,16 @@ class WebAppContentService:
                 except Exception as e:
                     logger.error(f"❌ Ошибка удаления физического файла: {str(e)}")
             
+            if delete_physical and file_record.variants:
+                from webapp.storage import resolve_physical_path
+                for variant in file_record.variants:
+                    try:
+                        variant_path = resolve_physical_path(variant.get("storage_path"))
+                        if variant_path and variant_path.exists():
+                            await asyncio.to_thread(variant_path.unlink)
+                    except Exception as e:
+                        logger.error(f"❌ Ошибка удаления варианта изображения: {str(e)}")
+            
             await session.delete(file_record)
             await session.commit()
             
@@ -0,0 +1,118 @@
+"""
+Tests for the shared Bot API session middlewares
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageText, GetMe, SendMessage
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from bots import api_session
+from bots.api_session import TELEGRAM_API_DURATION, LatencyMiddleware, NoOpEditMiddleware, create_api_session
+from config import settings
+
+TEST_TOKEN = "123456:ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghi"
+
+KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="OK", callback_data="ok")]])
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.requests = []
+        self.not_modified = False
+        self.delay = 0.0
+
+    async def __call__(self, bot, method):
+        self.requests.append(type(method).__name__)
+        await asyncio.sleep(self.delay)
+        if isinstance(method, SendMessage):
+            return Message.model_validate({
+                "message_id": 10,
+                "date": 0,
+                "chat": {"id": method.chat_id, "type": "private"},
+                "text": method.text
+            })
+        if self.not_modified:
+            raise TelegramBadRequest(method, "Bad Request: message is not modified")
+        return True
+
+
+async def run_no_op_edit_scenario():
+    bot = Bot(token=TEST_TOKEN)
+    telegram = FakeTelegram()
+    middleware = NoOpEditMiddleware()
+
+    try:
+        await middleware(telegram, bot, SendMessage(chat_id=1, text="Меню", reply_markup=KEYBOARD))
+
+        # Same text and keyboard as sent: no request
+        assert await middleware(telegram, bot, EditMessageText(chat_id=1, message_id=10, text="Меню", reply_markup=KEYBOARD)) is True
+        assert telegram.requests == ["SendMessage"]
+
+        await middleware(telegram, bot, EditMessageText(chat_id=1, message_id=10, text="Каталог", reply_markup=KEYBOARD))
+        assert telegram.requests == ["SendMessage", "EditMessageText"]
+
+        # Identical edits running at the same time share one request
+        telegram.delay = 0.05
+        edit = EditMessageText(chat_id=1, message_id=10, text="Настройки")
+        await asyncio.gather(middleware(telegram, bot, edit), middleware(telegram, bot, edit))
+        assert telegram.requests.count("EditMessageText") == 2
+        assert middleware.skipped == 2
+
+        # "message is not modified" from Telegram is not an error
+        telegram.delay = 0.0
+        telegram.not_modified = True
+        assert await middleware(telegram, bot, EditMessageText(chat_id=1, message_id=99, text="x")) is True
+    finally:
+        await bot.session.close()
+
+
+async def run_latency_scenario():
+    bot = Bot(token=TEST_TOKEN)
+    telegram = FakeTelegram()
+    try:
+        await LatencyMiddleware()(telegram, bot, GetMe())
+    finally:
+        await bot.session.close()
+
+    histograms = dict(TELEGRAM_API_DURATION.items())
+    assert histograms[("getMe", "ok")].count >= 1
+
+
+def test_no_op_edits_are_not_sent():
+    asyncio.run(run_no_op_edit_scenario())
+
+
+def test_api_latency_is_recorded_per_method():
+    asyncio.run(run_latency_scenario())
+
+
+async def run_connector_scenario():
+    session = create_api_session()
+    try:
+        client = await session.create_session()
+        # Fails when an aiogram upgrade stops reading _connector_init
+        assert client.connector.limit == settings.bot_api_pool_size
+        assert client.connector.limit_per_host == settings.bot_api_pool_size
+    finally:
+        await session.close()
+
+
+def test_api_session_connector_is_tuned():
+    asyncio.run(run_connector_scenario())
+
+
+def test_connector_tuning_is_skipped_on_untested_aiogram(monkeypatch):
+    monkeypatch.setattr(api_session, "aiogram_version", "4.0.0")
+    session = AiohttpSession()
+    assert api_session.tune_connector(session) is False
+    assert "limit" not in session._connector_init
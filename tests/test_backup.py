@@ -0,0 +1,101 @@
+"""
+Tests for online SQLite backups
+"""
+
+import asyncio
+import gzip
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils import exporter
+from utils.backup_scheduler import BackupScheduler
+from utils.exporter import BackupProgress, ExportService
+
+
+def make_database(path: Path, rows: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, payload TEXT)")
+    conn.executemany("INSERT INTO items (payload) VALUES (?)", [("x" * 500,) for _ in range(rows)])
+    conn.commit()
+    conn.close()
+
+
+def count_rows(path: Path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    finally:
+        conn.close()
+
+
+async def run_backup_scenario(directory: Path):
+    db_path = directory / "source.db"
+    make_database(db_path, 200)
+
+    progress = BackupProgress()
+    backup = Path(await ExportService.export_database_sqlite(f"sqlite+aiosqlite:///{db_path}", progress))
+    try:
+        assert backup.suffix == ".gz"
+        assert progress.total_pages > 0 and progress.percent == 100
+
+        restored = directory / "restored.db"
+        with gzip.open(backup, "rb") as packed:
+            restored.write_bytes(packed.read())
+        assert count_rows(restored) == 200
+    finally:
+        ExportService.cleanup_export_file(str(backup))
+
+
+async def run_retention_scenario(directory: Path):
+    db_path = directory / "source.db"
+    make_database(db_path, 10)
+    scheduler = BackupScheduler(f"sqlite:///{db_path}", str(directory / "backups"), interval=3600, keep=2)
+
+    assert await scheduler.run_once() is not None
+    # Nothing changed: no new copy
+    assert await scheduler.run_once() is None
+
+    for _ in range(2):
+        make_database(db_path, 1)
+        assert await scheduler.run_once() is not None
+
+    backups = scheduler.backups()
+    assert len(backups) == 2
+    with gzip.open(backups[-1], "rb") as packed:
+        restored = directory / "latest.db"
+        restored.write_bytes(packed.read())
+    assert count_rows(restored) == 12
+
+
+def test_failed_backup_leaves_no_partial_file(monkeypatch, tmp_path):
+    db_path = tmp_path / "source.db"
+    make_database(db_path, 10)
+    scheduler = BackupScheduler(f"sqlite:///{db_path}", str(tmp_path / "backups"), interval=3600, keep=2)
+
+    def disk_full(source, target, length=0):
+        target.write(source.read(100))
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(exporter.shutil, "copyfileobj", disk_full)
+    with pytest.raises(OSError):
+        asyncio.run(scheduler.run_once())
+    assert list((tmp_path / "backups").iterdir()) == []
+    assert scheduler.backups() == []
+
+
+def test_database_backup_is_consistent_copy():
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run_backup_scenario(Path(directory)))
+
+
+def test_scheduled_backups_skip_unchanged_and_keep_newest():
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run_retention_scenario(Path(directory)))
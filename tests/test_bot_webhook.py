@@ -0,0 +1,105 @@
+"""
+Tests for the webhook transport of the bots
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from httpx import AsyncClient
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import settings
+from bots.webhook import SECRET_TOKEN_HEADER, WebhookUpdateConsumer, build_secret_token, webhook_mode_enabled
+from webapp.server import create_app
+
+TEST_TOKEN = "123456:ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghi"
+
+MESSAGE_UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 10,
+        "date": 0,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Test"},
+        "text": "hello"
+    }
+}
+
+
+async def run_webhook_scenario():
+    received = []
+    handled = asyncio.Event()
+    router = Router()
+
+    @router.message()
+    async def on_message(message: Message):
+        received.append(message.text)
+        handled.set()
+
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    bot = Bot(token=TEST_TOKEN)
+    consumer = WebhookUpdateConsumer("user", bot, dispatcher)
+
+    registered = {}
+
+    async def fake_set_webhook(**kwargs):
+        registered.update(kwargs)
+        return True
+
+    bot.set_webhook = fake_set_webhook
+    app = create_app(bot_webhooks=[consumer])
+
+    try:
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            # Updates arriving before start are refused so Telegram retries them
+            early = await client.post(
+                consumer.path, json=MESSAGE_UPDATE, headers={SECRET_TOKEN_HEADER: consumer.secret_token}
+            )
+            assert early.status_code == 503
+
+            await consumer.start()
+            assert registered["secret_token"] == consumer.secret_token
+            assert registered["url"].endswith(consumer.path)
+            assert "message" in registered["allowed_updates"]
+
+            forged = await client.post(consumer.path, json=MESSAGE_UPDATE, headers={SECRET_TOKEN_HEADER: "wrong"})
+            assert forged.status_code == 401
+
+            response = await client.post(
+                consumer.path, json=MESSAGE_UPDATE, headers={SECRET_TOKEN_HEADER: consumer.secret_token}
+            )
+            assert response.status_code == 200
+
+            await asyncio.wait_for(handled.wait(), timeout=5)
+            assert received == ["hello"]
+
+        await consumer.stop()
+        assert consumer.pending == 0
+    finally:
+        await bot.session.close()
+
+
+def test_secret_token_is_stable_and_per_bot():
+    first = build_secret_token(TEST_TOKEN)
+    assert first == build_secret_token(TEST_TOKEN)
+    assert first != build_secret_token("654321:ZYX")
+
+
+def test_webhook_mode_falls_back_to_polling_without_https(monkeypatch):
+    monkeypatch.setattr(settings, "bot_update_mode", "webhook")
+    monkeypatch.setattr(settings, "bot_webhook_base_url", "http://localhost:8000")
+    assert webhook_mode_enabled() is False
+
+    monkeypatch.setattr(settings, "bot_webhook_base_url", "https://bot.example.com")
+    assert webhook_mode_enabled() is True
+
+
+def test_webhook_acknowledges_and_processes_update():
+    asyncio.run(run_webhook_scenario())
@@ -0,0 +1,110 @@
+"""
+Tests for the scheduled message deletion service
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from database import init_db
+from utils.deletion_scheduler import DeletionScheduler
+
+
+class FakeBot:
+    def __init__(self, bot_id: int):
+        self.id = bot_id
+        self.calls = []
+
+    async def delete_message(self, chat_id, message_id):
+        self.calls.append((chat_id, [message_id]))
+        return True
+
+    async def delete_messages(self, chat_id, message_ids):
+        self.calls.append((chat_id, list(message_ids)))
+        return True
+
+
+async def run_batching_scenario():
+    bot = FakeBot(1)
+    scheduler = DeletionScheduler(tick=1.0, max_calls_per_second=2, persist=False)
+    scheduler.start = lambda: None
+
+    for message_id in (10, 11, 12):
+        scheduler.schedule(bot, 100, message_id, 5)
+    scheduler.schedule(bot, 200, 20, 5)
+    scheduler.schedule(bot, 300, 30, 5)
+    scheduler.schedule(bot, 400, 40, 60)
+
+    now = time.time()
+    assert await scheduler.process_due(now) == 0
+
+    # One call per chat, capped at two calls per tick
+    assert await scheduler.process_due(now + 10) == 2
+    assert bot.calls == [(100, [10, 11, 12]), (200, [20])]
+
+    assert await scheduler.process_due(now + 10) == 1
+    assert bot.calls[-1] == (300, [30])
+    assert scheduler.pending == 1
+
+
+async def run_persistence_scenario():
+    await init_db()
+    bot = FakeBot(7)
+
+    first = DeletionScheduler(persist=True)
+    first.start = lambda: None
+    first.schedule(bot, 500, 1, 60)
+    first.schedule(bot, 500, 2, 60)
+    await first.stop()
+
+    # A new process picks the deletions up from the database
+    second = DeletionScheduler(persist=True)
+    second._bots[bot.id] = bot
+    await second._load()
+    assert second.pending == 2
+
+    await second.process_due(time.time() + 120)
+    assert bot.calls == [(500, [1, 2])]
+
+    third = DeletionScheduler(persist=True)
+    await third._load()
+    assert third.pending == 0
+
+
+async def run_producer_consumer_scenario():
+    await init_db()
+    bot = FakeBot(8)
+
+    # A web process only writes the deletion to the table
+    producer = DeletionScheduler(role="producer")
+    producer.start = lambda: None
+    producer.schedule(bot, 600, 1, 5)
+    assert producer.pending == 0
+    assert await producer.process_due() == 0
+
+    # The consumer process picks it up once it is due
+    consumer = DeletionScheduler(role="consumer")
+    consumer._bots[bot.id] = bot
+    assert await consumer.process_due(time.time()) == 0
+    assert await consumer.process_due(time.time() + 10) == 1
+    assert bot.calls == [(600, [1])]
+
+    assert await consumer.process_due(time.time() + 10) == 0
+    assert bot.calls == [(600, [1])]
+
+
+def test_due_deletions_are_batched_per_chat_within_rate():
+    asyncio.run(run_batching_scenario())
+
+
+def test_pending_deletions_survive_restart():
+    asyncio.run(run_persistence_scenario())
+
+
+def test_producer_deletions_are_run_by_consumer():
+    asyncio.run(run_producer_consumer_scenario())
@@ -0,0 +1,169 @@
+"""
+Tests for background export jobs and the export artifact cache
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from aiogram.types import FSInputFile
+from sqlalchemy import delete, select
+
+from bot_registry import BotRegistry
+from database import AsyncSessionLocal, init_db
+from models import AppState, ButtonClick, ExportCursor, User
+from utils.export_jobs import SOURCE_VERSION_PREFIX, data_watermark, export_cache, run_backup_job, run_export_job
+
+
+class FakeBot:
+    def __init__(self):
+        self.documents = []
+        self.edits = []
+
+    async def send_document(self, chat_id, document, caption=None):
+        self.documents.append(document)
+        return SimpleNamespace(document=SimpleNamespace(file_id=f"file-{len(self.documents)}"))
+
+    async def edit_message_text(self, text, chat_id, message_id, reply_markup=None):
+        self.edits.append(text)
+
+
+async def run_export_job_scenario():
+    await init_db()
+    bot = FakeBot()
+    previous = BotRegistry.get_admin_bot()
+    BotRegistry.set_admin_bot(bot)
+    export_cache.clear()
+    try:
+        await run_export_job("job1", "users_csv", {}, 1, 10)
+        assert isinstance(bot.documents[0], FSInputFile)
+        assert bot.edits[-1] == "✅ Файл отправлен!"
+
+        # Unchanged data: the uploaded file is sent again by file_id
+        await run_export_job("job2", "users_csv", {}, 1, 10)
+        assert bot.documents[1] == "file-1"
+        assert bot.edits[-1] == "✅ Файл отправлен! (из кэша)"
+
+        # A new row changes the watermark
+        async with AsyncSessionLocal() as session:
+            session.add(User(telegram_id=9_420_001, username="export_job_user"))
+            await session.commit()
+        await run_export_job("job3", "users_csv", {}, 1, 10)
+        assert isinstance(bot.documents[2], FSInputFile)
+        assert len(export_cache) == 2
+    finally:
+        export_cache.clear()
+        BotRegistry.set_admin_bot(previous)
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(User).where(User.telegram_id == 9_420_001))
+            await session.commit()
+
+
+def test_export_jobs_reuse_cached_artifacts():
+    asyncio.run(run_export_job_scenario())
+
+
+async def get_source_version(source: str):
+    async with AsyncSessionLocal() as session:
+        state = await session.get(AppState, f"{SOURCE_VERSION_PREFIX}{source}")
+        return state.value if state is not None else None
+
+
+async def run_source_version_scenario():
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        session.add(User(telegram_id=9_420_002, username="export_version_user"))
+        await session.commit()
+    try:
+        before = await get_source_version("users")
+
+        # Timestamp-only updates are covered by the watermark itself
+        async with AsyncSessionLocal() as session:
+            user = (await session.execute(select(User).where(User.telegram_id == 9_420_002))).scalar_one()
+            user.last_active = None
+            await session.commit()
+        assert await get_source_version("users") == before
+
+        # A ban is recorded in the database, where every process sees it
+        async with AsyncSessionLocal() as session:
+            watermark = await data_watermark(session, "users")
+            user = (await session.execute(select(User).where(User.telegram_id == 9_420_002))).scalar_one()
+            user.is_banned = True
+            await session.commit()
+        version = await get_source_version("users")
+        assert version is not None and version != before
+        async with AsyncSessionLocal() as session:
+            assert (await data_watermark(session, "users"))[-1] == version
+            assert await data_watermark(session, "users") != watermark
+    finally:
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(User).where(User.telegram_id == 9_420_002))
+            await session.commit()
+
+
+def test_untimestamped_updates_change_the_watermark():
+    asyncio.run(run_source_version_scenario())
+
+
+class FailingBot(FakeBot):
+    async def send_document(self, chat_id, document, caption=None):
+        self.documents.append(document)
+        raise RuntimeError("upload failed")
+
+
+async def run_backup_job_scenario():
+    await init_db()
+    previous = BotRegistry.get_admin_bot()
+    try:
+        for bot in (FakeBot(), FailingBot()):
+            BotRegistry.set_admin_bot(bot)
+            await run_backup_job("backup1", 1, 10)
+            [document] = bot.documents
+            # The temporary copy is removed whether or not the upload worked
+            assert not Path(document.path).exists()
+        assert bot.edits[-1].startswith("❌ Ошибка экспорта")
+    finally:
+        BotRegistry.set_admin_bot(previous)
+
+
+def test_backup_job_sends_and_removes_the_copy():
+    asyncio.run(run_backup_job_scenario())
+
+
+async def run_incremental_export_scenario():
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(ExportCursor).where(ExportCursor.name == "button_clicks"))
+        user = User(telegram_id=9_420_003, username="export_cursor_user")
+        session.add(user)
+        await session.flush()
+        session.add(ButtonClick(user_id=user.id, button_name="export-cursor-click"))
+        await session.commit()
+    previous = BotRegistry.get_admin_bot()
+    try:
+        # The upload failed: the same rows are exported again next time
+        BotRegistry.set_admin_bot(FailingBot())
+        await run_export_job("inc1", "analytics_button_clicks_new", {}, 1, 10)
+        async with AsyncSessionLocal() as session:
+            assert await session.get(ExportCursor, "button_clicks") is None
+
+        BotRegistry.set_admin_bot(FakeBot())
+        await run_export_job("inc2", "analytics_button_clicks_new", {}, 1, 10)
+        async with AsyncSessionLocal() as session:
+            assert await session.get(ExportCursor, "button_clicks") is not None
+    finally:
+        BotRegistry.set_admin_bot(previous)
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(ExportCursor).where(ExportCursor.name == "button_clicks"))
+            await session.execute(delete(ButtonClick).where(ButtonClick.button_name == "export-cursor-click"))
+            await session.execute(delete(User).where(User.telegram_id == 9_420_003))
+            await session.commit()
+
+
+def test_incremental_cursor_moves_only_after_delivery():
+    asyncio.run(run_incremental_export_scenario())
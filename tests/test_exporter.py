@@ -0,0 +1,158 @@
+"""
+Tests for the streaming export engine
+"""
+
+import asyncio
+import csv
+import gzip
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pytest
+from sqlalchemy import delete
+
+from config import settings
+from database import AsyncSessionLocal, init_db
+from models import Alert, AlertType, ButtonClick, ExportCursor, User
+from utils import exporter
+from utils.exporter import ExportService
+
+TELEGRAM_ID_BASE = 9_410_000
+
+
+async def seed(session, count: int):
+    await session.execute(delete(Alert).where(Alert.title.like("export-test-%")))
+    await session.execute(delete(User).where(User.telegram_id >= TELEGRAM_ID_BASE, User.telegram_id < TELEGRAM_ID_BASE + 1000))
+    users = [User(telegram_id=TELEGRAM_ID_BASE + i, username=f"exporter{i}", language="RU") for i in range(count)]
+    session.add_all(users)
+    await session.flush()
+    session.add_all([
+        Alert(alert_type=AlertType.LOST_ITEM, creator_id=users[i].id, title=f"export-test-{i}", description="x" * 150)
+        for i in range(count)
+    ])
+    await session.commit()
+
+
+async def run_streaming_scenario():
+    await init_db()
+    original = (settings.export_batch_size, settings.export_gzip_threshold)
+    settings.export_batch_size = 7
+    paths = []
+    try:
+        async with AsyncSessionLocal() as session:
+            await seed(session, 25)
+
+            path = await ExportService.export_users_csv(session, language="RU")
+            paths.append(path)
+            with open(path, encoding="utf-8", newline="") as f:
+                rows = list(csv.reader(f))
+            exported = [row for row in rows[1:] if row[2].startswith("exporter")]
+            assert rows[0][:3] == ["ID", "Telegram ID", "Username"]
+            assert len(exported) == 25
+
+            path = await ExportService.export_alerts_json(session)
+            paths.append(path)
+            with open(path, encoding="utf-8") as f:
+                alerts = [a for a in json.load(f) if (a["title"] or "").startswith("export-test-")]
+            assert len(alerts) == 25
+            assert alerts[0]["description"] == "x" * 150
+
+            path = await ExportService.export_alerts_txt(session)
+            paths.append(path)
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            assert text.count("Заголовок: export-test-") == 25
+            assert text.endswith("=== КОНЕЦ ЭКСПОРТА ===\n")
+
+            # Above the threshold the file is gzipped
+            settings.export_gzip_threshold = 100
+            path = await ExportService.export_users_csv(session)
+            paths.append(path)
+            assert path.endswith(".csv.gz")
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                assert f.readline().startswith("ID,Telegram ID")
+    finally:
+        settings.export_batch_size, settings.export_gzip_threshold = original
+        for path in paths:
+            ExportService.cleanup_export_file(path)
+
+
+def test_exports_are_streamed_in_batches():
+    asyncio.run(run_streaming_scenario())
+
+
+async def run_columnar_scenario(use_parquet: bool):
+    await init_db()
+    paths = []
+    async with AsyncSessionLocal() as session:
+        await seed(session, 3)
+        await session.execute(delete(ButtonClick))
+        await session.execute(delete(ExportCursor).where(ExportCursor.name == "button_clicks"))
+        user = (await session.execute(User.__table__.select().where(User.telegram_id == TELEGRAM_ID_BASE))).first()
+        session.add_all([ButtonClick(user_id=user.id, button_name=f"btn{i}", category="menu") for i in range(5)])
+        await session.commit()
+
+        def read(path):
+            if use_parquet:
+                import pyarrow.parquet as pq
+                return pq.read_table(path).to_pylist()
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                assert {"name": "created_at", "type": "timestamp"} in header["columns"]
+                return [json.loads(line) for line in f]
+
+        try:
+            path, position = await ExportService.export_table_columnar(session, "button_clicks")
+            paths.append(path)
+            assert path.endswith(".parquet" if use_parquet else ".jsonl.gz")
+            assert [row["button_name"] for row in read(path)] == [f"btn{i}" for i in range(5)]
+            # A full export leaves the incremental cursor alone
+            assert position is None
+
+            # Full descriptions and real booleans, unlike the CSV export
+            path, _ = await ExportService.export_table_columnar(session, "alerts")
+            paths.append(path)
+            alerts = [row for row in read(path) if (row["title"] or "").startswith("export-test-")]
+            assert alerts[0]["description"] == "x" * 150
+            assert alerts[0]["is_approved"] is False
+            assert alerts[0]["alert_type"] == "LOST_ITEM"
+
+            # Without a saved cursor every row is new, until the position is saved
+            path, position = await ExportService.export_table_columnar(session, "button_clicks", incremental=True)
+            paths.append(path)
+            assert len(read(path)) == 5
+            path, position = await ExportService.export_table_columnar(session, "button_clicks", incremental=True)
+            paths.append(path)
+            assert len(read(path)) == 5
+            await ExportService.save_export_cursor(session, position)
+
+            # Incremental: only rows added after the saved position
+            session.add(ButtonClick(user_id=user.id, button_name="btn-new"))
+            await session.commit()
+            path, position = await ExportService.export_table_columnar(session, "button_clicks", incremental=True)
+            paths.append(path)
+            assert [row["button_name"] for row in read(path)] == ["btn-new"]
+            await ExportService.save_export_cursor(session, position)
+
+            path, position = await ExportService.export_table_columnar(session, "button_clicks", incremental=True)
+            paths.append(path)
+            assert read(path) == []
+            assert position is None
+        finally:
+            for path in paths:
+                ExportService.cleanup_export_file(path)
+
+
+def test_columnar_export_fallback_is_typed_and_incremental(monkeypatch):
+    monkeypatch.setattr(exporter, "pq", None)
+    asyncio.run(run_columnar_scenario(use_parquet=False))
+
+
+def test_columnar_export_writes_parquet():
+    pytest.importorskip("pyarrow")
+    asyncio.run(run_columnar_scenario(use_parquet=True))
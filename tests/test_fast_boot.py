@@ -0,0 +1,56 @@
+"""
+Tests for fast boot and the startup profile
+"""
+
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from database import init_db
+from utils.fast_boot import boot_marker, prepare_database, read_boot_marker
+from utils.startup_profile import import_report, parse_importtime
+
+
+async def run_fast_boot_scenario():
+    await init_db()
+    seeds = []
+
+    async def seed():
+        seeds.append(1)
+
+    # A seed version no earlier boot has used
+    version = uuid.uuid4().int % 10**9
+
+    assert await prepare_database(seed, version, fast=True) is False
+    assert await read_boot_marker() == boot_marker(version)
+    assert await prepare_database(seed, version, fast=True) is True
+    assert len(seeds) == 1
+
+    # Without fast boot, and after a seed change, everything runs again
+    assert await prepare_database(seed, version, fast=False) is False
+    assert await prepare_database(seed, version + 1, fast=True) is False
+    assert len(seeds) == 3
+
+
+def test_fast_boot_skips_matching_marker():
+    asyncio.run(run_fast_boot_scenario())
+
+
+def test_import_report():
+    records = parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |     aiogram.types\n"
+        "import time:        50 |        150 |   aiogram\n"
+        "import time:        30 |        180 | main\n"
+    )
+
+    assert [record.module for record in records] == ["aiogram.types", "aiogram", "main"]
+    packages, modules = import_report(records, top=2).split("Модули")
+    assert "модулей: 3" in packages
+    assert packages.splitlines()[3].split()[-1] == "aiogram"
+    assert [line.split()[-1] for line in modules.strip().splitlines()[1:]] == ["aiogram.types", "aiogram"]
@@ -0,0 +1,119 @@
+"""
+Tests for the persistent FSM storage
+"""
+
+import asyncio
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import event, update
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from bots.fsm_storage import SQLStorage
+from database import AsyncSessionLocal, engine, init_db
+from models import FSMRecord
+
+
+class WizardStates(StatesGroup):
+    waiting_description = State()
+
+
+def make_key() -> StorageKey:
+    user_id = uuid.uuid4().int % 10**9
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+async def run_persistence_scenario():
+    await init_db()
+    key = make_key()
+
+    storage = SQLStorage(flush_delay=0.05)
+    writes = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO FSM_STORAGE"):
+            writes.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        await storage.set_state(key, WizardStates.waiting_description)
+        await storage.update_data(key, {"what": "bag"})
+        await storage.update_data(key, {"description": "black"})
+        await asyncio.sleep(0.2)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    # Three changes in quick succession are written once
+    assert len(writes) == 1
+    await storage.close()
+
+    # A new storage (restart / another worker) sees the same conversation
+    restarted = SQLStorage(cache_ttl=0)
+    assert await restarted.get_state(key) == WizardStates.waiting_description.state
+    assert await restarted.get_data(key) == {"what": "bag", "description": "black"}
+
+    # Clearing state and data removes the row
+    await restarted.set_state(key, None)
+    await restarted.set_data(key, {})
+    await restarted.close()
+
+    async with AsyncSessionLocal() as session:
+        assert await session.get(FSMRecord, SQLStorage._build_key(key)) is None
+
+
+async def run_expiry_scenario():
+    await init_db()
+    key = make_key()
+
+    storage = SQLStorage(state_ttl=60, cache_ttl=0)
+    await storage.set_state(key, WizardStates.waiting_description)
+    await storage.close()
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(FSMRecord)
+            .where(FSMRecord.key == SQLStorage._build_key(key))
+            .values(updated_at=datetime.utcnow() - timedelta(hours=1))
+        )
+        await session.commit()
+
+    assert await storage.evict_expired() >= 1
+    assert await storage.get_state(key) is None
+
+
+async def run_non_json_scenario():
+    await init_db()
+    bad_key, good_key = make_key(), make_key()
+
+    storage = SQLStorage(flush_delay=0.05)
+    await storage.update_data(bad_key, {"when": datetime.utcnow()})
+    await storage.set_state(good_key, WizardStates.waiting_description)
+    await asyncio.sleep(0.2)
+    # The record that cannot be stored does not hold back the others
+    assert not storage._dirty
+    await storage.close()
+
+    restarted = SQLStorage(cache_ttl=0)
+    assert await restarted.get_state(good_key) == WizardStates.waiting_description.state
+    assert await restarted.get_data(bad_key) == {}
+    await restarted.set_state(good_key, None)
+    await restarted.close()
+
+
+def test_fsm_state_is_persisted_with_coalesced_writes():
+    asyncio.run(run_persistence_scenario())
+
+
+def test_abandoned_fsm_state_is_evicted():
+    asyncio.run(run_expiry_scenario())
+
+
+def test_non_json_fsm_data_does_not_block_other_records():
+    asyncio.run(run_non_json_scenario())
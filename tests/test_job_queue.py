@@ -0,0 +1,225 @@
+"""
+Tests for the database-backed background job queue
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+
+from config import settings
+from database import AsyncSessionLocal, init_db
+from models import BackgroundJob
+from utils.job_queue import (
+    JOB_CLAIMED,
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JobWorker,
+    _registry,
+    background_job,
+    claim_jobs,
+    enqueue_job,
+    requeue_stale_jobs,
+)
+from utils.task_supervisor import TaskGroup, TaskSupervisor, supervisor
+
+CALLS = []
+
+
+@background_job
+async def record_call(value, suffix=""):
+    CALLS.append(f"{value}{suffix}")
+
+
+@background_job
+async def fail_job():
+    raise RuntimeError("boom")
+
+
+@background_job
+async def slow_job(release):
+    await release.wait()
+
+
+async def clear_group(group: str) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(BackgroundJob).where(BackgroundJob.group == group))
+        await session.commit()
+
+
+async def get_job(job_id: int) -> BackgroundJob:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(BackgroundJob).where(BackgroundJob.id == job_id))
+        return result.scalar_one()
+
+
+async def run_queue_scenario():
+    await init_db()
+    CALLS.clear()
+    group = "test-queue"
+    await clear_group(group)
+
+    ok_id = await enqueue_job(group, record_call, ("a",), {"suffix": "!"})
+    failed_id = await enqueue_job(group, fail_job)
+
+    # A job is handed to exactly one worker
+    claimed = await claim_jobs("w1", [group], 10)
+    assert [job.id for job in claimed] == [ok_id, failed_id]
+    assert [job.status for job in claimed] == [JOB_CLAIMED, JOB_CLAIMED]
+    assert await claim_jobs("w2", [group], 10) == []
+
+    # Only the holder of a claim can start the job
+    assert await JobWorker("w2", groups=[group])._execute(ok_id, claimed[0].func, claimed[0].payload) is None
+    assert (await get_job(ok_id)).status == JOB_CLAIMED
+
+    worker = JobWorker("w1", groups=[group])
+    for job in claimed:
+        await worker._execute(job.id, job.func, job.payload)
+
+    assert CALLS == ["a!"]
+    assert (await get_job(ok_id)).status == JOB_DONE
+    failed = await get_job(failed_id)
+    assert failed.status == JOB_FAILED
+    assert "boom" in failed.error
+    assert failed.attempts == 1
+    await clear_group(group)
+
+
+async def run_offload_scenario():
+    await init_db()
+    CALLS.clear()
+    group = "test-offload"
+    await clear_group(group)
+    producer = TaskSupervisor()
+
+    original = (settings.background_jobs_mode, settings.background_job_groups)
+    settings.background_jobs_mode = "queue"
+    settings.background_job_groups = group
+    try:
+        await producer.spawn(group, record_call, "b")
+        await producer.spawn("other", record_call, "local")
+    finally:
+        settings.background_jobs_mode, settings.background_job_groups = original
+
+    # Only the configured group goes to the queue
+    assert CALLS == ["local"]
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(BackgroundJob).where(BackgroundJob.group == group))
+        jobs = result.scalars().all()
+    assert [job.status for job in jobs] == [JOB_QUEUED]
+
+    worker = JobWorker("w3", groups=[group])
+    assert await worker.run_once() == 1
+    await asyncio.gather(*supervisor.group(group).tasks)
+    assert CALLS == ["local", "b"]
+    await clear_group(group)
+
+
+async def run_group_limit_scenario():
+    await init_db()
+    group = "test-limit"
+    await clear_group(group)
+    supervisor._groups[group] = TaskGroup(group, 1)
+    release = asyncio.Event()
+
+    job_ids = [await enqueue_job(group, record_call, (index,)) for index in range(3)]
+    worker = JobWorker("w4", groups=[group])
+    worker_call = worker._run_job
+
+    async def run_job(job_id, name, payload):
+        await release.wait()
+        await worker_call(job_id, name, payload)
+
+    worker._run_job = run_job
+    # A worker takes no more jobs of a group than it has slots for
+    assert await worker.run_once() == 1
+    assert await worker.run_once() == 0
+    await asyncio.sleep(0.05)
+    assert (await get_job(job_ids[0])).status == JOB_RUNNING
+    assert [(await get_job(job_id)).status for job_id in job_ids[1:]] == [JOB_QUEUED, JOB_QUEUED]
+    assert await JobWorker("w5", groups=[group]).run_once() == 1
+
+    # A job that is still running keeps its heartbeat and is not taken over
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job_ids[0])
+            .values(started_at=datetime.utcnow() - timedelta(hours=1))
+        )
+        await session.commit()
+    assert await requeue_stale_jobs(600, 3) == 0
+
+    # A worker that stopped sending heartbeats loses its jobs
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job_ids[1])
+            .values(heartbeat_at=datetime.utcnow() - timedelta(hours=1))
+        )
+        await session.commit()
+    assert await requeue_stale_jobs(600, 3) == 1
+    assert (await get_job(job_ids[1])).status == JOB_QUEUED
+
+    release.set()
+    await asyncio.gather(*supervisor.group(group).tasks)
+    assert (await get_job(job_ids[0])).status == JOB_DONE
+    # The second worker lost the job before it got a slot and does not run it
+    assert (await get_job(job_ids[1])).status == JOB_QUEUED
+    await clear_group(group)
+
+
+async def run_cancel_scenario():
+    await init_db()
+    group = "test-cancel"
+    await clear_group(group)
+    job_id = await enqueue_job(group, record_call, ("c",))
+    [job] = await claim_jobs("w6", [group], 1)
+    worker = JobWorker("w6", groups=[group])
+    started = asyncio.Event()
+
+    async def hang(*args, **kwargs):
+        started.set()
+        await asyncio.Event().wait()
+
+    _registry[job.func] = hang
+    try:
+        task = asyncio.create_task(worker._execute(job.id, job.func, job.payload))
+        await started.wait()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    finally:
+        _registry[job.func] = record_call
+
+    # A job interrupted by shutdown goes back to the queue instead of "done"
+    cancelled = await get_job(job_id)
+    assert cancelled.status == JOB_QUEUED
+    assert cancelled.worker_id is None
+    await clear_group(group)
+
+
+def test_jobs_are_claimed_once_and_finished():
+    asyncio.run(run_queue_scenario())
+
+
+def test_supervisor_offloads_configured_groups():
+    asyncio.run(run_offload_scenario())
+
+
+def test_worker_claims_only_free_slots_and_heartbeats():
+    asyncio.run(run_group_limit_scenario())
+
+
+def test_cancelled_job_is_requeued():
+    asyncio.run(run_cancel_scenario())
@@ -0,0 +1,74 @@
+"""
+Tests for the precompiled locale catalog and the keyboard cache
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from database import AsyncSessionLocal, init_db
+from locales import LOCALES, t
+from services.main_menu_service import MainMenuService
+from utils.keyboard_builder import KeyboardBuilder
+from utils.keyboard_cache import KeyboardCache, keyboard_cache
+
+
+def test_catalog_matches_raw_locales():
+    for lang, strings in LOCALES.items():
+        for key, text in strings.items():
+            assert t(key, lang) == text
+            assert t(key, lang.lower()) == text
+
+    assert t("main_menu", None) == LOCALES["RU"]["main_menu"]
+    assert t("main_menu", "EN") == LOCALES["RU"]["main_menu"]
+    assert t("no_such_key", "UZ") == "no_such_key"
+    assert t("document_content", "RU", title="Паспорт") == "📋 Паспорт"
+    # Broken format arguments fall back to the template
+    assert t("document_content", "RU", other=1) == LOCALES["RU"]["document_content"]
+
+
+def test_static_keyboard_is_built_once_per_language():
+    first = KeyboardBuilder.main_menu_keyboard("RU")
+    assert KeyboardBuilder.main_menu_keyboard("RU") is first
+    assert KeyboardBuilder.main_menu_keyboard("UZ") is not first
+
+
+async def run_invalidation_scenario():
+    await init_db()
+    builds = []
+
+    async def build():
+        builds.append(1)
+        return object()
+
+    first = await keyboard_cache.get_or_build("test_menu", "RU", build)
+    assert await keyboard_cache.get_or_build("test_menu", "RU", build) is first
+    assert len(builds) == 1
+
+    async with AsyncSessionLocal() as session:
+        await MainMenuService.create_button(session, "Тест", "Test", "menu_cache_test", icon="🧪")
+
+    assert await keyboard_cache.get_or_build("test_menu", "RU", build) is not first
+    assert len(builds) == 2
+
+
+def test_menu_changes_invalidate_cached_keyboards():
+    asyncio.run(run_invalidation_scenario())
+
+
+def test_build_started_before_invalidation_is_not_cached():
+    cache = KeyboardCache()
+
+    async def scenario():
+        async def slow_build():
+            cache.invalidate()
+            return object()
+
+        await cache.get_or_build("menu", "RU", slow_build)
+        assert cache.get("menu", "RU") is None
+
+    asyncio.run(scenario())
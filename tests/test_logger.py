@@ -0,0 +1,83 @@
+"""
+Tests for the queued logging pipeline
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import settings
+from utils.logger import JsonFormatter, SamplingFilter, _LogQueueHandler, log_file_path, logger, parse_sample_rates
+
+
+def make_record(level=logging.INFO, module="main_menu_service", func="get_button_by_callback"):
+    return logging.LogRecord("bot", level, f"{module}.py", 1, "Кнопка %s", ("menu",), None, func)
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates("") == {}
+    assert parse_sample_rates("auth:0.5, statistics_service.track_button_click:2") == {
+        "auth": 0.5,
+        "statistics_service.track_button_click": 1.0
+    }
+
+
+def test_sampling_filter(monkeypatch):
+    sampler = SamplingFilter({"main_menu_service": 0.0, "main_menu_service.get_button_by_callback": 1.0})
+    assert sampler.filter(make_record()) is True
+    assert sampler.filter(make_record(func="_load_active_buttons")) is False
+    assert sampler.filter(make_record(level=logging.WARNING, func="_load_active_buttons")) is True
+    assert sampler.filter(make_record(module="auth")) is True
+
+    monkeypatch.setattr("utils.logger.random.random", lambda: 0.3)
+    sampler = SamplingFilter({"auth": 0.25})
+    assert sampler.filter(make_record(module="auth")) is False
+    record = make_record(module="auth")
+    sampler.rates["auth"] = 0.5
+    assert sampler.filter(record) is True
+    assert record.sample_rate == 0.5
+
+
+def test_queue_handler_keeps_exception_for_json():
+    log_queue = queue.SimpleQueue()
+    handler = _LogQueueHandler(log_queue)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("bot", logging.ERROR, "x.py", 1, "Ошибка %d", (42,), sys.exc_info(), "run")
+    handler.emit(record)
+
+    queued = log_queue.get_nowait()
+    assert queued is not record
+    assert queued.getMessage() == "Ошибка 42"
+    entry = json.loads(JsonFormatter().format(queued))
+    assert entry["message"] == "Ошибка 42"
+    assert entry["function"] == "run"
+    assert "ValueError: boom" in entry["exception"]
+
+
+def test_bot_logger_only_enqueues():
+    assert [type(handler) for handler in logger.handlers] == [_LogQueueHandler]
+
+
+def test_cluster_processes_get_their_own_log_file(monkeypatch):
+    monkeypatch.setattr(settings, "log_file", "logs/bot.log")
+    monkeypatch.setattr(settings, "log_process_name", "")
+    assert log_file_path() == "logs/bot.log"
+
+    monkeypatch.setattr(settings, "log_process_name", "jobs-0")
+    monkeypatch.setenv("LOG_PROCESS_PID", str(os.getpid()))
+    assert log_file_path() == str(Path("logs/bot.jobs-0.log"))
+
+    # A uvicorn worker started by the web process
+    monkeypatch.setattr(settings, "log_process_name", "web")
+    monkeypatch.setenv("LOG_PROCESS_PID", "1")
+    assert log_file_path() == str(Path(f"logs/bot.web-{os.getpid()}.log"))
@@ -0,0 +1,79 @@
+"""
+Tests for the versioned main-menu cache
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from sqlalchemy import event
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from database import AsyncSessionLocal, engine, init_db
+from services.dynamic_menu_service import DynamicMenuService, MenuFilterService
+from services.main_menu_service import MainMenuService
+from services.menu_service import MenuService
+from utils.menu_cache import menu_cache
+
+
+async def run_menu_cache_scenario():
+    await init_db()
+    menu_cache.invalidate("test start")
+
+    async with AsyncSessionLocal() as session:
+        button = await MainMenuService.create_button(session, "Кэш", "Kesh", "menu_cache_button", icon="🧪")
+        menu = await DynamicMenuService.create_menu(session, "КЭШ", "KESH", "🧪")
+        await MenuService.create_menu_item(session, "Пункт", "Band")
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with AsyncSessionLocal() as session:
+        buttons = await MainMenuService.get_active_buttons(session)
+        menus = await DynamicMenuService.get_all_menus(session)
+        items = await MenuService.get_all_menu_items(session)
+    assert button.id in {b.id for b in buttons}
+    assert menu.id in {m.id for m in menus}
+    assert items
+
+    # Repeated user renders are served without touching the database
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async with AsyncSessionLocal() as session:
+            assert await MainMenuService.get_active_buttons(session) is buttons
+            assert await DynamicMenuService.get_all_menus(session) is menus
+            assert await MenuService.get_all_menu_items(session) is items
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+    assert statements == []
+
+    # Admin mutations drop the cache; the admin view never uses it
+    version = menu_cache.version
+    async with AsyncSessionLocal() as session:
+        await MainMenuService.toggle_button(session, button.id)
+        await DynamicMenuService.toggle_menu(session, menu.id)
+        assert menu.id in {m.id for m in await DynamicMenuService.get_all_menus(session, active_only=False)}
+    assert menu_cache.version > version
+
+    async with AsyncSessionLocal() as session:
+        assert button.id not in {b.id for b in await MainMenuService.get_active_buttons(session)}
+        assert menu.id not in {m.id for m in await DynamicMenuService.get_all_menus(session)}
+
+    version = menu_cache.version
+    async with AsyncSessionLocal() as session:
+        await DynamicMenuService.toggle_menu(session, menu.id)
+        await MenuFilterService.create_filter(session, menu.id, "Фильтр", "Filtr")
+    assert menu_cache.version > version
+
+    async with AsyncSessionLocal() as session:
+        cached = next(m for m in await DynamicMenuService.get_all_menus(session) if m.id == menu.id)
+    assert [f.name_ru for f in cached.filters] == ["Фильтр"]
+
+
+def test_menu_cache_serves_renders_and_follows_mutations():
+    asyncio.run(run_menu_cache_scenario())
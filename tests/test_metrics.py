@@ -0,0 +1,137 @@
+"""
+Tests for the instrumentation: Prometheus rendering, handler and query
+timing and the /webapp/metrics endpoint
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Update
+from httpx import AsyncClient
+from sqlalchemy import select, text
+from sqlalchemy.dialects import sqlite
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from bots.handler_timing import BOT_HANDLER_DURATION, install_handler_timing
+from config import settings
+from database import AsyncSessionLocal, init_db
+from models import User
+from utils.db_metrics import DB_QUERY_DURATION, statement_template
+from utils.metrics import MetricsRegistry
+from webapp.server import create_app
+
+TEST_TOKEN = "123456:ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghi"
+
+
+def make_message_update(update_id: int, text_value: str) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 42, "type": "private"},
+            "from": {"id": 42, "is_bot": False, "first_name": "Test"},
+            "text": text_value
+        }
+    })
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    family = registry.histogram("demo_seconds", "Demo latency", ("route",), buckets=(0.1, 1.0))
+    family.observe(('say "hi"',), 0.05)
+    family.observe(('say "hi"',), 3.0)
+    registry.gauge("demo_queue_depth", "Queued items", lambda: 7)
+    registry.gauge("demo_broken", "Not ready", lambda: 1 / 0)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE demo_seconds histogram" in lines
+    assert 'demo_seconds_bucket{route="say \\"hi\\"",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="say \\"hi\\"",le="+Inf"} 2' in lines
+    assert 'demo_seconds_sum{route="say \\"hi\\""} 3.05' in lines
+    assert 'demo_seconds_count{route="say \\"hi\\""} 2' in lines
+    assert "demo_queue_depth 7" in lines
+    assert not any(line.startswith("demo_broken") for line in lines)
+
+
+def test_statement_template_collapses_placeholders():
+    assert statement_template("SELECT id\n  FROM users WHERE id IN (?, ?, ?)") == "SELECT … FROM users WHERE id IN (...)"
+    assert statement_template("SELECT id FROM users WHERE id IN ($1, $2)") == "SELECT … FROM users WHERE id IN (...)"
+    assert statement_template("SELECT a FROM t WHERE b IN (SELECT c, d FROM u)") == "SELECT … FROM t WHERE b IN (SELECT … FROM u)"
+    assert statement_template("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)") == "INSERT INTO t (a, b) VALUES (...)"
+
+
+def test_orm_queries_on_one_entity_get_distinct_templates():
+    def template(query):
+        return statement_template(str(query.compile(dialect=sqlite.dialect())))
+
+    by_telegram_id = template(select(User).where(User.telegram_id == 1))
+    by_id = template(select(User).where(User.id == 1))
+    banned = template(select(User).where(User.is_banned.is_(True)).order_by(User.created_at))
+
+    assert len({by_telegram_id, by_id, banned}) == 3
+    assert by_id == "SELECT … FROM users WHERE users.id = ?"
+
+
+async def run_handler_timing_scenario():
+    BOT_HANDLER_DURATION.clear()
+    dp = Dispatcher()
+    install_handler_timing(dp, "user")
+    router = Router(name="menu")
+
+    @router.message()
+    async def show_menu(message):
+        return "shown"
+
+    dp.include_router(router)
+    bot = Bot(token=TEST_TOKEN)
+    try:
+        await dp.feed_update(bot, make_message_update(1, "menu"))
+    finally:
+        await bot.session.close()
+
+    histograms = dict(BOT_HANDLER_DURATION.items())
+    histogram = histograms[("user", "menu", "run_handler_timing_scenario.<locals>.show_menu", "ok")]
+    assert histogram.count == 1
+
+
+def test_handler_timing_middleware():
+    asyncio.run(run_handler_timing_scenario())
+
+
+async def run_endpoint_scenario():
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        await session.execute(text("SELECT 1"))
+
+    templates = {labels[0] for labels, _ in DB_QUERY_DURATION.items()}
+    assert "SELECT 1" in templates
+
+    app = create_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        # Without a configured token the endpoint is not served at all
+        settings.metrics_token = ""
+        hidden = await client.get("/webapp/metrics")
+        assert hidden.status_code == 404
+
+        settings.metrics_token = "secret"
+        denied = await client.get("/webapp/metrics")
+        assert denied.status_code == 401
+
+        response = await client.get("/webapp/metrics", headers={"Authorization": "Bearer secret"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'db_query_duration_seconds_count{statement="SELECT 1"}' in response.text
+        assert "# TYPE broadcast_queue_depth gauge" in response.text
+
+
+def test_metrics_endpoint(monkeypatch):
+    import utils.task_supervisor  # noqa: F401 - registers the broadcast queue gauge
+
+    monkeypatch.setattr(settings, "metrics_token", "secret")
+    asyncio.run(run_endpoint_scenario())
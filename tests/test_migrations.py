@@ -0,0 +1,130 @@
+"""
+Tests for the schema migration runner
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pytest
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import inspect
+
+from config import settings
+from database import Base
+from utils.migrations import (
+    SchemaRevisionError, backfill_in_batches, create_index_online, current_revision,
+    head_revision, migrate_database, run_command, run_with_connection
+)
+
+
+def table_names(connection):
+    return set(inspect(connection).get_table_names())
+
+
+async def run_upgrade_scenario():
+    assert await migrate_database() == "created"
+    assert await run_with_connection(current_revision) == head_revision()
+    assert "app_state" in await run_with_connection(table_names)
+    assert await migrate_database() == "current"
+
+    # A database one revision behind
+    await run_with_connection(lambda connection: run_command(connection, "downgrade", "d6f3b8e90044"))
+    assert "app_state" not in await run_with_connection(table_names)
+
+    with pytest.raises(SchemaRevisionError):
+        await migrate_database(auto_upgrade=False)
+    assert await migrate_database() == "upgraded"
+    assert await run_with_connection(current_revision) == head_revision()
+    assert "app_state" in await run_with_connection(table_names)
+
+
+def test_new_and_outdated_database(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "database_url", f"sqlite+aiosqlite:///{tmp_path / 'migrations.db'}")
+    asyncio.run(run_upgrade_scenario())
+
+
+async def run_legacy_scenario():
+    # Tables from the old create_all boot, one of them missing a column
+    await run_with_connection(lambda connection: connection.exec_driver_sql("CREATE TABLE app_state (key VARCHAR(100) PRIMARY KEY)"))
+    with pytest.raises(SchemaRevisionError, match="app_state"):
+        await migrate_database()
+    assert await run_with_connection(current_revision) is None
+
+    # Only some tables: the rest are created and the pending revisions applied
+    await run_with_connection(lambda connection: connection.exec_driver_sql("DROP TABLE app_state"))
+    await run_with_connection(Base.metadata.tables["users"].create)
+    assert await migrate_database() == "upgraded"
+    assert await run_with_connection(current_revision) == head_revision()
+    assert "app_state" in await run_with_connection(table_names)
+
+
+def test_legacy_database_is_stamped(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "database_url", f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+    asyncio.run(run_legacy_scenario())
+
+
+def create_baseline_schema(connection):
+    """The schema the create_all boot left at the baseline revision"""
+    later_tables = {"fsm_storage", "scheduled_deletions", "background_jobs", "export_cursors", "app_state"}
+    Base.metadata.create_all(
+        connection, tables=[table for table in Base.metadata.sorted_tables if table.name not in later_tables]
+    )
+    connection.exec_driver_sql("ALTER TABLE webapp_files DROP COLUMN variants")
+    connection.exec_driver_sql("ALTER TABLE webapp_categories DROP COLUMN version")
+
+
+def column_names(connection, table):
+    return {column["name"] for column in inspect(connection).get_columns(table)}
+
+
+async def run_baseline_scenario():
+    await run_with_connection(create_baseline_schema)
+    with pytest.raises(SchemaRevisionError):
+        await migrate_database(auto_upgrade=False)
+
+    assert await migrate_database() == "upgraded"
+    assert await run_with_connection(current_revision) == head_revision()
+    assert "variants" in await run_with_connection(lambda connection: column_names(connection, "webapp_files"))
+    assert "heartbeat_at" in await run_with_connection(lambda connection: column_names(connection, "background_jobs"))
+
+    # A complete create_all schema is stamped with the head revision
+    await run_with_connection(lambda connection: connection.exec_driver_sql("DROP TABLE alembic_version"))
+    assert await migrate_database() == "stamped"
+    assert await run_with_connection(current_revision) == head_revision()
+
+
+def test_baseline_database_is_upgraded(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "database_url", f"sqlite+aiosqlite:///{tmp_path / 'baseline.db'}")
+    asyncio.run(run_baseline_scenario())
+
+
+def apply_online_operations(connection):
+    connection.exec_driver_sql("CREATE TABLE samples (id INTEGER PRIMARY KEY, a INTEGER, b INTEGER)")
+    for i in range(10):
+        connection.exec_driver_sql(f"INSERT INTO samples (id, a) VALUES ({i + 1}, {i})")
+    connection.commit()
+
+    context = MigrationContext.configure(connection, opts={"transaction_per_migration": True})
+    with Operations.context(context), context.begin_transaction(_per_migration=True):
+        create_index_online("ix_samples_a", "samples", ["a"])
+        create_index_online("ix_samples_a", "samples", ["a"])
+        updated = backfill_in_batches("samples", "b = a * :factor", "b IS NULL", {"factor": 2}, batch_size=3)
+
+    rows = connection.exec_driver_sql("SELECT a, b FROM samples").fetchall()
+    indexes = [index["name"] for index in inspect(connection).get_indexes("samples")]
+    return updated, rows, indexes
+
+
+def test_online_operations(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "database_url", f"sqlite+aiosqlite:///{tmp_path / 'online.db'}")
+    updated, rows, indexes = asyncio.run(run_with_connection(apply_online_operations))
+
+    assert updated == 10
+    assert all(b == a * 2 for a, b in rows)
+    assert indexes == ["ix_samples_a"]
@@ -0,0 +1,73 @@
+"""
+Tests for the bounded navigation state store
+"""
+
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from bots.navigation_state import NavigationStateStore, SQLNavigationBackend
+from database import init_db
+
+
+async def run_lru_scenario():
+    store = NavigationStateStore(max_entries=2, ttl=60)
+    await store.set(1, message_id=10, menu_id=1)
+    await store.set(2, message_id=20, menu_id=1)
+    assert (await store.get(1)).message_id == 10  # 1 becomes most recently used
+    await store.set(3, message_id=30, menu_id=2)
+
+    assert len(store) == 2
+    assert await store.get(2) is None
+    assert store.evictions == 1
+
+    assert await store.update(1, category_id=7)
+    assert (await store.get(1)).category_id == 7
+    assert not await store.update(42, category_id=7)
+
+    await store.delete(1)
+    assert await store.get(1) is None
+    assert 0 < store.hit_rate < 1
+
+
+async def run_ttl_scenario():
+    store = NavigationStateStore(max_entries=100, ttl=0.05)
+    await store.set(1, message_id=10)
+    time.sleep(0.1)
+    assert await store.get(1) is None
+    assert len(store) == 0
+
+
+async def run_backend_scenario():
+    await init_db()
+    user_id = uuid.uuid4().int % 10**9
+
+    store = NavigationStateStore(backend=SQLNavigationBackend(ttl=60))
+    await store.set(user_id, message_id=5, menu_id=3)
+    await store.update(user_id, filter_option_id=9)
+
+    # A fresh store (restart / another worker) reads it back from the database
+    restarted = NavigationStateStore(backend=SQLNavigationBackend(ttl=60))
+    state = await restarted.get(user_id)
+    assert state.as_dict() == {"message_id": 5, "menu_id": 3, "filter_option_id": 9, "category_id": None}
+
+    await restarted.delete(user_id)
+    assert await NavigationStateStore(backend=SQLNavigationBackend(ttl=60)).get(user_id) is None
+
+
+def test_navigation_state_is_bounded_lru():
+    asyncio.run(run_lru_scenario())
+
+
+def test_navigation_state_expires():
+    asyncio.run(run_ttl_scenario())
+
+
+def test_navigation_state_persistent_backend():
+    asyncio.run(run_backend_scenario())
@@ -0,0 +1,78 @@
+"""
+Tests for the streaming channel export parser
+"""
+
+import io
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils import parsers
+from utils.parsers import ContentParser, iter_json_array
+
+MESSAGES = [
+    {"id": 1, "type": "message", "text": "Курс Dirassa: уровень A1 начинается в сентябре"},
+    {"id": 2, "type": "message", "text": "Новый учебник для курса"},
+    {"id": 3, "type": "message", "text": "Стоимость курса: цена 100$"},
+    {"id": 4, "type": "message", "text": [{"type": "bold", "text": "курс"}]},
+    {"id": 5, "type": "service", "action": "pin_message"},
+    {"id": 6, "type": "message", "text": "Факультет шариата Al-Azhar, контакт +201234567890"},
+    {"id": 7, "type": "message", "text": "Azhar visa и икама: https://example.com/visa"},
+    {"id": 8, "type": "message", "text": "Пишите на info@example.com или https://example.com/visa"},
+    {"id": 9, "type": "message", "text": "Просто сообщение"},
+]
+
+
+def write_export(path: Path, messages) -> str:
+    data = {"name": "Channel \"messages\"", "type": "public_channel", "id": 123, "messages": messages}
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+    return str(path)
+
+
+def test_iter_json_array_streams_across_buffer_boundaries(monkeypatch):
+    monkeypatch.setattr(parsers, "READ_SIZE", 7)
+    document = json.dumps({"id": 1234567, "messages": MESSAGES, "tail": [1, 2]}, ensure_ascii=False)
+
+    assert list(iter_json_array(io.StringIO(document), "messages")) == MESSAGES
+    assert list(iter_json_array(io.StringIO('{"messages": []}'), "messages")) == []
+    assert list(iter_json_array(io.StringIO('{"other": 1}'), "messages")) == []
+
+
+def test_parse_all_single_pass(tmp_path):
+    result = ContentParser(write_export(tmp_path / "result.json", MESSAGES), workers=1).parse_all()
+
+    assert result["total_messages"] == 7
+    assert result["dirassa"]["levels"] == [MESSAGES[0]["text"]]
+    assert result["dirassa"]["books"] == [MESSAGES[1]["text"]]
+    assert result["dirassa"]["pricing"] == [MESSAGES[2]["text"]]
+    assert result["alazhar"]["faculties"] == [MESSAGES[5]["text"]]
+    assert result["alazhar"]["visa"] == [MESSAGES[6]["text"]]
+    assert result["contacts"] == [
+        {"text": MESSAGES[5]["text"], "phones": ["+201234567890"], "emails": []},
+        {"text": MESSAGES[7]["text"], "phones": [], "emails": ["info@example.com"]},
+    ]
+    assert result["urls"] == ["https://example.com/visa"]
+
+
+def test_parse_all_process_pool_matches_serial(tmp_path):
+    messages = [dict(message, id=i * 100 + message["id"]) for i in range(20) for message in MESSAGES]
+    path = write_export(tmp_path / "result.json", messages)
+
+    serial = ContentParser(path, workers=1, chunk_size=16).parse_all()
+    parallel = ContentParser(path, workers=2, chunk_size=16).parse_all()
+
+    assert parallel == serial
+    assert parallel["total_messages"] == 140
+    assert len(parallel["dirassa"]["levels"]) == 20
+
+
+def test_parse_all_invalid_file(tmp_path):
+    path = tmp_path / "result.json"
+    path.write_text('{"messages": [{"text": "курс"}', encoding="utf-8")
+
+    assert ContentParser(str(path), workers=1).parse_all() == {}
+    assert ContentParser(str(tmp_path / "missing.json"), workers=1).parse_all() == {}
@@ -0,0 +1,79 @@
+"""
+Tests for the background task supervisor
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from utils.task_supervisor import TaskSupervisor
+
+
+async def run_limits_scenario():
+    supervisor = TaskSupervisor()
+    running = 0
+    peak = 0
+
+    async def job():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    for _ in range(5):
+        supervisor.spawn("broadcasts", job)
+    assert supervisor.pending == 5
+
+    await supervisor.drain(timeout=5)
+    assert peak == 1  # broadcasts run one at a time
+    assert supervisor.stats()["broadcasts"]["completed"] == 5
+    assert supervisor.pending == 0
+
+    # No new work is accepted after drain
+    assert supervisor.spawn("broadcasts", job) is None
+
+
+async def run_session_scenario():
+    supervisor = TaskSupervisor()
+    sessions = []
+
+    async def job(value, session):
+        assert isinstance(session, AsyncSession)
+        sessions.append(session)
+        raise RuntimeError(value)
+
+    supervisor.spawn("couriers", job, "boom", with_session=True)
+    await supervisor.drain(timeout=5)
+
+    assert len(sessions) == 1
+    assert supervisor.stats()["couriers"]["failed"] == 1
+
+
+async def run_cancel_scenario():
+    supervisor = TaskSupervisor()
+
+    async def stuck():
+        await asyncio.sleep(60)
+
+    task = supervisor.spawn("cleanup", stuck)
+    await supervisor.drain(timeout=0.05)
+    assert task.cancelled()
+
+
+def test_group_concurrency_limit_and_drain():
+    asyncio.run(run_limits_scenario())
+
+
+def test_task_gets_own_session_and_errors_are_contained():
+    asyncio.run(run_session_scenario())
+
+
+def test_drain_cancels_tasks_after_timeout():
+    asyncio.run(run_cancel_scenario())
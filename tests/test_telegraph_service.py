@@ -0,0 +1,102 @@
+"""
+Tests for the lazy Telegraph client
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import httpx
+import telegraph.aio
+from telegraph.exceptions import RetryAfterError
+
+from services.telegraph_service import TelegraphService
+
+
+class FakeTelegraph:
+    """Stands in for telegraph.aio.Telegraph and records the calls"""
+
+    accounts = 0
+    failures = []
+    pages = []
+
+    def __init__(self, access_token=None, domain="telegra.ph"):
+        self.access_token = access_token
+
+    def get_access_token(self):
+        return self.access_token
+
+    async def create_account(self, short_name, author_name=None):
+        await asyncio.sleep(0.01)
+        FakeTelegraph.accounts += 1
+        self.access_token = f"token-{FakeTelegraph.accounts}"
+
+    async def _page(self, **kwargs):
+        if FakeTelegraph.failures:
+            raise FakeTelegraph.failures.pop(0)
+        FakeTelegraph.pages.append(dict(kwargs, token=self.access_token))
+        return {"path": f"page-{len(FakeTelegraph.pages)}"}
+
+    async def create_page(self, **kwargs):
+        return await self._page(**kwargs)
+
+    async def edit_page(self, **kwargs):
+        return await self._page(**kwargs)
+
+
+def reset_fake(monkeypatch):
+    monkeypatch.setattr(telegraph.aio, "Telegraph", FakeTelegraph)
+    monkeypatch.setattr("services.telegraph_service.RETRY_DELAY", 0)
+    FakeTelegraph.accounts = 0
+    FakeTelegraph.failures = []
+    FakeTelegraph.pages = []
+
+
+async def run_token_scenario(token_file: Path):
+    service = TelegraphService(token_file=str(token_file))
+    assert service._telegraph is None
+
+    urls = await asyncio.gather(*(service.create_article(f"t{i}", "<p>x</p>") for i in range(3)))
+    assert urls == ["https://telegra.ph/page-1", "https://telegra.ph/page-2", "https://telegra.ph/page-3"]
+    assert FakeTelegraph.accounts == 1
+    assert token_file.read_text(encoding="utf-8") == "token-1"
+
+    # A restarted process reuses the persisted token
+    restarted = TelegraphService(token_file=str(token_file))
+    assert await restarted.update_article("page-1", "t", "<p>y</p>") == "https://telegra.ph/page-4"
+    assert FakeTelegraph.accounts == 1
+    assert FakeTelegraph.pages[-1]["token"] == "token-1"
+
+
+def test_token_created_once_and_persisted(monkeypatch, tmp_path):
+    reset_fake(monkeypatch)
+    asyncio.run(run_token_scenario(tmp_path / "telegraph_token"))
+
+
+async def run_retry_scenario():
+    service = TelegraphService(token="configured", max_retries=2)
+
+    FakeTelegraph.failures = [RetryAfterError(0), httpx.ConnectError("down")]
+    assert await service.create_article("t", "<p>x</p>") == "https://telegra.ph/page-1"
+
+    # The page may already exist: a timed-out create is not repeated
+    FakeTelegraph.failures = [httpx.ReadTimeout("slow")]
+    assert await service.create_article("t", "<p>x</p>") is None
+    assert len(FakeTelegraph.pages) == 1
+
+    # Edits are idempotent and retried
+    FakeTelegraph.failures = [httpx.ReadTimeout("slow")]
+    assert await service.update_article("page-1", "t", "<p>y</p>") == "https://telegra.ph/page-2"
+
+    FakeTelegraph.failures = [httpx.ConnectError("down")] * 3
+    assert await service.update_article("page-1", "t", "<p>y</p>") is None
+    assert FakeTelegraph.accounts == 0
+
+
+def test_publish_retries(monkeypatch):
+    reset_fake(monkeypatch)
+    asyncio.run(run_retry_scenario())
@@ -0,0 +1,112 @@
+"""
+Tests for the update throttling middleware
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from aiogram.types import Update, User
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from bots.throttling import ThrottlingMiddleware
+
+USER = User(id=42, is_bot=False, first_name="Test")
+
+
+def make_callback_update(update_id: int, data: str) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": USER.id, "is_bot": False, "first_name": "Test"},
+            "chat_instance": "1",
+            "data": data
+        }
+    })
+
+
+async def run_dedup_scenario():
+    middleware = ThrottlingMiddleware(rate=0, per_user_concurrency=0, max_concurrency=0, dedup_prefixes=("accept_delivery_",))
+    release = asyncio.Event()
+    calls = []
+
+    async def handler(event, data):
+        calls.append(event.callback_query.data)
+        await release.wait()
+        return "handled"
+
+    first = asyncio.create_task(middleware(handler, make_callback_update(1, "accept_delivery_5"), {"event_from_user": USER}))
+    await asyncio.sleep(0)
+    # A double tap while the first callback is still running is dropped
+    assert await middleware(handler, make_callback_update(2, "accept_delivery_5"), {"event_from_user": USER}) is None
+    release.set()
+    assert await first == "handled"
+    assert calls == ["accept_delivery_5"]
+    assert middleware.collapsed == 1
+
+    # Once the first one finished the same button works again
+    assert await middleware(handler, make_callback_update(3, "accept_delivery_5"), {"event_from_user": USER}) == "handled"
+
+
+async def run_token_bucket_scenario():
+    middleware = ThrottlingMiddleware(rate=0.001, burst=3, max_concurrency=0)
+
+    async def handler(event, data):
+        return "handled"
+
+    results = [
+        await middleware(handler, make_callback_update(i, f"menu_{i}"), {"event_from_user": USER})
+        for i in range(5)
+    ]
+    assert results == ["handled"] * 3 + [None] * 2
+    assert middleware.throttled == 2
+
+    # Other users are not affected
+    other = User(id=7, is_bot=False, first_name="Other")
+    assert await middleware(handler, make_callback_update(9, "menu"), {"event_from_user": other}) == "handled"
+
+
+async def run_ceiling_scenario():
+    middleware = ThrottlingMiddleware(rate=0, per_user_concurrency=0, max_concurrency=1, queue_timeout=0.05)
+    release = asyncio.Event()
+
+    async def handler(event, data):
+        await release.wait()
+        return "handled"
+
+    busy = asyncio.create_task(middleware(handler, make_callback_update(1, "slow"), {"event_from_user": USER}))
+    await asyncio.sleep(0)
+    assert middleware.in_flight == 1
+    # The ceiling is reached: the next update is shed after the queue timeout
+    assert await middleware(handler, make_callback_update(2, "fast"), {"event_from_user": USER}) is None
+    assert middleware.shed == 1
+    release.set()
+    assert await busy == "handled"
+    assert middleware.in_flight == 0
+
+    # Cancelling updates (shutdown) never leaks a slot
+    release.clear()
+    busy = asyncio.create_task(middleware(handler, make_callback_update(3, "slow"), {"event_from_user": USER}))
+    queued = asyncio.create_task(middleware(handler, make_callback_update(4, "slow"), {"event_from_user": USER}))
+    await asyncio.sleep(0)
+    busy.cancel()
+    queued.cancel()
+    await asyncio.gather(busy, queued, return_exceptions=True)
+    release.set()
+    assert await middleware(handler, make_callback_update(5, "fast"), {"event_from_user": USER}) == "handled"
+
+
+def test_duplicate_in_flight_callbacks_are_collapsed():
+    asyncio.run(run_dedup_scenario())
+
+
+def test_token_bucket_limits_each_user():
+    asyncio.run(run_token_bucket_scenario())
+
+
+def test_global_ceiling_sheds_updates():
+    asyncio.run(run_ceiling_scenario())
@@ -0,0 +1,103 @@
+"""
+Tests for responsive image variant generation and URL building
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from PIL import Image
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import settings
+from webapp.images import generate_image_variants, render_variants, shutdown_image_executor
+from webapp.routes.categories import build_file_srcset, build_file_url, serialize_file
+
+
+def create_image_with_exif(path: Path, width: int = 1000, height: int = 500) -> None:
+    """Save a JPEG carrying an EXIF block"""
+    img = Image.new("RGB", (width, height), color="blue")
+    exif = Image.Exif()
+    exif[0x010F] = "TestCamera"  # Make
+    img.save(path, format="JPEG", exif=exif)
+
+
+def test_render_variants_resizes_and_strips_exif():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "photo.jpg"
+        create_image_with_exif(source)
+        assert Image.open(source).getexif()
+
+        variants = render_variants(str(source), tmp, "photo", (320, 640, 1280))
+
+        widths = sorted({variant["width"] for variant in variants})
+        assert widths == [320, 640]  # no upscaling beyond 1000px
+        assert {variant["format"] for variant in variants} >= {"webp"}
+
+        for variant in variants:
+            variant_path = Path(tmp) / variant["filename"]
+            assert variant_path.exists()
+            assert variant["file_size"] == variant_path.stat().st_size
+            with Image.open(variant_path) as img:
+                assert img.width == variant["width"]
+                assert img.height == variant["height"] == variant["width"] // 2
+                assert not img.getexif()
+
+
+def test_generate_image_variants_uses_process_pool(monkeypatch):
+    monkeypatch.setattr(settings, "webapp_image_variant_widths", "100")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "cover.png"
+            Image.new("RGB", (400, 200), color="red").save(source)
+
+            variants = asyncio.run(generate_image_variants(source))
+
+            assert variants
+            assert all(variant["width"] == 100 for variant in variants)
+            assert all((Path(tmp) / variant["filename"]).exists() for variant in variants)
+    finally:
+        shutdown_image_executor()
+
+
+def test_build_file_url_and_srcset_use_variants():
+    base_url = settings.webapp_public_url.rstrip("/")
+    file_record = SimpleNamespace(
+        id=1,
+        file_type="IMAGE",
+        telegram_file_id=None,
+        storage_path="webapp/uploads/abc.jpg",
+        mime_type="image/jpeg",
+        file_size=1000,
+        original_name="abc.jpg",
+        description=None,
+        tag=None,
+        width=1000,
+        height=500,
+        variants=[
+            {"width": 640, "height": 320, "format": "webp", "storage_path": "webapp/uploads/abc_w640.webp"},
+            {"width": 320, "height": 160, "format": "webp", "storage_path": "webapp/uploads/abc_w320.webp"},
+        ],
+    )
+
+    assert build_file_url(file_record) == f"{base_url}/webapp/uploads/abc.jpg"
+    assert build_file_url(file_record, width=300) == f"{base_url}/webapp/uploads/abc_w320.webp"
+    assert build_file_url(file_record, width=2000) == f"{base_url}/webapp/uploads/abc.jpg"
+    assert build_file_srcset(file_record) == (
+        f"{base_url}/webapp/uploads/abc_w320.webp 320w, "
+        f"{base_url}/webapp/uploads/abc_w640.webp 640w, "
+        f"{base_url}/webapp/uploads/abc.jpg 1000w"
+    )
+
+    serialized = serialize_file(file_record)
+    assert [variant.width for variant in serialized.variants] == [320, 640]
+    assert serialized.srcset == build_file_srcset(file_record)
+
+    file_record.variants = None
+    assert build_file_srcset(file_record) is None
+    assert serialize_file(file_record).variants == []
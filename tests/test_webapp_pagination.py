@@ -0,0 +1,119 @@
+"""
+Tests for keyset pagination and field projection of Web App content
+"""
+
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+from httpx import AsyncClient
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import settings
+from database import AsyncSessionLocal, init_db
+from models import WebAppCategoryItemType
+from services.webapp_content_service import WebAppContentService
+from webapp.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from webapp.server import create_app
+
+
+async def create_category_with_items(session, count: int):
+    category = await WebAppContentService.create_category(
+        session=session,
+        slug=f"paging-{uuid.uuid4().hex[:8]}",
+        title="Paging test",
+        order_index=0
+    )
+    item_ids = []
+    for index in range(count):
+        item = await WebAppContentService.add_item(
+            session=session,
+            category_id=category.id,
+            item_type=WebAppCategoryItemType.TEXT,
+            text_content=f"Item {index}",
+            # Duplicate order_index values must still page deterministically by id
+            order_index=index // 2,
+            is_active=index != 3
+        )
+        item_ids.append(item.id)
+    return category.id, item_ids
+
+
+async def run_service_pagination_scenario():
+    await init_db()
+
+    async with AsyncSessionLocal() as session:
+        category_id, item_ids = await create_category_with_items(session, count=7)
+        active_ids = [item_id for index, item_id in enumerate(item_ids) if index != 3]
+
+        seen = []
+        after = None
+        while True:
+            page, after = await WebAppContentService.list_category_items_page(
+                session, category_id, limit=2, after=after
+            )
+            seen.extend(item.id for item in page)
+            if after is None:
+                break
+        assert seen == active_ids
+
+        counts = await WebAppContentService.count_items_by_category(session, [category_id])
+        assert counts == {category_id: len(active_ids)}
+        counts = await WebAppContentService.count_items_by_category(session, [category_id], include_inactive=True)
+        assert counts == {category_id: len(item_ids)}
+
+        await WebAppContentService.delete_category(session, category_id)
+
+
+async def run_api_pagination_scenario():
+    await init_db()
+
+    async with AsyncSessionLocal() as session:
+        category_id, item_ids = await create_category_with_items(session, count=5)
+        active_ids = [item_id for index, item_id in enumerate(item_ids) if index != 3]
+
+    app = create_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        detail = await client.get(f"/webapp/category/{category_id}?items_limit=2&item_fields=type,text_content")
+        assert detail.status_code == 200
+        body = detail.json()
+        assert body["items_count"] == len(active_ids)
+        assert [item["id"] for item in body["items"]] == active_ids[:2]
+        assert set(body["items"][0]) == {"id", "type", "text_content"}
+        assert body["next_items_cursor"]
+
+        rest = await client.get(
+            f"/webapp/category/{category_id}/items",
+            params={"cursor": body["next_items_cursor"], "limit": 10}
+        )
+        assert rest.status_code == 200
+        assert [item["id"] for item in rest.json()] == active_ids[2:]
+        assert NEXT_CURSOR_HEADER not in rest.headers
+
+        listing = await client.get("/webapp/categories", params={"limit": 1, "fields": "title,items_count"})
+        assert listing.status_code == 200
+        assert set(listing.json()[0]) == {"id", "title", "items_count"}
+
+        assert (await client.get("/webapp/categories", params={"fields": "secret"})).status_code == 400
+        assert (await client.get(f"/webapp/category/{category_id}/items", params={"cursor": "???"})).status_code == 400
+
+    async with AsyncSessionLocal() as session:
+        await WebAppContentService.delete_category(session, category_id)
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor((3, 42))) == (3, 42)
+    assert encode_cursor(None) is None
+
+
+def test_items_page_walks_all_active_items():
+    asyncio.run(run_service_pagination_scenario())
+
+
+def test_category_endpoints_paginate_and_project(monkeypatch):
+    monkeypatch.setattr(settings, "webapp_debug_skip_auth", True)
+    asyncio.run(run_api_pagination_scenario())
@@ -0,0 +1,142 @@
+"""
+Tests for set-based reordering with optimistic category versioning
+"""
+
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+from httpx import AsyncClient
+from sqlalchemy import event
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import settings
+from database import AsyncSessionLocal, engine, init_db
+from models import WebAppCategoryItemType
+from services.webapp_content_service import WebAppContentService, WebAppVersionConflictError
+from webapp.server import create_app
+
+
+async def create_category_with_items(session, count: int = 5):
+    category = await WebAppContentService.create_category(
+        session=session,
+        slug=f"reorder-{uuid.uuid4().hex[:8]}",
+        title="Reorder test",
+        order_index=0
+    )
+    items = []
+    for index in range(count):
+        items.append(await WebAppContentService.add_item(
+            session=session,
+            category_id=category.id,
+            item_type=WebAppCategoryItemType.TEXT,
+            text_content=f"Item {index}",
+            order_index=index
+        ))
+    return category, items
+
+
+async def run_service_reorder_scenario():
+    await init_db()
+
+    async with AsyncSessionLocal() as session:
+        category, items = await create_category_with_items(session)
+        category_id = category.id
+        category = await WebAppContentService.get_category(session, category_id, include_inactive=True)
+        # Every add_item bumps the version
+        assert category.version == len(items)
+
+        reversed_ids = [item.id for item in reversed(items)]
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("UPDATE WEBAPP_CATEGORY_ITEMS"):
+                statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            await WebAppContentService.reorder_items(
+                session=session,
+                item_order=[{"id": item_id, "order_index": idx} for idx, item_id in enumerate(reversed_ids)],
+                category_id=category.id,
+                expected_version=category.version
+            )
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+        stale_version = category.version
+        assert len(statements) == 1
+        assert "CASE" in statements[0].upper()
+
+        reloaded = await WebAppContentService.get_category(session, category.id, include_inactive=True)
+        assert [item.id for item in reloaded.items] == reversed_ids
+        assert reloaded.version == len(items) + 1
+
+        # Stale version is rejected and nothing changes
+        try:
+            await WebAppContentService.reorder_items(
+                session=session,
+                item_order=[{"id": item.id, "order_index": idx} for idx, item in enumerate(items)],
+                category_id=category.id,
+                expected_version=stale_version
+            )
+            raise AssertionError("Expected WebAppVersionConflictError")
+        except WebAppVersionConflictError:
+            pass
+
+        # The failed attempt rolled back the session, so only use plain ids from here
+        reloaded = await WebAppContentService.get_category(session, category_id, include_inactive=True)
+        assert [item.id for item in reloaded.items] == reversed_ids
+
+        # Editing an item is a change a concurrent reorder has to notice
+        await WebAppContentService.update_item(session, reversed_ids[0], is_active=False)
+        reloaded = await WebAppContentService.get_category(session, category_id, include_inactive=True)
+        assert reloaded.version == len(items) + 2
+
+        await WebAppContentService.delete_category(session, category_id)
+
+
+async def run_api_reorder_scenario():
+    await init_db()
+
+    async with AsyncSessionLocal() as session:
+        category, items = await create_category_with_items(session, count=3)
+
+    app = create_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        detail = (await client.get(f"/webapp/category/{category.id}?include_inactive=true")).json()
+        version = detail["version"]
+        new_order = [items[2].id, items[0].id, items[1].id]
+
+        response = await client.post(
+            f"/webapp/category/{category.id}/items/reorder",
+            json={"item_ids": new_order, "expected_version": version}
+        )
+        assert response.status_code == 200
+        assert [item["id"] for item in response.json()] == new_order
+
+        stale = await client.post(
+            f"/webapp/category/{category.id}/items/reorder",
+            json={"item_ids": list(reversed(new_order)), "expected_version": version}
+        )
+        assert stale.status_code == 409
+
+        detail = (await client.get(f"/webapp/category/{category.id}?include_inactive=true")).json()
+        assert detail["version"] == version + 1
+        assert [item["id"] for item in detail["items"]] == new_order
+
+    async with AsyncSessionLocal() as session:
+        await WebAppContentService.delete_category(session, category.id)
+
+
+def test_reorder_items_single_update_with_version_check():
+    asyncio.run(run_service_reorder_scenario())
+
+
+def test_reorder_items_endpoint_rejects_stale_version(monkeypatch):
+    monkeypatch.setattr(settings, "webapp_debug_skip_auth", True)
+    asyncio.run(run_api_reorder_scenario())
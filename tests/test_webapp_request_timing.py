@@ -0,0 +1,70 @@
+"""
+Tests for the ASGI request timing middleware
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from httpx import AsyncClient
+from starlette.responses import StreamingResponse
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import settings
+from utils.metrics import Histogram
+from webapp.server import HTTP_REQUEST_DURATION, create_app
+
+
+def get_histogram(labels) -> Histogram:
+    return dict(HTTP_REQUEST_DURATION.items()).get(labels)
+
+
+async def run_request_timing_scenario():
+    HTTP_REQUEST_DURATION.clear()
+    app = create_app()
+
+    @app.get("/webapp/test-stream/{name}")
+    async def stream(name: str):
+        async def chunks():
+            for index in range(3):
+                yield f"{name}-{index};".encode()
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        health = await client.get("/webapp/health")
+        assert health.status_code == 200
+        assert health.headers["server-timing"].startswith("app;dur=")
+
+        streamed = await client.get("/webapp/test-stream/abc")
+        assert streamed.text == "abc-0;abc-1;abc-2;"
+
+        static = await client.get("/webapp/static/js/app.js")
+        assert static.status_code == 200
+
+        missing = await client.get("/webapp/does-not-exist")
+        assert missing.status_code == 404
+
+    assert get_histogram(("GET", "/webapp/health", "200")).count == 1
+    assert get_histogram(("GET", "/webapp/test-stream/{name}", "200")).count == 1
+    assert get_histogram(("GET", "/webapp/static/{path}", "200")).count == 1
+    assert get_histogram(("GET", "<unmatched>", "404")).count == 1
+
+
+def test_request_timing_middleware(monkeypatch):
+    monkeypatch.setattr(settings, "webapp_server_timing", True)
+    asyncio.run(run_request_timing_scenario())
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert histogram.count == 4
+    assert list(histogram.cumulative_counts()) == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert Histogram().quantile(0.5) is None
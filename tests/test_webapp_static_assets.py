@@ -0,0 +1,103 @@
+"""
+Tests for fingerprinted, precompressed static asset serving
+"""
+
+import asyncio
+import gzip
+import sys
+import tempfile
+from pathlib import Path
+
+from httpx import AsyncClient
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import settings
+from webapp.assets import IMMUTABLE_CACHE_CONTROL, build_asset_manifest
+from webapp.server import create_app
+
+
+def write_static_tree(root: Path, helper_body: str) -> None:
+    (root / "js").mkdir()
+    (root / "css").mkdir()
+    (root / "js" / "helper.js").write_text(helper_body)
+    (root / "js" / "main.js").write_text(
+        "import { helper } from './helper.js';\n" + "console.log(helper());\n" * 100
+    )
+    (root / "css" / "main.css").write_text("body { color: red; }\n" * 100)
+
+
+def test_manifest_rewrites_module_imports_and_cascades_hashes():
+    with tempfile.TemporaryDirectory() as tmp_a, tempfile.TemporaryDirectory() as tmp_b:
+        write_static_tree(Path(tmp_a), "export const helper = () => 1;")
+        write_static_tree(Path(tmp_b), "export const helper = () => 2;")
+
+        manifest_a = build_asset_manifest(Path(tmp_a))
+        manifest_b = build_asset_manifest(Path(tmp_b))
+
+        helper_hashed = manifest_a.resolve("js/helper.js")
+        assert helper_hashed.startswith("js/helper.") and helper_hashed.endswith(".js")
+
+        main_asset = manifest_a.assets["js/main.js"]
+        assert f"from './{helper_hashed.split('/')[-1]}'" in main_asset.content.decode()
+
+        # A change in the dependency changes the importing module's URL too
+        assert manifest_a.resolve("js/main.js") != manifest_b.resolve("js/main.js")
+        assert manifest_a.resolve("css/main.css") == manifest_b.resolve("css/main.css")
+
+        assert gzip.decompress(main_asset.encoded["gzip"]) == main_asset.content
+        assert manifest_a.resolve("unknown.js") == "unknown.js"
+
+
+async def run_static_serving_scenario():
+    app = create_app()
+    manifest = app.state.asset_manifest
+    hashed_app_js = manifest.resolve("js/app.js")
+    assert hashed_app_js != "js/app.js"
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        page = await client.get("/webapp/")
+        assert page.status_code == 200
+        assert f"/webapp/static/{hashed_app_js}" in page.text
+        assert f"/webapp/static/{manifest.resolve('css/main.css')}" in page.text
+
+        response = await client.get(
+            f"/webapp/static/{hashed_app_js}",
+            headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text == manifest.assets["js/app.js"].content.decode()
+
+        etag = response.headers["etag"]
+        not_modified = await client.get(
+            f"/webapp/static/{hashed_app_js}",
+            headers={"If-None-Match": etag}
+        )
+        assert not_modified.status_code == 304
+
+        plain = await client.get("/webapp/static/js/app.js")
+        assert plain.status_code == 200
+        assert plain.headers["cache-control"] == "no-cache"
+
+
+def test_fingerprinted_static_serving():
+    asyncio.run(run_static_serving_scenario())
+
+
+async def run_unfingerprinted_scenario():
+    app = create_app()
+    assert not app.state.asset_manifest.assets
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        page = await client.get("/webapp/")
+        assert f"/webapp/static/js/app.js?v={settings.webapp_version}" in page.text
+        assert f"/webapp/static/css/main.css?v={settings.webapp_version}" in page.text
+
+
+def test_unfingerprinted_assets_keep_version_query(monkeypatch):
+    monkeypatch.setattr(settings, "webapp_static_fingerprint", False)
+    asyncio.run(run_unfingerprinted_scenario())
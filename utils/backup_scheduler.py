@@ -0,0 +1,118 @@
+"""
+Scheduled database backups
+Periodic online copies of the SQLite database into BACKUP_DIR, skipped while
+the database is unchanged and pruned to the newest BACKUP_KEEP files
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from config import settings
+from utils.exporter import backup_sqlite_database, sqlite_path_from_url
+from utils.logger import logger
+
+BACKUP_PREFIX = "backup_"
+STATE_FILE = ".last_backup.json"
+
+
+def _database_fingerprint(db_path: str) -> List[Tuple[int, int]]:
+    """(mtime, size) of the database and its WAL; any write changes one of them"""
+    fingerprint = []
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            stat = os.stat(path)
+            fingerprint.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            fingerprint.append((0, 0))
+    return fingerprint
+
+
+class BackupScheduler:
+    """
+    Copies the database every ``interval`` seconds.
+
+    A run is skipped when the database files have not changed since the
+    previous backup, so idle periods do not fill the directory with
+    identical copies. The fingerprint of the last backup is kept in the
+    backup directory and survives restarts.
+    """
+
+    def __init__(self, db_url: str, directory: str, interval: float, keep: int, compress: bool = True):
+        self.db_url = db_url
+        self.directory = Path(directory)
+        self.interval = interval
+        self.keep = keep
+        self.compress = compress
+        self._task: Optional[asyncio.Task] = None
+
+    def backups(self) -> List[Path]:
+        """Existing backups, oldest first"""
+        if not self.directory.exists():
+            return []
+        return sorted(
+            path for path in self.directory.iterdir()
+            # .tmp files are copies still being written
+            if path.name.startswith(BACKUP_PREFIX) and not path.name.endswith(".tmp")
+        )
+
+    def _read_state(self) -> Optional[list]:
+        try:
+            return json.loads((self.directory / STATE_FILE).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _backup(self) -> Optional[Path]:
+        db_path = sqlite_path_from_url(self.db_url)
+        fingerprint = [list(part) for part in _database_fingerprint(db_path)]
+        if fingerprint == self._read_state() and self.backups():
+            return None
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        target = self.directory / f"{BACKUP_PREFIX}{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}.db"
+        path = Path(backup_sqlite_database(db_path, str(target), compress=self.compress))
+        (self.directory / STATE_FILE).write_text(json.dumps(fingerprint), encoding="utf-8")
+
+        for old in self.backups()[:-self.keep] if self.keep > 0 else []:
+            old.unlink(missing_ok=True)
+        return path
+
+    async def run_once(self) -> Optional[Path]:
+        """Make a backup unless nothing changed; returns its path"""
+        path = await asyncio.to_thread(self._backup)
+        if path is None:
+            logger.debug("Резервная копия не нужна: база данных не изменилась")
+        else:
+            logger.info(f"✅ Резервная копия базы данных: {path}")
+        return path
+
+    def start(self) -> None:
+        if self.interval <= 0 or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._run(), name="backup-scheduler")
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        logger.info(f"Резервное копирование каждые {self.interval / 3600:g} ч в {self.directory}")
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Ошибка резервного копирования базы данных: {str(e)}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+
+backup_scheduler = BackupScheduler(
+    db_url=settings.database_url,
+    directory=settings.backup_dir,
+    interval=settings.backup_interval_hours * 3600,
+    keep=settings.backup_keep,
+    compress=settings.backup_compress
+)
@@ -0,0 +1,74 @@
+"""
+Database query metrics
+Counts and times every statement through the engine's cursor events,
+labelled by the statement template
+"""
+
+import re
+import time
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.metrics import metrics
+
+DB_QUERY_DURATION = metrics.histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time by statement template",
+    ("statement",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+# Statements past this length are cut: the label only has to identify the query
+MAX_TEMPLATE_LENGTH = 200
+# Templates beyond this count are reported as OTHER_TEMPLATE to bound the label set
+MAX_TEMPLATES = 500
+OTHER_TEMPLATE = "<other>"
+
+_WHITESPACE = re.compile(r"\s+")
+# IN lists and VALUES rows: (?, ?, ?) for qmark, $1 for asyncpg, %(name)s for psycopg
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|\$\d+|%\(\w+\)s|%s)(?:\s*,\s*(?:\?|\$\d+|%\(\w+\)s|%s))*\s*\)")
+_REPEATED_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+# ORM selects list every column first; the FROM/WHERE part is what tells queries apart
+_SELECT_LIST = re.compile(r"\bSELECT\s+(?:(?!\bSELECT\b).)+?\s+FROM\b", re.IGNORECASE)
+
+_templates = set()
+
+
+@lru_cache(maxsize=2048)
+def statement_template(statement: str) -> str:
+    """Statement text with whitespace squeezed and select and placeholder lists collapsed"""
+    template = _WHITESPACE.sub(" ", statement).strip()
+    template = _SELECT_LIST.sub("SELECT … FROM", template)
+    template = _PLACEHOLDER_LIST.sub("(...)", template)
+    template = _REPEATED_ROWS.sub("(...)", template)
+    if len(template) > MAX_TEMPLATE_LENGTH:
+        template = template[:MAX_TEMPLATE_LENGTH] + "…"
+    if template not in _templates:
+        if len(_templates) >= MAX_TEMPLATES:
+            return OTHER_TEMPLATE
+        _templates.add(template)
+    return template
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is not None:
+        DB_QUERY_DURATION.observe((statement_template(statement),), time.perf_counter() - started)
+
+
+def install_query_metrics(engine: Engine) -> None:
+    """
+    Time the statements of a sync engine (``AsyncEngine.sync_engine``).
+    Failed statements are not recorded: their errors are logged by the caller.
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,256 @@
+"""
+Scheduled message deletion
+One heap of pending deletions served by a single timer task instead of a
+sleeping coroutine per message
+"""
+
+import asyncio
+import heapq
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from aiogram import Bot
+from sqlalchemy import delete, insert, select, tuple_
+
+from bot_registry import get_admin_bot, get_user_bot
+from config import settings
+from database import AsyncSessionLocal
+from models import ScheduledDeletion
+from utils.logger import logger
+from utils.metrics import metrics
+
+# Telegram refuses to delete messages older than 48 hours
+MAX_MESSAGE_AGE = timedelta(hours=48)
+# deleteMessages accepts at most 100 ids per call
+MAX_IDS_PER_CALL = 100
+
+# (bot_id, chat_id, message_id)
+DeletionKey = Tuple[int, int, int]
+
+
+class DeletionScheduler:
+    """
+    Deletes bot messages when their time comes.
+
+    Every ``tick`` seconds the due entries are taken from the heap, grouped
+    by chat and removed with one deleteMessages call per chat. At most
+    ``max_calls_per_second`` calls are made so deletions never crowd out
+    real replies; the rest wait for the next tick. Pending deletions are
+    stored in ``scheduled_deletions`` and reloaded after a restart.
+
+    In a multi-process deployment ``role`` splits the work: "producer"
+    processes only write scheduled deletions to the table, and a single
+    "consumer" process reads due rows from it every tick and deletes them.
+    """
+
+    def __init__(
+        self,
+        *,
+        tick: float = 1.0,
+        max_calls_per_second: float = 10.0,
+        persist: bool = True,
+        role: str = "local",
+        session_factory=AsyncSessionLocal
+    ):
+        self.tick = tick
+        self.max_calls_per_second = max_calls_per_second
+        self.role = role
+        # Producers and consumers only talk through the table
+        self.persist = persist or role != "local"
+        self.session_factory = session_factory
+        self._heap: List[Tuple[float, int, int, int]] = []
+        self._bots: Dict[int, Bot] = {}
+        self._to_insert: Dict[DeletionKey, float] = {}
+        self._to_remove: List[DeletionKey] = []
+        self._task: Optional[asyncio.Task] = None
+        self._loaded = False
+        self._queued: Set[DeletionKey] = set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, bot: Bot, chat_id: int, message_id: int, delay: float) -> None:
+        """Schedule deletion of a message after delay seconds"""
+        due = time.time() + delay
+        self._bots[bot.id] = bot
+        if self.role != "producer":
+            heapq.heappush(self._heap, (due, bot.id, chat_id, message_id))
+        if self.persist:
+            self._to_insert[(bot.id, chat_id, message_id)] = due
+        self.start()
+
+    def start(self) -> None:
+        """Start the timer task (called lazily by schedule)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="deletion-scheduler")
+
+    async def stop(self) -> None:
+        """Stop the timer and persist what is still pending"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self._flush()
+
+    def _resolve_bot(self, bot_id: int) -> Optional[Bot]:
+        bot = self._bots.get(bot_id)
+        if bot is None:
+            for candidate in (get_user_bot(), get_admin_bot()):
+                if candidate is not None and candidate.id == bot_id:
+                    bot = self._bots[bot_id] = candidate
+        return bot
+
+    async def _load(self) -> None:
+        """Reload deletions persisted by a previous run"""
+        self._loaded = True
+        if not self.persist:
+            return
+
+        try:
+            cutoff = datetime.utcnow() - MAX_MESSAGE_AGE
+            async with self.session_factory() as session:
+                await session.execute(delete(ScheduledDeletion).where(ScheduledDeletion.delete_at < cutoff))
+                result = await session.execute(select(ScheduledDeletion))
+                rows = result.scalars().all()
+                await session.commit()
+        except Exception as e:
+            logger.error(f"❌ Ошибка загрузки отложенных удалений: {str(e)}", exc_info=True)
+            return
+
+        for row in rows:
+            due = (row.delete_at - datetime(1970, 1, 1)).total_seconds()
+            heapq.heappush(self._heap, (due, row.bot_id, row.chat_id, row.message_id))
+        if rows:
+            logger.info(f"Восстановлено отложенных удалений сообщений: {len(rows)}")
+
+    async def _flush(self) -> None:
+        """Write buffered schedule/remove changes in one transaction"""
+        if not self.persist or not (self._to_insert or self._to_remove):
+            return
+
+        to_insert, self._to_insert = self._to_insert, {}
+        to_remove, self._to_remove = self._to_remove, []
+        try:
+            async with self.session_factory() as session:
+                if to_insert:
+                    keys = list(to_insert)
+                    await session.execute(delete(ScheduledDeletion).where(
+                        tuple_(ScheduledDeletion.bot_id, ScheduledDeletion.chat_id, ScheduledDeletion.message_id).in_(keys)
+                    ))
+                    await session.execute(insert(ScheduledDeletion), [
+                        {
+                            "bot_id": bot_id,
+                            "chat_id": chat_id,
+                            "message_id": message_id,
+                            "delete_at": datetime.utcfromtimestamp(due)
+                        }
+                        for (bot_id, chat_id, message_id), due in to_insert.items()
+                    ])
+                if to_remove:
+                    await session.execute(delete(ScheduledDeletion).where(
+                        tuple_(ScheduledDeletion.bot_id, ScheduledDeletion.chat_id, ScheduledDeletion.message_id).in_(to_remove)
+                    ))
+                await session.commit()
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения отложенных удалений: {str(e)}", exc_info=True)
+
+    async def _pull_due(self, now: float) -> None:
+        """Consumer: move due rows written by producer processes into the heap"""
+        limit = max(1, int(self.max_calls_per_second * self.tick)) * MAX_IDS_PER_CALL
+        try:
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    select(ScheduledDeletion)
+                    .where(ScheduledDeletion.delete_at <= datetime.utcfromtimestamp(now))
+                    .order_by(ScheduledDeletion.delete_at)
+                    .limit(limit)
+                )
+                rows = result.scalars().all()
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения отложенных удалений: {str(e)}", exc_info=True)
+            return
+
+        for row in rows:
+            key = (row.bot_id, row.chat_id, row.message_id)
+            if key not in self._queued:
+                self._queued.add(key)
+                due = (row.delete_at - datetime(1970, 1, 1)).total_seconds()
+                heapq.heappush(self._heap, (due, row.bot_id, row.chat_id, row.message_id))
+
+    def _take_due(self, now: float, max_calls: int) -> "OrderedDict[Tuple[int, int], List[int]]":
+        """Pop due entries grouped by (bot_id, chat_id), at most max_calls groups"""
+        batches: "OrderedDict[Tuple[int, int], List[int]]" = OrderedDict()
+        deferred = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            _, bot_id, chat_id, message_id = entry
+            batch = batches.get((bot_id, chat_id))
+            if batch is None and len(batches) >= max_calls:
+                deferred.append(entry)
+                continue
+            if batch is None:
+                batch = batches[(bot_id, chat_id)] = []
+            if len(batch) >= MAX_IDS_PER_CALL:
+                deferred.append(entry)
+                continue
+            batch.append(message_id)
+        for entry in deferred:
+            heapq.heappush(self._heap, entry)
+        return batches
+
+    async def _delete_batch(self, bot_id: int, chat_id: int, message_ids: List[int]) -> None:
+        bot = self._resolve_bot(bot_id)
+        if bot is not None:
+            try:
+                if len(message_ids) == 1:
+                    await bot.delete_message(chat_id=chat_id, message_id=message_ids[0])
+                else:
+                    await bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+            except Exception as e:
+                # Messages may have been deleted already or be too old
+                logger.debug(f"⚠️ Не удалось удалить сообщения {message_ids} в чате {chat_id}: {str(e)}")
+        else:
+            logger.warning(f"Бот {bot_id} недоступен, удаление сообщений {message_ids} пропущено")
+
+        for message_id in message_ids:
+            key = (bot_id, chat_id, message_id)
+            self._queued.discard(key)
+            self._to_remove.append(key)
+
+    async def process_due(self, now: Optional[float] = None) -> int:
+        """Run one tick: delete due messages within the rate cap; returns API calls made"""
+        now = time.time() if now is None else now
+        if self.role == "producer":
+            await self._flush()
+            return 0
+        if self.role == "consumer":
+            await self._flush()
+            await self._pull_due(now)
+
+        max_calls = max(1, int(self.max_calls_per_second * self.tick))
+        batches = self._take_due(now, max_calls)
+        for (bot_id, chat_id), message_ids in batches.items():
+            await self._delete_batch(bot_id, chat_id, message_ids)
+        await self._flush()
+        return len(batches)
+
+    async def _run(self) -> None:
+        if not self._loaded and self.role == "local":
+            await self._load()
+        while True:
+            try:
+                await self.process_due()
+            except Exception as e:
+                logger.error(f"❌ Ошибка планировщика удаления сообщений: {str(e)}", exc_info=True)
+            await asyncio.sleep(self.tick)
+
+
+deletion_scheduler = DeletionScheduler(
+    tick=settings.auto_delete_tick,
+    max_calls_per_second=settings.auto_delete_max_rate,
+    persist=settings.auto_delete_persist,
+    role=settings.auto_delete_role
+)
+metrics.gauge("scheduled_deletions_pending", "Messages waiting for automatic deletion", lambda: deletion_scheduler.pending)
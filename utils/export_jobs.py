@@ -0,0 +1,415 @@
+"""
+Background export jobs
+Admin exports run as supervised tasks that report progress by editing a
+status message; finished files are cached per data version so repeated
+requests for unchanged data are answered at once
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from aiogram.types import FSInputFile, InlineKeyboardButton, InlineKeyboardMarkup
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from bot_registry import get_admin_bot
+from config import settings
+from database import AsyncSessionLocal
+from models import Alert, AppState, ButtonClick, Delivery, User, UserActivity
+from utils.exporter import ANALYTICS_TABLES, BackupProgress, ExportProgress, ExportService
+from utils.job_queue import background_job
+from utils.logger import logger
+from utils.metrics import metrics
+
+EXPORT_GROUP = "exports"
+
+# Seconds between progress edits of the status message
+PROGRESS_INTERVAL = 2.0
+
+# Models have no updated_at column: the newest of these timestamps, the row
+# count and the highest id together change whenever rows are added,
+# removed or move through their life cycle
+EXPORT_SOURCES = {
+    "alerts": (Alert, (Alert.created_at, Alert.moderated_at, Alert.broadcast_at)),
+    "users": (User, (User.created_at, User.last_active)),
+    "deliveries": (Delivery, (Delivery.created_at, Delivery.assigned_at, Delivery.completed_at)),
+    "user_activities": (UserActivity, (UserActivity.created_at,)),
+    "button_clicks": (ButtonClick, (ButtonClick.created_at,)),
+}
+
+
+class ExportDefinition:
+    """One entry of the admin export menu"""
+
+    def __init__(
+        self,
+        source: str,
+        method: Callable[..., Awaitable[str]],
+        title: str,
+        caption: str,
+        filters: Optional[Dict[str, Any]] = None,
+        cacheable: bool = True
+    ):
+        self.source = source
+        self.method = method
+        self.title = title
+        self.caption = caption
+        self.filters = filters or {}
+        # Exports that move a cursor produce different files for the same data
+        self.cacheable = cacheable
+
+
+EXPORTS: Dict[str, ExportDefinition] = {
+    "alerts_csv": ExportDefinition(
+        "alerts", ExportService.export_alerts_csv, "Экспорт алертов в CSV",
+        "✅ Экспорт алертов завершен!\n\n📊 CSV файл готов."
+    ),
+    "alerts_json": ExportDefinition(
+        "alerts", ExportService.export_alerts_json, "Экспорт алертов в JSON",
+        "✅ Экспорт алертов завершен!\n\n📄 JSON файл готов."
+    ),
+    "alerts_txt": ExportDefinition(
+        "alerts", ExportService.export_alerts_txt, "Экспорт алертов в TXT",
+        "✅ Экспорт алертов завершен!\n\n📝 TXT файл готов."
+    ),
+    "users_csv": ExportDefinition(
+        "users", ExportService.export_users_csv, "Экспорт пользователей в CSV",
+        "✅ Экспорт пользователей завершен!\n\n📊 CSV файл готов."
+    ),
+    "users_txt": ExportDefinition(
+        "users", ExportService.export_users_txt, "Экспорт пользователей в TXT",
+        "✅ Экспорт пользователей завершен!\n\n📝 TXT файл готов."
+    ),
+    "deliveries_csv": ExportDefinition(
+        "deliveries", ExportService.export_deliveries_csv, "Экспорт доставок в CSV",
+        "✅ Экспорт доставок завершен!\n\n📊 CSV файл готов."
+    ),
+    "deliveries_txt": ExportDefinition(
+        "deliveries", ExportService.export_deliveries_txt, "Экспорт доставок в TXT",
+        "✅ Экспорт доставок завершен!\n\n📝 TXT файл готов."
+    ),
+}
+
+ANALYTICS_TITLES = {
+    "alerts": "алертов",
+    "users": "пользователей",
+    "deliveries": "доставок",
+    "user_activities": "активности пользователей",
+    "button_clicks": "нажатий кнопок",
+}
+for _table in ANALYTICS_TABLES:
+    EXPORTS[f"analytics_{_table}"] = ExportDefinition(
+        _table, ExportService.export_table_columnar, f"Аналитический экспорт {ANALYTICS_TITLES[_table]}",
+        "✅ Аналитический экспорт завершен!\n\n📈 Типизированный файл (Parquet) готов.",
+        filters={"table": _table}, cacheable=False
+    )
+    EXPORTS[f"analytics_{_table}_new"] = ExportDefinition(
+        _table, ExportService.export_table_columnar, f"Новые записи {ANALYTICS_TITLES[_table]}",
+        "✅ Аналитический экспорт завершен!\n\n📈 Новые записи с прошлого экспорта.",
+        filters={"table": _table, "incremental": True}, cacheable=False
+    )
+
+# Updates that leave every timestamp untouched (bans, deactivation) write
+# a new token to app_state in the same transaction. The token lives in the
+# database, so exports run by a job worker process see changes committed
+# by the web and bot processes
+_MODEL_SOURCES = {model: source for source, (model, _) in EXPORT_SOURCES.items()}
+_TIMESTAMP_ATTRIBUTES = {
+    source: {column.key for column in columns} for source, (_, columns) in EXPORT_SOURCES.items()
+}
+SOURCE_VERSION_PREFIX = "export_version:"
+
+
+def _changed_sources(session: Session) -> Set[str]:
+    """
+    Sources with rows updated beyond their timestamps; inserts and deletes
+    already move the row count or the highest id
+    """
+    sources = set()
+    for obj in session.dirty:
+        source = _MODEL_SOURCES.get(type(obj))
+        if source is None or source in sources:
+            continue
+        changed = {attr.key for attr in inspect(obj).attrs if attr.history.has_changes()}
+        if changed - _TIMESTAMP_ATTRIBUTES[source]:
+            sources.add(source)
+    return sources
+
+
+def _write_source_version(connection, source: str) -> None:
+    values = {"key": f"{SOURCE_VERSION_PREFIX}{source}", "value": uuid.uuid4().hex, "updated_at": datetime.utcnow()}
+    table = AppState.__table__
+    if connection.dialect.name in ("sqlite", "postgresql"):
+        insert = sqlite_insert if connection.dialect.name == "sqlite" else postgresql_insert
+        statement = insert(table).values(**values)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={"value": statement.excluded.value, "updated_at": statement.excluded.updated_at}
+        ))
+        return
+    updated = connection.execute(update(table).where(table.c.key == values["key"]).values(**values))
+    if not updated.rowcount:
+        connection.execute(table.insert().values(**values))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_source_changes(session: Session, flush_context) -> None:
+    sources = _changed_sources(session)
+    if sources:
+        connection = session.connection()
+        for source in sorted(sources):
+            _write_source_version(connection, source)
+
+
+class ExportArtifact:
+    def __init__(self, filepath: str, caption: str):
+        self.filepath = filepath
+        self.caption = caption
+        self.file_id: Optional[str] = None
+        self.created_at = time.monotonic()
+
+
+class ExportCache:
+    """
+    Finished export files keyed by (export type, filters, data watermark).
+
+    Once a file has been uploaded its Telegram file_id is remembered, so a
+    cache hit is a single sendDocument by file_id. Evicted files are
+    deleted from disk.
+    """
+
+    def __init__(self, max_entries: int = 16, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, ExportArtifact]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[ExportArtifact]:
+        artifact = self._entries.get(key)
+        if artifact is not None and (
+            (self.ttl and time.monotonic() - artifact.created_at >= self.ttl)
+            or (artifact.file_id is None and not os.path.exists(artifact.filepath))
+        ):
+            self._drop(key)
+            artifact = None
+        if artifact is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return artifact
+
+    def put(self, key: Hashable, artifact: ExportArtifact) -> bool:
+        """Keep the artifact; False when caching is disabled and the caller owns the file"""
+        if self.max_entries <= 0:
+            return False
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = artifact
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+        return True
+
+    def _drop(self, key: Hashable) -> None:
+        artifact = self._entries.pop(key)
+        ExportService.cleanup_export_file(artifact.filepath)
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self._drop(key)
+
+
+export_cache = ExportCache(max_entries=settings.export_cache_size, ttl=settings.export_cache_ttl)
+metrics.gauge("export_cache_entries", "Cached export files", lambda: len(export_cache))
+
+
+def new_export_job_id() -> str:
+    return uuid.uuid4().hex[:8]
+
+
+async def data_watermark(session, source: str) -> Tuple[Any, ...]:
+    """Value that changes whenever the rows behind an export change"""
+    model, columns = EXPORT_SOURCES[source]
+    result = await session.execute(
+        select(func.count(), func.max(model.id), *(func.max(column) for column in columns))
+    )
+    version = await session.get(AppState, f"{SOURCE_VERSION_PREFIX}{source}", populate_existing=True)
+    return tuple(result.one()) + (version.value if version is not None else None,)
+
+
+def export_cache_key(export_type: str, filters: Dict[str, Any], watermark: Tuple[Any, ...]) -> Hashable:
+    return export_type, json.dumps(filters, sort_keys=True, default=str), watermark
+
+
+async def track_progress(
+    bot,
+    chat_id: int,
+    message_id: int,
+    task: asyncio.Future,
+    render: Callable[[], Optional[str]]
+) -> None:
+    """Edit a status message every PROGRESS_INTERVAL seconds until task is done"""
+    last_text = None
+    while not task.done():
+        await asyncio.wait({task}, timeout=PROGRESS_INTERVAL)
+        text = None if task.done() else render()
+        if text and text != last_text:
+            last_text = text
+            try:
+                await bot.edit_message_text(text=text, chat_id=chat_id, message_id=message_id)
+            except Exception as e:
+                logger.debug(f"Не удалось обновить прогресс в чате {chat_id}: {str(e)}")
+
+
+def _back_keyboard(text: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=text, callback_data="admin_export_menu")]
+    ])
+
+
+@background_job
+async def run_export_job(
+    job_id: str,
+    export_type: str,
+    filters: Dict[str, Any],
+    chat_id: int,
+    message_id: int
+) -> None:
+    """Build (or reuse) an export file and send it to the admin chat"""
+    bot = get_admin_bot()
+    if bot is None:
+        logger.error(f"❌ Экспорт #{job_id}: админ-бот недоступен")
+        return
+
+    definition = EXPORTS[export_type]
+    filters = {**definition.filters, **filters}
+    # Path of a freshly built file nobody else owns yet
+    unowned_path = None
+    position = None
+    try:
+        async with AsyncSessionLocal() as session:
+            key, artifact = None, None
+            if definition.cacheable:
+                key = export_cache_key(export_type, filters, await data_watermark(session, definition.source))
+                artifact = export_cache.get(key)
+            cached = artifact is not None
+
+            if artifact is None:
+                progress = ExportProgress()
+                task = asyncio.ensure_future(definition.method(session, progress=progress, **filters))
+                await track_progress(
+                    bot, chat_id, message_id, task,
+                    lambda: (
+                        f"⏳ {definition.title}...\n\n"
+                        f"Задача #{job_id}: {progress.rows}/{progress.total} строк"
+                    ) if progress.total else None
+                )
+                result = await task
+                # Incremental exports also return the cursor position they reached
+                filepath, position = result if isinstance(result, tuple) else (result, None)
+                artifact = ExportArtifact(filepath, definition.caption)
+                unowned_path = artifact.filepath
+
+        document = artifact.file_id or FSInputFile(artifact.filepath)
+        message = await bot.send_document(chat_id=chat_id, document=document, caption=artifact.caption)
+
+        if position is not None:
+            # Only a delivered file moves the cursor: a failed send is exported again next time
+            async with AsyncSessionLocal() as session:
+                await ExportService.save_export_cursor(session, position)
+
+        if not cached:
+            artifact.file_id = message.document.file_id if message.document else None
+            if definition.cacheable and export_cache.put(key, artifact):
+                unowned_path = None
+
+        await bot.edit_message_text(
+            text="✅ Файл отправлен!" + (" (из кэша)" if cached else ""),
+            chat_id=chat_id,
+            message_id=message_id,
+            reply_markup=_back_keyboard("🔙 К меню экспорта")
+        )
+        logger.info(f"✅ Экспорт #{job_id} ({export_type}) отправлен в чат {chat_id}{' из кэша' if cached else ''}")
+
+    except Exception as e:
+        logger.error(f"❌ Ошибка экспорта #{job_id} ({export_type}): {str(e)}", exc_info=True)
+        try:
+            await bot.edit_message_text(
+                text="❌ Ошибка экспорта",
+                chat_id=chat_id,
+                message_id=message_id,
+                reply_markup=_back_keyboard("🔙 Назад")
+            )
+        except Exception:
+            pass
+    finally:
+        if unowned_path is not None:
+            ExportService.cleanup_export_file(unowned_path)
+
+
+def _backup_progress_text(progress: BackupProgress) -> Optional[str]:
+    if not progress.total_pages:
+        return None
+    if progress.compressing:
+        return "⏳ Резервная копия базы данных...\n\n🗜 Сжатие файла..."
+    return (
+        "⏳ Резервная копия базы данных...\n\n"
+        f"📄 Скопировано страниц: {progress.copied_pages}/{progress.total_pages} ({progress.percent}%)"
+    )
+
+
+@background_job
+async def run_backup_job(job_id: str, chat_id: int, message_id: int) -> None:
+    """Make an online backup of the database and send it to the admin chat"""
+    bot = get_admin_bot()
+    if bot is None:
+        logger.error(f"❌ Резервная копия #{job_id}: админ-бот недоступен")
+        return
+
+    filepath = None
+    try:
+        # Backup runs in a worker thread; the status message shows its progress
+        progress = BackupProgress()
+        task = asyncio.ensure_future(ExportService.export_database_sqlite(settings.database_url, progress))
+        await track_progress(bot, chat_id, message_id, task, lambda: _backup_progress_text(progress))
+        filepath = await task
+
+        await bot.send_document(
+            chat_id=chat_id,
+            document=FSInputFile(filepath),
+            caption="✅ Резервная копия базы данных готова!\n\n💾 Файл SQLite со всеми таблицами и данными."
+        )
+        await bot.edit_message_text(
+            text="✅ Файл отправлен!",
+            chat_id=chat_id,
+            message_id=message_id,
+            reply_markup=_back_keyboard("🔙 К меню экспорта")
+        )
+        logger.info(f"✅ Резервная копия #{job_id} отправлена в чат {chat_id}")
+
+    except Exception as e:
+        logger.error(f"❌ Ошибка резервной копии #{job_id}: {str(e)}", exc_info=True)
+        try:
+            await bot.edit_message_text(
+                text="❌ Ошибка экспорта\n\nЭкспорт базы данных возможен только для SQLite.",
+                chat_id=chat_id,
+                message_id=message_id,
+                reply_markup=_back_keyboard("🔙 Назад")
+            )
+        except Exception:
+            pass
+    finally:
+        if filepath is not None:
+            ExportService.cleanup_export_file(filepath)
@@ -1,501 +1,901 @@
+import asyncio
 import csv
+import enum
+import gzip
+import io
 import json
+import shutil
 import sqlite3
 import tempfile
 import os
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
 from pathlib import Path
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from models import Alert, User, Delivery, AlertType
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, and_, func, or_, select
+from sqlalchemy.sql import Select
+from config import settings
+from models import Alert, User, Delivery, AlertType, UserActivity, ButtonClick, ExportCursor
 from utils.logger import logger
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+ALERT_COLUMNS = (
+    Alert.id, Alert.alert_type, Alert.title, Alert.description, Alert.creator_id,
+    Alert.created_at, Alert.is_approved, Alert.is_moderated, Alert.moderator_id,
+    Alert.moderated_at, Alert.is_active, Alert.phone, Alert.address_text,
+    Alert.location_type, Alert.latitude, Alert.longitude, Alert.broadcast_count,
+    Alert.broadcast_at, Alert.target_languages, Alert.target_citizenships
+)
+USER_COLUMNS = (
+    User.id, User.telegram_id, User.username, User.first_name, User.phone,
+    User.language, User.citizenship, User.is_admin, User.is_courier,
+    User.is_banned, User.created_at, User.last_active
+)
+# Tables available for columnar (analytics) export
+ANALYTICS_TABLES = {
+    "alerts": Alert,
+    "users": User,
+    "deliveries": Delivery,
+    "user_activities": UserActivity,
+    "button_clicks": ButtonClick,
+}
+DELIVERY_COLUMNS = (
+    Delivery.id, Delivery.description, Delivery.creator_id, Delivery.courier_id,
+    Delivery.status, Delivery.phone, Delivery.address_text, Delivery.created_at,
+    Delivery.assigned_at, Delivery.completed_at
+)
+
+
+def _ts(value: Optional[datetime]) -> str:
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def _yes_no(value: Any) -> str:
+    return 'Да' if value else 'Нет'
+
+
+def _short(text: str) -> str:
+    return text[:100] + '...' if len(text) > 100 else text
+
+
+def _export_path(prefix: str, extension: str) -> str:
+    filename = f"{prefix}_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return os.path.join(tempfile.gettempdir(), filename)
+
+
+class ExportWriter:
+    """
+    Incremental writer of one export file.
+
+    Every method runs in a worker thread: a batch of rows is encoded into
+    one string and written with a single call, so only one batch is held
+    in memory at a time.
+    """
+
+    # Writers producing compressed files are never gzipped again
+    compressed = False
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.count = 0
+        self._file = None
+
+    def open(self, total: int) -> None:
+        self._file = open(self.filepath, 'w', newline='', encoding='utf-8')
+        self._file.write(self.header(total))
+
+    def write_rows(self, rows: Sequence[Any]) -> None:
+        self._file.write(self.encode(rows))
+        self.count += len(rows)
+
+    def close(self, complete: bool) -> None:
+        if self._file is None:
+            return
+        try:
+            if complete:
+                self._file.write(self.footer())
+        finally:
+            self._file.close()
+
+    def header(self, total: int) -> str:
+        return ''
+
+    def encode(self, rows: Sequence[Any]) -> str:
+        raise NotImplementedError
+
+    def footer(self) -> str:
+        return ''
+
+
+class CsvExportWriter(ExportWriter):
+    def __init__(self, filepath: str, fieldnames: List[str], format_row: Callable[[Any], List[Any]]):
+        super().__init__(filepath)
+        self.fieldnames = fieldnames
+        self.format_row = format_row
+
+    def _csv(self, rows: Iterable[List[Any]]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def header(self, total: int) -> str:
+        return self._csv([self.fieldnames])
+
+    def encode(self, rows: Sequence[Any]) -> str:
+        return self._csv(self.format_row(row) for row in rows)
+
+
+class JsonExportWriter(ExportWriter):
+    """Writes a JSON array one element at a time"""
+
+    def __init__(self, filepath: str, format_row: Callable[[Any], Dict[str, Any]]):
+        super().__init__(filepath)
+        self.format_row = format_row
+
+    def header(self, total: int) -> str:
+        return '['
+
+    def encode(self, rows: Sequence[Any]) -> str:
+        items = []
+        for index, row in enumerate(rows, start=self.count):
+            item = json.dumps(self.format_row(row), ensure_ascii=False, indent=2)
+            items.append(('\n' if index == 0 else ',\n') + item)
+        return ''.join(items)
+
+    def footer(self) -> str:
+        return '\n]\n' if self.count else ']\n'
+
+
+class TxtExportWriter(ExportWriter):
+    def __init__(self, filepath: str, title: str, total_label: str, format_row: Callable[[Any], List[str]]):
+        super().__init__(filepath)
+        self.title = title
+        self.total_label = total_label
+        self.format_row = format_row
+
+    def header(self, total: int) -> str:
+        return (
+            f"=== {self.title} ===\n"
+            f"Сгенерирован: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"{self.total_label}: {total}\n"
+            "\n" + "="*80 + "\n\n"
+        )
+
+    def encode(self, rows: Sequence[Any]) -> str:
+        chunks = []
+        for row in rows:
+            chunks.extend(f"{line}\n" for line in self.format_row(row))
+            chunks.append("\n" + "-"*80 + "\n\n")
+        return ''.join(chunks)
+
+    def footer(self) -> str:
+        return "=== КОНЕЦ ЭКСПОРТА ===\n"
+
+
+def _column_kind(column) -> str:
+    """Logical type of a table column in columnar exports"""
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return "bool"
+    if isinstance(column_type, Integer):
+        return "int64"
+    if isinstance(column_type, Float):
+        return "float64"
+    if isinstance(column_type, DateTime):
+        return "timestamp"
+    if isinstance(column_type, JSON):
+        return "json"
+    return "string"
+
+
+def _plain(value: Any) -> Any:
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+class ColumnarExportWriter(ExportWriter):
+    """
+    Typed export of whole table rows, oldest first.
+
+    Keeps the last written row so the caller can move the incremental
+    export cursor past it.
+    """
+
+    compressed = True
+
+    def __init__(self, filepath: str, columns: List[tuple]):
+        super().__init__(filepath)
+        self.columns = columns  # [(name, kind)]
+        self.last_row = None
+
+    def write_rows(self, rows: Sequence[Any]) -> None:
+        if rows:
+            self.write_columns(rows)
+            self.count += len(rows)
+            self.last_row = rows[-1]
+
+    def write_columns(self, rows: Sequence[Any]) -> None:
+        raise NotImplementedError
+
+
+class ParquetExportWriter(ColumnarExportWriter):
+    """Parquet file with one row group per fetched batch (requires pyarrow)"""
+
+    def _arrow_type(self, kind: str):
+        return {
+            "bool": pa.bool_(),
+            "int64": pa.int64(),
+            "float64": pa.float64(),
+            "timestamp": pa.timestamp("us"),
+        }.get(kind, pa.string())
+
+    def open(self, total: int) -> None:
+        self.schema = pa.schema([(name, self._arrow_type(kind)) for name, kind in self.columns])
+        self._file = pq.ParquetWriter(self.filepath, self.schema, compression=settings.analytics_export_compression)
+
+    def write_columns(self, rows: Sequence[Any]) -> None:
+        arrays = []
+        for (name, kind), values in zip(self.columns, zip(*rows)):
+            if kind == "json":
+                values = [None if value is None else json.dumps(value, ensure_ascii=False) for value in values]
+            elif kind == "string":
+                values = [_plain(value) for value in values]
+            arrays.append(pa.array(values, type=self._arrow_type(kind)))
+        self._file.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self, complete: bool) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+class JsonLinesExportWriter(ColumnarExportWriter):
+    """
+    Fallback without pyarrow: gzipped JSON Lines.
+
+    The first line describes the columns and their types; values keep
+    their JSON types (numbers, booleans, nested JSON), timestamps are ISO
+    8601 strings.
+    """
+
+    def open(self, total: int) -> None:
+        self._file = gzip.open(self.filepath, 'wt', encoding='utf-8', compresslevel=6)
+        schema = {"columns": [{"name": name, "type": kind} for name, kind in self.columns]}
+        self._file.write(json.dumps(schema) + '\n')
+
+    def write_columns(self, rows: Sequence[Any]) -> None:
+        names = [name for name, _ in self.columns]
+        lines = []
+        for row in rows:
+            record = {}
+            for name, value in zip(names, row):
+                if isinstance(value, datetime):
+                    value = value.isoformat()
+                record[name] = _plain(value)
+            lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.write(''.join(lines))
+
+
+def _remove_quietly(*paths: str) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def gzip_file(filepath: str, compressed: Optional[str] = None) -> str:
+    """Replace a file with its gzipped copy, return the new path"""
+    compressed = compressed or f"{filepath}.gz"
+    try:
+        with open(filepath, 'rb') as source, gzip.open(compressed, 'wb', compresslevel=6) as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+    except BaseException:
+        _remove_quietly(compressed)
+        raise
+    os.remove(filepath)
+    return compressed
+
+
+def compress_if_large(filepath: str, limit: int) -> str:
+    """Gzip a file that Telegram would not accept as a document"""
+    if limit <= 0 or os.path.getsize(filepath) <= limit:
+        return filepath
+
+    compressed = gzip_file(filepath)
+    logger.info(f"✅ [exporter] Файл больше {limit} байт, сжат: {compressed}")
+    return compressed
+
+
+class ExportProgress:
+    """Row counters of a running export"""
+
+    def __init__(self):
+        self.rows = 0
+        self.total = 0
+
+
+class ExportPosition(NamedTuple):
+    """Last row of an incremental export, saved as the table's cursor once the file is delivered"""
+    table: str
+    last_created_at: datetime
+    last_id: int
+
+
+class BackupProgress:
+    """Page counters of a running SQLite backup, updated from the worker thread"""
+
+    def __init__(self):
+        self.copied_pages = 0
+        self.total_pages = 0
+        self.compressing = False
+
+    def __call__(self, status: int, remaining: int, total: int) -> None:
+        self.total_pages = total
+        self.copied_pages = total - remaining
+
+    @property
+    def percent(self) -> int:
+        return int(self.copied_pages * 100 / self.total_pages) if self.total_pages else 0
+
+
+def sqlite_path_from_url(db_url: str) -> str:
+    """Absolute path of the database file behind a sqlite:/// or sqlite+aiosqlite:/// URL"""
+    # Support formats: sqlite:///path, sqlite+aiosqlite:///path
+    if "sqlite" not in db_url.lower():
+        logger.error("❌ [exporter] Экспорт SQLite поддерживается только для SQLite баз данных")
+        raise ValueError("SQLite export only supported for SQLite databases")
+
+    db_path = db_url.split("///")[-1]
+    # Handle relative paths like ./bot_database.db
+    if db_path.startswith("./"):
+        db_path = db_path[2:]
+    db_path = os.path.abspath(db_path)
+
+    if not os.path.exists(db_path):
+        logger.error(f"❌ [exporter] Файл базы данных не найден: {db_path}")
+        raise FileNotFoundError(f"Database file not found: {db_path}")
+    return db_path
+
+
+def backup_sqlite_database(
+    db_path: str,
+    target_path: str,
+    progress: Optional[BackupProgress] = None,
+    compress: bool = True
+) -> str:
+    """
+    Copy a live SQLite database with the online backup API.
+
+    Blocking: run it in a worker thread. Pages are copied
+    BACKUP_PAGES_PER_STEP at a time so writers are only locked out for
+    one step; SQLite restarts the copy when another connection writes in
+    between, so the result is always a consistent snapshot. Returns the
+    path of the (optionally gzipped) copy.
+
+    The copy is built under a .tmp name and renamed when complete, so a
+    failed backup never leaves a partial file at the target path.
+    """
+    result_path = f"{target_path}.gz" if compress else target_path
+    copy_path = f"{target_path}.tmp"
+    compressed_path = f"{result_path}.tmp"
+    try:
+        source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            target = sqlite3.connect(copy_path)
+            try:
+                source.backup(target, pages=settings.backup_pages_per_step, progress=progress)
+            finally:
+                target.close()
+        finally:
+            source.close()
+
+        if compress:
+            if progress is not None:
+                progress.compressing = True
+            gzip_file(copy_path, compressed_path)
+            os.replace(compressed_path, result_path)
+        else:
+            os.replace(copy_path, result_path)
+    except BaseException:
+        _remove_quietly(copy_path, compressed_path)
+        raise
+    return result_path
+
+
+def _alert_csv_row(alert) -> List[Any]:
+    return [
+        alert.id,
+        alert.alert_type.value,
+        alert.title or '',
+        _short(alert.description),
+        alert.creator_id,
+        _ts(alert.created_at),
+        _yes_no(alert.is_approved),
+        alert.moderator_id or '',
+        _ts(alert.moderated_at),
+        _yes_no(alert.is_active),
+        alert.phone or '',
+        alert.address_text or '',
+        alert.broadcast_count,
+        _ts(alert.broadcast_at)
+    ]
+
+
+def _alert_json_row(alert) -> Dict[str, Any]:
+    return {
+        'id': alert.id,
+        'alert_type': alert.alert_type.value,
+        'title': alert.title,
+        'description': alert.description,
+        'creator_id': alert.creator_id,
+        'created_at': alert.created_at.isoformat(),
+        'is_approved': alert.is_approved,
+        'is_moderated': alert.is_moderated,
+        'moderator_id': alert.moderator_id,
+        'moderated_at': alert.moderated_at.isoformat() if alert.moderated_at else None,
+        'is_active': alert.is_active,
+        'phone': alert.phone,
+        'address_text': alert.address_text,
+        'location_type': alert.location_type,
+        'latitude': alert.latitude,
+        'longitude': alert.longitude,
+        'broadcast_count': alert.broadcast_count,
+        'broadcast_at': alert.broadcast_at.isoformat() if alert.broadcast_at else None,
+        'target_languages': alert.target_languages,
+        'target_citizenships': alert.target_citizenships
+    }
+
+
+def _alert_txt_lines(alert) -> List[str]:
+    lines = [f"ID: {alert.id}", f"Тип: {alert.alert_type.value}"]
+    if alert.title:
+        lines.append(f"Заголовок: {alert.title}")
+    lines.append(f"Описание: {alert.description}")
+    lines.append(f"Создатель ID: {alert.creator_id}")
+    lines.append(f"Создан: {_ts(alert.created_at)}")
+    lines.append(f"Одобрен: {_yes_no(alert.is_approved)}")
+    if alert.moderator_id:
+        lines.append(f"Модератор ID: {alert.moderator_id}")
+    if alert.moderated_at:
+        lines.append(f"Отмодерирован: {_ts(alert.moderated_at)}")
+    lines.append(f"Активен: {_yes_no(alert.is_active)}")
+    if alert.phone:
+        lines.append(f"Телефон: {alert.phone}")
+    if alert.address_text:
+        lines.append(f"Адрес: {alert.address_text}")
+    if alert.broadcast_count:
+        lines.append(f"Количество рассылок: {alert.broadcast_count}")
+    if alert.broadcast_at:
+        lines.append(f"Дата рассылки: {_ts(alert.broadcast_at)}")
+    return lines
+
+
+def _user_csv_row(user) -> List[Any]:
+    return [
+        user.id,
+        user.telegram_id,
+        user.username or '',
+        user.first_name or '',
+        user.phone or '',
+        user.language,
+        user.citizenship or '',
+        _yes_no(user.is_admin),
+        _yes_no(user.is_courier),
+        _yes_no(user.is_banned),
+        _ts(user.created_at),
+        _ts(user.last_active)
+    ]
+
+
+def _user_txt_lines(user) -> List[str]:
+    lines = [f"ID: {user.id}", f"Telegram ID: {user.telegram_id}"]
+    if user.username:
+        lines.append(f"Username: @{user.username}")
+    if user.first_name:
+        lines.append(f"Имя: {user.first_name}")
+    if user.phone:
+        lines.append(f"Телефон: {user.phone}")
+    lines.append(f"Язык: {user.language}")
+    if user.citizenship:
+        lines.append(f"Гражданство: {user.citizenship}")
+    lines.append(f"Админ: {_yes_no(user.is_admin)}")
+    lines.append(f"Курьер: {_yes_no(user.is_courier)}")
+    lines.append(f"Заблокирован: {_yes_no(user.is_banned)}")
+    lines.append(f"Зарегистрирован: {_ts(user.created_at)}")
+    if user.last_active:
+        lines.append(f"Последняя активность: {_ts(user.last_active)}")
+    return lines
+
+
+def _delivery_csv_row(delivery) -> List[Any]:
+    return [
+        delivery.id,
+        _short(delivery.description),
+        delivery.creator_id,
+        delivery.courier_id or '',
+        delivery.status,
+        delivery.phone,
+        delivery.address_text or '',
+        _ts(delivery.created_at),
+        _ts(delivery.assigned_at),
+        _ts(delivery.completed_at)
+    ]
+
+
+def _delivery_txt_lines(delivery) -> List[str]:
+    lines = [
+        f"ID: {delivery.id}",
+        f"Описание: {delivery.description}",
+        f"Создатель ID: {delivery.creator_id}"
+    ]
+    if delivery.courier_id:
+        lines.append(f"Курьер ID: {delivery.courier_id}")
+    lines.append(f"Статус: {delivery.status}")
+    lines.append(f"Телефон: {delivery.phone}")
+    if delivery.address_text:
+        lines.append(f"Адрес: {delivery.address_text}")
+    lines.append(f"Создан: {_ts(delivery.created_at)}")
+    if delivery.assigned_at:
+        lines.append(f"Назначен: {_ts(delivery.assigned_at)}")
+    if delivery.completed_at:
+        lines.append(f"Завершен: {_ts(delivery.completed_at)}")
+    return lines
+
+
+ALERT_CSV_FIELDS = [
+    'ID', 'Тип', 'Заголовок', 'Описание', 'Создатель ID', 'Создан',
+    'Одобрен', 'Модератор ID', 'Отмодерирован', 'Активен', 'Телефон',
+    'Адрес', 'Количество рассылок', 'Дата рассылки'
+]
+USER_CSV_FIELDS = [
+    'ID', 'Telegram ID', 'Username', 'Имя', 'Телефон', 'Язык',
+    'Гражданство', 'Админ', 'Курьер', 'Заблокирован', 'Зарегистрирован',
+    'Последняя активность'
+]
+DELIVERY_CSV_FIELDS = [
+    'ID', 'Описание', 'Создатель ID', 'Курьер ID', 'Статус',
+    'Телефон', 'Адрес', 'Создан', 'Назначен', 'Завершен'
+]
+
 
 class ExportService:
     """Service for exporting data to various formats"""
-    
+
+    @staticmethod
+    def _alerts_query(
+        alert_type: Optional[AlertType],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime]
+    ) -> Select:
+        query = select(*ALERT_COLUMNS)
+        if alert_type:
+            query = query.where(Alert.alert_type == alert_type)
+        if start_date:
+            query = query.where(Alert.created_at >= start_date)
+        if end_date:
+            query = query.where(Alert.created_at <= end_date)
+        return query.order_by(Alert.created_at.desc())
+
+    @staticmethod
+    def _users_query(
+        language: Optional[str],
+        citizenship: Optional[str],
+        is_courier: Optional[bool]
+    ) -> Select:
+        query = select(*USER_COLUMNS)
+        if language:
+            query = query.where(User.language == language)
+        if citizenship:
+            query = query.where(User.citizenship == citizenship)
+        if is_courier is not None:
+            query = query.where(User.is_courier == is_courier)
+        return query.order_by(User.created_at.desc())
+
+    @staticmethod
+    def _deliveries_query(
+        status: Optional[str],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime]
+    ) -> Select:
+        query = select(*DELIVERY_COLUMNS)
+        if status:
+            query = query.where(Delivery.status == status)
+        if start_date:
+            query = query.where(Delivery.created_at >= start_date)
+        if end_date:
+            query = query.where(Delivery.created_at <= end_date)
+        return query.order_by(Delivery.created_at.desc())
+
+    @staticmethod
+    async def stream_export(
+        session: AsyncSession,
+        query: Select,
+        writer: ExportWriter,
+        progress: Optional[ExportProgress] = None
+    ) -> str:
+        """
+        Write the rows of query to writer, return the file path.
+
+        Rows are fetched in batches of EXPORT_BATCH_SIZE plain tuples from a
+        server-side cursor; encoding and file I/O run in a worker thread
+        while the next batch is fetched. Files above the Telegram document
+        limit are gzipped.
+        """
+        total_query = select(func.count()).select_from(query.order_by(None).subquery())
+        total = (await session.execute(total_query)).scalar_one()
+        if progress is not None:
+            progress.total = total
+
+        await asyncio.to_thread(writer.open, total)
+        pending: Optional[asyncio.Future] = None
+        complete = False
+        try:
+            result = await session.stream(query.execution_options(yield_per=settings.export_batch_size))
+            async for rows in result.partitions():
+                if pending is not None:
+                    await pending
+                    if progress is not None:
+                        progress.rows = writer.count
+                pending = asyncio.ensure_future(asyncio.to_thread(writer.write_rows, rows))
+            if pending is not None:
+                await pending
+            if progress is not None:
+                progress.rows = writer.count
+            complete = True
+        finally:
+            if pending is not None and not pending.done():
+                await asyncio.gather(pending, return_exceptions=True)
+            await asyncio.to_thread(writer.close, complete)
+            if not complete:
+                ExportService.cleanup_export_file(writer.filepath)
+
+        if writer.compressed:
+            return writer.filepath
+        return await asyncio.to_thread(compress_if_large, writer.filepath, settings.export_gzip_threshold)
+
     @staticmethod
     async def export_alerts_csv(
         session: AsyncSession,
         alert_type: Optional[AlertType] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        progress: Optional[ExportProgress] = None
     ) -> str:
         """Export alerts to CSV file, return file path"""
         try:
-            # Query alerts
-            query = select(Alert)
-            
-            if alert_type:
-                query = query.where(Alert.alert_type == alert_type)
-            if start_date:
-                query = query.where(Alert.created_at >= start_date)
-            if end_date:
-                query = query.where(Alert.created_at <= end_date)
-            
-            query = query.order_by(Alert.created_at.desc())
-            
-            result = await session.execute(query)
-            alerts = result.scalars().all()
-            
-            # Create temporary CSV file
-            temp_dir = tempfile.gettempdir()
-            filename = f"alerts_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
-            filepath = os.path.join(temp_dir, filename)
-            
-            with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = [
-                    'ID', 'Тип', 'Заголовок', 'Описание', 'Создатель ID', 'Создан',
-                    'Одобрен', 'Модератор ID', 'Отмодерирован', 'Активен', 'Телефон',
-                    'Адрес', 'Количество рассылок', 'Дата рассылки'
-                ]
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                for alert in alerts:
-                    writer.writerow({
-                        'ID': alert.id,
-                        'Тип': alert.alert_type.value,
-                        'Заголовок': alert.title or '',
-                        'Описание': alert.description[:100] + '...' if len(alert.description) > 100 else alert.description,
-                        'Создатель ID': alert.creator_id,
-                        'Создан': alert.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                        'Одобрен': 'Да' if alert.is_approved else 'Нет',
-                        'Модератор ID': alert.moderator_id or '',
-                        'Отмодерирован': alert.moderated_at.strftime('%Y-%m-%d %H:%M:%S') if alert.moderated_at else '',
-                        'Активен': 'Да' if alert.is_active else 'Нет',
-                        'Телефон': alert.phone or '',
-                        'Адрес': alert.address_text or '',
-                        'Количество рассылок': alert.broadcast_count,
-                        'Дата рассылки': alert.broadcast_at.strftime('%Y-%m-%d %H:%M:%S') if alert.broadcast_at else ''
-                    })
-            
-            logger.info(f"✅ [exporter] Экспортировано {len(alerts)} алертов в CSV: {filepath}")
+            writer = CsvExportWriter(_export_path("alerts", "csv"), ALERT_CSV_FIELDS, _alert_csv_row)
+            query = ExportService._alerts_query(alert_type, start_date, end_date)
+            filepath = await ExportService.stream_export(session, query, writer, progress)
+
+            logger.info(f"✅ [exporter] Экспортировано {writer.count} алертов в CSV: {filepath}")
             return filepath
-            
+
         except Exception as e:
             logger.error(f"❌ [exporter] Ошибка экспорта алертов в CSV: {str(e)}", exc_info=True)
             raise
-    
+
     @staticmethod
     async def export_users_csv(
         session: AsyncSession,
         language: Optional[str] = None,
         citizenship: Optional[str] = None,
-        is_courier: Optional[bool] = None
+        is_courier: Optional[bool] = None,
+        progress: Optional[ExportProgress] = None
     ) -> str:
         """Export users to CSV file, return file path"""
         try:
-            # Query users
-            query = select(User)
-            
-            if language:
-                query = query.where(User.language == language)
-            if citizenship:
-                query = query.where(User.citizenship == citizenship)
-            if is_courier is not None:
-                query = query.where(User.is_courier == is_courier)
-            
-            query = query.order_by(User.created_at.desc())
-            
-            result = await session.execute(query)
-            users = result.scalars().all()
-            
-            # Create temporary CSV file
-            temp_dir = tempfile.gettempdir()
-            filename = f"users_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
-            filepath = os.path.join(temp_dir, filename)
-            
-            with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = [
-                    'ID', 'Telegram ID', 'Username', 'Имя', 'Телефон', 'Язык',
-                    'Гражданство', 'Админ', 'Курьер', 'Заблокирован', 'Зарегистрирован',
-                    'Последняя активность'
-                ]
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                for user in users:
-                    writer.writerow({
-                        'ID': user.id,
-                        'Telegram ID': user.telegram_id,
-                        'Username': user.username or '',
-                        'Имя': user.first_name or '',
-                        'Телефон': user.phone or '',
-                        'Язык': user.language,
-                        'Гражданство': user.citizenship or '',
-                        'Админ': 'Да' if user.is_admin else 'Нет',
-                        'Курьер': 'Да' if user.is_courier else 'Нет',
-                        'Заблокирован': 'Да' if user.is_banned else 'Нет',
-                        'Зарегистрирован': user.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                        'Последняя активность': user.last_active.strftime('%Y-%m-%d %H:%M:%S') if user.last_active else ''
-                    })
-            
-            logger.info(f"✅ [exporter] Экспортировано {len(users)} пользователей в CSV: {filepath}")
+            writer = CsvExportWriter(_export_path("users", "csv"), USER_CSV_FIELDS, _user_csv_row)
+            query = ExportService._users_query(language, citizenship, is_courier)
+            filepath = await ExportService.stream_export(session, query, writer, progress)
+
+            logger.info(f"✅ [exporter] Экспортировано {writer.count} пользователей в CSV: {filepath}")
             return filepath
-            
+
         except Exception as e:
             logger.error(f"❌ [exporter] Ошибка экспорта пользователей в CSV: {str(e)}", exc_info=True)
             raise
-    
+
     @staticmethod
     async def export_deliveries_csv(
         session: AsyncSession,
         status: Optional[str] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        progress: Optional[ExportProgress] = None
     ) -> str:
         """Export deliveries to CSV file, return file path"""
         try:
-            # Query deliveries
-            query = select(Delivery)
-            
-            if status:
-                query = query.where(Delivery.status == status)
-            if start_date:
-                query = query.where(Delivery.created_at >= start_date)
-            if end_date:
-                query = query.where(Delivery.created_at <= end_date)
-            
-            query = query.order_by(Delivery.created_at.desc())
-            
-            result = await session.execute(query)
-            deliveries = result.scalars().all()
-            
-            # Create temporary CSV file
-            temp_dir = tempfile.gettempdir()
-            filename = f"deliveries_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
-            filepath = os.path.join(temp_dir, filename)
-            
-            with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = [
-                    'ID', 'Описание', 'Создатель ID', 'Курьер ID', 'Статус',
-                    'Телефон', 'Адрес', 'Создан', 'Назначен', 'Завершен'
-                ]
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                for delivery in deliveries:
-                    writer.writerow({
-                        'ID': delivery.id,
-                        'Описание': delivery.description[:100] + '...' if len(delivery.description) > 100 else delivery.description,
-                        'Создатель ID': delivery.creator_id,
-                        'Курьер ID': delivery.courier_id or '',
-                        'Статус': delivery.status,
-                        'Телефон': delivery.phone,
-                        'Адрес': delivery.address_text or '',
-                        'Создан': delivery.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                        'Назначен': delivery.assigned_at.strftime('%Y-%m-%d %H:%M:%S') if delivery.assigned_at else '',
-                        'Завершен': delivery.completed_at.strftime('%Y-%m-%d %H:%M:%S') if delivery.completed_at else ''
-                    })
-            
-            logger.info(f"✅ [exporter] Экспортировано {len(deliveries)} доставок в CSV: {filepath}")
+            writer = CsvExportWriter(_export_path("deliveries", "csv"), DELIVERY_CSV_FIELDS, _delivery_csv_row)
+            query = ExportService._deliveries_query(status, start_date, end_date)
+            filepath = await ExportService.stream_export(session, query, writer, progress)
+
+            logger.info(f"✅ [exporter] Экспортировано {writer.count} доставок в CSV: {filepath}")
             return filepath
-            
+
         except Exception as e:
             logger.error(f"❌ [exporter] Ошибка экспорта доставок в CSV: {str(e)}", exc_info=True)
             raise
-    
+
     @staticmethod
     async def export_alerts_json(
         session: AsyncSession,
         alert_type: Optional[AlertType] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        progress: Optional[ExportProgress] = None
     ) -> str:
         """Export alerts to JSON file, return file path"""
         try:
-            # Query alerts
-            query = select(Alert)
-            
-            if alert_type:
-                query = query.where(Alert.alert_type == alert_type)
-            if start_date:
-                query = query.where(Alert.created_at >= start_date)
-            if end_date:
-                query = query.where(Alert.created_at <= end_date)
-            
-            query = query.order_by(Alert.created_at.desc())
-            
-            result = await session.execute(query)
-            alerts = result.scalars().all()
-            
-            # Create temporary JSON file
-            temp_dir = tempfile.gettempdir()
-            filename = f"alerts_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json"
-            filepath = os.path.join(temp_dir, filename)
-            
-            # Convert to dict
-            alerts_data = []
-            for alert in alerts:
-                alerts_data.append({
-                    'id': alert.id,
-                    'alert_type': alert.alert_type.value,
-                    'title': alert.title,
-                    'description': alert.description,
-                    'creator_id': alert.creator_id,
-                    'created_at': alert.created_at.isoformat(),
-                    'is_approved': alert.is_approved,
-                    'is_moderated': alert.is_moderated,
-                    'moderator_id': alert.moderator_id,
-                    'moderated_at': alert.moderated_at.isoformat() if alert.moderated_at else None,
-                    'is_active': alert.is_active,
-                    'phone': alert.phone,
-                    'address_text': alert.address_text,
-                    'location_type': alert.location_type,
-                    'latitude': alert.latitude,
-                    'longitude': alert.longitude,
-                    'broadcast_count': alert.broadcast_count,
-                    'broadcast_at': alert.broadcast_at.isoformat() if alert.broadcast_at else None,
-                    'target_languages': alert.target_languages,
-                    'target_citizenships': alert.target_citizenships
-                })
-            
-            with open(filepath, 'w', encoding='utf-8') as jsonfile:
-                json.dump(alerts_data, jsonfile, ensure_ascii=False, indent=2)
-            
-            logger.info(f"✅ [exporter] Экспортировано {len(alerts)} алертов в JSON: {filepath}")
+            writer = JsonExportWriter(_export_path("alerts", "json"), _alert_json_row)
+            query = ExportService._alerts_query(alert_type, start_date, end_date)
+            filepath = await ExportService.stream_export(session, query, writer, progress)
+
+            logger.info(f"✅ [exporter] Экспортировано {writer.count} алертов в JSON: {filepath}")
             return filepath
-            
+
         except Exception as e:
             logger.error(f"❌ [exporter] Ошибка экспорта алертов в JSON: {str(e)}", exc_info=True)
             raise
-    
+
     @staticmethod
-    async def export_database_sqlite(db_url: str) -> str:
-        """Export entire database to SQLite dump, return file path"""
+    async def export_table_columnar(
+        session: AsyncSession,
+        table: str,
+        incremental: bool = False,
+        progress: Optional[ExportProgress] = None
+    ) -> Tuple[str, Optional[ExportPosition]]:
+        """
+        Export full typed rows of an analytics table, return the file path
+        and, for an incremental export, the position to save with
+        save_export_cursor once the file has been delivered.
+
+        Writes compressed Parquet when pyarrow is installed and gzipped JSON
+        Lines otherwise. Rows go out in (created_at, id) order; with
+        incremental=True only rows after the saved cursor are included.
+        """
         try:
-            # Extract database path from URL
-            # Support formats: sqlite:///path, sqlite+aiosqlite:///path
-            if "sqlite" in db_url.lower():
-                # Remove protocol prefixes
-                db_path = db_url.split("///")[-1]
-                # Handle relative paths like ./bot_database.db
-                if db_path.startswith("./"):
-                    db_path = db_path[2:]
-                db_path = os.path.abspath(db_path)
+            model = ANALYTICS_TABLES.get(table)
+            if model is None:
+                raise ValueError(f"Unknown analytics table: {table}")
+
+            columns = list(model.__table__.columns)
+            query = select(*columns).order_by(model.created_at, model.id)
+
+            if incremental:
+                cursor = await session.get(ExportCursor, table)
+                if cursor is not None:
+                    query = query.where(or_(
+                        model.created_at > cursor.last_created_at,
+                        and_(model.created_at == cursor.last_created_at, model.id > cursor.last_id)
+                    ))
+
+            kinds = [(column.name, _column_kind(column)) for column in columns]
+            if pq is not None:
+                writer = ParquetExportWriter(_export_path(f"{table}_analytics", "parquet"), kinds)
             else:
-                logger.error("❌ [exporter] Экспорт SQLite поддерживается только для SQLite баз данных")
-                raise ValueError("SQLite export only supported for SQLite databases")
-            
-            # Verify database file exists
-            if not os.path.exists(db_path):
-                logger.error(f"❌ [exporter] Файл базы данных не найден: {db_path}")
-                raise FileNotFoundError(f"Database file not found: {db_path}")
-            
-            # Create temporary dump file
+                writer = JsonLinesExportWriter(_export_path(f"{table}_analytics", "jsonl.gz"), kinds)
+            filepath = await ExportService.stream_export(session, query, writer, progress)
+
+            position = None
+            last_row = writer.last_row
+            if incremental and last_row is not None and last_row.created_at is not None:
+                position = ExportPosition(table, last_row.created_at, last_row.id)
+
+            logger.info(
+                f"✅ [exporter] Экспортировано {writer.count} строк {table} "
+                f"({'новые' if incremental else 'все'}): {filepath}"
+            )
+            return filepath, position
+
+        except Exception as e:
+            logger.error(f"❌ [exporter] Ошибка колоночного экспорта {table}: {str(e)}", exc_info=True)
+            raise
+
+    @staticmethod
+    async def save_export_cursor(session: AsyncSession, position: ExportPosition) -> None:
+        """Move a table's incremental export cursor past a delivered export"""
+        cursor = await session.get(ExportCursor, position.table)
+        if cursor is None:
+            cursor = ExportCursor(name=position.table)
+            session.add(cursor)
+        cursor.last_created_at = position.last_created_at
+        cursor.last_id = position.last_id
+        await session.commit()
+
+    @staticmethod
+    async def export_database_sqlite(db_url: str, progress: Optional[BackupProgress] = None) -> str:
+        """Export a consistent copy of the whole SQLite database, return file path"""
+        try:
+            db_path = sqlite_path_from_url(db_url)
+
+            # Create temporary backup file
             temp_dir = tempfile.gettempdir()
-            filename = f"database_dump_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.sql"
+            filename = f"database_backup_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.db"
             filepath = os.path.join(temp_dir, filename)
-            
-            # Connect and dump
-            conn = sqlite3.connect(db_path)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                for line in conn.iterdump():
-                    f.write(f'{line}\n')
-            conn.close()
-            
-            logger.info(f"✅ [exporter] База данных экспортирована в SQLite dump: {filepath}")
+
+            filepath = await asyncio.to_thread(
+                backup_sqlite_database, db_path, filepath, progress, settings.backup_compress
+            )
+
+            logger.info(f"✅ [exporter] Резервная копия базы данных создана: {filepath}")
             return filepath
-            
+
         except Exception as e:
             logger.error(f"❌ [exporter] Ошибка экспорта базы данных: {str(e)}", exc_info=True)
             raise
-    
+
     @staticmethod
     async def export_alerts_txt(
         session: AsyncSession,
         alert_type: Optional[AlertType] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        progress: Optional[ExportProgress] = None
     ) -> str:
         """Export alerts to TXT file, return file path"""
         try:
-            # Query alerts
-            query = select(Alert)
-            
-            if alert_type:
-                query = query.where(Alert.alert_type == alert_type)
-            if start_date:
-                query = query.where(Alert.created_at >= start_date)
-            if end_date:
-                query = query.where(Alert.created_at <= end_date)
-            
-            query = query.order_by(Alert.created_at.desc())
-            
-            result = await session.execute(query)
-            alerts = result.scalars().all()
-            
-            # Create temporary TXT file
-            temp_dir = tempfile.gettempdir()
-            filename = f"alerts_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.txt"
-            filepath = os.path.join(temp_dir, filename)
-            
-            with open(filepath, 'w', encoding='utf-8') as txtfile:
-                txtfile.write("=== ЭКСПОРТ АЛЕРТОВ ===\n")
-                txtfile.write(f"Сгенерирован: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                txtfile.write(f"Всего алертов: {len(alerts)}\n")
-                txtfile.write("\n" + "="*80 + "\n\n")
-                
-                for alert in alerts:
-                    txtfile.write(f"ID: {alert.id}\n")
-                    txtfile.write(f"Тип: {alert.alert_type.value}\n")
-                    if alert.title:
-                        txtfile.write(f"Заголовок: {alert.title}\n")
-                    txtfile.write(f"Описание: {alert.description}\n")
-                    txtfile.write(f"Создатель ID: {alert.creator_id}\n")
-                    txtfile.write(f"Создан: {alert.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    txtfile.write(f"Одобрен: {'Да' if alert.is_approved else 'Нет'}\n")
-                    if alert.moderator_id:
-                        txtfile.write(f"Модератор ID: {alert.moderator_id}\n")
-                    if alert.moderated_at:
-                        txtfile.write(f"Отмодерирован: {alert.moderated_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    txtfile.write(f"Активен: {'Да' if alert.is_active else 'Нет'}\n")
-                    if alert.phone:
-                        txtfile.write(f"Телефон: {alert.phone}\n")
-                    if alert.address_text:
-                        txtfile.write(f"Адрес: {alert.address_text}\n")
-                    if alert.broadcast_count:
-                        txtfile.write(f"Количество рассылок: {alert.broadcast_count}\n")
-                    if alert.broadcast_at:
-                        txtfile.write(f"Дата рассылки: {alert.broadcast_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    txtfile.write("\n" + "-"*80 + "\n\n")
-                
-                txtfile.write("=== КОНЕЦ ЭКСПОРТА ===\n")
-            
-            logger.info(f"✅ [exporter] Экспортировано {len(alerts)} алертов в TXT: {filepath}")
+            writer = TxtExportWriter(_export_path("alerts", "txt"), "ЭКСПОРТ АЛЕРТОВ", "Всего алертов", _alert_txt_lines)
+            query = ExportService._alerts_query(alert_type, start_date, end_date)
+            filepath = await ExportService.stream_export(session, query, writer, progress)
+
+            logger.info(f"✅ [exporter] Экспортировано {writer.count} алертов в TXT: {filepath}")
             return filepath
-            
+
         except Exception as e:
             logger.error(f"❌ [exporter] Ошибка экспорта алертов в TXT: {str(e)}", exc_info=True)
             raise
-    
+
     @staticmethod
     async def export_users_txt(
         session: AsyncSession,
         language: Optional[str] = None,
         citizenship: Optional[str] = None,
-        is_courier: Optional[bool] = None
+        is_courier: Optional[bool] = None,
+        progress: Optional[ExportProgress] = None
     ) -> str:
         """Export users to TXT file, return file path"""
         try:
-            # Query users
-            query = select(User)
-            
-            if language:
-                query = query.where(User.language == language)
-            if citizenship:
-                query = query.where(User.citizenship == citizenship)
-            if is_courier is not None:
-                query = query.where(User.is_courier == is_courier)
-            
-            query = query.order_by(User.created_at.desc())
-            
-            result = await session.execute(query)
-            users = result.scalars().all()
-            
-            # Create temporary TXT file
-            temp_dir = tempfile.gettempdir()
-            filename = f"users_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.txt"
-            filepath = os.path.join(temp_dir, filename)
-            
-            with open(filepath, 'w', encoding='utf-8') as txtfile:
-                txtfile.write("=== ЭКСПОРТ ПОЛЬЗОВАТЕЛЕЙ ===\n")
-                txtfile.write(f"Сгенерирован: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                txtfile.write(f"Всего пользователей: {len(users)}\n")
-                txtfile.write("\n" + "="*80 + "\n\n")
-                
-                for user in users:
-                    txtfile.write(f"ID: {user.id}\n")
-                    txtfile.write(f"Telegram ID: {user.telegram_id}\n")
-                    if user.username:
-                        txtfile.write(f"Username: @{user.username}\n")
-                    if user.first_name:
-                        txtfile.write(f"Имя: {user.first_name}\n")
-                    if user.phone:
-                        txtfile.write(f"Телефон: {user.phone}\n")
-                    txtfile.write(f"Язык: {user.language}\n")
-                    if user.citizenship:
-                        txtfile.write(f"Гражданство: {user.citizenship}\n")
-                    txtfile.write(f"Админ: {'Да' if user.is_admin else 'Нет'}\n")
-                    txtfile.write(f"Курьер: {'Да' if user.is_courier else 'Нет'}\n")
-                    txtfile.write(f"Заблокирован: {'Да' if user.is_banned else 'Нет'}\n")
-                    txtfile.write(f"Зарегистрирован: {user.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    if user.last_active:
-                        txtfile.write(f"Последняя активность: {user.last_active.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    txtfile.write("\n" + "-"*80 + "\n\n")
-                
-                txtfile.write("=== КОНЕЦ ЭКСПОРТА ===\n")
-            
-            logger.info(f"✅ [exporter] Экспортировано {len(users)} пользователей в TXT: {filepath}")
+            writer = TxtExportWriter(
+                _export_path("users", "txt"), "ЭКСПОРТ ПОЛЬЗОВАТЕЛЕЙ", "Всего пользователей", _user_txt_lines
+            )
+            query = ExportService._users_query(language, citizenship, is_courier)
+            filepath = await ExportService.stream_export(session, query, writer, progress)
+
+            logger.info(f"✅ [exporter] Экспортировано {writer.count} пользователей в TXT: {filepath}")
             return filepath
-            
+
         except Exception as e:
             logger.error(f"❌ [exporter] Ошибка экспорта пользователей в TXT: {str(e)}", exc_info=True)
             raise
-    
+
     @staticmethod
     async def export_deliveries_txt(
         session: AsyncSession,
         status: Optional[str] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        progress: Optional[ExportProgress] = None
     ) -> str:
         """Export deliveries to TXT file, return file path"""
         try:
-            # Query deliveries
-            query = select(Delivery)
-            
-            if status:
-                query = query.where(Delivery.status == status)
-            if start_date:
-                query = query.where(Delivery.created_at >= start_date)
-            if end_date:
-                query = query.where(Delivery.created_at <= end_date)
-            
-            query = query.order_by(Delivery.created_at.desc())
-            
-            result = await session.execute(query)
-            deliveries = result.scalars().all()
-            
-            # Create temporary TXT file
-            temp_dir = tempfile.gettempdir()
-            filename = f"deliveries_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.txt"
-            filepath = os.path.join(temp_dir, filename)
-            
-            with open(filepath, 'w', encoding='utf-8') as txtfile:
-                txtfile.write("=== ЭКСПОРТ ДОСТАВОК ===\n")
-                txtfile.write(f"Сгенерирован: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                txtfile.write(f"Всего доставок: {len(deliveries)}\n")
-                txtfile.write("\n" + "="*80 + "\n\n")
-                
-                for delivery in deliveries:
-                    txtfile.write(f"ID: {delivery.id}\n")
-                    txtfile.write(f"Описание: {delivery.description}\n")
-                    txtfile.write(f"Создатель ID: {delivery.creator_id}\n")
-                    if delivery.courier_id:
-                        txtfile.write(f"Курьер ID: {delivery.courier_id}\n")
-                    txtfile.write(f"Статус: {delivery.status}\n")
-                    txtfile.write(f"Телефон: {delivery.phone}\n")
-                    if delivery.address_text:
-                        txtfile.write(f"Адрес: {delivery.address_text}\n")
-                    txtfile.write(f"Создан: {delivery.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    if delivery.assigned_at:
-                        txtfile.write(f"Назначен: {delivery.assigned_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    if delivery.completed_at:
-                        txtfile.write(f"Завершен: {delivery.completed_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    txtfile.write("\n" + "-"*80 + "\n\n")
-                
-                txtfile.write("=== КОНЕЦ ЭКСПОРТА ===\n")
-            
-            logger.info(f"✅ [exporter] Экспортировано {len(deliveries)} доставок в TXT: {filepath}")
+            writer = TxtExportWriter(
+                _export_path("deliveries", "txt"), "ЭКСПОРТ ДОСТАВОК", "Всего доставок", _delivery_txt_lines
+            )
+            query = ExportService._deliveries_query(status, start_date, end_date)
+            filepath = await ExportService.stream_export(session, query, writer, progress)
+
+            logger.info(f"✅ [exporter] Экспортировано {writer.count} доставок в TXT: {filepath}")
             return filepath
-            
+
         except Exception as e:
             logger.error(f"❌ [exporter] Ошибка экспорта доставок в TXT: {str(e)}", exc_info=True)
             raise
-    
+
     @staticmethod
     def cleanup_export_file(filepath: str) -> bool:
         """Delete export file after sending"""
@@ -0,0 +1,79 @@
+"""
+Fast boot
+Restarts skip the schema check and seeding while neither the models, the
+migrations nor the seed data changed since the last full boot
+"""
+
+import hashlib
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import AsyncSessionLocal, Base, init_db
+from models import AppState
+from utils.logger import logger
+from utils.migrations import head_revision
+
+BOOT_MARKER_KEY = "boot_marker"
+
+
+def schema_fingerprint() -> str:
+    """Hash of the tables, columns and indexes declared by the models"""
+    digest = hashlib.sha1()
+    for table in Base.metadata.sorted_tables:
+        digest.update(table.name.encode())
+        for column in table.columns:
+            digest.update(f"|{column.name}:{column.type!r}:{column.nullable}".encode())
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            digest.update(f"|{index.name}".encode())
+    return digest.hexdigest()[:16]
+
+
+def boot_marker(seed_version: int) -> str:
+    return f"seed-{seed_version}:schema-{schema_fingerprint()}:revision-{head_revision()}"
+
+
+async def read_boot_marker() -> Optional[str]:
+    """Marker of the last full boot; None on a new database"""
+    try:
+        async with AsyncSessionLocal() as session:
+            state = await session.get(AppState, BOOT_MARKER_KEY)
+            return state.value if state is not None else None
+    except SQLAlchemyError:
+        return None
+
+
+async def save_boot_marker(marker: str) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.merge(AppState(key=BOOT_MARKER_KEY, value=marker))
+        await session.commit()
+
+
+async def prepare_database(
+    seed: Callable[[], Awaitable[None]],
+    seed_version: int,
+    fast: bool = False
+) -> bool:
+    """
+    Create or migrate the schema and seed initial data.
+
+    With ``fast`` both steps are skipped when the marker written by the
+    previous full boot matches the current models, head revision and seed
+    version.
+    Returns True when the boot was fast.
+    """
+    marker = boot_marker(seed_version)
+    if fast and await read_boot_marker() == marker:
+        logger.info("Быстрый запуск: схема и начальные данные не изменились")
+        return True
+
+    logger.info("Initializing database...")
+    await init_db()
+    logger.info("Database schema is up to date")
+
+    logger.info("Seeding initial data...")
+    await seed()
+    logger.info("Initial data seeding completed")
+
+    await save_boot_marker(marker)
+    return False
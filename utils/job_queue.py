@@ -0,0 +1,397 @@
+"""
+Database-backed queue of background jobs
+Lets web/bot processes hand broadcasts and other heavy work over to
+separate job worker processes; the database is the only coordination point
+"""
+
+import asyncio
+import importlib
+import json
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+from sqlalchemy import and_, func, select, update
+
+from config import settings
+from database import AsyncSessionLocal
+from models import BackgroundJob
+from utils.logger import logger
+from utils.metrics import metrics
+
+JOB_QUEUED = "queued"
+# Taken by a worker but waiting for a free slot of its group there
+JOB_CLAIMED = "claimed"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Job functions are only imported from the application's own packages
+JOB_MODULE_PREFIXES = ("bots.", "services.", "utils.", "webapp.")
+
+_registry: Dict[str, Callable[..., Awaitable[Any]]] = {}
+# Queued jobs per group, refreshed whenever metrics are collected
+queued_jobs: Dict[str, int] = {}
+
+
+def background_job(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Mark a coroutine function as runnable in a job worker process"""
+    name = f"{func.__module__}:{func.__qualname__}"
+    _registry[name] = func
+    func.__background_job__ = name
+    return func
+
+
+def job_name(func: Callable[..., Any]) -> Optional[str]:
+    return getattr(func, "__background_job__", None)
+
+
+def resolve_job(name: str) -> Optional[Callable[..., Awaitable[Any]]]:
+    """Find a registered job function, importing its module if needed"""
+    func = _registry.get(name)
+    if func is None:
+        module_name = name.partition(":")[0]
+        if module_name.startswith(JOB_MODULE_PREFIXES):
+            importlib.import_module(module_name)
+            func = _registry.get(name)
+    return func
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def enqueue_job(
+    group: str,
+    func: Callable[..., Awaitable[Any]],
+    args: Sequence[Any] = (),
+    kwargs: Optional[Dict[str, Any]] = None,
+    with_session: bool = False
+) -> int:
+    """Queue a @background_job call; arguments must be JSON serialisable"""
+    name = job_name(func)
+    if name is None:
+        raise ValueError(f"{func.__name__} is not a background job")
+
+    payload = {"args": list(args), "kwargs": kwargs or {}, "with_session": with_session}
+    json.dumps(payload)  # fail here rather than in the worker
+
+    async with AsyncSessionLocal() as session:
+        job = BackgroundJob(group=group, func=name, payload=payload, status=JOB_QUEUED)
+        session.add(job)
+        await session.commit()
+        return job.id
+
+
+async def claim_jobs(
+    worker_id: str,
+    groups: Sequence[str],
+    limit: int,
+    exclude_groups: Sequence[str] = (),
+    group_slots: Optional[Callable[[str], int]] = None
+) -> List[BackgroundJob]:
+    """
+    Atomically take up to limit queued jobs.
+
+    Each job is claimed with a conditional UPDATE, so when several workers
+    race for the same row exactly one of them gets it. ``group_slots``
+    caps the jobs taken per group, leaving the rest to other workers.
+    """
+    if limit <= 0:
+        return []
+
+    async with AsyncSessionLocal() as session:
+        stmt = select(BackgroundJob.id, BackgroundJob.group).where(BackgroundJob.status == JOB_QUEUED)
+        if groups:
+            stmt = stmt.where(BackgroundJob.group.in_(groups))
+        if exclude_groups:
+            stmt = stmt.where(BackgroundJob.group.not_in(exclude_groups))
+        result = await session.execute(stmt.order_by(BackgroundJob.id).limit(limit))
+        candidates = result.all()
+
+        claimed = []
+        taken: Dict[str, int] = {}
+        for job_id, group in candidates:
+            if group_slots is not None and taken.get(group, 0) >= group_slots(group):
+                continue
+            result = await session.execute(
+                update(BackgroundJob)
+                .where(and_(BackgroundJob.id == job_id, BackgroundJob.status == JOB_QUEUED))
+                .values(status=JOB_CLAIMED, worker_id=worker_id, heartbeat_at=datetime.utcnow())
+            )
+            await session.commit()
+            if result.rowcount == 1:
+                claimed.append(job_id)
+                taken[group] = taken.get(group, 0) + 1
+
+        if not claimed:
+            return []
+        result = await session.execute(
+            select(BackgroundJob).where(BackgroundJob.id.in_(claimed)).order_by(BackgroundJob.id)
+        )
+        return list(result.scalars().all())
+
+
+async def start_job(job_id: int, worker_id: str) -> bool:
+    """
+    Mark a claimed job as running; False when the worker no longer holds
+    it (released on shutdown or requeued after missed heartbeats)
+    """
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(BackgroundJob)
+            .where(and_(
+                BackgroundJob.id == job_id,
+                BackgroundJob.worker_id == worker_id,
+                BackgroundJob.status == JOB_CLAIMED
+            ))
+            .values(status=JOB_RUNNING, started_at=now, heartbeat_at=now, attempts=BackgroundJob.attempts + 1)
+        )
+        await session.commit()
+        return result.rowcount == 1
+
+
+async def finish_job(job_id: int, error: Optional[str] = None) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job_id)
+            .values(
+                status=JOB_FAILED if error else JOB_DONE,
+                error=error,
+                finished_at=datetime.utcnow()
+            )
+        )
+        await session.commit()
+
+
+async def release_jobs(
+    worker_id: str,
+    job_ids: Sequence[int],
+    statuses: Sequence[str] = (JOB_CLAIMED,)
+) -> int:
+    """Put jobs held by this worker back into the queue"""
+    if not job_ids:
+        return 0
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(BackgroundJob)
+            .where(and_(
+                BackgroundJob.id.in_(list(job_ids)),
+                BackgroundJob.worker_id == worker_id,
+                BackgroundJob.status.in_(list(statuses))
+            ))
+            .values(status=JOB_QUEUED, worker_id=None, started_at=None, heartbeat_at=None)
+        )
+        await session.commit()
+        return result.rowcount or 0
+
+
+async def heartbeat_jobs(worker_id: str) -> None:
+    """Show that the jobs held by this worker are still alive"""
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(BackgroundJob)
+            .where(and_(
+                BackgroundJob.worker_id == worker_id,
+                BackgroundJob.status.in_([JOB_CLAIMED, JOB_RUNNING])
+            ))
+            .values(heartbeat_at=datetime.utcnow())
+        )
+        await session.commit()
+
+
+async def requeue_stale_jobs(timeout: float, max_attempts: int) -> int:
+    """
+    Give jobs of crashed workers back to the queue (or fail them after
+    max_attempts). A job is stale when its worker stopped refreshing the
+    heartbeat, however long the job itself has been running.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    stale = and_(
+        BackgroundJob.status.in_([JOB_CLAIMED, JOB_RUNNING]),
+        # Rows claimed before the heartbeat column existed
+        func.coalesce(BackgroundJob.heartbeat_at, BackgroundJob.started_at) < cutoff
+    )
+
+    async with AsyncSessionLocal() as session:
+        requeued = await session.execute(
+            update(BackgroundJob)
+            .where(stale, BackgroundJob.attempts < max_attempts)
+            .values(status=JOB_QUEUED, worker_id=None, started_at=None, heartbeat_at=None)
+        )
+        await session.execute(
+            update(BackgroundJob)
+            .where(stale, BackgroundJob.attempts >= max_attempts)
+            .values(status=JOB_FAILED, error="worker lost", finished_at=datetime.utcnow())
+        )
+        await session.commit()
+
+    if requeued.rowcount:
+        logger.warning(f"Возвращено в очередь зависших фоновых задач: {requeued.rowcount}")
+    return requeued.rowcount or 0
+
+
+async def count_queued_jobs() -> Dict[str, int]:
+    """Jobs waiting for a worker, per group"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(BackgroundJob.group, func.count(BackgroundJob.id))
+            .where(BackgroundJob.status == JOB_QUEUED)
+            .group_by(BackgroundJob.group)
+        )
+        return dict(result.all())
+
+
+@metrics.on_collect
+async def refresh_queued_jobs() -> None:
+    counts = await count_queued_jobs()
+    queued_jobs.clear()
+    queued_jobs.update(counts)
+
+
+class JobWorker:
+    """
+    Runs queued jobs of this process.
+
+    Jobs are executed through the local TaskSupervisor, so the per-group
+    concurrency limits apply inside every worker process as well. A worker
+    only claims as many jobs of a group as it has free slots for; the rest
+    stay queued for other workers. Claimed jobs are marked running when
+    they get a slot, and the worker refreshes their heartbeat until they
+    finish.
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        groups: Sequence[str] = (),
+        poll_interval: float = 1.0,
+        stale_timeout: float = 600.0,
+        max_attempts: int = 3
+    ):
+        self.worker_id = worker_id or default_worker_id()
+        self.groups = list(groups)
+        self.poll_interval = poll_interval
+        self.stale_timeout = stale_timeout
+        self.max_attempts = max_attempts
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        # Jobs claimed and not finished: job id → group
+        self._claimed: Dict[int, str] = {}
+        self._started: Set[int] = set()
+
+    def _free_slots(self, group: str) -> int:
+        from utils.task_supervisor import supervisor
+
+        held = sum(1 for claimed_group in self._claimed.values() if claimed_group == group)
+        return supervisor.group(group).limit - held
+
+    async def _execute(self, job_id: int, name: str, payload: Dict[str, Any]) -> None:
+        try:
+            if not await start_job(job_id, self.worker_id):
+                logger.warning(f"Фоновая задача #{job_id} ({name}) больше не закреплена за {self.worker_id}, пропускаем")
+                return
+            self._started.add(job_id)
+            await self._run_job(job_id, name, payload)
+        finally:
+            self._claimed.pop(job_id, None)
+            self._started.discard(job_id)
+
+    async def _run_job(self, job_id: int, name: str, payload: Dict[str, Any]) -> None:
+        self.running += 1
+        error = None
+        try:
+            func = resolve_job(name)
+            if func is None:
+                raise LookupError(f"unknown background job {name}")
+            kwargs = dict(payload.get("kwargs") or {})
+            if payload.get("with_session"):
+                async with AsyncSessionLocal() as session:
+                    await func(*payload.get("args", []), session=session, **kwargs)
+            else:
+                await func(*payload.get("args", []), **kwargs)
+            self.completed += 1
+        except asyncio.CancelledError:
+            # Interrupted by shutdown: another worker runs it again
+            self.running -= 1
+            await release_jobs(self.worker_id, [job_id], statuses=(JOB_RUNNING,))
+            logger.warning(f"Фоновая задача #{job_id} ({name}) прервана и возвращена в очередь")
+            raise
+        except Exception as e:
+            self.failed += 1
+            error = f"{type(e).__name__}: {e}"
+            logger.error(f"❌ Ошибка фоновой задачи #{job_id} ({name}): {str(e)}", exc_info=True)
+        self.running -= 1
+        await finish_job(job_id, error)
+
+    async def run_once(self, capacity: int = 16) -> int:
+        """Claim and start available jobs; returns how many were claimed"""
+        from utils.task_supervisor import supervisor
+
+        full_groups = sorted({group for group in self._claimed.values() if self._free_slots(group) <= 0})
+        jobs = await claim_jobs(
+            self.worker_id,
+            self.groups,
+            capacity - len(self._claimed),
+            exclude_groups=full_groups,
+            group_slots=self._free_slots
+        )
+        for job in jobs:
+            self._claimed[job.id] = job.group
+            if supervisor.spawn(job.group, self._execute, job.id, job.func, job.payload) is None:
+                # The supervisor is shutting down
+                self._claimed.pop(job.id, None)
+                await release_jobs(self.worker_id, [job.id])
+        return len(jobs)
+
+    async def release_waiting(self) -> int:
+        """Return claimed jobs that have not started yet to the queue"""
+        waiting = [job_id for job_id in self._claimed if job_id not in self._started]
+        return await release_jobs(self.worker_id, waiting)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        logger.info(f"Обработчик фоновых задач {self.worker_id} запущен (группы: {self.groups or 'все'})")
+        metrics.gauge("background_jobs_running", "Queued jobs running in this worker", lambda: self.running)
+        metrics.gauge("background_jobs_claimed", "Queued jobs held by this worker", lambda: len(self._claimed))
+        last_sweep = 0.0
+        loop = asyncio.get_running_loop()
+        try:
+            while not stop.is_set():
+                try:
+                    if loop.time() - last_sweep >= self.stale_timeout / 4:
+                        last_sweep = loop.time()
+                        await heartbeat_jobs(self.worker_id)
+                        await requeue_stale_jobs(self.stale_timeout, self.max_attempts)
+                    started = await self.run_once()
+                except Exception as e:
+                    started = 0
+                    logger.error(f"❌ Ошибка очереди фоновых задач: {str(e)}", exc_info=True)
+                if not started:
+                    try:
+                        await asyncio.wait_for(stop.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            # Jobs still waiting for a slot go to other workers instead of
+            # being cancelled by the shutdown drain
+            try:
+                released = await self.release_waiting()
+                if released:
+                    logger.info(f"Возвращено в очередь невыполненных фоновых задач: {released}")
+            except Exception as e:
+                logger.error(f"❌ Не удалось вернуть фоновые задачи в очередь: {str(e)}", exc_info=True)
+
+
+def create_job_worker(worker_id: Optional[str] = None) -> JobWorker:
+    """Create a worker configured by BACKGROUND_JOB_* settings"""
+    return JobWorker(
+        worker_id=worker_id,
+        groups=settings.background_job_groups_list,
+        poll_interval=settings.background_job_poll_interval,
+        stale_timeout=settings.background_job_stale_timeout,
+        max_attempts=settings.background_job_max_attempts
+    )
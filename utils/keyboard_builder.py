@@ -47,9 +47,15 @@ class KeyboardBuilder:
 
     @staticmethod
     def main_menu_keyboard(language: str = "RU") -> ReplyKeyboardMarkup:
-        """Build main menu keyboard"""
+        """Build main menu keyboard (cached per language)"""
         from locales import t
+        from utils.keyboard_cache import keyboard_cache
         
+        markup = keyboard_cache.get("builder_main_menu", language)
+        if markup is not None:
+            return markup
+        
+        version = keyboard_cache.version
         buttons = [
             t("menu_categories", language),
             t("menu_services", language),
@@ -60,7 +66,8 @@ class KeyboardBuilder:
             t("menu_help", language)
         ]
         
-        return KeyboardBuilder.reply_keyboard(buttons, row_width=2)
+        markup = KeyboardBuilder.reply_keyboard(buttons, row_width=2)
+        return keyboard_cache.put("builder_main_menu", language, markup, version)
 
     @staticmethod
     def admin_menu_keyboard(language: str = "RU") -> ReplyKeyboardMarkup:
@@ -0,0 +1,90 @@
+"""
+Per-language cache of static keyboards
+Markups built from the menu tables are reused until a MainMenuButton,
+MenuItem or MainMenu row is committed
+"""
+
+import time
+from itertools import chain
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import MainMenu, MainMenuButton, MenuItem
+from utils.logger import logger
+from utils.metrics import metrics
+
+MENU_MODELS = (MainMenuButton, MenuItem, MainMenu)
+
+_CHANGED_FLAG = "menu_keyboards_changed"
+
+
+class KeyboardCache:
+    """
+    Markups keyed by (keyboard name, language).
+
+    Every invalidation bumps ``version``; a markup built from data read
+    before the bump is not stored, so a slow build can never put a stale
+    keyboard back into the cache. A non-zero ``ttl`` bounds the age of
+    entries when other processes may change the menu.
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self._markups: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._markups)
+
+    def get(self, name: str, lang: str) -> Optional[Any]:
+        entry = self._markups.get((name, lang))
+        if entry is None or (self.ttl and time.monotonic() - entry[1] >= self.ttl):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def put(self, name: str, lang: str, markup: Any, version: int) -> Any:
+        if version == self.version:
+            self._markups[(name, lang)] = (markup, time.monotonic())
+        return markup
+
+    async def get_or_build(self, name: str, lang: str, build: Callable[[], Awaitable[Any]]) -> Any:
+        markup = self.get(name, lang)
+        if markup is None:
+            version = self.version
+            markup = self.put(name, lang, await build(), version)
+        return markup
+
+    def invalidate(self) -> None:
+        self.version += 1
+        if self._markups:
+            logger.debug(f"Кэш клавиатур сброшен (версия {self.version})")
+        self._markups.clear()
+
+
+keyboard_cache = KeyboardCache(ttl=settings.menu_cache_ttl)
+metrics.gauge("bot_keyboard_cache_entries", "Cached keyboard markups", lambda: len(keyboard_cache))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_menu_changes(session: Session, flush_context) -> None:
+    # new/dirty/deleted still hold the pre-flush state here
+    if any(isinstance(obj, MENU_MODELS) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info[_CHANGED_FLAG] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop(_CHANGED_FLAG, False):
+        keyboard_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_changes(session: Session) -> None:
+    session.info.pop(_CHANGED_FLAG, None)
@@ -1,5 +1,15 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict
 from config import settings
 
 
@@ -38,21 +48,147 @@ class RussianFormatter(logging.Formatter):
         return base_line
 
 
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-запись на строку для сборщиков логов"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+            "process": record.process,
+            "message": record.getMessage()
+        }
+        sample_rate = getattr(record, "sample_rate", None)
+        if sample_rate is not None:
+            # One kept record stands for 1 / sample_rate calls
+            entry["sample_rate"] = sample_rate
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """'main_menu_service:0.01,statistics_service.track_button_click:0.1' → {key: rate}"""
+    rates = {}
+    for item in value.split(","):
+        key, _, rate = item.strip().rpartition(":")
+        if key:
+            rates[key.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает только долю INFO/DEBUG записей горячих модулей
+    Keeps a fraction of INFO and DEBUG records per module or module.function;
+    warnings and errors always pass
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        rate = self.rates.get(f"{record.module}.{record.funcName}")
+        if rate is None:
+            rate = self.rates.get(record.module)
+        if rate is None:
+            return True
+        record.sample_rate = rate
+        return random.random() < rate
+
+
+class _LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    Only renders the message in the calling thread; exception info is kept
+    for the formatters, which run on the listener thread
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def log_file_path() -> str:
+    """
+    LOG_FILE, with the process name added for a cluster.py process: rotation
+    renames the file, which only works with a single writer. Workers the
+    process starts itself (uvicorn) add their pid.
+    """
+    name = settings.log_process_name
+    if not name:
+        return settings.log_file
+    if os.environ.get("LOG_PROCESS_PID") != str(os.getpid()):
+        name = f"{name}-{os.getpid()}"
+    path = Path(settings.log_file)
+    return str(path.with_name(f"{path.stem}.{name}{path.suffix}"))
+
+
+def _file_handler() -> logging.Handler:
+    filename = log_file_path()
+    rotation = settings.log_rotation.lower()
+    if rotation == "size":
+        return logging.handlers.RotatingFileHandler(
+            filename,
+            maxBytes=settings.log_max_bytes,
+            backupCount=settings.log_backup_count,
+            encoding="utf-8"
+        )
+    if rotation == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            filename,
+            when=settings.log_rotate_when,
+            backupCount=settings.log_backup_count,
+            encoding="utf-8"
+        )
+    return logging.FileHandler(filename, encoding="utf-8")
+
+
 def setup_logger():
+    """
+    Записи попадают в очередь, а в консоль и файл их пишет фоновый поток
+    Records go to a queue; a background thread formats and writes them, so
+    logging never blocks the event loop on disk or terminal I/O
+    """
     logger = logging.getLogger("bot")
     logger.setLevel(getattr(logging, settings.log_level.upper(), logging.INFO))
 
-    formatter = RussianFormatter()
+    formatter = JsonFormatter() if settings.log_format.lower() == "json" else RussianFormatter()
 
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
 
-    file_handler = logging.FileHandler(settings.log_file, encoding="utf-8")
+    file_handler = _file_handler()
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _LogQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(settings.log_sample_rates)))
+    logger.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    listener.start()
+    # Stopping the listener writes out the records still in the queue
+    atexit.register(listener.stop)
 
     return logger
 
 
+def setup_access_logger(parent: logging.Logger) -> logging.Logger:
+    """
+    Логгер HTTP-доступа: записи идут через очередь родительского логгера
+    Access logger sharing the parent's queue and writer thread
+    """
+    return parent.getChild("http")
+
+
 logger = setup_logger()
+access_logger = setup_access_logger(logger)
@@ -0,0 +1,64 @@
+"""
+Versioned cache of the user main-menu model
+Read-only menu rows for the user bot, dropped by every admin mutation in
+MenuService, DynamicMenuService and MainMenuService
+"""
+
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from config import settings
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+class MenuCache:
+    """
+    Results of user-facing menu queries keyed by query name.
+
+    Cached rows are detached ORM objects with their relationships already
+    loaded; callers must treat them as read-only. Admin screens read with
+    ``include_inactive``/``active_only=False`` and bypass the cache, so they
+    always see the database. ``invalidate`` bumps ``version``; a load that
+    started before the bump is returned to its caller but not stored.
+
+    Invalidation only reaches the current process; with several worker
+    processes a ``ttl`` bounds how long the others serve an old menu.
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None and (not self.ttl or time.monotonic() - entry[1] < self.ttl):
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        version = self.version
+        value = await load()
+        if version == self.version:
+            self._entries[key] = (value, time.monotonic())
+        return value
+
+    def invalidate(self, reason: str) -> None:
+        self.version += 1
+        self._entries.clear()
+        logger.debug(f"Кэш меню сброшен: {reason} (версия {self.version})")
+
+
+menu_cache = MenuCache(ttl=settings.menu_cache_ttl)
+metrics.gauge("menu_cache_version", "Version of the cached user main menu", lambda: menu_cache.version)
+metrics.gauge(
+    "menu_cache_hit_rate",
+    "Menu cache lookup hit rate",
+    lambda: menu_cache.hits / (menu_cache.hits + menu_cache.misses) if menu_cache.hits + menu_cache.misses else 0.0
+)
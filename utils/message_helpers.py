@@ -2,7 +2,6 @@
 Message Helper Utilities
 Auto-delete messages, button layouts, and keyboard management
 """
-import asyncio
 from typing import Optional, List, Union
 from aiogram import Bot
 from aiogram.types import (
@@ -13,6 +12,7 @@ from aiogram.types import (
     Message,
     ReplyKeyboardMarkup
 )
+from utils.deletion_scheduler import deletion_scheduler
 from utils.logger import logger
 
 
@@ -43,9 +43,7 @@ async def send_menu_auto_delete(
     )
     
     # Schedule deletion
-    asyncio.create_task(
-        delete_message_later(bot, chat_id, msg.message_id, delete_after)
-    )
+    deletion_scheduler.schedule(bot, chat_id, msg.message_id, delete_after)
     
     return msg
 
@@ -59,19 +57,16 @@ async def delete_message_later(
     """
     Delete message after delay
     
+    Returns immediately: the deletion is handed to the shared
+    deletion scheduler, which survives restarts.
+    
     Args:
         bot: Bot instance
         chat_id: Chat ID
         message_id: Message ID to delete
         delay: Delay in seconds
     """
-    await asyncio.sleep(delay)
-    try:
-        await bot.delete_message(chat_id=chat_id, message_id=message_id)
-        logger.info(f"✅ Сообщение {message_id} удалено автоматически")
-    except Exception as e:
-        # Message may have been already deleted or is too old
-        logger.debug(f"⚠️ Не удалось удалить сообщение {message_id}: {str(e)}")
+    deletion_scheduler.schedule(bot, chat_id, message_id, delay)
 
 
 async def delete_message_immediately(
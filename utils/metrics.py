@@ -0,0 +1,216 @@
+"""
+In-process metrics - latency histograms with labels and callback gauges,
+rendered in the Prometheus text format
+"""
+
+import asyncio
+import math
+import threading
+from bisect import bisect_left
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils.logger import logger
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; roughly exponential from 5ms to 10s
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Histogram:
+    """Cumulative-bucket histogram compatible with the Prometheus model"""
+
+    __slots__ = ("buckets", "bucket_counts", "count", "sum")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # Last slot counts observations above the largest bucket (+Inf)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self) -> Iterator[Tuple[float, int]]:
+        """Yield (upper_bound, cumulative_count) pairs, ending with +Inf"""
+        total = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), self.bucket_counts):
+            total += bucket_count
+            yield bound, total
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate quantile as the upper bound of the bucket holding it"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, cumulative in self.cumulative_counts():
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+class HistogramFamily:
+    """Set of histograms sharing a name and label names"""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple[str, ...], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            histogram = self._children.get(labels)
+            if histogram is None:
+                histogram = self._children[labels] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def items(self) -> Iterator[Tuple[Tuple[str, ...], Histogram]]:
+        with self._lock:
+            return iter(list(self._children.items()))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._children.clear()
+
+
+class CallbackGauge:
+    """Gauge whose value is read from a callback when collected"""
+
+    __slots__ = ("name", "description", "callback")
+
+    def __init__(self, name: str, description: str, callback: Callable[[], float]):
+        self.name = name
+        self.description = description
+        self.callback = callback
+
+    def value(self) -> float:
+        return float(self.callback())
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label(str(value))}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+class MetricsRegistry:
+    """Process-wide registry of metric families"""
+
+    def __init__(self):
+        self._histograms: Dict[str, HistogramFamily] = {}
+        self._gauges: Dict[str, CallbackGauge] = {}
+        self._collectors: List[Callable[[], Awaitable[None]]] = []
+        self._lock = threading.Lock()
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> HistogramFamily:
+        """Get or create a histogram family"""
+        with self._lock:
+            family = self._histograms.get(name)
+            if family is None:
+                family = self._histograms[name] = HistogramFamily(name, description, label_names, buckets)
+            return family
+
+    def histograms(self) -> Iterator[HistogramFamily]:
+        with self._lock:
+            return iter(list(self._histograms.values()))
+
+    def gauge(self, name: str, description: str, callback: Callable[[], float]) -> CallbackGauge:
+        """Register (or replace) a gauge computed by callback"""
+        with self._lock:
+            gauge = self._gauges[name] = CallbackGauge(name, description, callback)
+            return gauge
+
+    def gauges(self) -> Iterator[CallbackGauge]:
+        with self._lock:
+            return iter(list(self._gauges.values()))
+
+    def on_collect(self, collector: Callable[[], Awaitable[None]]) -> Callable[[], Awaitable[None]]:
+        """
+        Register a coroutine function run before every collection, for
+        values that need I/O (gauge callbacks must not block)
+        """
+        with self._lock:
+            self._collectors.append(collector)
+        return collector
+
+    async def collect(self, timeout: float = 5.0) -> None:
+        """Run the collectors; a failing or slow collector leaves its gauges stale"""
+        with self._lock:
+            collectors = list(self._collectors)
+        if not collectors:
+            return
+        results = await asyncio.gather(
+            *(asyncio.wait_for(collector(), timeout) for collector in collectors),
+            return_exceptions=True
+        )
+        for collector, result in zip(collectors, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Сборщик метрик {collector.__name__} не выполнен: {result!r}")
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for family in sorted(self.histograms(), key=lambda family: family.name):
+            lines.append(f"# HELP {family.name} {_escape_help(family.description)}")
+            lines.append(f"# TYPE {family.name} histogram")
+            # Under the family lock the buckets of a series always add up to its count
+            with family._lock:
+                for labels, histogram in sorted(family._children.items()):
+                    for bound, cumulative in histogram.cumulative_counts():
+                        bucket_labels = _labels(family.label_names + ("le",), labels + (_format_value(bound),))
+                        lines.append(f"{family.name}_bucket{bucket_labels} {cumulative}")
+                    series_labels = _labels(family.label_names, labels)
+                    lines.append(f"{family.name}_sum{series_labels} {_format_value(histogram.sum)}")
+                    lines.append(f"{family.name}_count{series_labels} {histogram.count}")
+
+        for gauge in sorted(self.gauges(), key=lambda gauge: gauge.name):
+            try:
+                value = gauge.value()
+            except Exception:
+                # The object behind the callback is gone or not ready yet
+                continue
+            lines.append(f"# HELP {gauge.name} {_escape_help(gauge.description)}")
+            lines.append(f"# TYPE {gauge.name} gauge")
+            lines.append(f"{gauge.name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,315 @@
+"""
+Schema migrations
+Brings the database to the newest Alembic revision at startup and provides
+online-safe operations for migration scripts
+
+    python -m utils.migrations current|check|upgrade|downgrade REV|stamp REV
+
+A new database is created from the models and stamped with the head
+revision. A database created by the old create_all boot (tables, but no
+alembic_version) is stamped with the newest revision whose tables and
+columns (REVISION_OBJECTS) are all present and then upgraded as usual.
+Every later schema change goes through a revision in alembic/versions
+and adds its tables and columns to REVISION_OBJECTS.
+
+Online-safe migrations: revisions run in separate transactions and wait at
+most DB_MIGRATION_LOCK_TIMEOUT seconds for a lock instead of queueing the
+bots' queries behind them. Long work should use the helpers below:
+create_index_online builds Postgres indexes CONCURRENTLY, and
+backfill_in_batches commits every DB_MIGRATION_BATCH_SIZE rows so writers
+are never blocked for long. SQLite locks the whole database while building
+an index; readers keep working in WAL mode.
+"""
+
+import argparse
+import asyncio
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from alembic import command, op
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, pool, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import models  # noqa: F401 - registers every table on Base.metadata
+from config import settings
+from database import Base
+from utils.logger import logger
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MIGRATIONS_DIR = PROJECT_ROOT / "alembic"
+
+
+# Tables and table.columns each revision adds after the baseline, used to
+# recognise the revision of a database without alembic_version. A revision
+# missing here is never assumed to be applied
+REVISION_OBJECTS: Dict[str, Sequence[str]] = {
+    "e1a7c3f40026": ("webapp_files.variants",),
+    "f2b8d4a50029": ("webapp_categories.version",),
+    "a3c9e5b60032": ("fsm_storage",),
+    "b4d1f6c70035": ("scheduled_deletions",),
+    "c5e2a7d80040": ("background_jobs",),
+    "d6f3b8e90044": ("export_cursors",),
+    "e7a4c9fa0047": ("app_state",),
+    "f8b5dab10040": ("background_jobs.heartbeat_at",),
+}
+
+
+class SchemaRevisionError(RuntimeError):
+    """The database schema does not match the code"""
+
+
+def alembic_config() -> Config:
+    config = Config(str(PROJECT_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return config
+
+
+@lru_cache(maxsize=1)
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def set_lock_timeout(connection: Connection) -> None:
+    """Make DDL give up on a busy lock instead of stalling the application"""
+    timeout_ms = int(settings.db_migration_lock_timeout * 1000)
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"PRAGMA busy_timeout = {timeout_ms}")
+    elif connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET lock_timeout = {timeout_ms}")
+
+
+def current_revision(connection: Connection) -> Optional[str]:
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def missing_columns(connection: Connection) -> List[str]:
+    """Model columns absent from existing tables, as table.column"""
+    inspector = inspect(connection)
+    existing = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        missing.extend(f"{table.name}.{column.name}" for column in table.columns if column.name not in columns)
+    return missing
+
+
+def run_command(connection: Connection, name: str, *args: Any) -> None:
+    """Run an Alembic command on an open connection"""
+    config = alembic_config()
+    config.attributes["connection"] = connection
+    getattr(command, name)(config, *args)
+
+
+async def run_with_connection(func: Callable[[Connection], Any]) -> Any:
+    """
+    Call func with a sync connection of a dedicated engine; session settings
+    such as the lock timeout never leak into the application pool
+    """
+    engine = create_async_engine(settings.database_url, poolclass=pool.NullPool)
+    try:
+        async with engine.connect() as connection:
+            result = await connection.run_sync(func)
+            await connection.commit()
+            return result
+    finally:
+        await engine.dispose()
+
+
+def stamp_unversioned(connection: Connection, script: ScriptDirectory) -> str:
+    """
+    Stamp a database created without Alembic with the newest revision whose
+    objects are all present and return it. Tables no revision creates are
+    added from the models first; a table that does not exist yet counts as
+    having its columns, since it is created complete.
+    """
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+
+    def present(name: str) -> bool:
+        table, _, column = name.partition(".")
+        if not column:
+            return table in tables
+        return table in tables and column in {c["name"] for c in inspector.get_columns(table)}
+
+    revisions = [revision.revision for revision in reversed(list(script.walk_revisions()))]
+    detected, later = revisions[0], []
+    for revision in revisions[1:]:
+        objects = REVISION_OBJECTS.get(revision)
+        if later or objects is None or not all(
+            present(name) or ("." in name and name.partition(".")[0] not in tables) for name in objects
+        ):
+            later.append(revision)
+        else:
+            detected = revision
+
+    later_objects = [name for revision in later for name in REVISION_OBJECTS.get(revision, ())]
+    later_tables = {name for name in later_objects if "." not in name}
+    # Objects the pending revisions would create a second time
+    ahead = [
+        name for name in later_objects
+        if present(name) or ("." in name and name.partition(".")[0] not in tables | later_tables)
+    ]
+    missing = [
+        name for name in missing_columns(connection)
+        if name not in later_objects and name.partition(".")[0] not in later_tables
+    ]
+    if ahead or missing:
+        problems = [f"нет колонок: {', '.join(missing)}"] if missing else []
+        if ahead:
+            problems.append(f"есть объекты ревизий новее {detected}: {', '.join(ahead)}")
+        raise SchemaRevisionError(
+            f"Схема базы без ревизии миграций не совпадает ни с одной ревизией ({'; '.join(problems)}). "
+            "Отметьте ревизию, соответствующую схеме (python -m utils.migrations stamp <ревизия>), "
+            "и выполните upgrade"
+        )
+
+    Base.metadata.create_all(
+        connection, tables=[table for table in Base.metadata.sorted_tables if table.name not in later_tables]
+    )
+    run_command(connection, "stamp", detected)
+    logger.info(f"База без ревизии миграций отмечена ревизией {detected}")
+    return detected
+
+
+def _migrate(connection: Connection, auto_upgrade: bool) -> str:
+    head = head_revision()
+    current = current_revision(connection)
+    script = ScriptDirectory.from_config(alembic_config())
+
+    if current is None:
+        if not inspect(connection).get_table_names():
+            Base.metadata.create_all(connection)
+            run_command(connection, "stamp", head)
+            return "created"
+        current = stamp_unversioned(connection, script)
+        if current == head:
+            return "stamped"
+
+    if current == head:
+        return "current"
+
+    if current not in {revision.revision for revision in script.walk_revisions()}:
+        # Rolled back code on a database migrated by a newer release: the
+        # expand-only migrations keep the old schema usable
+        logger.warning(f"Ревизия базы {current} неизвестна этой версии (последняя известная {head})")
+        return "ahead"
+
+    if not auto_upgrade:
+        raise SchemaRevisionError(
+            f"Схема базы устарела: ревизия {current}, нужна {head}. "
+            "Выполните python -m utils.migrations upgrade"
+        )
+
+    # Let every revision run in its own transaction
+    connection.commit()
+    logger.info(f"Миграция базы данных: {current} → {head}")
+    run_command(connection, "upgrade", "head")
+    return "upgraded"
+
+
+async def migrate_database(auto_upgrade: bool = True) -> str:
+    """
+    Verify the schema revision, creating or upgrading the schema as needed.
+
+    Returns created, stamped, current, upgraded or ahead; raises
+    SchemaRevisionError when the database is behind and auto_upgrade is off.
+    """
+    result = await run_with_connection(lambda connection: _migrate(connection, auto_upgrade))
+    if result in ("created", "stamped"):
+        logger.info(f"Схема базы данных {'создана' if result == 'created' else 'отмечена'} на ревизии {head_revision()}")
+    return result
+
+
+def create_index_online(
+    index_name: str,
+    table_name: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    **kwargs: Any
+) -> None:
+    """Create an index without blocking writes on Postgres (CONCURRENTLY)"""
+    if op.get_bind().dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+        with op.get_context().autocommit_block():
+            op.create_index(
+                index_name, table_name, list(columns), unique=unique,
+                postgresql_concurrently=True, if_not_exists=True, **kwargs
+            )
+    else:
+        op.create_index(index_name, table_name, list(columns), unique=unique, if_not_exists=True, **kwargs)
+
+
+def drop_index_online(index_name: str, table_name: str) -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+    else:
+        op.drop_index(index_name, table_name=table_name, if_exists=True)
+
+
+def backfill_in_batches(
+    table_name: str,
+    assignments: str,
+    where: str,
+    params: Optional[Dict[str, Any]] = None,
+    batch_size: Optional[int] = None,
+    key: str = "id"
+) -> int:
+    """
+    UPDATE table SET <assignments> for rows matching <where>, committing
+    every batch_size rows. The update must make <where> false for the
+    rows it touched (for example ``where="new_column IS NULL"``).
+    Returns the number of updated rows.
+    """
+    batch_size = batch_size or settings.db_migration_batch_size
+    statement = text(
+        f"UPDATE {table_name} SET {assignments} WHERE {key} IN "
+        f"(SELECT {key} FROM {table_name} WHERE {where} LIMIT :batch_size)"
+    )
+    bind = op.get_bind()
+    total = 0
+    with op.get_context().autocommit_block():
+        while True:
+            updated = bind.execute(statement, {**(params or {}), "batch_size": batch_size}).rowcount
+            total += updated
+            if updated < batch_size:
+                break
+    logger.info(f"Заполнено строк в {table_name}: {total}")
+    return total
+
+
+async def _run_cli(args: argparse.Namespace) -> int:
+    if args.command == "current":
+        revision = await run_with_connection(current_revision)
+        print(f"{revision or 'нет ревизии'} (последняя: {head_revision()})")
+        return 0
+    if args.command == "check":
+        revision = await run_with_connection(current_revision)
+        print(f"{revision or 'нет ревизии'} (последняя: {head_revision()})")
+        return 0 if revision == head_revision() else 1
+    if args.command == "upgrade" and args.revision == "head":
+        print(await migrate_database(auto_upgrade=True))
+        return 0
+
+    await run_with_connection(lambda connection: run_command(connection, args.command, args.revision))
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    parser.add_argument("command", choices=["current", "check", "upgrade", "downgrade", "stamp"])
+    parser.add_argument("revision", nargs="?", default="head")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_run_cli(args)))
+
+
+if __name__ == "__main__":
+    main()
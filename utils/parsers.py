@@ -1,162 +1,328 @@
 import json
+import multiprocessing
+import os
 import re
-from typing import Dict, List, Optional
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+from config import settings
 from utils.logger import logger
 
+# Characters read from the export file at a time
+READ_SIZE = 1 << 20
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_WHITESPACE_CHARS = ("", " ", "\t", "\n", "\r")
+
+# Phone numbers are found by their digits; starting the pattern with a
+# character class lets the regex engine skip to candidate positions
+PHONE_DIGITS_PATTERN = re.compile(r'[0-9]{10,15}')
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+# Domain part alone: rules out @mentions before the costly full pattern runs
+EMAIL_DOMAIN_PATTERN = re.compile(r'@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+URL_PATTERN = re.compile(r'https?://[^\s]+')
+
+# Gate keywords select the messages of a section; the first category with a
+# matching keyword receives the message, "general" the rest. Matching is
+# done on the lower-cased text
+DIRASSA_KEYWORDS = (
+    "dirassa", "дирасса", "курс", "уровень", "level",
+    "учебник", "книга", "book", "kitob"
+)
+DIRASSA_CATEGORIES = (
+    ("levels", ("a0", "a1", "a2", "b1", "b2", "c1", "c2")),
+    ("books", ("книга", "book", "учебник")),
+    ("pricing", ("цена", "стоимость", "price")),
+    ("curriculum", ("программа", "curriculum")),
+)
+ALAZHAR_KEYWORDS = (
+    "al-azhar", "аль-азхар", "азхар", "azhar",
+    "факультет", "faculty", "шариат", "sharia",
+    "языки", "language", "инженерия", "engineering"
+)
+ALAZHAR_CATEGORIES = (
+    ("faculties", ("факультет", "faculty")),
+    ("requirements", ("требование", "requirement", "документ")),
+    ("visa", ("виза", "visa", "икама", "iqama")),
+    ("scholarships", ("стипендия", "scholarship", "грант")),
+    ("contacts", ("контакт", "contact", "телефон", "phone")),
+)
+
+# Classification of one message: (index in chunk, dirassa category,
+# alazhar category, phones, emails, urls)
+Match = Tuple[int, Optional[str], Optional[str], List[str], List[str], List[str]]
+
+
+class KeywordClassifier:
+    """
+    Sorts texts into the categories of several keyword sections.
+
+    The text is lower-cased once and every section is resolved with
+    short-circuiting substring checks, which CPython runs faster than a
+    combined alternation regex for keyword lists of this size.
+    """
+
+    def __init__(self, sections: Dict[str, Tuple[Tuple[str, ...], Tuple[Tuple[str, Tuple[str, ...]], ...]]]):
+        self.sections = tuple(
+            (name, tuple(gate), tuple((category, tuple(words)) for category, words in categories))
+            for name, (gate, categories) in sections.items()
+        )
+
+    def classify(self, text: str) -> Dict[str, Optional[str]]:
+        """Category of the text in every section, None when the section does not apply"""
+        lowered = text.lower()
+        result: Dict[str, Optional[str]] = {}
+        for name, gate, categories in self.sections:
+            if not any(keyword in lowered for keyword in gate):
+                result[name] = None
+                continue
+            result[name] = next(
+                (category for category, words in categories if any(word in lowered for word in words)),
+                "general"
+            )
+        return result
+
+
+classifier = KeywordClassifier({
+    "dirassa": (DIRASSA_KEYWORDS, DIRASSA_CATEGORIES),
+    "alazhar": (ALAZHAR_KEYWORDS, ALAZHAR_CATEGORIES),
+})
+
+
+def find_phones(text: str) -> List[str]:
+    """Same matches as [\\+]?[0-9]{10,15}, including the leading plus"""
+    return [
+        f"+{match.group()}" if match.start() and text[match.start() - 1] == "+" else match.group()
+        for match in PHONE_DIGITS_PATTERN.finditer(text)
+    ]
+
+
+def classify_chunk(texts: List[str]) -> List[Match]:
+    """Classify message texts; only messages with a match are returned"""
+    matches = []
+    for index, text in enumerate(texts):
+        sections = classifier.classify(text)
+        phones = find_phones(text)
+        emails = EMAIL_PATTERN.findall(text) if EMAIL_DOMAIN_PATTERN.search(text) else []
+        urls = URL_PATTERN.findall(text) if "://" in text else []
+        if sections["dirassa"] or sections["alazhar"] or phones or emails or urls:
+            matches.append((index, sections["dirassa"], sections["alazhar"], phones, emails, urls))
+    return matches
+
+
+class _StreamReader:
+    """Decodes JSON values one at a time from a text file"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int = READ_SIZE) -> None:
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self) -> str:
+        """Next non-whitespace character, "" at the end of the file"""
+        while True:
+            if self.buffer[self.pos:self.pos + 1] not in _WHITESPACE_CHARS:
+                return self.buffer[self.pos]
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        size = READ_SIZE
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # A number may continue past the end of the buffer
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            # Values larger than the buffer: grow the read geometrically
+            self._fill(size)
+            size *= 2
+
+
+def iter_json_array(f, key: str) -> Iterator:
+    """
+    Stream the items of the array stored under a top-level key of a JSON
+    object, without loading the rest of the document into memory
+    """
+    reader = _StreamReader(f)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name != key:
+            reader.value()
+        else:
+            reader.expect("[")
+            if reader.peek() == "]":
+                return
+            while True:
+                yield reader.value()
+                if reader.peek() == "]":
+                    return
+                reader.expect(",")
+        if reader.peek() == "}":
+            return
+        reader.expect(",")
+
 
 class ContentParser:
     """Parse result.json to extract Al-Azhar and Dirassa information"""
-    
-    def __init__(self, json_file: str = "result.json"):
+
+    def __init__(
+        self,
+        json_file: str = "result.json",
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ):
         self.json_file = json_file
-        self.data = None
-    
-    def load_data(self) -> bool:
-        """Load JSON data"""
+        self.workers = (settings.parser_workers if workers is None else workers) or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size or settings.parser_chunk_size)
+        self._parsed: Optional[Dict] = None
+
+    def iter_messages(self) -> Iterator[Dict]:
+        """Stream text messages from the JSON export"""
+        with open(self.json_file, 'r', encoding='utf-8') as f:
+            for msg in iter_json_array(f, "messages"):
+                if isinstance(msg, dict) and isinstance(msg.get("text"), str):
+                    yield msg
+
+    def extract_messages(self) -> List[Dict]:
+        """Extract all messages from JSON"""
         try:
-            with open(self.json_file, 'r', encoding='utf-8') as f:
-                self.data = json.load(f)
-            return True
+            return list(self.iter_messages())
         except Exception as e:
             logger.error(f"Error loading {self.json_file}: {e}")
-            return False
-    
-    def extract_messages(self) -> List[Dict]:
-        """Extract all messages from JSON"""
-        if not self.data:
             return []
-        
-        messages = self.data.get("messages", [])
-        return [msg for msg in messages if isinstance(msg.get("text"), str)]
-    
+
+    def _iter_chunks(self) -> Iterator[List[str]]:
+        chunk = []
+        for msg in self.iter_messages():
+            chunk.append(msg["text"])
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _iter_classified(self) -> Iterator[Tuple[List[str], List[Match]]]:
+        """
+        Chunks of texts with their classification, in file order.
+
+        Chunks are classified in a process pool while the file is still
+        being read; a file that fits into one chunk is handled in-process.
+        """
+        chunks = self._iter_chunks()
+        first = next(chunks, None)
+        if first is None:
+            return
+        second = next(chunks, None)
+        if second is None or self.workers <= 1:
+            yield first, classify_chunk(first)
+            if second is not None:
+                yield second, classify_chunk(second)
+                for chunk in chunks:
+                    yield chunk, classify_chunk(chunk)
+            return
+
+        # Read ahead a bounded number of chunks so memory stays flat
+        max_pending = self.workers * 2
+        pending: Deque[Tuple[List[str], Future]] = deque()
+        with ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for chunk in (first, second):
+                pending.append((chunk, pool.submit(classify_chunk, chunk)))
+            for chunk in chunks:
+                if len(pending) >= max_pending:
+                    done_chunk, future = pending.popleft()
+                    yield done_chunk, future.result()
+                pending.append((chunk, pool.submit(classify_chunk, chunk)))
+            while pending:
+                done_chunk, future = pending.popleft()
+                yield done_chunk, future.result()
+
+    def parse_all(self) -> Dict:
+        """Parse all content in a single pass over the messages"""
+        dirassa_info = {"levels": [], "books": [], "curriculum": [], "pricing": [], "general": []}
+        alazhar_info = {
+            "faculties": [], "requirements": [], "visa": [], "documents": [],
+            "scholarships": [], "contacts": [], "general": []
+        }
+        contacts = []
+        urls: Dict[str, None] = {}
+        total = 0
+
+        try:
+            for texts, matches in self._iter_classified():
+                total += len(texts)
+                for index, dirassa, alazhar, phones, emails, found_urls in matches:
+                    text = texts[index]
+                    if dirassa:
+                        dirassa_info[dirassa].append(text)
+                    if alazhar:
+                        alazhar_info[alazhar].append(text)
+                    if phones or emails:
+                        contacts.append({"text": text, "phones": phones, "emails": emails})
+                    urls.update(dict.fromkeys(found_urls))
+        except Exception as e:
+            logger.error(f"Error loading {self.json_file}: {e}")
+            return {}
+
+        self._parsed = {
+            "dirassa": dirassa_info,
+            "alazhar": alazhar_info,
+            "contacts": contacts,
+            "urls": list(urls),
+            "total_messages": total
+        }
+        return self._parsed
+
+    def _result(self, key: str):
+        if self._parsed is None:
+            self.parse_all()
+        return (self._parsed or {}).get(key)
+
     def find_dirassa_info(self) -> Dict:
         """Extract Dirassa-related information"""
-        dirassa_info = {
-            "levels": [],
-            "books": [],
-            "curriculum": [],
-            "pricing": [],
-            "general": []
-        }
-        
-        messages = self.extract_messages()
-        
-        dirassa_keywords = [
-            "dirassa", "дирасса", "курс", "уровень", "level",
-            "A0", "A1", "A2", "B1", "B2", "C1", "C2",
-            "учебник", "книга", "book", "kitob"
-        ]
-        
-        for msg in messages:
-            text = msg.get("text", "").lower()
-            
-            if any(keyword in text for keyword in dirassa_keywords):
-                if any(level in text.upper() for level in ["A0", "A1", "A2", "B1", "B2", "C1", "C2"]):
-                    dirassa_info["levels"].append(msg.get("text", ""))
-                elif "книга" in text or "book" in text or "учебник" in text:
-                    dirassa_info["books"].append(msg.get("text", ""))
-                elif "цена" in text or "стоимость" in text or "price" in text:
-                    dirassa_info["pricing"].append(msg.get("text", ""))
-                elif "программа" in text or "curriculum" in text:
-                    dirassa_info["curriculum"].append(msg.get("text", ""))
-                else:
-                    dirassa_info["general"].append(msg.get("text", ""))
-        
-        return dirassa_info
-    
+        return self._result("dirassa") or {}
+
     def find_alazhar_info(self) -> Dict:
         """Extract Al-Azhar-related information"""
-        alazhar_info = {
-            "faculties": [],
-            "requirements": [],
-            "visa": [],
-            "documents": [],
-            "scholarships": [],
-            "contacts": [],
-            "general": []
-        }
-        
-        messages = self.extract_messages()
-        
-        alazhar_keywords = [
-            "al-azhar", "аль-азхар", "азхар", "azhar",
-            "факультет", "faculty", "шариат", "sharia",
-            "языки", "language", "инженерия", "engineering"
-        ]
-        
-        for msg in messages:
-            text = msg.get("text", "").lower()
-            
-            if any(keyword in text for keyword in alazhar_keywords):
-                if "факультет" in text or "faculty" in text:
-                    alazhar_info["faculties"].append(msg.get("text", ""))
-                elif "требование" in text or "requirement" in text or "документ" in text:
-                    alazhar_info["requirements"].append(msg.get("text", ""))
-                elif "виза" in text or "visa" in text or "икама" in text or "iqama" in text:
-                    alazhar_info["visa"].append(msg.get("text", ""))
-                elif "стипендия" in text or "scholarship" in text or "грант" in text:
-                    alazhar_info["scholarships"].append(msg.get("text", ""))
-                elif "контакт" in text or "contact" in text or "телефон" in text or "phone" in text:
-                    alazhar_info["contacts"].append(msg.get("text", ""))
-                else:
-                    alazhar_info["general"].append(msg.get("text", ""))
-        
-        return alazhar_info
-    
+        return self._result("alazhar") or {}
+
     def find_contacts(self) -> List[Dict]:
         """Extract contact information"""
-        contacts = []
-        messages = self.extract_messages()
-        
-        phone_pattern = re.compile(r'[\+]?[0-9]{10,15}')
-        email_pattern = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
-        
-        for msg in messages:
-            text = msg.get("text", "")
-            
-            phones = phone_pattern.findall(text)
-            emails = email_pattern.findall(text)
-            
-            if phones or emails:
-                contacts.append({
-                    "text": text,
-                    "phones": phones,
-                    "emails": emails
-                })
-        
-        return contacts
-    
+        return self._result("contacts") or []
+
     def extract_urls(self) -> List[str]:
         """Extract all URLs from messages"""
-        urls = []
-        messages = self.extract_messages()
-        
-        url_pattern = re.compile(r'https?://[^\s]+')
-        
-        for msg in messages:
-            text = msg.get("text", "")
-            found_urls = url_pattern.findall(text)
-            urls.extend(found_urls)
-        
-        return list(set(urls))
-    
-    def parse_all(self) -> Dict:
-        """Parse all content"""
-        if not self.load_data():
-            return {}
-        
-        return {
-            "dirassa": self.find_dirassa_info(),
-            "alazhar": self.find_alazhar_info(),
-            "contacts": self.find_contacts(),
-            "urls": self.extract_urls(),
-            "total_messages": len(self.extract_messages())
-        }
-    
+        return self._result("urls") or []
+
     def export_to_json(self, output_file: str = "data/dirassa_content.json"):
         """Export parsed data to JSON"""
         parsed_data = self.parse_all()
-        
+
         try:
             with open(output_file, 'w', encoding='utf-8') as f:
                 json.dump(parsed_data, f, ensure_ascii=False, indent=2)
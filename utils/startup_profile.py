@@ -0,0 +1,104 @@
+"""
+Startup profiling
+Timings of the boot phases and an import-time breakdown of an entry point
+
+    python -m utils.startup_profile [module] [--top N]
+
+The breakdown runs the import in a fresh interpreter with -X importtime,
+so it measures a real cold start and needs no import hooks. This module
+only uses the standard library: main.py imports it before anything heavy.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class BootTimer:
+    """Durations of consecutive startup phases"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str) -> float:
+        """Close the phase that ends now; returns its duration in seconds"""
+        now = time.perf_counter()
+        duration = now - self._last
+        self.phases.append((phase, duration))
+        self._last = now
+        return duration
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+    def summary(self) -> str:
+        parts = ", ".join(f"{phase} {duration:.2f} с" for phase, duration in self.phases)
+        return f"{self.total:.2f} с ({parts})"
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """Records of `-X importtime` output, in import order"""
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|", 2)
+        records.append(ImportRecord(module.strip(), int(self_us), int(cumulative_us)))
+    return records
+
+
+def measure_imports(module: str = "main") -> List[ImportRecord]:
+    """Import a module in a fresh interpreter and return the import timings"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def import_report(records: List[ImportRecord], top: int = 20) -> str:
+    """Slowest modules by their own import time and the totals per top-level package"""
+    total_us = sum(record.self_us for record in records)
+    packages: Dict[str, int] = defaultdict(int)
+    for record in records:
+        packages[record.module.split(".")[0]] += record.self_us
+
+    lines = [f"Импорт: {total_us / 1e6:.2f} с, модулей: {len(records)}", "", "Пакеты (собственное время):"]
+    for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f"  {self_us / 1e3:9.1f} мс  {100 * self_us / max(total_us, 1):5.1f}%  {package}")
+
+    lines += ["", "Модули (собственное / с зависимостями):"]
+    for record in sorted(records, key=lambda record: record.self_us, reverse=True)[:top]:
+        lines.append(f"  {record.self_us / 1e3:9.1f} мс  {record.cumulative_us / 1e3:9.1f} мс  {record.module}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import-time breakdown of an entry point")
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    print(import_report(measure_imports(args.module), args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Background task supervisor
+Runs fire-and-forget work in named groups with concurrency limits,
+keeps references to running tasks and drains them on shutdown
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from config import settings
+from database import AsyncSessionLocal
+from utils.job_queue import enqueue_job, job_name, queued_jobs
+from utils.logger import logger
+from utils.metrics import metrics
+
+BACKGROUND_TASK_DURATION = metrics.histogram(
+    "background_task_duration_seconds",
+    "Background task run time by group and outcome",
+    ("group", "outcome")
+)
+
+# Concurrency limits of known groups; others use BACKGROUND_TASK_DEFAULT_LIMIT
+GROUP_LIMITS = {
+    "moderation": 4,
+    "couriers": 4,
+    "broadcasts": 1,
+    "exports": 2,
+    "cleanup": 16,
+}
+
+
+class TaskGroup:
+    """Named set of background tasks sharing a concurrency limit"""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.tasks: Set[asyncio.Task] = set()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def waiting(self) -> int:
+        """Tasks waiting for a free slot"""
+        return len(self.tasks) - self.running
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "pending": len(self.tasks),
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+class TaskSupervisor:
+    """
+    Owner of all background tasks of the process.
+
+    ``spawn`` takes a coroutine function rather than a coroutine so the task
+    can be given its own database session (``with_session=True`` passes
+    ``session=`` and closes it when the task ends); request-scoped sessions
+    must never outlive their handler.
+
+    With BACKGROUND_JOBS_MODE=queue, ``@background_job`` functions of the
+    groups in BACKGROUND_JOB_GROUPS are written to the ``background_jobs``
+    table instead and run by a job worker process (see cluster.py).
+    """
+
+    def __init__(self):
+        self._groups: Dict[str, TaskGroup] = {}
+        self._closing = False
+
+    def group(self, name: str) -> TaskGroup:
+        task_group = self._groups.get(name)
+        if task_group is None:
+            limit = GROUP_LIMITS.get(name, settings.background_task_default_limit)
+            task_group = self._groups[name] = TaskGroup(name, limit)
+        return task_group
+
+    @property
+    def pending(self) -> int:
+        return sum(len(task_group.tasks) for task_group in self._groups.values())
+
+    def waiting(self, group: str) -> int:
+        task_group = self._groups.get(group)
+        return task_group.waiting if task_group is not None else 0
+
+    def spawn(
+        self,
+        group: str,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        with_session: bool = False,
+        **kwargs: Any
+    ) -> Optional[asyncio.Task]:
+        """Schedule func(*args, **kwargs) in a group; returns None while shutting down"""
+        if self._closing:
+            logger.warning(f"Фоновая задача {func.__name__} ({group}) отклонена: идёт остановка")
+            return None
+
+        task_group = self.group(group)
+        if self._should_offload(group, func):
+            coro = self._enqueue(task_group, func, args, kwargs, with_session)
+        else:
+            coro = self._run(task_group, func, args, kwargs, with_session)
+        task = asyncio.create_task(coro, name=f"{group}:{func.__name__}")
+        task_group.tasks.add(task)
+        task.add_done_callback(task_group.tasks.discard)
+        return task
+
+    @staticmethod
+    def _should_offload(group: str, func: Callable[..., Awaitable[Any]]) -> bool:
+        return (
+            settings.background_jobs_mode.lower() == "queue"
+            and group in settings.background_job_groups_list
+            and job_name(func) is not None
+        )
+
+    async def _enqueue(
+        self,
+        task_group: TaskGroup,
+        func: Callable[..., Awaitable[Any]],
+        args: tuple,
+        kwargs: Dict[str, Any],
+        with_session: bool
+    ) -> None:
+        try:
+            job_id = await enqueue_job(task_group.name, func, args, kwargs, with_session)
+            logger.debug(f"Фоновая задача {func.__name__} ({task_group.name}) передана в очередь: #{job_id}")
+        except Exception as e:
+            # Unserialisable arguments or no database: do the work here
+            logger.warning(f"⚠️ Не удалось поставить {func.__name__} в очередь ({str(e)}), выполняем локально")
+            await self._run(task_group, func, args, kwargs, with_session)
+
+    async def _run(
+        self,
+        task_group: TaskGroup,
+        func: Callable[..., Awaitable[Any]],
+        args: tuple,
+        kwargs: Dict[str, Any],
+        with_session: bool
+    ) -> None:
+        async with task_group.semaphore:
+            task_group.running += 1
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                if with_session:
+                    async with AsyncSessionLocal() as session:
+                        await func(*args, session=session, **kwargs)
+                else:
+                    await func(*args, **kwargs)
+                outcome = "ok"
+                task_group.completed += 1
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+                raise
+            except Exception as e:
+                task_group.failed += 1
+                logger.error(f"❌ Ошибка фоновой задачи {func.__name__} ({task_group.name}): {str(e)}", exc_info=True)
+            finally:
+                task_group.running -= 1
+                BACKGROUND_TASK_DURATION.observe((task_group.name, outcome), time.perf_counter() - started)
+
+    async def drain(self, timeout: float) -> None:
+        """Stop accepting tasks, wait for running ones and cancel what is left"""
+        self._closing = True
+        tasks = {task for task_group in self._groups.values() for task in task_group.tasks}
+        if not tasks:
+            return
+
+        logger.info(f"Ожидаем завершения фоновых задач: {len(tasks)}")
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(f"Прервано фоновых задач при остановке: {len(pending)}")
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: task_group.stats() for name, task_group in self._groups.items()}
+
+
+supervisor = TaskSupervisor()
+metrics.gauge("background_tasks_pending", "Background tasks queued or running", lambda: supervisor.pending)
+metrics.gauge(
+    "broadcast_queue_depth",
+    "Broadcasts waiting to start in this process or in the job queue",
+    lambda: supervisor.waiting("broadcasts") + queued_jobs.get("broadcasts", 0)
+)
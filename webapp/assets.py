@@ -0,0 +1,245 @@
+"""
+Static asset manifest for the Web App
+Fingerprints static files by content hash, precompresses them and serves
+hashed URLs with long-lived immutable caching
+"""
+
+import gzip
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from utils.logger import logger
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+HASH_LENGTH = 10
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Only text assets benefit from compression; tiny files are not worth it
+COMPRESSIBLE_SUFFIXES = {".js", ".css", ".svg", ".json", ".html", ".txt", ".map"}
+MIN_COMPRESS_SIZE = 512
+
+MEDIA_TYPES = {
+    ".js": "text/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".svg": "image/svg+xml",
+    ".json": "application/json",
+    ".html": "text/html; charset=utf-8",
+    ".txt": "text/plain; charset=utf-8",
+    ".map": "application/json",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".ico": "image/x-icon",
+    ".woff2": "font/woff2",
+}
+
+# Relative ES module specifiers: import ... from './x.js', export ... from './x.js', import('./x.js')
+MODULE_SPECIFIER_PATTERN = re.compile(
+    r"""(\bfrom\s*|\bimport\s*\(?\s*)(['"])(\.{1,2}/[^'"]+?\.js)\2"""
+)
+
+
+@dataclass
+class StaticAsset:
+    """Fingerprinted asset with precompressed bodies"""
+    logical_path: str
+    hashed_path: str
+    etag: str
+    media_type: str
+    content: bytes
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+
+@dataclass
+class AssetManifest:
+    """Mapping between logical static paths and their fingerprinted versions"""
+    assets: Dict[str, StaticAsset] = field(default_factory=dict)
+    by_hashed_path: Dict[str, StaticAsset] = field(default_factory=dict)
+
+    def resolve(self, logical_path: str) -> str:
+        """Return hashed path for a logical path (unchanged if unknown)"""
+        asset = self.assets.get(logical_path.lstrip("/"))
+        return asset.hashed_path if asset else logical_path
+
+    def to_dict(self) -> Dict[str, str]:
+        return {path: asset.hashed_path for path, asset in self.assets.items()}
+
+
+def _hashed_name(logical_path: str, digest: str) -> str:
+    stem, dot, suffix = logical_path.rpartition(".")
+    if not dot or "/" in suffix:
+        return f"{logical_path}.{digest}"
+    return f"{stem}.{digest}.{suffix}"
+
+
+def _compress(content: bytes) -> Dict[str, bytes]:
+    encoded = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(content, quality=11)
+    # Keep only encodings that actually save bytes
+    return {name: body for name, body in encoded.items() if len(body) < len(content)}
+
+
+def build_asset_manifest(static_dir: Path) -> AssetManifest:
+    """
+    Fingerprint every file under static_dir.
+
+    JavaScript modules have their relative import specifiers rewritten to the
+    hashed names of their dependencies before hashing, so a change in any
+    imported module also changes the URL of every module importing it.
+    """
+    static_dir = Path(static_dir)
+    sources: Dict[str, Path] = {}
+    for path in sorted(static_dir.rglob("*")):
+        if path.is_file() and not path.name.startswith("."):
+            sources[path.relative_to(static_dir).as_posix()] = path
+
+    manifest = AssetManifest()
+    in_progress = set()
+
+    def process(logical_path: str) -> StaticAsset:
+        if logical_path in manifest.assets:
+            return manifest.assets[logical_path]
+        if logical_path in in_progress:
+            raise ValueError(f"Циклический импорт статических модулей: {logical_path}")
+        in_progress.add(logical_path)
+
+        content = sources[logical_path].read_bytes()
+        suffix = Path(logical_path).suffix.lower()
+
+        if suffix == ".js":
+            base_dir = os.path.dirname(logical_path)
+
+            def rewrite(match: re.Match) -> str:
+                specifier = match.group(3)
+                target = os.path.normpath(os.path.join(base_dir, specifier)).replace(os.sep, "/")
+                if target not in sources:
+                    return match.group(0)
+                dependency = process(target)
+                hashed_name = dependency.hashed_path.rsplit("/", 1)[-1]
+                new_specifier = specifier.rsplit("/", 1)[0] + "/" + hashed_name
+                return f"{match.group(1)}{match.group(2)}{new_specifier}{match.group(2)}"
+
+            text = content.decode("utf-8")
+            content = MODULE_SPECIFIER_PATTERN.sub(rewrite, text).encode("utf-8")
+
+        digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+        asset = StaticAsset(
+            logical_path=logical_path,
+            hashed_path=_hashed_name(logical_path, digest),
+            etag=f'"{digest}"',
+            media_type=MEDIA_TYPES.get(suffix, "application/octet-stream"),
+            content=content,
+        )
+        if suffix in COMPRESSIBLE_SUFFIXES and len(content) >= MIN_COMPRESS_SIZE:
+            asset.encoded = _compress(content)
+
+        manifest.assets[logical_path] = asset
+        manifest.by_hashed_path[asset.hashed_path] = asset
+        in_progress.discard(logical_path)
+        return asset
+
+    for logical_path in sources:
+        process(logical_path)
+
+    original_size = sum(len(asset.content) for asset in manifest.assets.values())
+    compressed_size = sum(
+        min([len(asset.content), *(len(body) for body in asset.encoded.values())])
+        for asset in manifest.assets.values()
+    )
+    logger.info(
+        f"Манифест статических файлов собран: {len(manifest.assets)} файлов, "
+        f"{original_size} → {compressed_size} байт после сжатия"
+        f"{'' if brotli is not None else ' (brotli недоступен, только gzip)'}"
+    )
+    return manifest
+
+
+def _accepted_encodings(scope: Scope) -> Dict[str, float]:
+    """Parse Accept-Encoding header into {encoding: q}"""
+    header = ""
+    for key, value in scope.get("headers", []):
+        if key == b"accept-encoding":
+            header = value.decode("latin-1")
+            break
+
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+    return accepted
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves manifest assets under hashed names from memory.
+
+    Hashed URLs are cached as immutable and negotiated between brotli, gzip
+    and identity encodings. Plain names still work but must be revalidated.
+    """
+
+    def __init__(self, *, manifest: AssetManifest, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.manifest = manifest
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+
+        asset = self.manifest.by_hashed_path.get(path.replace(os.sep, "/"))
+        if asset is None:
+            response = await super().get_response(path, scope)
+            response.headers.setdefault("Cache-Control", REVALIDATE_CACHE_CONTROL)
+            return response
+
+        headers = {
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+            "ETag": asset.etag,
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = _header(scope, b"if-none-match")
+        if if_none_match and asset.etag in if_none_match:
+            return Response(status_code=304, headers=headers)
+
+        accepted = _accepted_encodings(scope)
+        body = asset.content
+        for encoding in ("br", "gzip"):
+            if encoding in asset.encoded and accepted.get(encoding, 0) > 0:
+                body = asset.encoded[encoding]
+                headers["Content-Encoding"] = encoding
+                break
+
+        return Response(content=body, media_type=asset.media_type, headers=headers)
@@ -0,0 +1,125 @@
+"""
+Image processing pipeline for Web App uploads
+Generates responsive WebP/AVIF variants in a process pool
+"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from config import settings
+from utils.logger import logger
+
+# Formats tried in order of preference; AVIF is skipped when Pillow has no encoder
+VARIANT_FORMATS = ("avif", "webp")
+VARIANT_QUALITY = {"avif": 50, "webp": 80}
+VARIANT_MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+# Formats Pillow can rasterize; SVG and animated GIFs are served as-is
+PROCESSABLE_MIME_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _available_formats() -> Tuple[str, ...]:
+    """Return variant formats supported by the installed Pillow build."""
+    from PIL import Image
+
+    Image.init()
+    return tuple(fmt for fmt in VARIANT_FORMATS if fmt.upper() in Image.SAVE)
+
+
+def render_variants(
+    source_path: str,
+    output_dir: str,
+    stem: str,
+    widths: Tuple[int, ...]
+) -> List[dict]:
+    """
+    Render resized copies of an image without EXIF metadata.
+
+    Runs inside a worker process, so it only takes and returns plain data.
+    Widths larger than the source are skipped (no upscaling).
+    """
+    from PIL import Image, ImageOps
+
+    formats = _available_formats()
+    variants: List[dict] = []
+
+    with Image.open(source_path) as img:
+        if getattr(img, "is_animated", False):
+            return variants
+
+        # Apply orientation from EXIF before it is dropped
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+
+        for width in sorted(set(widths)):
+            if width >= img.width:
+                continue
+
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), Image.LANCZOS)
+
+            for fmt in formats:
+                filename = f"{stem}_w{width}.{fmt}"
+                target = Path(output_dir) / filename
+                # No exif= argument: Pillow writes variants without metadata
+                resized.save(target, format=fmt.upper(), quality=VARIANT_QUALITY[fmt])
+                variants.append({
+                    "width": width,
+                    "height": height,
+                    "format": fmt,
+                    "mime_type": VARIANT_MIME_TYPES[fmt],
+                    "filename": filename,
+                    "file_size": target.stat().st_size,
+                })
+
+    return variants
+
+
+def get_image_executor() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.webapp_image_workers)
+        logger.info(f"Пул обработки изображений запущен ({settings.webapp_image_workers} процессов)")
+    return _executor
+
+
+def shutdown_image_executor() -> None:
+    """Stop the process pool if it was started."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        logger.info("Пул обработки изображений остановлен")
+
+
+def is_processable_image(mime_type: Optional[str]) -> bool:
+    """Check whether variants can be generated for the given MIME type."""
+    return (mime_type or "").lower() in PROCESSABLE_MIME_TYPES
+
+
+async def generate_image_variants(physical_path: Path) -> List[dict]:
+    """
+    Generate responsive variants next to the original upload.
+
+    Returns a list of dicts with width, height, format, mime_type, filename
+    and file_size. Errors are logged and produce an empty list.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_image_executor(),
+            render_variants,
+            str(physical_path),
+            str(physical_path.parent),
+            physical_path.stem,
+            tuple(settings.webapp_image_variant_widths_list),
+        )
+    except Exception as e:
+        logger.warning(f"Не удалось создать варианты изображения {physical_path.name}: {str(e)}")
+        return []
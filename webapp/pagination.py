@@ -0,0 +1,53 @@
+"""
+Cursor pagination and field projection helpers for Web App APIs
+"""
+
+import base64
+import json
+from typing import Iterable, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 30
+MAX_PAGE_SIZE = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: Optional[Tuple[int, int]]) -> Optional[str]:
+    """Encode an (order_index, id) position as an opaque URL-safe cursor"""
+    if position is None:
+        return None
+    raw = json.dumps([int(position[0]), int(position[1])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Decode a cursor produced by encode_cursor; invalid cursors give HTTP 400"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        order_index, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return int(order_index), int(row_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор пагинации")
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[Set[str]]:
+    """
+    Parse a comma-separated ``fields`` parameter.
+
+    Returns None when no projection was requested. ``id`` is always included
+    so clients can key rendered rows; unknown names give HTTP 400.
+    """
+    if not fields:
+        return None
+
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестные поля: {', '.join(sorted(unknown))}"
+        )
+    return requested | {"id"}
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, Request, HTTPException
-from starlette.responses import HTMLResponse
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Request, HTTPException
+from starlette.responses import HTMLResponse, Response
 
 from config import settings
 from models import User
+from utils.metrics import PROMETHEUS_CONTENT_TYPE, metrics
 from webapp.auth import get_current_user, require_admin_user
 
 router = APIRouter(prefix="/webapp", tags=["webapp"])
@@ -38,6 +42,20 @@ async def healthcheck() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(authorization: Optional[str] = Header(default=None)) -> Response:
+    """Метрики процесса в текстовом формате Prometheus (только с METRICS_TOKEN)."""
+    if not settings.metrics_token:
+        # Not configured: the endpoint does not exist
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(
+        (authorization or "").encode(), f"Bearer {settings.metrics_token}".encode()
+    ):
+        raise HTTPException(status_code=401, detail="Неверный токен метрик")
+    await metrics.collect()
+    return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @router.get("/me")
 async def get_me(user: User = Depends(get_current_user)) -> dict:
     """Получить информацию о текущем пользователе."""
@@ -9,20 +9,21 @@ import uuid
 from pathlib import Path
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form
 from pydantic import BaseModel, Field, validator
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 
 from config import settings
+from database import AsyncSessionLocal
 from models import (
     User,
     WebAppCategory,
     WebAppCategoryItem,
     WebAppCategoryItemType,
 )
-from services.webapp_content_service import WebAppContentService
+from services.webapp_content_service import WebAppContentService, WebAppVersionConflictError
 from utils.logger import logger
 from webapp.auth import require_admin_user, get_db_session
 from webapp.routes.categories import (
@@ -30,9 +31,10 @@ from webapp.routes.categories import (
     WebAppCategoryItemOut,
     WebAppCategoryOut,
     WebAppFileOut,
-    build_file_url,
     serialize_category,
+    serialize_file,
 )
+from webapp.images import generate_image_variants, is_processable_image
 from webapp.storage import build_storage_path, get_upload_directory
 
 
@@ -63,6 +65,10 @@ class CategoryUpdateRequest(BaseModel):
         None,
         description="Optional list of item IDs to reorder as part of the update"
     )
+    expected_version: Optional[int] = Field(
+        None,
+        description="Category version the items_order is based on (rejects stale reorders with 409)"
+    )
 
 
 class ItemCreateRequest(BaseModel):
@@ -128,6 +134,10 @@ class ItemUpdateRequest(BaseModel):
 class ItemReorderRequest(BaseModel):
     """Schema for reordering items"""
     item_ids: List[int] = Field(..., description="List of item IDs in desired order")
+    expected_version: Optional[int] = Field(
+        None,
+        description="Category version the order is based on (rejects stale reorders with 409)"
+    )
 
 
 async def _prepare_reorder_data(
@@ -145,13 +155,12 @@ async def _prepare_reorder_data(
         raise HTTPException(status_code=400, detail="Список item_ids содержит дубликаты")
 
     result = await session.execute(
-        select(WebAppCategoryItem).where(
+        select(WebAppCategoryItem.id).where(
             WebAppCategoryItem.id.in_(item_ids),
             WebAppCategoryItem.category_id == category_id
         )
     )
-    existing_items = result.scalars().all()
-    existing_ids = {item.id for item in existing_items}
+    existing_ids = set(result.scalars().all())
 
     invalid_ids = set(item_ids) - existing_ids
     if invalid_ids:
@@ -171,13 +180,22 @@ async def _apply_reorder_data(
     *,
     session: AsyncSession,
     category_id: int,
-    reorder_data: List[dict]
+    reorder_data: List[dict],
+    expected_version: Optional[int] = None
 ) -> int:
-    """Persist items reordering"""
-    success = await WebAppContentService.reorder_items(
-        session=session,
-        item_order=reorder_data
-    )
+    """Persist items reordering with a single UPDATE and bump the category version"""
+    try:
+        success = await WebAppContentService.reorder_items(
+            session=session,
+            item_order=reorder_data,
+            category_id=category_id,
+            expected_version=expected_version
+        )
+    except WebAppVersionConflictError:
+        raise HTTPException(
+            status_code=409,
+            detail="Категория была изменена другим администратором. Обновите страницу и повторите"
+        )
 
     if not success:
         logger.error(f"❌ Ошибка применения порядка элементов в категории {category_id}")
@@ -302,7 +320,8 @@ async def update_category(
             count = await _apply_reorder_data(
                 session=session,
                 category_id=category_id,
-                reorder_data=reorder_data
+                reorder_data=reorder_data,
+                expected_version=data.expected_version
             )
             logger.info(f"✅ Переупорядочено {count} элементов в категории {category_id}")
         
@@ -411,10 +430,9 @@ async def reorder_categories(
         
         # Verify all categories exist
         result = await session.execute(
-            select(WebAppCategory).where(WebAppCategory.id.in_(data.category_ids))
+            select(WebAppCategory.id).where(WebAppCategory.id.in_(data.category_ids))
         )
-        existing_categories = result.scalars().all()
-        existing_ids = {cat.id for cat in existing_categories}
+        existing_ids = set(result.scalars().all())
         
         invalid_ids = set(data.category_ids) - existing_ids
         if invalid_ids:
@@ -424,13 +442,14 @@ async def reorder_categories(
                 detail=f"Категории с ID {sorted(invalid_ids)} не найдены"
             )
         
-        # Update order_index for each category
-        for idx, category_id in enumerate(data.category_ids):
-            await WebAppContentService.update_category(
-                session=session,
-                category_id=category_id,
-                order_index=idx
-            )
+        # Update order_index for all categories in one statement
+        await WebAppContentService.reorder_categories(
+            session=session,
+            category_order=[
+                {"id": category_id, "order_index": idx}
+                for idx, category_id in enumerate(data.category_ids)
+            ]
+        )
         
         # Get updated categories list
         categories = await WebAppContentService.list_categories(
@@ -535,20 +554,7 @@ async def create_item(
         item = result.scalar_one()
         
         # Serialize
-        file_data = None
-        if item.file:
-            file_data = WebAppFileOut(
-                id=item.file.id,
-                file_type=item.file.file_type,
-                file_url=build_file_url(item.file),
-                mime_type=item.file.mime_type,
-                file_size=item.file.file_size,
-                original_name=item.file.original_name,
-                description=item.file.description,
-                tag=item.file.tag,
-                width=item.file.width,
-                height=item.file.height
-            )
+        file_data = serialize_file(item.file) if item.file else None
         
         response = WebAppCategoryItemOut(
             id=item.id,
@@ -663,20 +669,7 @@ async def update_item(
         updated_item = result.scalar_one()
         
         # Serialize
-        file_data = None
-        if updated_item.file:
-            file_data = WebAppFileOut(
-                id=updated_item.file.id,
-                file_type=updated_item.file.file_type,
-                file_url=build_file_url(updated_item.file),
-                mime_type=updated_item.file.mime_type,
-                file_size=updated_item.file.file_size,
-                original_name=updated_item.file.original_name,
-                description=updated_item.file.description,
-                tag=updated_item.file.tag,
-                width=updated_item.file.width,
-                height=updated_item.file.height
-            )
+        file_data = serialize_file(updated_item.file) if updated_item.file else None
         
         response = WebAppCategoryItemOut(
             id=updated_item.id,
@@ -771,6 +764,7 @@ async def reorder_items(
     
     Accepts array of item IDs in desired order. Each item will be assigned
     an order_index based on its position in the array (0, 1, 2, ...).
+    When expected_version is given and the category changed meanwhile, responds with 409.
     """
     try:
         # Check if category exists
@@ -792,7 +786,8 @@ async def reorder_items(
         count = await _apply_reorder_data(
             session=session,
             category_id=category_id,
-            reorder_data=reorder_data
+            reorder_data=reorder_data,
+            expected_version=data.expected_version
         )
         
         # Get updated category with items
@@ -908,8 +903,39 @@ async def get_image_dimensions(file_path: Path) -> tuple[Optional[int], Optional
         return None, None
 
 
+async def process_uploaded_image(file_id: int, physical_path: Path) -> None:
+    """
+    Generate responsive variants for an uploaded image and store them on the file record.
+    Runs as a background task after the upload response is sent.
+    """
+    variants = await generate_image_variants(physical_path)
+    if not variants:
+        return
+
+    for variant in variants:
+        variant["storage_path"] = build_storage_path(variant.pop("filename"))
+
+    try:
+        async with AsyncSessionLocal() as session:
+            file_record = await WebAppContentService.set_file_variants(
+                session=session,
+                file_id=file_id,
+                variants=variants
+            )
+    except Exception as e:
+        logger.error(f"❌ Ошибка сохранения вариантов изображения {file_id}: {str(e)}", exc_info=True)
+        file_record = None
+
+    if file_record is None:
+        # File was deleted meanwhile or saving failed - do not leave orphans behind
+        for variant in variants:
+            variant_path = get_upload_directory() / Path(variant["storage_path"]).name
+            await asyncio.to_thread(variant_path.unlink, missing_ok=True)
+
+
 @router.post("/upload", response_model=WebAppFileOut)
 async def upload_file(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     description: Optional[str] = Form(None),
     tag: Optional[str] = Form(None),
@@ -928,7 +954,9 @@ async def upload_file(
     Accepts images (jpg, png, gif, webp, svg), documents (pdf, doc, docx, xls, xlsx),
     and videos (mp4, mpeg, mov, avi, webm).
     
-    Returns file metadata including file_id and file_url.
+    Returns file metadata including file_id and file_url. Responsive WebP/AVIF
+    variants for images are generated in the background and exposed later via
+    the file's variants and srcset fields.
     """
     try:
         if not file.filename:
@@ -988,20 +1016,10 @@ async def upload_file(
             height=height
         )
         
-        file_url = build_file_url(file_record)
-        
-        response = WebAppFileOut(
-            id=file_record.id,
-            file_type=file_record.file_type,
-            file_url=file_url,
-            mime_type=file_record.mime_type,
-            file_size=file_record.file_size,
-            original_name=file_record.original_name,
-            description=file_record.description,
-            tag=file_record.tag,
-            width=file_record.width,
-            height=file_record.height
-        )
+        if file_type == "IMAGE" and is_processable_image(content_type):
+            background_tasks.add_task(process_uploaded_image, file_record.id, physical_path)
+        
+        response = serialize_file(file_record)
         
         logger.info(
             f"✅ Администратор {user.telegram_id} загрузил файл {file_record.id}: "
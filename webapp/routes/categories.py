@@ -3,20 +3,39 @@ Web App Categories API Routes
 Provides read-only endpoints for category listing and details
 """
 
-from typing import List, Optional, Union
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, List, Optional, Set, Union
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
-from models import User, WebAppCategory
+from models import User, WebAppCategory, WebAppCategoryItem
 from services.webapp_content_service import WebAppContentService
 from utils.logger import logger
 from webapp.auth import get_current_user, get_db_session
+from webapp.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+    parse_fields,
+)
 
 router = APIRouter(prefix="/webapp", tags=["webapp-categories"])
 
 
+class WebAppFileVariantOut(BaseModel):
+    url: str
+    width: int
+    height: Optional[int] = None
+    format: str
+    mime_type: Optional[str] = None
+    file_size: Optional[int] = None
+
+
 class WebAppFileOut(BaseModel):
     id: int
     file_type: str
@@ -28,6 +47,8 @@ class WebAppFileOut(BaseModel):
     tag: Optional[str] = None
     width: Optional[int] = None
     height: Optional[int] = None
+    variants: List[WebAppFileVariantOut] = []
+    srcset: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -55,9 +76,11 @@ class WebAppCategoryOut(BaseModel):
     title: str
     description: Optional[str] = None
     cover_url: Optional[str] = None
+    cover_srcset: Optional[str] = None
     cover_file_id: Optional[int] = None
     order_index: int
     is_active: bool
+    version: int = 0
     items_count: int = 0
 
     class Config:
@@ -70,17 +93,45 @@ class WebAppCategoryDetailOut(BaseModel):
     title: str
     description: Optional[str] = None
     cover_url: Optional[str] = None
+    cover_srcset: Optional[str] = None
     cover_file_id: Optional[int] = None
     order_index: int
     is_active: bool
+    version: int = 0
     items: List[WebAppCategoryItemOut]
+    items_count: Optional[int] = None
+    next_items_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
 
 
-def build_file_url(file_record) -> Optional[str]:
-    """Build absolute file URL from file record"""
+def _build_storage_url(storage_path: str) -> str:
+    """Build absolute URL for a path stored relative to the public mounts"""
+    storage_path = storage_path.lstrip("/")
+    base_url = settings.webapp_public_url.rstrip("/")
+
+    if storage_path.startswith("webapp/static/") or storage_path.startswith("webapp/uploads/"):
+        return f"{base_url}/{storage_path}"
+
+    return f"{base_url}/webapp/static/{storage_path}"
+
+
+def _select_variants(file_record, fmt: Optional[str] = None) -> List[dict]:
+    """Return stored image variants sorted by width, optionally of one format"""
+    variants = getattr(file_record, "variants", None) or []
+    if fmt is not None:
+        variants = [variant for variant in variants if variant.get("format") == fmt]
+    return sorted(variants, key=lambda variant: variant.get("width") or 0)
+
+
+def build_file_url(file_record, width: Optional[int] = None, fmt: str = "webp") -> Optional[str]:
+    """
+    Build absolute file URL from file record
+
+    When ``width`` is given, the smallest stored variant of ``fmt`` that is at
+    least that wide is returned; the original is used if none fits.
+    """
     if not file_record:
         return None
 
@@ -88,61 +139,132 @@ def build_file_url(file_record) -> Optional[str]:
         return file_record.telegram_file_id
 
     if file_record.storage_path:
-        storage_path = file_record.storage_path.lstrip("/")
-        base_url = settings.webapp_public_url.rstrip("/")
-
-        if storage_path.startswith("webapp/static/") or storage_path.startswith("webapp/uploads/"):
-            return f"{base_url}/{storage_path}"
+        if width is not None:
+            for variant in _select_variants(file_record, fmt):
+                if variant.get("width", 0) >= width and variant.get("storage_path"):
+                    return _build_storage_url(variant["storage_path"])
 
-        return f"{base_url}/webapp/static/{storage_path}"
+        return _build_storage_url(file_record.storage_path)
 
     return None
 
 
+def build_file_srcset(file_record, fmt: str = "webp") -> Optional[str]:
+    """Build an HTML srcset value from stored image variants"""
+    if not file_record or file_record.telegram_file_id:
+        return None
+
+    candidates = [
+        f"{_build_storage_url(variant['storage_path'])} {variant['width']}w"
+        for variant in _select_variants(file_record, fmt)
+        if variant.get("storage_path") and variant.get("width")
+    ]
+
+    if not candidates:
+        return None
+
+    if file_record.storage_path and file_record.width:
+        candidates.append(f"{_build_storage_url(file_record.storage_path)} {file_record.width}w")
+
+    return ", ".join(candidates)
+
+
+def serialize_file(file_record) -> WebAppFileOut:
+    """Convert ORM file record to response model"""
+    variants = []
+    if not file_record.telegram_file_id:
+        variants = [
+            WebAppFileVariantOut(
+                url=_build_storage_url(variant["storage_path"]),
+                width=variant["width"],
+                height=variant.get("height"),
+                format=variant["format"],
+                mime_type=variant.get("mime_type"),
+                file_size=variant.get("file_size")
+            )
+            for variant in _select_variants(file_record)
+            if variant.get("storage_path")
+        ]
+
+    return WebAppFileOut(
+        id=file_record.id,
+        file_type=file_record.file_type,
+        file_url=build_file_url(file_record),
+        mime_type=file_record.mime_type,
+        file_size=file_record.file_size,
+        original_name=file_record.original_name,
+        description=file_record.description,
+        tag=file_record.tag,
+        width=file_record.width,
+        height=file_record.height,
+        variants=variants,
+        srcset=build_file_srcset(file_record)
+    )
+
+
+def serialize_item(item: WebAppCategoryItem) -> WebAppCategoryItemOut:
+    """Convert ORM category item to response model"""
+    return WebAppCategoryItemOut(
+        id=item.id,
+        category_id=item.category_id,
+        type=item.type,
+        text_content=item.text_content,
+        rich_metadata=item.rich_metadata,
+        file=serialize_file(item.file) if item.file else None,
+        button_text=item.button_text,
+        target_category_id=item.target_category_id,
+        order_index=item.order_index,
+        is_active=item.is_active
+    )
+
+
+def item_columns_for_fields(fields: Optional[Set[str]]) -> Optional[Set[str]]:
+    """Map projected item fields to the ORM columns that must be loaded"""
+    if fields is None:
+        return None
+    return {"file_id" if name == "file" else name for name in fields}
+
+
+def project_item(item: WebAppCategoryItem, fields: Set[str]) -> dict:
+    """
+    Serialize only the requested item fields.
+
+    Touches nothing but the requested attributes, so it is safe to use on
+    items loaded with a column subset.
+    """
+    data = {}
+    for name in fields:
+        if name == "file":
+            data["file"] = serialize_file(item.file).model_dump() if item.file else None
+        else:
+            data[name] = getattr(item, name)
+    return data
+
+
 def serialize_category(
     category: WebAppCategory,
     *,
     include_items: bool,
-    include_inactive_items: bool
+    include_inactive_items: bool,
+    items_count: Optional[int] = None
 ) -> Union[WebAppCategoryOut, WebAppCategoryDetailOut]:
-    """Convert ORM category to response model"""
+    """
+    Convert ORM category to response model
+
+    ``items_count`` overrides counting the loaded items, for categories
+    loaded without them.
+    """
     cover_url = build_file_url(category.cover_file) if category.cover_file else None
+    cover_srcset = build_file_srcset(category.cover_file) if category.cover_file else None
     cover_file_id = category.cover_file_id
 
     serialized_items: List[WebAppCategoryItemOut] = []
-    for item in category.items:
-        if not include_inactive_items and not item.is_active:
-            continue
-
-        file_data = None
-        if item.file:
-            file_data = WebAppFileOut(
-                id=item.file.id,
-                file_type=item.file.file_type,
-                file_url=build_file_url(item.file),
-                mime_type=item.file.mime_type,
-                file_size=item.file.file_size,
-                original_name=item.file.original_name,
-                description=item.file.description,
-                tag=item.file.tag,
-                width=item.file.width,
-                height=item.file.height
-            )
-
-        serialized_items.append(
-            WebAppCategoryItemOut(
-                id=item.id,
-                category_id=item.category_id,
-                type=item.type,
-                text_content=item.text_content,
-                rich_metadata=item.rich_metadata,
-                file=file_data,
-                button_text=item.button_text,
-                target_category_id=item.target_category_id,
-                order_index=item.order_index,
-                is_active=item.is_active
-            )
-        )
+    if include_items or items_count is None:
+        serialized_items = [
+            serialize_item(item)
+            for item in category.items
+            if include_inactive_items or item.is_active
+        ]
 
     if include_items:
         ordered_items = sorted(serialized_items, key=lambda x: x.order_index)
@@ -152,29 +274,47 @@ def serialize_category(
             title=category.title,
             description=category.description,
             cover_url=cover_url,
+            cover_srcset=cover_srcset,
             cover_file_id=cover_file_id,
             order_index=category.order_index,
             is_active=category.is_active,
-            items=ordered_items
+            version=category.version or 0,
+            items=ordered_items,
+            items_count=len(ordered_items)
         )
 
-    items_count = len(category.items) if include_inactive_items else len(serialized_items)
+    if items_count is None:
+        items_count = len(category.items) if include_inactive_items else len(serialized_items)
     return WebAppCategoryOut(
         id=category.id,
         slug=category.slug,
         title=category.title,
         description=category.description,
         cover_url=cover_url,
+        cover_srcset=cover_srcset,
         cover_file_id=cover_file_id,
         order_index=category.order_index,
         is_active=category.is_active,
+        version=category.version or 0,
         items_count=items_count
     )
 
 
+def _page_response(content, next_position) -> JSONResponse:
+    """JSON response carrying the next page cursor in a header"""
+    headers: Dict[str, str] = {}
+    next_cursor = encode_cursor(next_position)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    return JSONResponse(content=jsonable_encoder(content), headers=headers)
+
+
 @router.get("/categories", response_model=List[WebAppCategoryOut])
 async def list_categories(
     include_inactive: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_db_session)
 ):
@@ -184,32 +324,51 @@ async def list_categories(
     
     Query params:
     - include_inactive: Include inactive categories (admin only)
+    - limit: Page size; without it all categories are returned
+    - cursor: Opaque cursor from the X-Next-Cursor header of the previous page
+    - fields: Comma-separated subset of fields to return (id is always included)
     
-    Returns list of categories with minimal fields sorted by order_index.
+    Returns list of categories with minimal fields sorted by (order_index, id).
+    When more categories follow, the X-Next-Cursor response header is set.
     """
     try:
+        projection = parse_fields(fields, WebAppCategoryOut.model_fields)
+        after = decode_cursor(cursor)
         effective_include_inactive = include_inactive and user.is_admin
         
         if include_inactive and not user.is_admin:
             logger.warning(f"Пользователь {user.telegram_id} попытался получить неактивные категории без прав администратора")
         
-        categories = await WebAppContentService.list_categories(
+        categories, next_position = await WebAppContentService.list_categories_page(
             session=session,
-            include_inactive=effective_include_inactive
+            include_inactive=effective_include_inactive,
+            limit=limit,
+            after=after
         )
         
+        counts = {}
+        if projection is None or "items_count" in projection:
+            counts = await WebAppContentService.count_items_by_category(
+                session=session,
+                category_ids=[category.id for category in categories],
+                include_inactive=effective_include_inactive
+            )
+        
         result = [
             serialize_category(
                 category,
                 include_items=False,
-                include_inactive_items=effective_include_inactive
-            )
+                include_inactive_items=effective_include_inactive,
+                items_count=counts.get(category.id, 0)
+            ).model_dump(include=projection)
             for category in categories
         ]
         
         logger.info(f"✅ Получен список категорий: {len(result)} категорий для пользователя {user.telegram_id}")
-        return result
+        return _page_response(result, next_position)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Ошибка получения списка категорий: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка получения списка категорий")
@@ -219,6 +378,8 @@ async def list_categories(
 async def get_category(
     category_id: int,
     include_inactive: bool = False,
+    items_limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    item_fields: Optional[str] = None,
     user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_db_session)
 ):
@@ -231,16 +392,21 @@ async def get_category(
     
     Query params:
     - include_inactive: Include inactive items (admin only)
+    - items_limit: Return only the first page of items; continue with
+      /webapp/category/{category_id}/items?cursor=next_items_cursor
+    - item_fields: Comma-separated subset of item fields (id is always included)
     
-    Returns full category details including ordered active items.
+    Returns category details including ordered items, the total
+    items_count and next_items_cursor when more items follow.
     """
     try:
+        projection = parse_fields(item_fields, WebAppCategoryItemOut.model_fields)
         effective_include_inactive = include_inactive and user.is_admin
         
         if include_inactive and not user.is_admin:
             logger.warning(f"Пользователь {user.telegram_id} попытался получить неактивные элементы без прав администратора")
         
-        category = await WebAppContentService.get_category(
+        category = await WebAppContentService.get_category_summary(
             session=session,
             category_id=category_id,
             include_inactive=effective_include_inactive
@@ -250,17 +416,102 @@ async def get_category(
             logger.warning(f"❌ Категория {category_id} не найдена для пользователя {user.telegram_id}")
             raise HTTPException(status_code=404, detail="Категория не найдена")
         
-        result = serialize_category(
+        items, next_position = await WebAppContentService.list_category_items_page(
+            session=session,
+            category_id=category_id,
+            include_inactive=effective_include_inactive,
+            limit=items_limit,
+            columns=item_columns_for_fields(projection)
+        )
+        
+        items_count = len(items)
+        if next_position is not None:
+            counts = await WebAppContentService.count_items_by_category(
+                session=session,
+                category_ids=[category_id],
+                include_inactive=effective_include_inactive
+            )
+            items_count = counts.get(category_id, 0)
+        
+        summary = serialize_category(
             category,
-            include_items=True,
-            include_inactive_items=effective_include_inactive
+            include_items=False,
+            include_inactive_items=effective_include_inactive,
+            items_count=items_count
         )
+        result = summary.model_dump()
+        result["items"] = [
+            serialize_item(item).model_dump() if projection is None else project_item(item, projection)
+            for item in items
+        ]
+        result["next_items_cursor"] = encode_cursor(next_position)
         
         logger.info(f"✅ Получена категория {category_id} для пользователя {user.telegram_id}")
-        return result
+        return JSONResponse(content=jsonable_encoder(result))
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"❌ Ошибка получения категории {category_id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка получения категории")
+
+
+@router.get("/category/{category_id}/items", response_model=List[WebAppCategoryItemOut])
+async def list_category_items(
+    category_id: int,
+    include_inactive: bool = False,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db_session)
+):
+    """
+    Получить страницу элементов категории
+    Get a page of category items
+    
+    Query params:
+    - include_inactive: Include inactive items (admin only)
+    - limit: Page size
+    - cursor: Opaque cursor from X-Next-Cursor or next_items_cursor
+    - fields: Comma-separated subset of item fields (id is always included)
+    
+    Returns items sorted by (order_index, id). When more items follow,
+    the X-Next-Cursor response header is set.
+    """
+    try:
+        projection = parse_fields(fields, WebAppCategoryItemOut.model_fields)
+        after = decode_cursor(cursor)
+        effective_include_inactive = include_inactive and user.is_admin
+        
+        category = await WebAppContentService.get_category_summary(
+            session=session,
+            category_id=category_id,
+            include_inactive=effective_include_inactive
+        )
+        
+        if not category:
+            raise HTTPException(status_code=404, detail="Категория не найдена")
+        
+        items, next_position = await WebAppContentService.list_category_items_page(
+            session=session,
+            category_id=category_id,
+            include_inactive=effective_include_inactive,
+            limit=limit,
+            after=after,
+            columns=item_columns_for_fields(projection)
+        )
+        
+        result = [
+            serialize_item(item).model_dump() if projection is None else project_item(item, projection)
+            for item in items
+        ]
+        
+        logger.info(f"✅ Получено {len(result)} элементов категории {category_id} для пользователя {user.telegram_id}")
+        return _page_response(result, next_position)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Ошибка получения элементов категории {category_id}: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка получения элементов категории")
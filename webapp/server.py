@@ -1,43 +1,117 @@
+import random
+import time
 from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import Path
-from typing import Callable, Awaitable
+from typing import TYPE_CHECKING, Sequence
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from starlette.datastructures import MutableHeaders
 from starlette.staticfiles import StaticFiles
 from starlette.templating import Jinja2Templates
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from config import settings
-from utils.logger import logger
+from utils.logger import access_logger, logger
+from utils.metrics import metrics
 from webapp.routes import router as webapp_router
+from webapp.pagination import NEXT_CURSOR_HEADER
 from webapp.routes.categories import router as categories_router
 from webapp.routes.admin import router as admin_router
+from webapp.assets import AssetManifest, FingerprintedStaticFiles, build_asset_manifest
+from webapp.images import shutdown_image_executor
 from webapp.storage import get_upload_directory
 
+if TYPE_CHECKING:
+    from bots.webhook import WebhookUpdateConsumer
+
 STATIC_DIR = Path(__file__).resolve().parent / "static"
 TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(
+HTTP_REQUEST_DURATION = metrics.histogram(
+    "webapp_http_request_duration_seconds",
+    "Длительность обработки HTTP запросов веб-приложения",
+    ("method", "route", "status"),
+)
+
+
+def _route_template(scope: Scope, mount_root_path: str) -> str:
+    """Return the matched route template instead of the raw path to keep label cardinality low."""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+
+    # Mounted apps (static files, uploads) only update root_path
+    root_path = scope.get("root_path", "")
+    if root_path and root_path != mount_root_path:
+        return f"{root_path}/{{path}}"
+
+    return "<unmatched>"
+
+
+class RequestTimingMiddleware:
+    """
+    Чистый ASGI middleware для замера времени HTTP запросов
+    Pure ASGI middleware recording request latency histograms
+
+    Unlike BaseHTTPMiddleware it does not wrap the response in a task group,
+    so streaming responses pass through untouched. Access log lines are sampled
+    (errors and slow requests are always logged) and written asynchronously.
+    """
+
+    def __init__(
         self,
-        request: Request,
-        call_next: Callable[[Request], Awaitable[Response]]
-    ) -> Response:
-        logger.info(f"HTTP запрос: {request.method} {request.url.path}")
+        app: ASGIApp,
+        *,
+        sample_rate: float = 0.0,
+        slow_request_ms: int = 1000,
+        server_timing: bool = False
+    ) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_request_seconds = slow_request_ms / 1000
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        mount_root_path = scope.get("root_path", "")
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    MutableHeaders(scope=message).append("Server-Timing", f"app;dur={elapsed_ms:.1f}")
+            await send(message)
+
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
         except Exception as exc:
-            logger.error(
-                f"Ошибка обработки HTTP запроса {request.method} {request.url.path}: {exc}"
+            access_logger.error(
+                f"Ошибка обработки HTTP запроса {scope['method']} {scope['path']}: {exc}"
             )
             raise
-        logger.info(
-            f"HTTP ответ: {response.status_code} {request.url.path}"
-        )
-        return response
+        finally:
+            duration = time.perf_counter() - started
+            route = _route_template(scope, mount_root_path)
+            HTTP_REQUEST_DURATION.observe((scope["method"], route, str(status_code)), duration)
+
+            if status_code >= 500 or duration >= self.slow_request_seconds:
+                access_logger.warning(
+                    f"HTTP {scope['method']} {scope['path']} → {status_code} за {duration * 1000:.1f} мс"
+                )
+            elif self.sample_rate and random.random() < self.sample_rate:
+                access_logger.info(
+                    f"HTTP {scope['method']} {scope['path']} → {status_code} за {duration * 1000:.1f} мс"
+                )
 
 
 @asynccontextmanager
@@ -47,12 +121,32 @@ async def lifespan(_: FastAPI):
         yield
     finally:
         logger.info("Остановка веб-приложения...")
+        shutdown_image_executor()
+
+
+def static_asset_url(app: FastAPI, manifest: AssetManifest, logical_path: str) -> str:
+    """URL of a static file: its fingerprinted name, or ?v=<version> when it has none"""
+    url = app.url_path_for("webapp_static", path=manifest.resolve(logical_path))
+    if logical_path.lstrip("/") in manifest.assets:
+        return url
+    return f"{url}?v={settings.webapp_version}"
 
 
-def create_app() -> FastAPI:
+def create_app(bot_webhooks: Sequence["WebhookUpdateConsumer"] = ()) -> FastAPI:
+    """
+    Build the Web App.
+
+    ``bot_webhooks`` are mounted as POST routes so the bots can receive
+    Telegram updates on the same server instead of polling.
+    """
     app = FastAPI(title="Al-Azhar & Dirassa WebApp", lifespan=lifespan)
 
-    app.add_middleware(RequestLoggingMiddleware)
+    app.add_middleware(
+        RequestTimingMiddleware,
+        sample_rate=settings.webapp_access_log_sample_rate,
+        slow_request_ms=settings.webapp_slow_request_ms,
+        server_timing=settings.webapp_server_timing
+    )
 
     if settings.webapp_cors_origins_list:
         logger.info("Включаем CORS для веб-приложения")
@@ -62,15 +156,34 @@ def create_app() -> FastAPI:
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            expose_headers=[NEXT_CURSOR_HEADER],
         )
 
     app.include_router(webapp_router)
     app.include_router(categories_router)
     app.include_router(admin_router)
 
+    for consumer in bot_webhooks:
+        app.add_api_route(
+            consumer.path,
+            consumer.handle,
+            methods=["POST"],
+            include_in_schema=False,
+            name=f"{consumer.name}_bot_webhook"
+        )
+        logger.info(f"Webhook бота {consumer.name} подключён: {consumer.path}")
+
+    manifest = AssetManifest()
     if STATIC_DIR.exists():
-        app.mount("/webapp/static", StaticFiles(directory=str(STATIC_DIR)), name="webapp_static")
+        if settings.webapp_static_fingerprint:
+            manifest = build_asset_manifest(STATIC_DIR)
+        app.mount(
+            "/webapp/static",
+            FingerprintedStaticFiles(directory=str(STATIC_DIR), manifest=manifest),
+            name="webapp_static"
+        )
         logger.info("Статические файлы веб-приложения подключены")
+    app.state.asset_manifest = manifest
 
     upload_dir = get_upload_directory()
     app.mount("/webapp/uploads", StaticFiles(directory=str(upload_dir)), name="webapp_uploads")
@@ -78,6 +191,7 @@ def create_app() -> FastAPI:
 
     if TEMPLATES_DIR.exists():
         app.state.templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+        app.state.templates.env.globals["asset_url"] = partial(static_asset_url, app, manifest)
         logger.info("Шаблоны веб-приложения настроены")
 
     return app
@@ -67,10 +67,14 @@ export class AdminAPIClient {
         });
     }
 
-    async reorderItems(categoryId, itemIds) {
+    async reorderItems(categoryId, itemIds, expectedVersion = null) {
+        const payload = { item_ids: itemIds };
+        if (expectedVersion !== null && expectedVersion !== undefined) {
+            payload.expected_version = expectedVersion;
+        }
         return await this.apiClient.request(`/webapp/category/${categoryId}/items/reorder`, {
             method: 'POST',
-            body: JSON.stringify({ item_ids: itemIds })
+            body: JSON.stringify(payload)
         });
     }
 
@@ -147,6 +147,11 @@ export class AdminEditor {
         this.elements.adminToggle.querySelector('.mode-toggle-label').textContent = 'Перейти в режим пользователя';
         this.elements.adminToolbar.classList.remove('hidden');
         
+        // Users see paged items; editing and reordering need the full list
+        if (this.currentCategory?.next_items_cursor) {
+            this.app.loadCategory(this.currentCategory.id, { skipLoading: true });
+        }
+        
         // Enable buttons if category is selected
         this.updateToolbarState();
         
@@ -639,10 +644,17 @@ export class AdminEditor {
         const newOrder = items.map((item) => item.id);
         
         try {
-            await this.api.reorderItems(this.currentCategory.id, newOrder);
+            await this.api.reorderItems(this.currentCategory.id, newOrder, this.currentCategory.version);
             notifications.success('Порядок обновлён');
+            this.api.apiClient.clearCache();
             await this.app.loadCategory(this.currentCategory.id);
         } catch (error) {
+            if (error.status === 409) {
+                notifications.warning('Категория была изменена. Загружаем актуальный порядок...');
+                this.api.apiClient.clearCache();
+                await this.app.loadCategory(this.currentCategory.id);
+                return;
+            }
             console.error('Failed to reorder items:', error);
             notifications.error('Ошибка изменения порядка');
         }
@@ -23,6 +23,23 @@ export class APIClient {
     }
 
     async request(endpoint, options = {}) {
+        const response = await this.fetchResponse(endpoint, options);
+        return await response.json();
+    }
+
+    /**
+     * Fetch one page of a cursor-paginated endpoint.
+     * The cursor of the next page arrives in the X-Next-Cursor header.
+     */
+    async requestPage(endpoint, options = {}) {
+        const response = await this.fetchResponse(endpoint, options);
+        return {
+            items: await response.json(),
+            nextCursor: response.headers.get('X-Next-Cursor')
+        };
+    }
+
+    async fetchResponse(endpoint, options = {}) {
         const url = `${this.baseURL}${endpoint}`;
         const config = {
             ...options,
@@ -51,10 +68,12 @@ export class APIClient {
                     errorMessage = errorBody || errorMessage;
                 }
 
-                throw new Error(errorMessage);
+                const error = new Error(errorMessage);
+                error.status = response.status;
+                throw error;
             }
 
-            return await response.json();
+            return response;
         } catch (error) {
             console.error('API request failed:', error);
             throw error;
@@ -81,8 +100,8 @@ export class APIClient {
         return data;
     }
 
-    async getCategory(categoryId, includeInactive = false) {
-        const cacheKey = `category:${categoryId}:${includeInactive}`;
+    async getCategory(categoryId, includeInactive = false, itemsLimit = null) {
+        const cacheKey = `category:${categoryId}:${includeInactive}:${itemsLimit ?? 'all'}`;
 
         if (cache.has(cacheKey)) {
             return cache.get(cacheKey);
@@ -92,6 +111,9 @@ export class APIClient {
         if (includeInactive) {
             params.set('include_inactive', 'true');
         }
+        if (itemsLimit) {
+            params.set('items_limit', String(itemsLimit));
+        }
 
         const endpoint = `/webapp/category/${categoryId}?${params.toString()}`;
         const data = await this.request(endpoint);
@@ -100,6 +122,18 @@ export class APIClient {
         return data;
     }
 
+    async getCategoryItems(categoryId, cursor, limit) {
+        const params = new URLSearchParams();
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
+        if (limit) {
+            params.set('limit', String(limit));
+        }
+
+        return await this.requestPage(`/webapp/category/${categoryId}/items?${params.toString()}`);
+    }
+
     async getCurrentUser() {
         const cacheKey = 'current_user';
 
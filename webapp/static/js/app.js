@@ -4,6 +4,8 @@ import { NavigationController } from './navigation.js';
 import { ContentRenderer } from './renderer.js';
 import { AdminEditor } from './admin-editor.js';
 
+const ITEMS_PAGE_SIZE = 30;
+
 class WebAppController {
     constructor() {
         this.webApp = window.Telegram?.WebApp ?? null;
@@ -191,6 +193,10 @@ class WebAppController {
                 const cover = document.createElement('img');
                 cover.className = 'category-cover';
                 cover.src = category.cover_url;
+                if (category.cover_srcset) {
+                    cover.srcset = category.cover_srcset;
+                    cover.sizes = '320px';
+                }
                 cover.alt = category.title;
                 card.appendChild(cover);
             } else {
@@ -243,7 +249,9 @@ class WebAppController {
         this.hideError();
 
         try {
-            const category = await this.api.getCategory(categoryId, false);
+            // Admin editing works on the full item list, users scroll pages lazily
+            const itemsLimit = this.adminEditor?.isAdminMode ? null : ITEMS_PAGE_SIZE;
+            const category = await this.api.getCategory(categoryId, false, itemsLimit);
             if (!category) {
                 throw new Error('Категория не найдена');
             }
@@ -261,7 +269,7 @@ class WebAppController {
             this.elements.categoryTitle.textContent = category.title;
             this.elements.categoryDescription.textContent = category.description ?? '';
 
-            const itemCount = category.items?.length ?? 0;
+            const itemCount = category.items_count ?? category.items?.length ?? 0;
             this.elements.categoryMeta.textContent = `${itemCount} ${this.pluralizeItems(itemCount)}`;
 
             if (category.cover_url) {
@@ -276,6 +284,9 @@ class WebAppController {
             } else {
                 this.hideEmpty();
                 this.renderer.renderItems(category.items);
+                if (category.next_items_cursor) {
+                    this.enableItemPaging(category);
+                }
             }
 
             const restored = this.restoreScrollPosition(category.id, fromInitialLoad);
@@ -298,7 +309,7 @@ class WebAppController {
         if (!category.cover_url) return;
 
         this.elements.categoryHero.innerHTML = `
-            <img src="${category.cover_url}" alt="${category.title}">
+            <img src="${category.cover_url}"${category.cover_srcset ? ` srcset="${category.cover_srcset}" sizes="100vw"` : ''} alt="${category.title}">
             <div class="category-hero-content">
                 <h3 class="category-heading">${category.title}</h3>
                 ${category.description ? `<p class="category-intro">${category.description}</p>` : ''}
@@ -314,6 +325,26 @@ class WebAppController {
         this.elements.categoryHero.innerHTML = '';
     }
 
+    enableItemPaging(category) {
+        let cursor = category.next_items_cursor;
+
+        this.renderer.enableLazyLoading(async () => {
+            if (!cursor || this.currentCategory?.id !== category.id) {
+                return false;
+            }
+
+            const page = await this.api.getCategoryItems(category.id, cursor, ITEMS_PAGE_SIZE);
+            // The user may have navigated away while the page was loading
+            if (this.currentCategory?.id !== category.id) {
+                return false;
+            }
+
+            this.renderer.appendItems(page.items);
+            cursor = page.nextCursor;
+            return Boolean(cursor);
+        });
+    }
+
     saveScrollPosition(persist = false) {
         if (!this.currentCategory?.id) return;
         this.scrollPositions.set(this.currentCategory.id, window.scrollY);
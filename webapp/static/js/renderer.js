@@ -6,9 +6,12 @@ export class ContentRenderer {
         this.modal = new ImageModal();
         this.onNavigationButtonClick = options.onNavigationButtonClick;
         this.webApp = window.Telegram?.WebApp;
+        this.observer = null;
+        this.sentinel = null;
     }
 
     clear() {
+        this.disableLazyLoading();
         this.container.innerHTML = '';
     }
 
@@ -30,6 +33,90 @@ export class ContentRenderer {
         this.container.appendChild(fragment);
     }
 
+    appendItems(items) {
+        if (!items || items.length === 0) {
+            return;
+        }
+
+        const fragment = document.createDocumentFragment();
+        items.forEach((item) => {
+            const element = this.renderItem(item);
+            if (element) {
+                fragment.appendChild(element);
+            }
+        });
+
+        // Keep the sentinel last so it keeps marking the end of the list
+        const anchor = this.sentinel?.parentNode === this.container ? this.sentinel : null;
+        this.container.insertBefore(fragment, anchor);
+    }
+
+    /**
+     * Load further pages as the end of the list approaches the viewport.
+     * loadMore appends the next page and resolves to true while pages remain.
+     */
+    enableLazyLoading(loadMore) {
+        this.disableLazyLoading();
+
+        if (!('IntersectionObserver' in window)) {
+            this.loadRemaining(loadMore);
+            return;
+        }
+
+        const sentinel = document.createElement('div');
+        sentinel.className = 'content-sentinel';
+        sentinel.setAttribute('aria-hidden', 'true');
+        this.container.appendChild(sentinel);
+
+        let loading = false;
+        const observer = new IntersectionObserver(async (entries) => {
+            if (loading || !entries.some((entry) => entry.isIntersecting)) {
+                return;
+            }
+
+            loading = true;
+            try {
+                const hasMore = await loadMore();
+                if (!hasMore || this.observer !== observer) {
+                    this.disableLazyLoading(observer);
+                    return;
+                }
+                // Re-observe so a sentinel still in view triggers the next page
+                observer.unobserve(sentinel);
+                observer.observe(sentinel);
+            } catch (error) {
+                console.error('Failed to load more items:', error);
+            } finally {
+                loading = false;
+            }
+        }, { rootMargin: '600px 0px' });
+
+        this.sentinel = sentinel;
+        this.observer = observer;
+        observer.observe(sentinel);
+    }
+
+    disableLazyLoading(observer = this.observer) {
+        if (!observer || observer !== this.observer) {
+            return;
+        }
+
+        observer.disconnect();
+        this.sentinel?.remove();
+        this.observer = null;
+        this.sentinel = null;
+    }
+
+    async loadRemaining(loadMore) {
+        try {
+            while (await loadMore()) {
+                // Keep loading until the last page
+            }
+        } catch (error) {
+            console.error('Failed to load more items:', error);
+        }
+    }
+
     renderItem(item) {
         const wrapper = document.createElement('div');
         wrapper.className = 'content-item';
@@ -105,6 +192,10 @@ export class ContentRenderer {
         const img = document.createElement('img');
         img.loading = 'lazy';
         img.src = item.file?.file_url ?? '';
+        if (item.file?.srcset) {
+            img.srcset = item.file.srcset;
+            img.sizes = '(max-width: 768px) 100vw, 768px';
+        }
         img.alt = item.file?.description ?? item.text_content ?? 'Изображение';
 
         if (item.file?.width && item.file?.height) {
@@ -113,7 +204,7 @@ export class ContentRenderer {
         }
 
         img.addEventListener('click', () => {
-            this.modal.open(img.src, img.alt);
+            this.modal.open(item.file?.file_url ?? img.src, img.alt);
         });
 
         container.appendChild(img);